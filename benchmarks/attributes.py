@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare reading and writing attributes of a versioned object through
+the descriptors installed by ``VObjectMeta`` with the generic
+``__getattr__()`` and ``__setattr__()`` path every access took before
+them.  Run from the top of the source tree::
+
+    python benchmarks/attributes.py --reads 1000000 --writes 300000
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import vobj  # noqa
+
+
+class Employee(vobj.VObject):
+    class Version1(vobj.Schema):
+        __version__ = 1
+
+        name = vobj.Attribute()
+        salary = vobj.Attribute(validate=int)
+
+
+def _legacy():
+    """
+    Build a copy of ``Employee`` without the descriptors, whose
+    attribute reads and writes take the generic path.
+    """
+
+    class Legacy(vobj.VObject):
+        Version1 = Employee.Version1
+
+    for name in Employee.Version1.__vers_attrs__:
+        delattr(Legacy, name)
+    Legacy.__setattr__ = vobj.VObject.__setattr__
+
+    return Legacy
+
+
+def _measure(func, number, repeat):
+    return min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--reads', type=int, default=1000000,
+                        help='The number of attribute reads.')
+    parser.add_argument('--writes', type=int, default=300000,
+                        help='The number of attribute writes.')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='Runs per measurement; the best is kept.')
+    args = parser.parse_args()
+
+    emp = Employee(name='Alice', salary=10)
+    legacy = _legacy()(name='Alice', salary=10)
+
+    print('Python %s' % sys.version.split()[0])
+    print('%-8s %-12s %9s %9s' % ('access', 'path', 'time', 'per op'))
+    for access, number, path, func in [
+        ('read', args.reads, 'descriptor', lambda: emp.salary),
+        ('read', args.reads, '__getattr__', lambda: legacy.salary),
+        ('write', args.writes, 'descriptor',
+         lambda: setattr(emp, 'salary', 12)),
+        ('write', args.writes, '__setattr__',
+         lambda: setattr(legacy, 'salary', 12)),
+    ]:
+        elapsed = _measure(func, number, args.repeat)
+        print('%-8s %-12s %8.3fs %7.3fus' % (access, path, elapsed,
+                                             elapsed * 1000000.0 / number))
+
+
+if __name__ == '__main__':
+    main()
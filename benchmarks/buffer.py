@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare reading a single attribute of many binary-encoded objects
+through ``from_buffer()`` views with loading each object through
+``from_bytes()``.  The records are slices of one large buffer, as
+they would be in a memory-mapped file.  Run from the top of the
+source tree::
+
+    python benchmarks/buffer.py --records 100000
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import vobj  # noqa
+
+
+class Record(vobj.VObject):
+    class Version1(vobj.Schema):
+        __version__ = 1
+
+        name = vobj.Attribute()
+        score = vobj.Attribute(validate=int)
+        active = vobj.Attribute(True)
+        tags = vobj.Attribute([])
+        notes = vobj.Attribute(u'')
+        address = vobj.Attribute({})
+
+
+def _measure(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--records', '-n', type=int, default=100000,
+                        help='The number of records to read.')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='Runs per measurement; the best is kept.')
+    args = parser.parse_args()
+
+    records = [Record(name=u'Name%d' % i, score=i, tags=[u'a', u'b'],
+                      notes=u'x' * 40,
+                      address={u'city': u'Somewhere', u'zip': u'00000'})
+               .to_bytes() for i in range(args.records)]
+
+    # Slice each record out of one buffer, without copying
+    spans = []
+    pos = 0
+    for data in records:
+        spans.append((pos, pos + len(data)))
+        pos += len(data)
+    buf = memoryview(b''.join(records))
+    slices = [buf[start:end] for start, end in spans]
+
+    print('Python %s, %d records of %d bytes on average' %
+          (sys.version.split()[0], args.records,
+           len(buf) // args.records))
+    print('%-22s %9s' % ('method', 'time'))
+    for name, func in [
+        ('from_bytes().score', lambda: sum(
+            Record.from_bytes(data).score for data in slices)),
+        ('from_buffer().score', lambda: sum(
+            Record.from_buffer(data).score for data in slices)),
+        ('from_buffer() trusted', lambda: sum(
+            Record.from_buffer(data, trusted=True).score
+            for data in slices)),
+    ]:
+        print('%-22s %8.3fs' % (name, _measure(func, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+#
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure the cost of creating a ``VObject`` subclass with many
+versions, and of the first load of a state of its oldest version,
+with the upgrader chains built lazily and with "__vers_eager__".
+Each version's upgrader adds one attribute.  Building all the chains
+eagerly takes time linear in the number of versions, so the warm-up
+cost per version (the difference between the eager and lazy creation
+times, divided by the number of versions) should stay roughly
+constant; with ``--check``, the benchmark fails if it grows by more
+than a factor of two.  Run from the top of the source tree::
+
+    python benchmarks/chains.py --versions 100,500,1000
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import vobj  # noqa
+
+
+def _make_upgrader(name):
+    def upgrade(cls, state):
+        state[name] = 0
+        return state
+    return vobj.upgrader(upgrade)
+
+
+def _make_schemas(count):
+    """
+    Build ``count`` schemas, each adding one attribute to the
+    previous version.
+
+    :returns: A namespace for a ``VObject`` subclass.
+    """
+
+    namespace = {}
+    base = vobj.Schema
+    for vers in range(1, count + 1):
+        name = 'attr%d' % vers
+        body = {'__version__': vers, name: vobj.Attribute(0)}
+        if vers > 1:
+            body['upgrade'] = _make_upgrader(name)
+        base = type(base)('Version%d' % vers, (base,), body)
+        namespace[base.__name__] = base
+
+    return namespace
+
+
+def _make_class(namespace, eager):
+    namespace = dict(namespace, __vers_eager__=eager)
+    return type(vobj.VObject)('Record', (vobj.VObject,), namespace)
+
+
+def _measure(namespace, eager):
+    """
+    Time the creation of the class, then the first load of a state of
+    version 1.
+
+    :returns: A tuple of the two times, in seconds.
+    """
+
+    start = timeit.default_timer()
+    cls = _make_class(namespace, eager)
+    created = timeit.default_timer()
+    cls.from_dict({'__version__': 1, 'attr1': 0})
+    loaded = timeit.default_timer()
+
+    return created - start, loaded - created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--versions', '-v', default='100,500,1000',
+                        help='Comma-separated numbers of versions to try.')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='Runs per measurement; the best is kept.')
+    parser.add_argument('--check', action='store_true',
+                        help='Fail if the warm-up cost per version more '
+                        'than doubles from the fewest to the most versions.')
+    args = parser.parse_args()
+
+    print('Python %s' % sys.version.split()[0])
+    print('%6s %-6s %12s %12s %12s' %
+          ('V', 'mode', 'create', 'first load', 'warm-up/V'))
+    per_version = []
+    for count in [int(count) for count in args.versions.split(',')]:
+        namespace = _make_schemas(count)
+        created = {}
+        for mode, eager in [('lazy', False), ('eager', True)]:
+            results = [_measure(namespace, eager)
+                       for i in range(args.repeat)]
+            created[mode] = min(r[0] for r in results)
+            warm = ''
+            if eager:
+                per_version.append(
+                    (created['eager'] - created['lazy']) / count)
+                warm = '%10.1fus' % (per_version[-1] * 1000000.0)
+            print('%6d %-6s %11.2fms %11.2fms %12s' %
+                  (count, mode, created[mode] * 1000.0,
+                   min(r[1] for r in results) * 1000.0, warm))
+
+    growth = per_version[-1] / per_version[0]
+    print('Warm-up cost per version changed by a factor of %.2f' % growth)
+    if args.check and growth > 2.0:
+        sys.exit('warm-up cost is growing faster than linearly')
+
+
+if __name__ == '__main__':
+    main()
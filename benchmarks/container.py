@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+#
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare reloading versioned objects from a ``vobj.container`` file
+with reloading them from JSON lines and from a pickle.  A fraction of
+the records is written in an older version, and is upgraded on
+reload.  Run from the top of the source tree::
+
+    python benchmarks/container.py --records 200000 --old 0.5
+"""
+
+from __future__ import print_function
+
+import argparse
+import io
+import os
+import pickle
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import vobj  # noqa
+from vobj import container  # noqa
+from vobj import stream  # noqa
+
+
+class Record(vobj.VObject):
+    class Version1(vobj.Schema):
+        __version__ = 1
+
+        name = vobj.Attribute()
+        score = vobj.Attribute(validate=int)
+        active = vobj.Attribute(True)
+        tags = vobj.Attribute([])
+
+    class Version2(Version1):
+        __version__ = 2
+
+        name = None
+        first = vobj.Attribute()
+        last = vobj.Attribute()
+
+        @vobj.upgrader
+        def upgrade(cls, state):
+            state['first'], state['last'] = state.pop('name').split(' ')
+            return state
+
+        @vobj.downgrader(1)
+        def downgrade(cls, state):
+            state['name'] = '%s %s' % (state.pop('first'), state.pop('last'))
+            return state
+
+
+def _records(objs, old):
+    # The proxies for the older version only live as long as the
+    # objects do
+    cutoff = int(len(objs) * old)
+    return [obj.__version__[1] if i < cutoff else obj
+            for i, obj in enumerate(objs)]
+
+
+def _measure(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--records', '-n', type=int, default=100000,
+                        help='The number of records to reload.')
+    parser.add_argument('--old', type=float, default=0.5,
+                        help='The fraction of records in the older '
+                        'version.')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='Runs per measurement; the best is kept.')
+    args = parser.parse_args()
+
+    objs = [Record(first=u'First%d' % i, last=u'Last', score=i,
+                   tags=[u'a', u'b']) for i in range(args.records)]
+    records = _records(objs, args.old)
+
+    out = io.BytesIO()
+    stream.write_records(out, (rec.to_dict() for rec in records))
+    lines = out.getvalue()
+
+    out = io.BytesIO()
+    with container.Writer(out) as writer:
+        writer.write_many(records)
+    data = out.getvalue()
+
+    # Pickles can only hold the objects themselves, in the latest
+    # version
+    pickled = pickle.dumps(objs, pickle.HIGHEST_PROTOCOL)
+
+    print('Python %s, %d records, %d%% in the older version' %
+          (sys.version.split()[0], args.records, args.old * 100))
+    print('%-12s %10s %9s' % ('format', 'bytes', 'reload'))
+    for name, size, func in [
+        ('json lines', len(lines), lambda: Record.from_dicts(
+            stream.read_records(io.BytesIO(lines)), take=True)),
+        ('pickle', len(pickled), lambda: pickle.loads(pickled)),
+        ('container', len(data), lambda: container.Reader(
+            data, [Record]).load()),
+    ]:
+        print('%-12s %10d %8.3fs' % (name, size,
+                                     _measure(func, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+#
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare upgrading a single state through a chain of 1, 3, or 10
+upgraders with the compiled loader built by ``Converters.fuse()``
+and with the step-by-step conversion, for generic and specialized
+schemas.  Run from the top of the source tree::
+
+    python benchmarks/converters.py --number 100000
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import vobj  # noqa
+from vobj import converters  # noqa
+
+
+def _upgrade(cls, state):
+    state['score'] += 1
+    return state
+
+
+def _make_class(steps, specialize):
+    """
+    Build a ``VObject`` subclass with ``steps`` + 1 versions, each
+    upgrader incrementing the score.
+    """
+
+    namespace = {}
+    base = vobj.Schema
+    for vers in range(1, steps + 2):
+        body = {'__version__': vers}
+        if vers == 1:
+            body['__vers_specialize__'] = specialize
+            body['name'] = vobj.Attribute()
+            body['score'] = vobj.Attribute(validate=int)
+            body['active'] = vobj.Attribute(True)
+        else:
+            body['upgrade'] = vobj.upgrader(_upgrade)
+        base = type(base)('Version%d' % vers, (base,), body)
+        namespace[base.__name__] = base
+
+    return type(vobj.VObject)('Record', (vobj.VObject,), namespace)
+
+
+def _unfused(cls):
+    """
+    Build the chain of upgraders from version 1 without compiling it,
+    so that it is applied step by step.
+    """
+
+    schemas = cls.__vers_schemas__
+    cvt = converters.Converters(schemas[-1])
+    for src, dst in reversed(cls.__vers_plan__(1)):
+        cvt.append(schemas[dst - 1].__vers_upgraders__[src])
+
+    return cvt
+
+
+def _measure(cvt, number, repeat):
+    state = {'__version__': 1, 'name': 'Alice', 'score': 1, 'active': True}
+    return min(timeit.repeat(lambda: cvt(state.copy()), number=number,
+                             repeat=repeat)) * 1000000.0 / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--number', '-n', type=int, default=100000,
+                        help='The number of states to upgrade.')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='Runs per measurement; the best is kept.')
+    args = parser.parse_args()
+
+    print('Python %s, %d upgrades' % (sys.version.split()[0], args.number))
+    print('%-12s %5s %10s %10s %8s' %
+          ('schema', 'steps', 'unfused', 'fused', 'change'))
+    for specialize in (False, True):
+        for steps in (1, 3, 10):
+            cls = _make_class(steps, specialize)
+            unfused = _measure(_unfused(cls), args.number, args.repeat)
+            fused = _measure(cls.__vers_upgrader_get__(1), args.number,
+                             args.repeat)
+            print('%-12s %5d %8.2fus %8.2fus %7.0f%%' %
+                  ('specialized' if specialize else 'generic', steps,
+                   unfused, fused, (fused - unfused) * 100.0 / unfused))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare the memory used by versioned objects whose schema stores the
+attribute values in a dictionary with that used by objects whose
+schema uses compact storage ("__vers_compact__").  The memory is
+measured with ``tracemalloc``, which requires Python 3.4 or later.
+Run from the top of the source tree::
+
+    python benchmarks/memory.py --objects 20000
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import vobj  # noqa
+
+
+class Record(vobj.VObject):
+    class Version1(vobj.Schema):
+        __version__ = 1
+
+        a = vobj.Attribute()
+        b = vobj.Attribute()
+        c = vobj.Attribute()
+        d = vobj.Attribute()
+        e = vobj.Attribute()
+        f = vobj.Attribute()
+        g = vobj.Attribute()
+        h = vobj.Attribute()
+
+
+class CompactRecord(vobj.VObject):
+    class Version1(Record.Version1):
+        __version__ = 1
+        __vers_compact__ = True
+
+
+def _measure(cls, count):
+    """
+    Measure the memory allocated by a number of instances of a
+    versioned object class.  The attribute values are small integers,
+    which are shared, so only the objects themselves are counted.
+
+    :returns: The average number of bytes per object.
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objs = [cls(a=1, b=2, c=3, d=4, e=5, f=6, g=7, h=8)
+                for i in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    del objs
+    return float(after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--objects', '-n', type=int, default=20000,
+                        help='The number of objects to create.')
+    args = parser.parse_args()
+
+    print('Python %s, %d objects with %d attributes' %
+          (sys.version.split()[0], args.objects,
+           len(Record.Version1.__vers_fields__)))
+    print('%-10s %14s' % ('storage', 'bytes/object'))
+    for name, cls in [
+        ('dict', Record),
+        ('compact', CompactRecord),
+    ]:
+        print('%-10s %14.1f' % (name, _measure(cls, args.objects)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure how ``vobj.parallel`` scales with the number of worker
+processes.  Each record is upgraded through a chain of upgraders
+doing a configurable amount of pure-Python work, first serially with
+``from_dicts()`` and then with each requested number of workers.
+Run from the top of the source tree::
+
+    python benchmarks/parallel.py --records 200000 --workers 1,2,4,8
+"""
+
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import vobj  # noqa
+
+
+# The amount of work done by each upgrader, in loop iterations; set
+# from the command line, and passed on to the workers through the
+# environment
+WORK = int(os.environ.get('VOBJ_BENCH_WORK', '200'))
+
+
+def _work(value):
+    for i in range(WORK):
+        value = (value * 31 + i) % 1000003
+    return value
+
+
+class Record(vobj.VObject):
+    class Version1(vobj.Schema):
+        __version__ = 1
+
+        name = vobj.Attribute(validate=str)
+        score = vobj.Attribute(validate=int)
+
+    class Version2(Version1):
+        __version__ = 2
+
+        name = None
+        first = vobj.Attribute(validate=str)
+        last = vobj.Attribute(validate=str)
+
+        @vobj.upgrader
+        def upgrade(cls, state):
+            state['first'], state['last'] = state.pop('name').split(' ')
+            state['score'] = _work(state['score'])
+            return state
+
+    class Version3(Version2):
+        __version__ = 3
+
+        checksum = vobj.Attribute(validate=int)
+
+        @vobj.upgrader
+        def upgrade(cls, state):
+            state['checksum'] = _work(state['score'] + len(state['first']))
+            return state
+
+
+def _states(count):
+    return [{'__version__': 1, 'name': 'First%d Last' % i, 'score': i}
+            for i in range(count)]
+
+
+def _measure(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    global WORK
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--records', '-n', type=int, default=100000,
+                        help='The number of records to load.')
+    parser.add_argument('--workers', '-w', default=None,
+                        help='Comma-separated worker counts to try.  '
+                        'Defaults to powers of two up to the CPU count.')
+    parser.add_argument('--chunk-size', '-c', type=int, default=2000,
+                        help='The number of records per chunk.')
+    parser.add_argument('--work', type=int, default=WORK,
+                        help='Loop iterations per upgrader.')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='Runs per measurement; the best is kept.')
+    args = parser.parse_args()
+
+    # Make the setting visible to the workers, which re-import this
+    # module under the "spawn" start method
+    WORK = args.work
+    os.environ['VOBJ_BENCH_WORK'] = str(args.work)
+
+    cpus = multiprocessing.cpu_count()
+    if args.workers:
+        counts = [int(count) for count in args.workers.split(',')]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= cpus:
+            counts.append(counts[-1] * 2)
+
+    states = _states(args.records)
+
+    print('Python %s, %d CPUs, %d records, chunk size %d, work %d' %
+          (sys.version.split()[0], cpus, args.records, args.chunk_size,
+           args.work))
+    serial = _measure(lambda: Record.from_dicts(states), args.repeat)
+    print('%-12s %9.3fs %8s' % ('serial', serial, '1.00x'))
+
+    for count in counts:
+        elapsed = _measure(
+            lambda: Record.from_dicts(states, workers=count,
+                                      chunk_size=args.chunk_size),
+            args.repeat)
+        print('%-12s %9.3fs %7.2fx' % ('%d workers' % count, elapsed,
+                                       serial / elapsed))
+
+
+if __name__ == '__main__':
+    main()
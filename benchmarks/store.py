@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare a ``vobj.store`` with a file holding a JSON object that maps
+keys to the ``to_dict()`` states of the objects: the time to write
+all the objects, and the time to open the file and load a few of the
+objects by key.  Run from the top of the source tree::
+
+    python benchmarks/store.py --records 100000 --reads 1000
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import vobj  # noqa
+from vobj import store  # noqa
+
+
+class Record(vobj.VObject):
+    class Version1(vobj.Schema):
+        __version__ = 1
+
+        name = vobj.Attribute()
+        score = vobj.Attribute(validate=int)
+        active = vobj.Attribute(True)
+        tags = vobj.Attribute([])
+
+
+def _measure(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--records', '-n', type=int, default=100000,
+                        help='The number of records to store.')
+    parser.add_argument('--reads', type=int, default=1000,
+                        help='The number of records to load after '
+                        'opening the file.')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='Runs per measurement; the best is kept.')
+    args = parser.parse_args()
+
+    objs = dict((u'key%d' % i, Record(name=u'Name%d' % i, score=i,
+                                      tags=[u'a', u'b']))
+                for i in range(args.records))
+    keys = random.Random(0).sample(sorted(objs), args.reads)
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        json_path = os.path.join(tmpdir, 'records.json')
+        store_path = os.path.join(tmpdir, 'records.vobjs')
+
+        def json_write():
+            with open(json_path, 'w') as f:
+                json.dump(dict((key, obj.to_dict())
+                               for key, obj in objs.items()), f)
+
+        def json_read():
+            with open(json_path) as f:
+                states = json.load(f)
+            return [Record.from_dict(states[key]) for key in keys]
+
+        def store_write():
+            for path in (store_path, store_path + store.INDEX_SUFFIX):
+                if os.path.exists(path):
+                    os.remove(path)
+            with store.Store(store_path, [Record]) as st:
+                st.put_many(objs)
+
+        def store_read():
+            with store.Store(store_path, [Record]) as st:
+                return [st[key] for key in keys]
+
+        print('Python %s, %d records, %d loaded by key' %
+              (sys.version.split()[0], args.records, args.reads))
+        print('%-12s %10s %9s %9s' % ('format', 'bytes', 'write',
+                                      'read'))
+        for name, path, write, read in [
+            ('json', json_path, json_write, json_read),
+            ('store', store_path, store_write, store_read),
+        ]:
+            write_time = _measure(write, args.repeat)
+            size = os.path.getsize(path)
+            if os.path.exists(path + store.INDEX_SUFFIX):
+                size += os.path.getsize(path + store.INDEX_SUFFIX)
+            print('%-12s %10d %8.3fs %8.3fs' %
+                  (name, size, write_time, _measure(read, args.repeat)))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
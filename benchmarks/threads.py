@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Stress the caches of versioned objects from several threads.  One
+thread keeps assigning new values to an attribute of an object while
+the reader threads read an older version of the object, counting the
+reads that return a version computed from a value which had already
+been replaced when the read began.  Then several threads load states
+of a freshly created class at once, counting how many times the
+upgrader chain was built.  Run from the top of the source tree::
+
+    python benchmarks/threads.py --readers 4 --duration 3
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import vobj  # noqa
+
+
+def _make_class():
+    class Counter(vobj.VObject):
+        class Version1(vobj.Schema):
+            __version__ = 1
+
+            double = vobj.Attribute(validate=int)
+
+        class Version2(vobj.Schema):
+            __version__ = 2
+
+            value = vobj.Attribute(validate=int)
+
+            @vobj.upgrader
+            def upgrade(cls, state):
+                return {'value': state['double'] // 2}
+
+            @vobj.downgrader(1)
+            def downgrade(cls, state):
+                # Take a little time, as a real downgrader would, so
+                # that writes can overlap it
+                double = 0
+                for i in range(100):
+                    double += state['value'] * 2
+                return {'double': double // 100}
+
+    return Counter
+
+
+def _run_threads(targets):
+    start = threading.Event()
+
+    def wrap(target):
+        def run():
+            start.wait()
+            target()
+        return run
+
+    threads = [threading.Thread(target=wrap(target)) for target in targets]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+
+
+def _stale_reads(readers, duration):
+    """
+    Run one writer and several readers on one object.
+
+    :returns: A tuple of the number of reads and the number of stale
+              reads.
+    """
+
+    obj = _make_class()(value=0)
+    written = [0]
+    stop = []
+    counts = []
+
+    def writer():
+        value = 0
+        end = timeit.default_timer() + duration
+        while timeit.default_timer() < end:
+            value += 1
+            obj.value = value
+            written[0] = value
+        stop.append(True)
+
+    def reader():
+        reads = stale = 0
+        while not stop:
+            expected = written[0]
+            if obj.__version__[1].double // 2 < expected:
+                stale += 1
+            reads += 1
+        counts.append((reads, stale))
+
+    _run_threads([writer] + [reader] * readers)
+
+    return (sum(reads for reads, stale in counts),
+            sum(stale for reads, stale in counts))
+
+
+def _chain_builds(loaders):
+    """
+    Load a state of the older version of a freshly created class from
+    several threads at once.
+
+    :returns: The number of times the upgrader chain was built.
+    """
+
+    cls = _make_class()
+    plan = cls.__vers_plan__
+    builds = []
+
+    def counting_plan(vers):
+        builds.append(vers)
+        return plan(vers)
+    cls.__vers_plan__ = staticmethod(counting_plan)
+
+    def loader():
+        cls.from_dict({'__version__': 1, 'double': 2})
+
+    _run_threads([loader] * loaders)
+
+    return len(builds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--readers', type=int, default=4,
+                        help='The number of reader threads.')
+    parser.add_argument('--loaders', type=int, default=8,
+                        help='The number of threads loading a new class.')
+    parser.add_argument('--duration', '-d', type=float, default=3.0,
+                        help='How long the writer runs, in seconds.')
+    args = parser.parse_args()
+
+    # Switch threads often, to make races more likely
+    if hasattr(sys, 'setswitchinterval'):
+        sys.setswitchinterval(0.000001)
+
+    print('Python %s' % sys.version.split()[0])
+    reads, stale = _stale_reads(args.readers, args.duration)
+    print('1 writer, %d readers for %.1fs: %d stale reads out of %d' %
+          (args.readers, args.duration, stale, reads))
+    print('%d threads loading a new class: chain built %d times' %
+          (args.loaders, _chain_builds(args.loaders)))
+
+
+if __name__ == '__main__':
+    main()
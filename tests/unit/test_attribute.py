@@ -23,8 +23,10 @@ class AttributeTest(unittest.TestCase):
         attr = attribute.Attribute()
 
         self.assertEqual(attr.default, attribute.unset)
+        self.assertEqual(attr.validate, attribute.identity)
         self.assertTrue(callable(attr.validate))
         self.assertEqual(attr.validate('spam'), 'spam')
+        self.assertEqual(attr.getstate, attribute.identity)
         self.assertTrue(callable(attr.getstate))
         self.assertEqual(attr.getstate('spam'), 'spam')
 
@@ -35,3 +37,10 @@ class AttributeTest(unittest.TestCase):
         self.assertEqual(attr.default, 'default')
         self.assertEqual(attr.validate, 'validate')
         self.assertEqual(attr.getstate, 'getstate')
+
+
+class IdentityTest(unittest.TestCase):
+    def test_identity(self):
+        value = object()
+
+        self.assertTrue(attribute.identity(value) is value)
@@ -0,0 +1,291 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import six
+
+from vobj import attribute
+from vobj import binary
+from vobj import decorators
+from vobj import proxy
+from vobj import schema
+from vobj import vobject
+
+
+class Employee(vobject.VObject):
+    class Version1(schema.Schema):
+        __version__ = 1
+
+        name = attribute.Attribute()
+        salary = attribute.Attribute(0, validate=int)
+
+    class Version2(Version1):
+        __version__ = 2
+
+        name = None
+        first = attribute.Attribute()
+        last = attribute.Attribute()
+
+        @decorators.upgrader
+        def upgrade(cls, state):
+            state['first'], state['last'] = state.pop('name').split(' ')
+            return state
+
+        @decorators.downgrader(1)
+        def downgrade(cls, state):
+            state['name'] = '%s %s' % (state.pop('first'), state.pop('last'))
+            return state
+
+
+def _roundtrip(value):
+    out = bytearray()
+    binary.encode_value(out, value)
+    data = bytes(out)
+
+    result, pos = binary.decode_value(data, 0)
+    assert pos == len(data)
+    assert binary.skip_value(data, 0) == len(data)
+
+    return result, data
+
+
+class ValueTest(unittest.TestCase):
+    def test_scalars(self):
+        for value in (None, True, False, 0, 1, -1, 63, -64, 64, 300,
+                      2 ** 70, -(2 ** 70), 1.5, -0.0, six.u('caf\xe9'),
+                      b'\x00\xff', six.u('')):
+            result, data = _roundtrip(value)
+
+            self.assertEqual(result, value)
+            self.assertEqual(type(result), type(value))
+
+    def test_small_int(self):
+        result, data = _roundtrip(5)
+
+        self.assertEqual(data, b'i\x0a')
+
+    def test_containers(self):
+        value = {
+            six.u('list'): [1, six.u('two'), None],
+            six.u('tuple'): (1.5, (True,)),
+            3: {six.u('nested'): []},
+        }
+
+        result, data = _roundtrip(value)
+
+        self.assertEqual(result, value)
+        self.assertTrue(isinstance(result[six.u('tuple')], tuple))
+
+    def test_memoryview(self):
+        out = bytearray()
+        binary.encode_value(out, [six.u('abc'), b'de', 2.5])
+
+        result, pos = binary.decode_value(memoryview(bytes(out)), 0)
+
+        self.assertEqual(result, [six.u('abc'), b'de', 2.5])
+
+    def test_unsupported(self):
+        self.assertRaises(TypeError, binary.encode_value, bytearray(),
+                          object())
+
+    def test_bad_tag(self):
+        self.assertRaises(ValueError, binary.decode_value, b'?', 0)
+        self.assertRaises(ValueError, binary.skip_value, b'?', 0)
+
+
+class RecordTest(unittest.TestCase):
+    def test_encode(self):
+        obj = Employee(first=six.u('Alice'), last=six.u('Smith'), salary=10)
+
+        result = binary.encode('Employee', obj.__vers_values__)
+
+        self.assertEqual(result, binary.MAGIC +
+                         b'\x08Employee\x02\x03'
+                         b's\x05Alice' b's\x05Smith' b'i\x14')
+
+    def test_decode(self):
+        data = binary.encode('Employee', Employee(
+            first=six.u('Alice'), last=six.u('Smith')).__vers_values__)
+
+        self.assertEqual(binary.decode(data), (
+            'Employee', 2, [six.u('Alice'), six.u('Smith'), 0]))
+        self.assertEqual(binary.decode_header(data)[:3], ('Employee', 2, 3))
+
+    def test_decode_bad_magic(self):
+        self.assertRaises(ValueError, binary.decode, b'XX\x00')
+
+    def test_decode_truncated(self):
+        data = binary.encode('Employee', Employee(
+            first=six.u('Alice'), last=six.u('Smith')).__vers_values__)
+
+        self.assertRaises(ValueError, binary.decode, data[:-1])
+        self.assertRaises(ValueError, binary.decode, data[:4])
+
+    def test_decode_extra(self):
+        data = binary.encode('Employee', Employee(
+            first=six.u('Alice'), last=six.u('Smith')).__vers_values__)
+
+        self.assertRaises(ValueError, binary.decode, data + b'N')
+
+
+class VObjectBytesTest(unittest.TestCase):
+    def test_roundtrip(self):
+        obj = Employee(first=six.u('Alice'), last=six.u('Smith'), salary=10)
+
+        result = Employee.from_bytes(obj.to_bytes())
+
+        self.assertEqual(result, obj)
+
+    def test_older_version(self):
+        obj = Employee(first=six.u('Alice'), last=six.u('Smith'), salary=10)
+
+        data = obj.__version__[1].to_bytes()
+        result = Employee.from_bytes(data)
+
+        self.assertEqual(binary.decode(data), (
+            'Employee', 1, [six.u('Alice Smith'), 10]))
+        self.assertEqual(result, obj)
+
+    def test_validated(self):
+        data = binary.encode('Employee', Employee.Version1(
+            {'name': six.u('Alice Smith'), 'salary': 10}))
+        data = data[:-2] + b's\x0212'
+
+        self.assertEqual(Employee.from_bytes(data).salary, 12)
+        self.assertEqual(Employee.from_bytes(data, trusted=True).salary,
+                         six.u('12'))
+
+    def test_memoryview(self):
+        obj = Employee(first=six.u('Alice'), last=six.u('Smith'))
+
+        result = Employee.from_bytes(memoryview(obj.to_bytes()))
+
+        self.assertEqual(result, obj)
+
+    def test_wrong_class(self):
+        class Other(vobject.VObject):
+            __vers_name__ = 'Other'
+
+            class Version1(schema.Schema):
+                __version__ = 1
+
+        self.assertRaises(ValueError, Other.from_bytes, Employee(
+            first=six.u('Alice'), last=six.u('Smith')).to_bytes())
+
+    def test_bad_version(self):
+        data = binary.MAGIC + b'\x08Employee\x03\x00'
+
+        self.assertRaises(TypeError, Employee.from_bytes, data)
+
+    def test_bad_count(self):
+        data = binary.MAGIC + b'\x08Employee\x02\x01N'
+
+        self.assertRaises(ValueError, Employee.from_bytes, data)
+
+    def test_name(self):
+        class Named(vobject.VObject):
+            __vers_name__ = 'emp'
+
+            class Version1(schema.Schema):
+                __version__ = 1
+
+        class Sub(Named):
+            pass
+
+        self.assertEqual(Employee.__vers_name__, 'Employee')
+        self.assertEqual(Named.__vers_name__, 'emp')
+        self.assertEqual(Sub.__vers_name__, 'Sub')
+        self.assertEqual(Named.from_bytes(Named().to_bytes()), Named())
+
+    def test_abstract(self):
+        self.assertRaises(TypeError, vobject.VObject.from_bytes, b'')
+
+
+class VObjectBufferTest(unittest.TestCase):
+    def test_latest(self):
+        obj = Employee(first=six.u('Alice'), last=six.u('Smith'), salary=10)
+
+        result = Employee.from_buffer(obj.to_bytes())
+
+        self.assertTrue(isinstance(result, proxy.BufferSchemaProxy))
+        self.assertEqual(result.first, six.u('Alice'))
+        self.assertEqual(result.salary, 10)
+        self.assertEqual(result.__vers_object__, None)
+        self.assertEqual(result.__version__, 2)
+        self.assertEqual(result, obj)
+        self.assertEqual(result.__version__[1].name, six.u('Alice Smith'))
+
+    def test_slice(self):
+        objs = [Employee(first=six.u('Alice'), last=six.u('Smith')),
+                Employee(first=six.u('Bob'), last=six.u('Jones'))]
+        records = [obj.to_bytes() for obj in objs]
+        buf = memoryview(b''.join(records))
+
+        result = Employee.from_buffer(buf[len(records[0]):])
+
+        self.assertEqual(result.first, six.u('Bob'))
+        self.assertEqual(result, objs[1])
+
+    def test_older_version(self):
+        obj = Employee(first=six.u('Alice'), last=six.u('Smith'), salary=10)
+
+        result = Employee.from_buffer(obj.__version__[1].to_bytes())
+
+        self.assertTrue(isinstance(result, Employee))
+        self.assertEqual(result, obj)
+
+    def test_custom_setstate(self):
+        class Custom(vobject.VObject):
+            class Version1(schema.Schema):
+                __version__ = 1
+
+                attr = attribute.Attribute()
+
+                def __setstate__(self, state):
+                    state['attr'] = state['attr'].upper()
+                    super(Custom.Version1, self).__setstate__(state)
+
+        result = Custom.from_buffer(Custom(attr=six.u('a')).to_bytes())
+
+        self.assertTrue(isinstance(result, Custom))
+        self.assertEqual(result.attr, six.u('A'))
+
+    def test_validated(self):
+        data = Employee(first=six.u('Alice'), last=six.u('Smith'),
+                        salary=10).to_bytes()
+        data = data[:-2] + b's\x0212'
+
+        self.assertEqual(Employee.from_buffer(data).salary, 12)
+        self.assertEqual(Employee.from_buffer(data, trusted=True).salary,
+                         six.u('12'))
+
+    def test_wrong_class(self):
+        class Other(vobject.VObject):
+            __vers_name__ = 'Other'
+
+            class Version1(schema.Schema):
+                __version__ = 1
+
+        self.assertRaises(ValueError, Other.from_buffer, Employee(
+            first=six.u('Alice'), last=six.u('Smith')).to_bytes())
+
+    def test_bad_count(self):
+        data = binary.MAGIC + b'\x08Employee\x02\x01N'
+
+        self.assertRaises(ValueError, Employee.from_buffer, data)
+
+    def test_abstract(self):
+        self.assertRaises(TypeError, vobject.VObject.from_buffer, b'')
@@ -0,0 +1,58 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+from vobj import codegen
+
+
+class NamerTest(unittest.TestCase):
+    def test_init(self):
+        namer = codegen.Namer(a=1, b=2)
+
+        self.assertEqual(namer.env, dict(a=1, b=2))
+
+    def test_bind(self):
+        namer = codegen.Namer(a=1)
+
+        result1 = namer.bind('value', 'one')
+        result2 = namer.bind('value', 'two')
+
+        self.assertEqual(result1, '_value_0')
+        self.assertEqual(result2, '_value_1')
+        self.assertEqual(namer.env, dict(a=1, _value_0='one', _value_1='two'))
+
+
+class MakeFunctionTest(unittest.TestCase):
+    def test_make_function(self):
+        lines = [
+            'def func(x):',
+            '    return x + offset',
+        ]
+
+        result = codegen.make_function('func', lines, dict(offset=5))
+
+        self.assertEqual(result(1), 6)
+        self.assertEqual(result.__name__, 'func')
+        self.assertEqual(result.__vers_generated__, True)
+        self.assertEqual(result.__vers_source__,
+                         'def func(x):\n    return x + offset\n')
+        self.assertEqual(result.__code__.co_filename, '<vobj func>')
+
+    def test_make_function_filename(self):
+        result = codegen.make_function('func', ['def func():', '    pass'],
+                                       {}, 'spam')
+
+        self.assertEqual(result.__code__.co_filename, 'spam')
@@ -0,0 +1,300 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import io
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import mock
+import six
+
+from vobj import attribute
+from vobj import container
+from vobj import decorators
+from vobj import schema
+from vobj import vobject
+
+
+class Employee(vobject.VObject):
+    class Version1(schema.Schema):
+        __version__ = 1
+
+        name = attribute.Attribute()
+        salary = attribute.Attribute(0, validate=int)
+
+    class Version2(Version1):
+        __version__ = 2
+
+        name = None
+        first = attribute.Attribute()
+        last = attribute.Attribute()
+
+        @decorators.upgrader
+        def upgrade(cls, state):
+            state['first'], state['last'] = state.pop('name').split(' ')
+            return state
+
+        @decorators.downgrader(1)
+        def downgrade(cls, state):
+            state['name'] = '%s %s' % (state.pop('first'), state.pop('last'))
+            return state
+
+
+class Office(vobject.VObject):
+    __vers_name__ = 'office'
+
+    class Version1(schema.Schema):
+        __version__ = 1
+
+        city = attribute.Attribute()
+
+
+def _employee(first, last, salary=0):
+    return Employee(first=six.u(first), last=six.u(last), salary=salary)
+
+
+def _container(objs):
+    stream = io.BytesIO()
+    with container.Writer(stream) as writer:
+        writer.write_many(objs)
+
+    return stream.getvalue()
+
+
+class WriterTest(unittest.TestCase):
+    def test_layout(self):
+        alice = _employee('Alice', 'Smith', 10)
+
+        result = _container([alice, alice.__version__[1], alice])
+
+        footer = (b'{"groups":[["Employee",2,["first","last","salary"]],'
+                  b'["Employee",1,["name","salary"]]]}')
+        self.assertEqual(result, container.MAGIC +
+                         b'[[0,"Alice","Smith",10],'
+                         b'[1,"Alice Smith",10],'
+                         b'[0,"Alice","Smith",10]]' + footer +
+                         b'\x07\x00\x00\x00\x00\x00\x00\x00'
+                         b'\x1e\x00\x00\x00\x00\x00\x00\x00'
+                         b'\x33\x00\x00\x00\x00\x00\x00\x00' +
+                         b'\x4a\x00\x00\x00\x00\x00\x00\x00' +
+                         struct.pack('<Q', 0x4a + len(footer)) +
+                         container.MAGIC)
+
+    def test_len(self):
+        writer = container.Writer(io.BytesIO())
+
+        count = writer.write_many([_employee('Alice', 'Smith'),
+                                   _employee('Bob', 'Jones')])
+
+        self.assertEqual(count, 2)
+        self.assertEqual(len(writer), 2)
+
+    def test_close_once(self):
+        stream = mock.Mock()
+        writer = container.Writer(stream)
+
+        writer.close()
+        writer.close()
+
+        self.assertEqual(stream.write.call_count, 2)
+        stream.flush.assert_called_once_with()
+        self.assertFalse(stream.close.called)
+
+    def test_write_closed(self):
+        writer = container.Writer(io.BytesIO())
+        writer.close()
+
+        self.assertRaises(ValueError, writer.write,
+                          _employee('Alice', 'Smith'))
+
+    def test_unsupported(self):
+        writer = container.Writer(io.BytesIO())
+
+        self.assertRaises(TypeError, writer.write,
+                          Employee(first=object(), last=six.u('Smith')))
+
+
+class ReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.alice = _employee('Alice', 'Smith', 10)
+        self.bob = _employee('Bob', 'Jones', 20)
+        self.office = Office(city=six.u('Austin'))
+        self.data = _container([self.alice, self.bob.__version__[1],
+                                self.office, self.bob])
+
+    def test_len(self):
+        reader = container.Reader(self.data, [Employee, Office])
+
+        self.assertEqual(len(reader), 4)
+
+    def test_getitem(self):
+        reader = container.Reader(self.data, [Employee, Office])
+
+        self.assertEqual(reader[0], self.alice)
+        self.assertEqual(reader[1], self.bob)
+        self.assertEqual(reader[2], self.office)
+        self.assertEqual(reader[-1], self.bob)
+        self.assertRaises(IndexError, lambda: reader[4])
+        self.assertRaises(IndexError, lambda: reader[-5])
+
+    def test_iter(self):
+        reader = container.Reader(self.data, [Employee, Office])
+
+        self.assertEqual(list(reader),
+                         [self.alice, self.bob, self.office, self.bob])
+
+    def test_states(self):
+        reader = container.Reader(self.data, [])
+
+        self.assertEqual(reader.states(), [
+            ('Employee', {'__version__': 2, 'first': 'Alice',
+                          'last': 'Smith', 'salary': 10}),
+            ('Employee', {'__version__': 1, 'name': 'Bob Jones',
+                          'salary': 20}),
+            ('office', {'__version__': 1, 'city': 'Austin'}),
+            ('Employee', {'__version__': 2, 'first': 'Bob',
+                          'last': 'Jones', 'salary': 20}),
+        ])
+
+    def test_load(self):
+        reader = container.Reader(self.data, [Employee, Office])
+
+        self.assertEqual(reader.load(),
+                         [self.alice, self.bob, self.office, self.bob])
+
+    @mock.patch.object(Employee, '__vers_load_rows__',
+                       side_effect=lambda vers, rows, trusted: rows)
+    def test_load_grouped(self, mock_load_rows):
+        reader = container.Reader(self.data, [Employee, Office],
+                                  trusted=True)
+
+        result = reader.load()
+
+        self.assertEqual(mock_load_rows.call_count, 2)
+        mock_load_rows.assert_any_call(
+            2, [['Alice', 'Smith', 10], ['Bob', 'Jones', 20]], True)
+        mock_load_rows.assert_any_call(1, [['Bob Jones', 20]], True)
+        self.assertEqual(result[0], ['Alice', 'Smith', 10])
+        self.assertEqual(result[1], ['Bob Jones', 20])
+
+    def test_load_by_name(self):
+        class Renamed(vobject.VObject):
+            __vers_name__ = 'office'
+
+            class Version1(schema.Schema):
+                __version__ = 1
+
+                address = attribute.Attribute('')
+                city = attribute.Attribute()
+
+        data = _container([self.office])
+        reader = container.Reader(data, [Renamed])
+
+        self.assertRaises(ValueError, reader.load)
+        self.assertRaises(ValueError, lambda: reader[0])
+
+        with mock.patch.object(Renamed, 'from_dicts',
+                               return_value=['loaded']) as mock_from_dicts:
+            self.assertEqual(reader.load(), ['loaded'])
+
+        mock_from_dicts.assert_called_once_with(
+            [{'__version__': 1, 'city': 'Austin'}], trusted=False, take=True)
+
+    def test_load_validated(self):
+        data = _container([Employee.from_dict(
+            {'__version__': 2, 'first': six.u('Bob'), 'last': six.u('Jones'),
+             'salary': six.u('20')}, trusted=True)])
+
+        self.assertEqual(container.Reader(data, [Employee]).load()[0].salary,
+                         20)
+        self.assertEqual(container.Reader(data, [Employee],
+                                          trusted=True).load()[0].salary,
+                         six.u('20'))
+
+    def test_missing_class(self):
+        reader = container.Reader(self.data, [Employee])
+
+        self.assertEqual(reader[0], self.alice)
+        self.assertRaises(ValueError, lambda: reader[2])
+        self.assertRaises(ValueError, reader.load)
+
+    def test_empty(self):
+        reader = container.Reader(_container([]), [Employee])
+
+        self.assertEqual(len(reader), 0)
+        self.assertEqual(reader.load(), [])
+
+    def test_bad_magic(self):
+        self.assertRaises(ValueError, container.Reader,
+                          b'X' + self.data[1:], [Employee])
+        self.assertRaises(ValueError, container.Reader,
+                          self.data[:-1], [Employee])
+        self.assertRaises(ValueError, container.Reader, b'', [Employee])
+
+    def test_bad_trailer(self):
+        data = bytearray(self.data)
+        data[-len(container.MAGIC) - 1] = 0xff
+
+        self.assertRaises(ValueError, container.Reader, bytes(data),
+                          [Employee])
+
+    def test_bad_index(self):
+        data = self.data[:-22] + b'\x00' + self.data[-22:]
+
+        self.assertRaises(ValueError, container.Reader, data, [Employee])
+
+    def test_bad_footer(self):
+        data = self.data.replace(b'"groups"', b'"groupz"')
+
+        self.assertRaises(ValueError, container.Reader, data, [Employee])
+
+    def test_bad_rows(self):
+        data = self.data.replace(b'[0,"Alice"', b'[9,"Alice"')
+
+        reader = container.Reader(data, [Employee, Office])
+
+        self.assertRaises(ValueError, reader.load)
+        self.assertRaises(ValueError, reader.states)
+        self.assertRaises(ValueError, lambda: reader[0])
+        self.assertEqual(reader[1], self.bob)
+
+    def test_truncated_rows(self):
+        data = self.data.replace(b'[0,"Alice"', b' 0,"Alice"')
+
+        reader = container.Reader(data, [Employee, Office])
+
+        self.assertRaises(ValueError, reader.load)
+
+    def test_mmap(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        filename = os.path.join(tmpdir, 'employees.vobj')
+        with open(filename, 'wb') as f:
+            f.write(self.data)
+
+        with open(filename, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                reader = container.Reader(data, [Employee, Office])
+
+                self.assertEqual(reader.load(), [self.alice, self.bob,
+                                                 self.office, self.bob])
+                self.assertEqual(reader[1], self.bob)
+            finally:
+                data.close()
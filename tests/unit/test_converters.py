@@ -17,7 +17,11 @@ import unittest
 
 import mock
 
+from vobj import attribute
 from vobj import converters
+from vobj import decorators
+from vobj import mapping
+from vobj import schema as schema_mod
 
 
 class ConvertersTest(unittest.TestCase):
@@ -52,3 +56,677 @@ class ConvertersTest(unittest.TestCase):
         self.assertEqual(states[3], {'__version__': 10, 'from': 'conv3'})
         schema.assert_called_once_with()
         sch_obj.__setstate__.assert_called_once_with(states[3])
+
+    def test_convert_many(self):
+        sch_objs = [mock.Mock(__setstate__=mock.Mock()) for i in range(2)]
+        schema = mock.Mock(side_effect=sch_objs, __version__=3)
+        cvtr = converters.Converters(
+            schema,
+            lambda state: dict(state, second=True),
+            lambda state: dict(state, first=True),
+        )
+        states = [{'__version__': 1, 'a': 1}, {'__version__': 1, 'a': 2}]
+
+        result = cvtr.convert_many(states)
+
+        self.assertEqual(result, sch_objs)
+        self.assertEqual(states, [{'a': 1}, {'a': 2}])
+        sch_objs[0].__setstate__.assert_called_once_with({
+            '__version__': 3, 'a': 1, 'first': True, 'second': True,
+        })
+        sch_objs[1].__setstate__.assert_called_once_with({
+            '__version__': 3, 'a': 2, 'first': True, 'second': True,
+        })
+
+    def test_convert_many_empty(self):
+        sch_objs = [mock.Mock(__setstate__=mock.Mock()) for i in range(2)]
+        schema = mock.Mock(side_effect=sch_objs, __version__=3)
+        cvtr = converters.Converters(schema)
+        states = [{'__version__': 3, 'a': 1}, {'__version__': 3, 'a': 2}]
+
+        result = cvtr.convert_many(states)
+
+        self.assertEqual(result, sch_objs)
+        self.assertEqual(states, [{'__version__': 3, 'a': 1},
+                                  {'__version__': 3, 'a': 2}])
+        sch_objs[0].__setstate__.assert_called_once_with(states[0])
+        sch_objs[1].__setstate__.assert_called_once_with(states[1])
+
+    def test_convert_all(self):
+        batch = mock.Mock(
+            __vers_batch__=True,
+            side_effect=lambda states: [dict(state, batch=True)
+                                        for state in states],
+        )
+        schema = mock.Mock(__version__=3)
+        cvtr = converters.Converters(
+            schema,
+            batch,
+            lambda state: dict(state, single=True),
+        )
+        states = [{'__version__': 1, 'a': 1}, {'__version__': 1, 'a': 2}]
+
+        result = cvtr.convert_all(iter(states))
+
+        self.assertEqual(result, [
+            {'a': 1, 'batch': True, 'single': True},
+            {'a': 2, 'batch': True, 'single': True},
+        ])
+        self.assertEqual(states, [{'a': 1}, {'a': 2}])
+        self.assertFalse(schema.called)
+
+    def test_convert_many_take(self):
+        batch = mock.Mock(
+            __vers_batch__=True,
+            side_effect=lambda states: [dict(state, batch=True)
+                                        for state in states],
+        )
+        sch_objs = [mock.Mock(__vers_takevalues__=mock.Mock())
+                    for i in range(2)]
+        schema = mock.Mock(side_effect=sch_objs, __version__=3)
+        cvtr = converters.Converters(schema, batch)
+        states = [{'__version__': 1, 'a': 1}, {'__version__': 1, 'a': 2}]
+
+        result = cvtr.convert_many(states, True)
+
+        self.assertEqual(result, sch_objs)
+        sch_objs[0].__vers_takevalues__.assert_called_once_with(
+            {'a': 1, 'batch': True})
+        sch_objs[1].__vers_takevalues__.assert_called_once_with(
+            {'a': 2, 'batch': True})
+
+    def test_convert_many_take_empty(self):
+        sch_objs = [mock.Mock(__vers_takevalues__=mock.Mock())
+                    for i in range(2)]
+        schema = mock.Mock(side_effect=sch_objs, __version__=3)
+        cvtr = converters.Converters(schema)
+        states = [{'__version__': 3, 'a': 1}, {'__version__': 3, 'a': 2}]
+
+        result = cvtr.convert_many(states, True)
+
+        self.assertEqual(result, sch_objs)
+        sch_objs[0].__vers_takevalues__.assert_called_once_with(states[0])
+        sch_objs[1].__vers_takevalues__.assert_called_once_with(states[1])
+
+    def test_call_take(self):
+        sch_obj = mock.Mock(__setstate__=mock.Mock(),
+                            __vers_takevalues__=mock.Mock())
+        schema = mock.Mock(return_value=sch_obj, __version__=3)
+        cvtr = converters.Converters(
+            schema, lambda state: dict(state, single=True))
+
+        result = cvtr({'__version__': 1, 'a': 1}, True)
+
+        self.assertEqual(result, sch_obj)
+        sch_obj.__vers_takevalues__.assert_called_once_with(
+            {'a': 1, 'single': True})
+        self.assertFalse(sch_obj.__setstate__.called)
+
+    def test_call_batch(self):
+        def batch(states):
+            return [dict(state, batch=True) for state in states]
+        batch.__vers_batch__ = True
+        sch_obj = mock.Mock(__setstate__=mock.Mock())
+        schema = mock.Mock(return_value=sch_obj, __version__=3)
+        cvtr = converters.Converters(
+            schema,
+            lambda state: dict(state, single=True),
+            batch,
+        )
+
+        result = cvtr({'__version__': 1, 'a': 1})
+
+        self.assertEqual(result, sch_obj)
+        sch_obj.__setstate__.assert_called_once_with({
+            '__version__': 3, 'a': 1, 'batch': True, 'single': True,
+        })
+
+    def test_convert_many_batch(self):
+        batch = mock.Mock(
+            __vers_batch__=True,
+            side_effect=lambda states: [dict(state, batch=True)
+                                        for state in states],
+        )
+        sch_objs = [mock.Mock(__setstate__=mock.Mock()) for i in range(2)]
+        schema = mock.Mock(side_effect=sch_objs, __version__=3)
+        cvtr = converters.Converters(
+            schema,
+            batch,
+            lambda state: dict(state, single=True),
+        )
+        states = [{'__version__': 1, 'a': 1}, {'__version__': 1, 'a': 2}]
+
+        result = cvtr.convert_many(states)
+
+        self.assertEqual(result, sch_objs)
+        batch.assert_called_once_with([
+            {'a': 1, 'single': True},
+            {'a': 2, 'single': True},
+        ])
+        sch_objs[0].__setstate__.assert_called_once_with({
+            '__version__': 3, 'a': 1, 'batch': True, 'single': True,
+        })
+        sch_objs[1].__setstate__.assert_called_once_with({
+            '__version__': 3, 'a': 2, 'batch': True, 'single': True,
+        })
+
+    def test_convert_many_batch_short(self):
+        batch = mock.Mock(__vers_batch__=True, return_value=[{}])
+        schema = mock.Mock(__version__=3)
+        cvtr = converters.Converters(schema, batch)
+        states = [{'__version__': 1, 'a': 1}, {'__version__': 1, 'a': 2}]
+
+        self.assertRaises(ValueError, cvtr.convert_many, states)
+        self.assertFalse(schema.called)
+
+    def test_call_columnar(self):
+        def columnar(cols):
+            cols['b'] = [a * 2 for a in cols['a']]
+            return cols
+        columnar.__vers_columnar__ = True
+        sch_obj = mock.Mock(__setstate__=mock.Mock())
+        schema = mock.Mock(return_value=sch_obj, __version__=2)
+        cvtr = converters.Converters(schema, columnar)
+
+        result = cvtr({'__version__': 1, 'a': 2})
+
+        self.assertEqual(result, sch_obj)
+        sch_obj.__setstate__.assert_called_once_with({
+            '__version__': 2, 'a': 2, 'b': 4,
+        })
+
+    def test_convert_many_columnar(self):
+        columnar = mock.Mock(
+            __vers_batch__=False,
+            __vers_columnar__=True,
+            side_effect=lambda cols: dict(cols, b=[a * 2
+                                                   for a in cols['a']]),
+        )
+        sch_objs = [mock.Mock(__setstate__=mock.Mock()) for i in range(2)]
+        schema = mock.Mock(side_effect=sch_objs, __version__=2)
+        cvtr = converters.Converters(schema, columnar)
+        states = [{'__version__': 1, 'a': 1}, {'__version__': 1, 'a': 2}]
+
+        result = cvtr.convert_many(states)
+
+        self.assertEqual(result, sch_objs)
+        columnar.assert_called_once_with({'a': [1, 2]})
+        sch_objs[0].__setstate__.assert_called_once_with({
+            '__version__': 2, 'a': 1, 'b': 2,
+        })
+        sch_objs[1].__setstate__.assert_called_once_with({
+            '__version__': 2, 'a': 2, 'b': 4,
+        })
+
+    def test_convert_many_columnar_short(self):
+        columnar = mock.Mock(__vers_batch__=False, __vers_columnar__=True,
+                             return_value={'a': [1]})
+        schema = mock.Mock(__version__=2)
+        cvtr = converters.Converters(schema, columnar)
+        states = [{'__version__': 1, 'a': 1}, {'__version__': 1, 'a': 2}]
+
+        self.assertRaises(ValueError, cvtr.convert_many, states)
+
+    def test_convert_columns(self):
+        calls = []
+
+        def columnar(cols):
+            calls.append(('columnar', dict(cols)))
+            cols['c'] = [a + b for a, b in zip(cols['a'], cols['b'])]
+            return cols
+        columnar.__vers_columnar__ = True
+
+        def row1(state):
+            calls.append(('row1', dict(state)))
+            state['b'] = state['a'] * 10
+            return state
+
+        def row2(state):
+            calls.append(('row2', dict(state)))
+            del state['a']
+            return state
+
+        def batch(states):
+            calls.append(('batch', len(states)))
+            return states
+        batch.__vers_batch__ = True
+
+        cvtr = converters.Converters('schema', row2, batch, columnar, row1)
+        cols = {'a': (1, 2)}
+
+        result = cvtr.convert_columns(cols)
+
+        self.assertEqual(result, {'b': [10, 20], 'c': [11, 22]})
+        self.assertEqual(cols, {'a': (1, 2)})
+        self.assertEqual(calls, [
+            ('row1', {'a': 1}),
+            ('row1', {'a': 2}),
+            ('columnar', {'a': [1, 2], 'b': [10, 20]}),
+            ('batch', 2),
+            ('row2', {'a': 1, 'b': 10, 'c': 11}),
+            ('row2', {'a': 2, 'b': 20, 'c': 22}),
+        ])
+
+    def test_convert_columns_columnar_only(self):
+        columnar = mock.Mock(__vers_columnar__=True,
+                             return_value={'b': [1, 2]})
+        cvtr = converters.Converters('schema', columnar)
+        cols = {'a': [1, 2]}
+
+        result = cvtr.convert_columns(cols)
+
+        self.assertEqual(result, {'b': [1, 2]})
+        columnar.assert_called_once_with(cols)
+        self.assertFalse(columnar.call_args[0][0] is cols)
+
+    def test_convert_columns_empty(self):
+        columnar = mock.Mock(__vers_columnar__=True)
+        schema = mock.Mock(__vers_attrs__={'a': 'attr_a', 'b': 'attr_b'})
+        cvtr = converters.Converters(schema, columnar)
+
+        result = cvtr.convert_columns({'a': []})
+
+        self.assertEqual(result, {'a': [], 'b': []})
+        self.assertFalse(columnar.called)
+
+    def test_convert_columns_ragged(self):
+        cvtr = converters.Converters('schema')
+
+        self.assertRaises(ValueError, cvtr.convert_columns,
+                          {'a': [1, 2], 'b': [1]})
+
+    def test_convert_columns_columnar_short(self):
+        columnar = mock.Mock(__vers_columnar__=True,
+                             return_value={'a': [1]})
+        cvtr = converters.Converters('schema', columnar)
+
+        self.assertRaises(ValueError, cvtr.convert_columns, {'a': [1, 2]})
+
+    @mock.patch.object(converters.Converters, '_compile')
+    def test_fuse(self, mock_compile):
+        map1 = mapping.rename('a', 'b')
+        map2 = mapping.drop('c')
+        map3 = mapping.add('d', 1)
+        cvtr = converters.Converters('schema', map3, map2, 'func', map1)
+
+        result = cvtr.fuse()
+
+        self.assertTrue(isinstance(result, converters.Converters))
+        self.assertEqual(result._target_schema, 'schema')
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0].steps, map2.steps + map3.steps)
+        self.assertEqual(result[1:], ['func', map1])
+        self.assertEqual(result._loader, mock_compile.return_value)
+        self.assertEqual(cvtr._loader, None)
+
+    def test_fuse_keeps_direct(self):
+        cvtr = converters.Converters('schema', 'func')
+        cvtr._direct = True
+
+        with mock.patch.object(converters.Converters, '_compile'):
+            result = cvtr.fuse()
+
+        self.assertEqual(result._direct, True)
+        self.assertEqual(result._segments, [('run', ('func',))])
+
+    def test_call_loader(self):
+        cvtr = converters.Converters('schema', 'conv')
+        cvtr._loader = mock.Mock(return_value='sch_obj')
+
+        result = cvtr('state')
+
+        self.assertEqual(result, 'sch_obj')
+        cvtr._loader.assert_called_once_with('state', False)
+
+    def test_call_loader_take(self):
+        cvtr = converters.Converters('schema', 'conv')
+        cvtr._loader = mock.Mock(return_value='sch_obj')
+
+        result = cvtr('state', True)
+
+        self.assertEqual(result, 'sch_obj')
+        cvtr._loader.assert_called_once_with('state', True)
+
+    def test_convert_many_loader(self):
+        cvtr = converters.Converters('schema', 'conv')
+        cvtr._loader = mock.Mock(side_effect=lambda x, take: (x * 2, take))
+
+        result = cvtr.convert_many(iter([1, 2]), True)
+
+        self.assertEqual(result, [(2, True), (4, True)])
+
+    def test_convert_many_loader_batch(self):
+        batch = mock.Mock(
+            __vers_batch__=True,
+            side_effect=lambda states: [dict(state, batch=True)
+                                        for state in states],
+        )
+        sch_obj = mock.Mock(__setstate__=mock.Mock())
+        schema = mock.Mock(return_value=sch_obj, __version__=3)
+        cvtr = converters.Converters(schema, batch)
+        cvtr._loader = mock.Mock()
+
+        result = cvtr.convert_many([{'__version__': 1}])
+
+        self.assertEqual(result, [sch_obj])
+        self.assertFalse(cvtr._loader.called)
+        batch.assert_called_once_with([{}])
+
+
+class CompileTest(unittest.TestCase):
+    def make_schema(self, **kwargs):
+        namespace = dict(
+            __version__=2,
+            a=attribute.Attribute(validate=int),
+            b=attribute.Attribute(),
+            upgrade=decorators.upgrader(mapping.Mapping([])),
+        )
+        namespace.update(kwargs)
+        return schema_mod.SchemaMeta('TestSchema', (schema_mod.Schema,),
+                                     namespace)
+
+    def test_empty(self):
+        sch = self.make_schema()
+        cvtr = converters.Converters(sch)
+        state = {'__version__': 2, 'a': '1', 'b': 2}
+
+        result = cvtr._compile()(state)
+
+        self.assertTrue(isinstance(result, sch))
+        self.assertEqual(result.__getstate__(), {
+            '__version__': 2, 'a': 1, 'b': 2,
+        })
+        self.assertEqual(state, {'__version__': 2, 'a': '1', 'b': 2})
+
+    def test_empty_bad_version(self):
+        cvtr = converters.Converters(self.make_schema())
+
+        self.assertRaises(ValueError, cvtr._compile(),
+                          {'__version__': 1, 'a': 1, 'b': 2})
+
+    def do_test_chain(self, sch):
+        def batch(states):
+            return [dict(state, c=True) for state in states]
+        batch.__vers_batch__ = True
+
+        def columnar(cols):
+            cols['a'] = [str(int(val) + 1) for val in cols['a']]
+            return cols
+        columnar.__vers_columnar__ = True
+
+        cvtr = converters.Converters(
+            sch, mapping.drop('c'), columnar, batch,
+            mapping.rename('x', 'a') + mapping.add('b', 5))
+
+        loader = cvtr._compile()
+        result = loader({'__version__': 1, 'x': '1'})
+
+        self.assertTrue(isinstance(result, sch))
+        self.assertEqual(result.__getstate__(), {
+            '__version__': 2, 'a': 2, 'b': 5,
+        })
+        self.assertRaises(ValueError, loader, {'__version__': 1, 'x': 1,
+                                               'd': 3})
+
+        return loader
+
+    def test_chain(self):
+        loader = self.do_test_chain(self.make_schema())
+
+        self.assertTrue('object.__new__' not in loader.__vers_source__)
+        self.assertTrue('_new_0(_target_1)' in loader.__vers_source__)
+
+    def test_chain_specialized(self):
+        sch = self.make_schema(__vers_specialize__=True)
+
+        self.do_test_chain(sch)
+
+        self.assertTrue(
+            sch.__vers_setvalues__.__vers_generated__)
+
+    def test_chain_compact(self):
+        self.do_test_chain(self.make_schema(__vers_compact__=True))
+
+    def test_chain_custom_init(self):
+        calls = []
+
+        def __init__(self, values=None):
+            calls.append(values)
+
+        loader = self.do_test_chain(self.make_schema(__init__=__init__))
+
+        self.assertTrue('_target_0()' in loader.__vers_source__)
+        self.assertEqual(calls, [None] * 2)
+
+    def test_chain_custom_setstate(self):
+        calls = []
+
+        def __setstate__(self, state):
+            calls.append(dict(state))
+            schema_mod.Schema.__setstate__(self, state)
+
+        sch = self.make_schema(__setstate__=__setstate__,
+                               __vers_specialize__=True)
+
+        self.do_test_chain(sch)
+
+        self.assertFalse(getattr(sch.__vers_setvalues__,
+                                 '__vers_generated__', False))
+        self.assertEqual(calls[0], {'__version__': 2, 'a': '2', 'b': 5})
+
+    def do_test_take(self, sch):
+        empty = converters.Converters(sch)._compile()
+        chain = converters.Converters(
+            sch, mapping.rename('x', 'a'))._compile()
+        states = [{'__version__': 2, 'a': '1', 'b': 2},
+                  {'__version__': 1, 'x': '1', 'b': 2}]
+
+        results = [empty(states[0], True), chain(states[1], True)]
+
+        for result in results:
+            self.assertTrue(isinstance(result, sch))
+            self.assertEqual(result.__getstate__(), {
+                '__version__': 2, 'a': 1, 'b': 2,
+            })
+        self.assertRaises(ValueError, chain, {'__version__': 1, 'x': 1},
+                          True)
+
+        return states, results
+
+    def test_take(self):
+        states, results = self.do_test_take(self.make_schema())
+
+        for state, result in zip(states, results):
+            self.assertTrue(result.__vers_values__ is state)
+            self.assertEqual(state, {'a': 1, 'b': 2})
+
+    def test_take_specialized(self):
+        sch = self.make_schema(__vers_specialize__=True)
+
+        states, results = self.do_test_take(sch)
+
+        self.assertTrue(sch.__vers_takevalues__.__vers_generated__)
+        for state, result in zip(states, results):
+            self.assertFalse(result.__vers_values__ is state)
+            self.assertEqual(result.__vers_values__, {'a': 1, 'b': 2})
+
+    def test_take_compact(self):
+        states, results = self.do_test_take(
+            self.make_schema(__vers_compact__=True))
+
+        for result in results:
+            self.assertEqual(result.__vers_values__, [1, 2])
+
+    def test_take_custom_setstate(self):
+        calls = []
+
+        def __setstate__(self, state):
+            calls.append(dict(state))
+            schema_mod.Schema.__setstate__(self, state)
+
+        sch = self.make_schema(__setstate__=__setstate__,
+                               __vers_specialize__=True)
+
+        states, results = self.do_test_take(sch)
+
+        self.assertEqual(calls[:2], [
+            {'__version__': 2, 'a': '1', 'b': 2},
+            {'__version__': 2, 'a': '1', 'b': 2},
+        ])
+        for state, result in zip(states, results):
+            self.assertFalse(result.__vers_values__ is state)
+
+    @mock.patch.object(converters, '_INLINE_MAX', 1)
+    def test_chain_loop(self):
+        sch = self.make_schema()
+        cvtr = converters.Converters(
+            sch,
+            lambda state: dict(state, b=state['b'] + 1),
+            lambda state: dict(state, b=state['b'] * 2),
+            mapping.add('b', 5),
+        )
+
+        loader = cvtr._compile()
+        result = loader({'__version__': 1, 'a': 1})
+
+        self.assertTrue('for cvt in' in loader.__vers_source__)
+        self.assertEqual(result.__getstate__(), {
+            '__version__': 2, 'a': 1, 'b': 11,
+        })
+
+    @mock.patch.object(converters, '_INLINE_MAX', 1)
+    def test_chain_loop_batch(self):
+        def batch(states):
+            return [dict(state, b=state['b'] * 10) for state in states]
+        batch.__vers_batch__ = True
+
+        sch = self.make_schema()
+        cvtr = converters.Converters(
+            sch,
+            lambda state: dict(state, b=state['b'] + 1),
+            batch,
+            mapping.add('b', 1),
+            lambda state: dict(state, b=state['b'] * 2),
+        )
+
+        result = cvtr._compile()({'__version__': 1, 'a': 1, 'b': 1})
+
+        self.assertEqual(result.__vers_values__, {'a': 1, 'b': 21})
+
+
+class SegmentsTest(unittest.TestCase):
+    def test_segments(self):
+        def batch(states):
+            return states
+        batch.__vers_batch__ = True
+
+        def columnar(cols):
+            return cols
+        columnar.__vers_columnar__ = True
+
+        map1 = mapping.add('b', 1)
+
+        result = converters._segments(
+            ['func1', map1, batch, 'func2', columnar, 'func3'])
+
+        self.assertEqual(result, [
+            ('run', ('func1', map1.function)),
+            ('batch', batch),
+            ('run', ('func2',)),
+            ('columnar', columnar),
+            ('run', ('func3',)),
+        ])
+
+    def test_empty(self):
+        self.assertEqual(converters._segments([]), [])
+
+
+class ChainTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = schema_mod.SchemaMeta(
+            'TestSchema', (schema_mod.Schema,), {
+                '__version__': 2,
+                'a': attribute.Attribute(),
+                'b': attribute.Attribute(validate=int),
+                'upgrade': decorators.upgrader(mapping.Mapping([])),
+            })
+
+    def do_test_chain(self, *conversions):
+        # Build the chain one step at a time, applying the last
+        # conversion first, as an eager warm-up does
+        result = converters.Converters(self.schema).fuse()
+        for converter in conversions:
+            result = result.chain(converter)
+
+        expected = converters.Converters(self.schema, *conversions).fuse()
+        self.assertEqual(len(result), len(expected))
+        self.assertEqual([(kind, len(value) if kind == 'run' else value)
+                          for kind, value in result._segments],
+                         [(kind, len(value) if kind == 'run' else value)
+                          for kind, value in expected._segments])
+        self.assertEqual(result._loader.__vers_source__,
+                         expected._loader.__vers_source__)
+        self.assertEqual(result._direct, True)
+
+        return result
+
+    def test_plain(self):
+        result = self.do_test_chain(
+            lambda state: dict(state, b=state['b'] * 2),
+            lambda state: dict(state, b=state['b'] + 1),
+        )
+
+        self.assertEqual(result({'__version__': 1, 'a': 1, 'b': 1})
+                         .__vers_values__, {'a': 1, 'b': 4})
+
+    def test_mappings(self):
+        result = self.do_test_chain(
+            mapping.compute('b', lambda state: state['b'] * 2),
+            mapping.rename('x', 'b'),
+        )
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result({'__version__': 1, 'a': 1, 'x': 3})
+                         .__vers_values__, {'a': 1, 'b': 6})
+
+    def test_batch(self):
+        def batch(states):
+            return [dict(state, b=state['b'] * 10) for state in states]
+        batch.__vers_batch__ = True
+
+        def columnar(cols):
+            return dict(cols, b=[val + 2 for val in cols['b']])
+        columnar.__vers_columnar__ = True
+
+        result = self.do_test_chain(
+            lambda state: dict(state, b=state['b'] + 1),
+            batch,
+            columnar,
+            mapping.add('b', 1),
+            mapping.add('a', 1),
+        )
+
+        self.assertEqual(result({'__version__': 1})
+                         .__vers_values__, {'a': 1, 'b': 31})
+        self.assertEqual(result.convert_many([{'__version__': 1}])[0]
+                         .__vers_values__, {'a': 1, 'b': 31})
+
+    @mock.patch.object(converters, '_INLINE_MAX', 1)
+    def test_loop(self):
+        result = self.do_test_chain(*[
+            lambda state: dict(state, b=state['b'] + 1)
+            for i in range(5)
+        ])
+
+        self.assertTrue('for cvt in' in result._loader.__vers_source__)
+        self.assertEqual(result({'__version__': 1, 'a': 1, 'b': 1})
+                         .__vers_values__, {'a': 1, 'b': 6})
+
+    def test_unchanged(self):
+        base = converters.Converters(self.schema, 'func').fuse()
+        base_segments = list(base._segments)
+
+        base.chain('other')
+
+        self.assertEqual(list(base), ['func'])
+        self.assertEqual(base._segments, base_segments)
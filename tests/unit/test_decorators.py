@@ -25,6 +25,8 @@ class UpgraderTest(unittest.TestCase):
             pass
 
         self.assertEqual(test.__vers_upgrader__, None)
+        self.assertEqual(test.__vers_batch__, False)
+        self.assertEqual(test.__vers_cost__, None)
 
     def test_empty_arg(self):
         @decorators.upgrader()
@@ -39,6 +41,48 @@ class UpgraderTest(unittest.TestCase):
             pass
 
         self.assertEqual(test.__vers_upgrader__, 5)
+        self.assertEqual(test.__vers_batch__, False)
+
+    def test_batch(self):
+        @decorators.upgrader(batch=True)
+        def test():
+            pass
+
+        self.assertEqual(test.__vers_upgrader__, None)
+        self.assertEqual(test.__vers_batch__, True)
+
+    def test_int_arg_batch(self):
+        @decorators.upgrader(5, batch=True)
+        def test():
+            pass
+
+        self.assertEqual(test.__vers_upgrader__, 5)
+        self.assertEqual(test.__vers_batch__, True)
+
+    def test_columnar(self):
+        @decorators.upgrader(columnar=True)
+        def test():
+            pass
+
+        self.assertEqual(test.__vers_upgrader__, None)
+        self.assertEqual(test.__vers_batch__, False)
+        self.assertEqual(test.__vers_columnar__, True)
+
+    def test_batch_columnar(self):
+        self.assertRaises(TypeError, decorators.upgrader,
+                          batch=True, columnar=True)
+
+    def test_cost(self):
+        @decorators.upgrader(5, cost=2.5)
+        def test():
+            pass
+
+        self.assertEqual(test.__vers_upgrader__, 5)
+        self.assertEqual(test.__vers_cost__, 2.5)
+
+    def test_cost_invalid(self):
+        self.assertRaises(TypeError, decorators.upgrader, cost=-1)
+        self.assertRaises(TypeError, decorators.upgrader, cost='1')
 
     def test_int_arg_low(self):
         self.assertRaises(TypeError, decorators.upgrader, 0)
@@ -54,6 +98,48 @@ class DowngraderTest(unittest.TestCase):
             pass
 
         self.assertEqual(test.__vers_downgrader__, 5)
+        self.assertEqual(test.__vers_columnar__, False)
+
+    def test_columnar(self):
+        @decorators.downgrader(5, columnar=True)
+        def test():
+            pass
+
+        self.assertEqual(test.__vers_downgrader__, 5)
+        self.assertEqual(test.__vers_columnar__, True)
+
+    def test_depends(self):
+        @decorators.downgrader(5, depends=['attr1', 'attr2'])
+        def test():
+            pass
+
+        self.assertEqual(test.__vers_downgrader__, 5)
+        self.assertEqual(test.__vers_depends__,
+                         frozenset(['attr1', 'attr2']))
+
+    def test_depends_default(self):
+        @decorators.downgrader(5)
+        def test():
+            pass
+
+        self.assertEqual(test.__vers_depends__, None)
+
+    def test_produces(self):
+        @decorators.downgrader(5, produces=('attr1', 'attr2'))
+        def test():
+            pass
+
+        self.assertEqual(test.__vers_produces__,
+                         frozenset(['attr1', 'attr2']))
+        self.assertEqual(test.__vers_depends__, None)
+
+    def test_produces_string(self):
+        self.assertRaises(TypeError, decorators.downgrader, 5,
+                          produces='attr')
+
+    def test_depends_string(self):
+        self.assertRaises(TypeError, decorators.downgrader, 5,
+                          depends='attr')
 
     def test_int_arg_low(self):
         self.assertRaises(TypeError, decorators.downgrader, 0)
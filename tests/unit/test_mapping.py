@@ -0,0 +1,97 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import mock
+
+from vobj import mapping
+
+
+class MappingTest(unittest.TestCase):
+    def test_init(self):
+        result = mapping.Mapping([('drop', 'a')])
+
+        self.assertEqual(result.steps, (('drop', 'a'),))
+        self.assertTrue(result.function.__vers_generated__)
+
+    def test_init_unknown(self):
+        self.assertRaises(TypeError, mapping.Mapping, [('other', 'a')])
+
+    def test_call(self):
+        func = mock.Mock(side_effect=lambda state: state['b'] * 2)
+        mapper = mapping.Mapping([
+            ('rename', 'a', 'b'),
+            ('drop', 'c'),
+            ('add', 'd', 'default'),
+            ('add', 'e', 'default'),
+            ('compute', 'f', func),
+        ])
+        state = {'a': 1, 'c': 2, 'e': 3}
+
+        result = mapper(state)
+
+        self.assertTrue(result is state)
+        self.assertEqual(result, {'b': 1, 'd': 'default', 'e': 3, 'f': 2})
+        func.assert_called_once_with(state)
+
+    def test_call_empty(self):
+        mapper = mapping.Mapping([])
+
+        self.assertEqual(mapper({'a': 1}), {'a': 1})
+
+    def test_add(self):
+        map1 = mapping.Mapping([('rename', 'a', 'b')])
+        map2 = mapping.Mapping([('drop', 'b')])
+
+        result = map1 + map2
+
+        self.assertTrue(isinstance(result, mapping.Mapping))
+        self.assertEqual(result.steps, (('rename', 'a', 'b'), ('drop', 'b')))
+        self.assertEqual(result({'a': 1, 'c': 2}), {'c': 2})
+
+    def test_add_other(self):
+        def test_func():
+            mapping.Mapping([]) + 'other'
+
+        self.assertRaises(TypeError, test_func)
+
+    def test_repr(self):
+        mapper = mapping.Mapping([('rename', 'a', 'b'), ('drop', 'c')])
+
+        self.assertEqual(repr(mapper),
+                         "<Mapping rename('a', 'b'), drop('c',)>")
+
+
+class HelperTest(unittest.TestCase):
+    def test_rename(self):
+        result = mapping.rename('a', 'b')
+
+        self.assertEqual(result.steps, (('rename', 'a', 'b'),))
+
+    def test_drop(self):
+        result = mapping.drop('a')
+
+        self.assertEqual(result.steps, (('drop', 'a'),))
+
+    def test_add(self):
+        result = mapping.add('a', 5)
+
+        self.assertEqual(result.steps, (('add', 'a', 5),))
+
+    def test_compute(self):
+        result = mapping.compute('a', len)
+
+        self.assertEqual(result.steps, (('compute', 'a', len),))
@@ -0,0 +1,233 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import unittest
+
+import mock
+
+from vobj import attribute
+from vobj import decorators
+from vobj import parallel
+from vobj import schema
+from vobj import vobject
+
+
+# The worker processes look the class up by name, so it must be
+# defined at module level
+class Employee(vobject.VObject):
+    class Version1(schema.Schema):
+        __version__ = 1
+
+        name = attribute.Attribute()
+
+    class Version2(Version1):
+        __version__ = 2
+
+        name = None
+        first = attribute.Attribute()
+        last = attribute.Attribute()
+        salary = attribute.Attribute(0, validate=int)
+
+        @decorators.upgrader
+        def upgrade(cls, state):
+            state['first'], state['last'] = state.pop('name').split(' ')
+            state['salary'] = 0
+            return state
+
+
+class Restored(vobject.VObject):
+    class Version1(schema.Schema):
+        __version__ = 1
+
+        name = attribute.Attribute()
+
+    class Version2(Version1):
+        __version__ = 2
+
+        name = None
+        first = attribute.Attribute()
+        last = attribute.Attribute()
+
+        @decorators.upgrader
+        def upgrade(cls, state):
+            state['first'], state['last'] = state.pop('name').split(' ')
+            return state
+
+        def __setstate__(self, state):
+            super(Restored.Version2, self).__setstate__(state)
+            self.restored_in = os.getpid()
+
+
+class UpgradeStatesTest(unittest.TestCase):
+    def test_upgrade_states(self):
+        result = parallel._upgrade_states(Employee, [
+            {'__version__': 1, 'name': 'Alice Smith'},
+            {'__version__': 2, 'first': 'Bob', 'last': 'Jones',
+             'salary': '10'},
+        ])
+
+        self.assertEqual(result, [
+            {'__version__': 2, 'first': 'Alice', 'last': 'Smith',
+             'salary': 0},
+            {'__version__': 2, 'first': 'Bob', 'last': 'Jones',
+             'salary': '10'},
+        ])
+
+
+class UpgradeChunkTest(unittest.TestCase):
+    def test_upgrade_chunk(self):
+        result = parallel._upgrade_chunk(Employee, [
+            {'__version__': 1, 'name': 'Alice Smith'},
+            {'__version__': 2, 'first': 'Bob', 'last': 'Jones',
+             'salary': '10'},
+        ])
+
+        self.assertEqual(result, [
+            ('Alice', 'Smith', 0),
+            ('Bob', 'Jones', 10),
+        ])
+
+    def test_upgrade_chunk_trusted(self):
+        result = parallel._upgrade_chunk(Employee, [
+            {'__version__': 1, 'name': 'Alice Smith'},
+            {'__version__': 2, 'first': 'Bob', 'last': 'Jones',
+             'salary': '10'},
+        ], True)
+
+        self.assertEqual(result, [
+            ('Alice', 'Smith', 0),
+            ('Bob', 'Jones', '10'),
+        ])
+
+    def test_upgrade_chunk_setstate(self):
+        result = parallel._upgrade_chunk(Restored, [
+            {'__version__': 1, 'name': 'Alice Smith'},
+        ])
+
+        self.assertEqual(result, [
+            {'__version__': 2, 'first': 'Alice', 'last': 'Smith'},
+        ])
+
+
+class UpgradeAllTest(unittest.TestCase):
+    def states(self, count):
+        for i in range(count):
+            if i % 2:
+                yield {'__version__': 1, 'name': 'First%d Last' % i}
+            else:
+                yield {'__version__': 2, 'first': 'First%d' % i,
+                       'last': 'Last', 'salary': i}
+
+    def test_upgrade_all(self):
+        result = list(parallel.upgrade_all(Employee, self.states(25),
+                                           workers=2, chunk_size=3))
+
+        self.assertEqual(result, Employee.from_dicts(self.states(25)))
+        for obj in result:
+            self.assertTrue(isinstance(obj, Employee))
+
+    def test_upgrade_all_trusted(self):
+        result = list(parallel.upgrade_all(Employee, self.states(5),
+                                           workers=2, chunk_size=2,
+                                           trusted=True))
+
+        self.assertEqual(result, Employee.from_dicts(self.states(5)))
+
+    def test_upgrade_all_setstate(self):
+        states = [
+            {'__version__': 1, 'name': 'Alice Smith'},
+            {'__version__': 2, 'first': 'Bob', 'last': 'Jones'},
+        ]
+
+        result = list(parallel.upgrade_all(Restored, states, workers=2,
+                                           chunk_size=1))
+
+        self.assertEqual([obj.to_dict() for obj in result], [
+            {'__version__': 2, 'first': 'Alice', 'last': 'Smith'},
+            {'__version__': 2, 'first': 'Bob', 'last': 'Jones'},
+        ])
+        for obj in result:
+            self.assertEqual(obj.restored_in, os.getpid())
+
+    def test_upgrade_all_error(self):
+        states = list(self.states(5))
+        states[3] = {'__version__': 1}
+
+        result = parallel.upgrade_all(Employee, states, workers=2,
+                                      chunk_size=2)
+
+        self.assertRaises(KeyError, list, result)
+
+    def test_upgrade_all_abstract(self):
+        self.assertRaises(TypeError, parallel.upgrade_all,
+                          vobject.VObject, [])
+
+    def test_upgrade_all_bad_workers(self):
+        self.assertRaises(ValueError, parallel.upgrade_all,
+                          Employee, [], workers=0)
+
+    def test_upgrade_all_bad_chunk_size(self):
+        self.assertRaises(ValueError, parallel.upgrade_all,
+                          Employee, [], chunk_size=0)
+
+    @mock.patch.object(parallel, 'futures', None)
+    def test_upgrade_all_unavailable(self):
+        self.assertRaises(RuntimeError, parallel.upgrade_all,
+                          Employee, [])
+
+    @mock.patch.object(parallel, 'futures')
+    @mock.patch('multiprocessing.cpu_count', return_value=3)
+    def test_upgrade_all_default_workers(self, mock_cpu_count,
+                                         mock_futures):
+        executor = mock_futures.ProcessPoolExecutor.return_value
+
+        result = parallel.upgrade_all(Employee, [])
+
+        self.assertEqual(list(result), [])
+        mock_futures.ProcessPoolExecutor.assert_called_once_with(3)
+        executor.shutdown.assert_called_once_with()
+
+    @mock.patch.object(parallel, 'futures')
+    def test_upgrade_all_window(self, mock_futures):
+        executor = mock_futures.ProcessPoolExecutor.return_value
+        futs = [mock.Mock(**{'result.return_value': [('A', 'B', i)]})
+                for i in range(5)]
+        executor.submit.side_effect = futs
+
+        result = parallel.upgrade_all(Employee, self.states(5), workers=1,
+                                      chunk_size=1)
+
+        self.assertEqual(next(result).salary, 0)
+        self.assertEqual(executor.submit.call_count, 2)
+        self.assertEqual(next(result).salary, 1)
+        self.assertEqual(executor.submit.call_count, 3)
+
+        result.close()
+
+        self.assertFalse(futs[1].cancel.called)
+        futs[2].cancel.assert_called_once_with()
+        self.assertFalse(futs[3].cancel.called)
+        executor.shutdown.assert_called_once_with()
+
+    @mock.patch.object(parallel, 'futures')
+    def test_upgrade_all_not_iterated(self, mock_futures):
+        result = parallel.upgrade_all(Employee, self.states(5), workers=1)
+
+        self.assertFalse(mock_futures.ProcessPoolExecutor.called)
+
+        result.close()
+
+        self.assertFalse(mock_futures.ProcessPoolExecutor.called)
@@ -13,11 +13,30 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
 import unittest
+import weakref
 
 import mock
+import six
 
+from vobj import attribute
 from vobj import proxy
+from vobj import schema
+from vobj import version
+from vobj import vobject
+
+
+class Buffered(vobject.VObject):
+    class Schema(schema.Schema):
+        __version__ = 1
+
+        name = attribute.Attribute()
+        salary = attribute.Attribute(validate=int)
+
+        @property
+        def title(self):
+            return 'Dr. %s' % self.name
 
 
 class SchemaProxyTest(unittest.TestCase):
@@ -115,10 +134,15 @@ class ReadOnlyLazySchemaProxyTest(unittest.TestCase):
             values.__contains__ = mock.Mock(side_effect=lambda x: x in kwargs)
 
         # Set up the master
-        master = mock.Mock(__vers_cache_get__=mock.Mock(return_value=values))
+        master = mock.Mock(
+            __vers_cache_get__=mock.Mock(return_value=values),
+            __vers_attr_get__=mock.Mock(
+                side_effect=lambda vers, name: getattr(values, name)),
+        )
 
         # Set up the version
-        version = mock.Mock(_master=master, __int__=mock.Mock(return_value=23))
+        version = mock.Mock(_master=master, _schema='schema',
+                            __int__=mock.Mock(return_value=23))
 
         # Set up the proxy
         prox = proxy.ReadOnlyLazySchemaProxy(version)
@@ -133,8 +157,28 @@ class ReadOnlyLazySchemaProxyTest(unittest.TestCase):
         prox, extra = self.init_proxy()
 
         self.assertEqual(prox.__version__, extra['version'])
+        self.assertEqual(prox.__vers_version__, 23)
         self.assertEqual(prox.__vers_master__, extra['master'])
 
+    def test_master_kept(self):
+        class Master(object):
+            pass
+        master = Master()
+        ref = weakref.ref(master)
+        prox = proxy.ReadOnlyLazySchemaProxy(
+            version.SmartVersion(1, 'schema', master))
+
+        del master
+
+        self.assertTrue(prox.__vers_master__ is ref())
+        self.assertFalse(ref() is None)
+
+    def test_getattr(self):
+        prox, extra = self.init_proxy(attr='value')
+
+        self.assertEqual(prox.attr, 'value')
+        extra['master'].__vers_attr_get__.assert_called_once_with(23, 'attr')
+
     def test_setattr_proxied(self):
         prox, extra = self.init_proxy(attr='value')
 
@@ -158,3 +202,279 @@ class ReadOnlyLazySchemaProxyTest(unittest.TestCase):
 
         self.assertEqual(result, extra['values'])
         extra['master'].__vers_cache_get__.assert_called_once_with(23)
+
+
+class BufferSchemaProxyTest(unittest.TestCase):
+    def init_proxy(self, trusted=False, **kwargs):
+        # The first value follows the header, at offset 13
+        data = Buffered(**kwargs).to_bytes()
+        return data, proxy.BufferSchemaProxy(Buffered, data, 13, trusted)
+
+    def test_init(self):
+        prox = proxy.BufferSchemaProxy('cls', 'buf', 5, True)
+
+        self.assertEqual(prox.__vers_class__, 'cls')
+        self.assertEqual(prox.__vers_buffer__, 'buf')
+        self.assertEqual(prox.__vers_start__, 5)
+        self.assertEqual(prox.__vers_trusted__, True)
+        self.assertEqual(prox.__vers_offsets__, None)
+        self.assertEqual(prox.__vers_object__, None)
+
+    def test_getattr(self):
+        data, prox = self.init_proxy(name=six.u('Alice'), salary=10)
+
+        self.assertEqual(prox.salary, 10)
+        self.assertEqual(prox.name, six.u('Alice'))
+        self.assertEqual(prox.__vers_offsets__, [13, 20])
+        self.assertEqual(prox.__vers_object__, None)
+
+    def test_getattr_validated(self):
+        data, prox = self.init_proxy(name=six.u('Alice'), salary=10)
+        data = data[:-2] + b's\x0212'
+
+        prox = proxy.BufferSchemaProxy(Buffered, data, 13)
+        trusted = proxy.BufferSchemaProxy(Buffered, data, 13, True)
+
+        self.assertEqual(prox.salary, 12)
+        self.assertEqual(trusted.salary, six.u('12'))
+
+    def test_getattr_trusted_getstate(self):
+        def parse_date(value):
+            if isinstance(value, datetime.date):
+                return value
+            return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+        class Dated(vobject.VObject):
+            class Schema(schema.Schema):
+                __version__ = 1
+
+                day = attribute.Attribute(validate=parse_date,
+                                          getstate=lambda v: v.isoformat())
+
+        data = Dated(day=datetime.date(2014, 3, 1)).to_bytes()
+
+        prox = proxy.BufferSchemaProxy(Dated, data, 10, True)
+
+        self.assertEqual(prox.day, datetime.date(2014, 3, 1))
+
+    def test_getattr_truncated(self):
+        data, prox = self.init_proxy(name=six.u('Alice'), salary=10)
+
+        short = proxy.BufferSchemaProxy(Buffered, data[:-1], 13)
+        shorter = proxy.BufferSchemaProxy(Buffered, data[:15], 13)
+        extra = proxy.BufferSchemaProxy(Buffered, data + b'N', 13)
+
+        self.assertRaises(ValueError, getattr, short, 'name')
+        self.assertRaises(ValueError, getattr, shorter, 'name')
+        self.assertRaises(ValueError, getattr, extra, 'name')
+
+    def test_getattr_other(self):
+        data, prox = self.init_proxy(name=six.u('Alice'), salary=10)
+
+        self.assertEqual(prox.title, 'Dr. Alice')
+        self.assertEqual(prox.__vers_object__,
+                         Buffered(name=six.u('Alice'), salary=10))
+        self.assertRaises(AttributeError, getattr, prox, 'missing')
+        self.assertRaises(AttributeError, getattr, prox, '__vers_missing__')
+
+    def test_materialized_once(self):
+        data, prox = self.init_proxy(name=six.u('Alice'), salary=10)
+
+        with mock.patch.object(Buffered, 'from_bytes',
+                               wraps=Buffered.from_bytes) as mock_from_bytes:
+            self.assertEqual(prox.to_dict(), {'__version__': 1,
+                                              'name': six.u('Alice'),
+                                              'salary': 10})
+            self.assertEqual(prox, Buffered(name=six.u('Alice'), salary=10))
+            self.assertEqual(prox.__version__, 1)
+
+        mock_from_bytes.assert_called_once_with(data, False)
+
+    def test_name(self):
+        data, prox = self.init_proxy(name=six.u('Alice'), salary=10)
+
+        self.assertEqual(prox.__vers_name__, 'Buffered')
+        self.assertEqual(prox.to_bytes(), data)
+
+    def test_read_only(self):
+        data, prox = self.init_proxy(name=six.u('Alice'), salary=10)
+
+        self.assertRaises(AttributeError, setattr, prox, 'name', 'Bob')
+        self.assertRaises(AttributeError, setattr, prox, 'other', 'Bob')
+        self.assertRaises(AttributeError, delattr, prox, 'name')
+
+
+class AttributeDescriptorTest(unittest.TestCase):
+    def make_obj(self, values, attrs=None, notify=None):
+        sch = mock.Mock(__vers_values__=values,
+                        __vers_attrs__=attrs or {},
+                        __vers_notify__=notify)
+        return mock.Mock(__vers_values__=sch), sch
+
+    def test_init(self):
+        desc = proxy.AttributeDescriptor('attr')
+
+        self.assertEqual(desc.name, 'attr')
+        self.assertEqual(desc.key, 'attr')
+        self.assertEqual(desc.direct, True)
+
+    def test_init_key(self):
+        desc = proxy.AttributeDescriptor('attr', 0)
+
+        self.assertEqual(desc.name, 'attr')
+        self.assertEqual(desc.key, 0)
+
+    def test_get_key(self):
+        desc = proxy.AttributeDescriptor('attr', 1)
+        obj, sch = self.make_obj(['zero', 'one'])
+
+        self.assertEqual(desc.__get__(obj, 'cls'), 'one')
+
+    def test_set_key(self):
+        desc = proxy.AttributeDescriptor('attr', 1)
+        attr = mock.Mock(**{'validate.return_value': 'validated'})
+        obj, sch = self.make_obj(['zero', 'one'], {'attr': attr})
+
+        desc.__set__(obj, 'new')
+
+        self.assertEqual(sch.__vers_values__, ['zero', 'validated'])
+
+    def test_get_class(self):
+        desc = proxy.AttributeDescriptor('attr')
+
+        self.assertEqual(desc.__get__(None, 'cls'), desc)
+
+    def test_get(self):
+        desc = proxy.AttributeDescriptor('attr')
+        obj, sch = self.make_obj({'attr': 'value'})
+        sch.attr = 'schema'
+
+        self.assertEqual(desc.__get__(obj, 'cls'), 'value')
+
+    def test_get_missing(self):
+        desc = proxy.AttributeDescriptor('attr')
+        obj, sch = self.make_obj({})
+        sch.attr = 'schema'
+
+        self.assertEqual(desc.__get__(obj, 'cls'), 'schema')
+
+    def test_get_uninit(self):
+        desc = proxy.AttributeDescriptor('attr')
+        obj, sch = self.make_obj(None)
+        sch.attr = 'schema'
+
+        self.assertEqual(desc.__get__(obj, 'cls'), 'schema')
+
+    def test_set(self):
+        desc = proxy.AttributeDescriptor('attr')
+        attr = mock.Mock(**{'validate.return_value': 'validated'})
+        notify = mock.Mock()
+        obj, sch = self.make_obj({'attr': 'value'}, {'attr': attr}, notify)
+
+        desc.__set__(obj, 'new')
+
+        attr.validate.assert_called_once_with('new')
+        self.assertEqual(sch.__vers_values__, {'attr': 'validated'})
+        notify.assert_called_once_with('attr')
+
+    def test_set_no_notify(self):
+        desc = proxy.AttributeDescriptor('attr')
+        attr = mock.Mock(**{'validate.return_value': 'validated'})
+        obj, sch = self.make_obj({'attr': 'value'}, {'attr': attr})
+
+        desc.__set__(obj, 'new')
+
+        self.assertEqual(sch.__vers_values__, {'attr': 'validated'})
+
+    def test_set_indirect(self):
+        desc = proxy.AttributeDescriptor('attr', direct=False)
+        attr = mock.Mock(**{'validate.return_value': 'validated'})
+        obj, sch = self.make_obj({'attr': 'value'}, {'attr': attr})
+
+        desc.__set__(obj, 'new')
+
+        self.assertFalse(attr.validate.called)
+        self.assertEqual(sch.__vers_values__, {'attr': 'value'})
+        self.assertEqual(sch.attr, 'new')
+
+    def test_set_undeclared(self):
+        desc = proxy.AttributeDescriptor('attr')
+        obj, sch = self.make_obj({})
+
+        desc.__set__(obj, 'new')
+
+        self.assertEqual(sch.attr, 'new')
+        self.assertEqual(sch.__vers_values__, {})
+
+    def test_set_uninit(self):
+        desc = proxy.AttributeDescriptor('attr')
+        attr = mock.Mock(**{'validate.return_value': 'validated'})
+        obj, sch = self.make_obj(None, {'attr': attr})
+
+        desc.__set__(obj, 'new')
+
+        self.assertEqual(sch.attr, 'new')
+        self.assertFalse(attr.validate.called)
+
+
+class PropertyDescriptorTest(unittest.TestCase):
+    def test_init(self):
+        desc = proxy.PropertyDescriptor('prop')
+
+        self.assertEqual(desc.name, 'prop')
+
+    def test_get_class(self):
+        desc = proxy.PropertyDescriptor('prop')
+
+        self.assertEqual(desc.__get__(None, 'cls'), desc)
+
+    def test_get(self):
+        desc = proxy.PropertyDescriptor('prop')
+        obj = mock.Mock(__vers_values__=mock.Mock(prop='value'))
+
+        self.assertEqual(desc.__get__(obj, 'cls'), 'value')
+
+    def test_set(self):
+        desc = proxy.PropertyDescriptor('prop')
+        obj = mock.Mock(__vers_values__=mock.Mock())
+
+        desc.__set__(obj, 'value')
+
+        self.assertEqual(obj.__vers_values__.prop, 'value')
+
+
+class MemberDescriptorTest(unittest.TestCase):
+    def test_init(self):
+        desc = proxy.MemberDescriptor('meth')
+
+        self.assertEqual(desc.name, 'meth')
+
+    def test_get_class(self):
+        desc = proxy.MemberDescriptor('meth')
+
+        self.assertEqual(desc.__get__(None, 'cls'), desc)
+
+    def test_get(self):
+        desc = proxy.MemberDescriptor('meth')
+        obj = mock.Mock(__vers_values__=mock.Mock(meth='method'))
+
+        self.assertEqual(desc.__get__(obj, 'cls'), 'method')
+
+    def test_non_data(self):
+        self.assertFalse(hasattr(proxy.MemberDescriptor, '__set__'))
+
+
+class MaskDescriptorTest(unittest.TestCase):
+    def test_init(self):
+        desc = proxy.MaskDescriptor('attr')
+
+        self.assertEqual(desc.name, 'attr')
+
+    def test_get(self):
+        desc = proxy.MaskDescriptor('attr')
+
+        self.assertRaises(AttributeError, desc.__get__, None, 'cls')
+        self.assertRaises(AttributeError, desc.__get__, 'obj', 'cls')
+
+    def test_non_data(self):
+        self.assertFalse(hasattr(proxy.MaskDescriptor, '__set__'))
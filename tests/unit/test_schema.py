@@ -13,14 +13,43 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import re
 import unittest
 
 import mock
 
 from vobj import attribute
+from vobj import decorators
 from vobj import schema
 
 
+class StandardTest(unittest.TestCase):
+    def test_generic(self):
+        class TestSchema(schema.Schema):
+            pass
+
+        self.assertTrue(schema._standard(TestSchema, '__init__'))
+        self.assertTrue(schema._standard(TestSchema, '__new__'))
+
+    def test_generated(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            __vers_specialize__ = True
+
+        self.assertTrue(schema._standard(TestSchema, '__init__'))
+
+    def test_user_defined(self):
+        class TestSchema(schema.Schema):
+            def __init__(self, values=None):
+                pass
+
+        class SubSchema(TestSchema):
+            pass
+
+        self.assertFalse(schema._standard(TestSchema, '__init__'))
+        self.assertFalse(schema._standard(SubSchema, '__init__'))
+
+
 class SchemaMetaTest(unittest.TestCase):
     def test_bad_version_declared(self):
         namespace = {
@@ -246,6 +275,37 @@ class SchemaMetaTest(unittest.TestCase):
             2: result.fake_downgrader2,
         })
 
+    def test_downgrader_depends(self):
+        namespace = {
+            '__module__': 'test_vobject',
+            '__version__': 2,
+            'attr': attribute.Attribute(),
+            'fake_upgrader': mock.Mock(__vers_upgrader__=None),
+            'fake_downgrader': mock.Mock(__vers_downgrader__=1,
+                                         __vers_depends__=frozenset(['attr'])),
+        }
+
+        result = schema.SchemaMeta('TestSchema', (object,), namespace)
+
+        self.assertEqual(result.__vers_downgraders__, {
+            1: result.fake_downgrader,
+        })
+
+    def test_downgrader_depends_undeclared(self):
+        namespace = {
+            '__module__': 'test_vobject',
+            '__version__': 2,
+            'attr': attribute.Attribute(),
+            'fake_upgrader': mock.Mock(__vers_upgrader__=None),
+            'fake_downgrader': mock.Mock(
+                __vers_downgrader__=1,
+                __vers_depends__=frozenset(['attr', 'other']),
+            ),
+        }
+
+        self.assertRaises(TypeError, schema.SchemaMeta, 'TestSchema',
+                          (object,), namespace)
+
     def test_values(self):
         namespace = {
             '__module__': 'test_vobject',
@@ -389,7 +449,7 @@ class SchemaTest(unittest.TestCase):
 
         validator.assert_called_once_with('new_value')
         self.assertEqual(sch.__vers_values__, dict(attr='validated'))
-        notify.assert_called_once_with()
+        notify.assert_called_once_with('attr')
 
     def test_setattr_nosuch(self):
         class TestSchema(schema.Schema):
@@ -605,3 +665,669 @@ class SchemaTest(unittest.TestCase):
 
         self.assertEqual(sch.__vers_values__, dict(attr='validated'))
         validator.assert_called_once_with('value')
+
+    def test_setvalues(self):
+        validator = mock.Mock(return_value='validated')
+
+        class TestSchema(schema.Schema):
+            __version__ = 2
+            attr = attribute.Attribute('default', validate=validator)
+
+            @decorators.upgrader
+            def upgrader(cls, state):
+                pass
+        sch = TestSchema()
+
+        sch.__vers_setvalues__(dict(attr='value'))
+
+        self.assertEqual(sch.__vers_values__, dict(attr='validated'))
+        validator.assert_called_once_with('value')
+
+    def test_setvalues_ignores_version(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            attr = attribute.Attribute()
+        sch = TestSchema()
+
+        sch.__vers_setvalues__(dict(__version__=5, attr='value'))
+
+        self.assertEqual(sch.__vers_values__, dict(attr='value'))
+
+    def test_setvalues_errors(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            attr = attribute.Attribute()
+        sch = TestSchema()
+
+        self.assertRaises(ValueError, sch.__vers_setvalues__, {})
+        self.assertRaises(ValueError, sch.__vers_setvalues__,
+                          dict(attr=1, other=2))
+
+    def test_astuple_uninitialized(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            attr = attribute.Attribute()
+        sch = TestSchema()
+
+        self.assertRaises(RuntimeError, sch.__vers_astuple__)
+
+    def test_astuple(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            b = attribute.Attribute()
+            a = attribute.Attribute(getstate=str)
+        sch = TestSchema(dict(a=1, b=2))
+
+        self.assertEqual(sch.__vers_astuple__(), (1, 2))
+
+    def test_fromtuple(self):
+        validator = mock.Mock(return_value='validated')
+
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            b = attribute.Attribute(validate=validator)
+            a = attribute.Attribute()
+
+        sch = TestSchema.__vers_fromtuple__((1, 2))
+
+        self.assertTrue(isinstance(sch, TestSchema))
+        self.assertEqual(sch.__vers_values__, dict(a=1, b=2))
+        self.assertFalse(validator.called)
+
+    def test_fromtuple_badlength(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            a = attribute.Attribute()
+
+        self.assertRaises(ValueError, TestSchema.__vers_fromtuple__, (1, 2))
+
+    def test_fromtrusted(self):
+        validator = mock.Mock(return_value='validated')
+
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            b = attribute.Attribute(validate=validator)
+            a = attribute.Attribute(validate=validator)
+
+        sch = TestSchema.__vers_fromtrusted__(
+            dict(__version__=1, a=1, b=2))
+
+        self.assertTrue(isinstance(sch, TestSchema))
+        self.assertEqual(sch.__vers_values__, dict(a=1, b=2))
+        self.assertFalse(validator.called)
+
+    def test_fromtrusted_validate(self):
+        validator = mock.Mock(return_value='validated')
+
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            b = attribute.Attribute(validate=validator)
+            a = attribute.Attribute(validate=validator)
+
+        sch = TestSchema.__vers_fromtrusted__(dict(a=1, b=2), ['b'])
+
+        self.assertEqual(sch.__vers_values__, dict(a=1, b='validated'))
+        validator.assert_called_once_with(2)
+
+    def test_fromtrusted_badkeys(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            a = attribute.Attribute()
+            b = attribute.Attribute()
+
+        self.assertRaises(ValueError, TestSchema.__vers_fromtrusted__,
+                          dict(a=1))
+        self.assertRaises(ValueError, TestSchema.__vers_fromtrusted__,
+                          dict(a=1, b=2, c=3))
+        self.assertRaises(ValueError, TestSchema.__vers_fromtrusted__,
+                          dict(__version__=1, a=1, c=3))
+
+    def test_takevalues(self):
+        validator = mock.Mock(return_value='validated')
+
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            a = attribute.Attribute()
+            b = attribute.Attribute(validate=validator)
+        sch = TestSchema()
+        state = dict(__version__=1, a=1, b=2)
+
+        sch.__vers_takevalues__(state)
+
+        self.assertTrue(sch.__vers_values__ is state)
+        self.assertEqual(state, dict(a=1, b='validated'))
+        validator.assert_called_once_with(2)
+
+    def test_takevalues_badkeys(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            a = attribute.Attribute()
+        sch = TestSchema()
+
+        self.assertRaises(ValueError, sch.__vers_takevalues__, {})
+        self.assertRaises(ValueError, sch.__vers_takevalues__,
+                          dict(b=1))
+        self.assertRaises(ValueError, sch.__vers_takevalues__,
+                          dict(a=1, b=2))
+
+    def test_takevalues_custom_setstate(self):
+        calls = []
+
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            a = attribute.Attribute(validate=int)
+
+            def __setstate__(self, state):
+                calls.append(dict(state))
+                super(TestSchema, self).__setstate__(state)
+        sch = TestSchema()
+        state = dict(a='1')
+
+        sch.__vers_takevalues__(state)
+
+        self.assertEqual(calls, [dict(__version__=1, a='1')])
+        self.assertEqual(sch.__vers_values__, dict(a=1))
+        self.assertFalse(sch.__vers_values__ is state)
+
+
+class SpecializeTest(unittest.TestCase):
+    def make_schema(self, **kwargs):
+        validator = mock.Mock(side_effect=lambda x: 'v(%s)' % x)
+        getstate = mock.Mock(side_effect=lambda x: 'g(%s)' % x)
+
+        class TestSchema(schema.Schema):
+            __version__ = 3
+            __vers_specialize__ = True
+            required = attribute.Attribute()
+            optional = attribute.Attribute('default', validate=validator,
+                                           getstate=getstate)
+
+            @decorators.upgrader
+            def upgrader(cls, state):
+                pass
+
+        return TestSchema, validator, getstate
+
+    def test_not_requested(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+
+        for name in schema._SPECIALIZED:
+            self.assertFalse(name in TestSchema.__dict__)
+
+    def test_abstract(self):
+        class TestSchema(schema.Schema):
+            __vers_specialize__ = True
+
+        for name in schema._SPECIALIZED:
+            self.assertFalse(name in TestSchema.__dict__)
+
+    def test_generated(self):
+        TestSchema, validator, getstate = self.make_schema()
+
+        for name in schema._GENERATORS:
+            self.assertTrue(TestSchema.__dict__[name].__vers_generated__)
+
+    def test_identity_omitted(self):
+        TestSchema, validator, getstate = self.make_schema()
+
+        for name in schema._GENERATORS:
+            source = TestSchema.__dict__[name].__vers_source__
+            self.assertFalse('identity' in source)
+            self.assertEqual(len(re.findall(r'\b_(validate|getstate)_\d',
+                                            source)), 1)
+
+    def test_init(self):
+        TestSchema, validator, getstate = self.make_schema()
+
+        result = TestSchema(dict(required=1, optional=2, extra=3))
+
+        self.assertEqual(result.__vers_values__,
+                         dict(required=1, optional='v(2)'))
+        validator.assert_called_once_with(2)
+
+    def test_init_default(self):
+        TestSchema, validator, getstate = self.make_schema()
+
+        result = TestSchema(dict(required=1))
+
+        self.assertEqual(result.__vers_values__,
+                         dict(required=1, optional='default'))
+        self.assertFalse(validator.called)
+
+    def test_init_required(self):
+        TestSchema, validator, getstate = self.make_schema()
+
+        self.assertRaises(TypeError, TestSchema, dict(optional=2))
+
+    def test_init_late(self):
+        TestSchema, validator, getstate = self.make_schema()
+
+        result = TestSchema()
+
+        self.assertEqual(result.__vers_values__, None)
+
+    def test_getstate(self):
+        TestSchema, validator, getstate = self.make_schema()
+        sch = TestSchema(dict(required=1, optional=2))
+
+        result = sch.__getstate__()
+
+        self.assertEqual(result, dict(__version__=3, required=1,
+                                      optional='g(v(2))'))
+
+    def test_getstate_uninit(self):
+        TestSchema, validator, getstate = self.make_schema()
+
+        self.assertRaises(RuntimeError, TestSchema().__getstate__)
+
+    def test_setstate(self):
+        TestSchema, validator, getstate = self.make_schema()
+        sch = TestSchema()
+
+        sch.__setstate__(dict(__version__=3, required=1, optional=2))
+
+        self.assertEqual(sch.__vers_values__,
+                         dict(required=1, optional='v(2)'))
+
+    def test_setstate_errors(self):
+        TestSchema, validator, getstate = self.make_schema()
+        sch = TestSchema()
+
+        for state in (dict(required=1, optional=2),
+                      dict(__version__=2, required=1, optional=2),
+                      dict(__version__=3, required=1),
+                      dict(__version__=3, required=1, other=2),
+                      dict(__version__=3, required=1, optional=2, other=3)):
+            self.assertRaises(ValueError, sch.__setstate__, state)
+        self.assertEqual(sch.__vers_values__, None)
+
+    def test_setvalues(self):
+        TestSchema, validator, getstate = self.make_schema()
+        sch = TestSchema()
+
+        sch.__vers_setvalues__(dict(required=1, optional=2))
+
+        self.assertEqual(sch.__vers_values__,
+                         dict(required=1, optional='v(2)'))
+
+    def test_setvalues_version(self):
+        TestSchema, validator, getstate = self.make_schema()
+        sch = TestSchema()
+
+        sch.__vers_setvalues__(dict(__version__=1, required=1, optional=2))
+
+        self.assertEqual(sch.__vers_values__,
+                         dict(required=1, optional='v(2)'))
+
+    def test_setvalues_errors(self):
+        TestSchema, validator, getstate = self.make_schema()
+        sch = TestSchema()
+
+        for state in (dict(required=1),
+                      dict(__version__=3, required=1),
+                      dict(required=1, other=2),
+                      dict(required=1, optional=2, other=3)):
+            self.assertRaises(ValueError, sch.__vers_setvalues__, state)
+        self.assertEqual(sch.__vers_values__, None)
+
+    def test_setvalues_user_setstate(self):
+        TestSchema, validator, getstate = self.make_schema()
+        calls = []
+
+        class SubSchema(TestSchema):
+            def __setstate__(self, state):
+                calls.append(state)
+
+            @decorators.upgrader
+            def upgrader(cls, state):
+                pass
+
+        sch = SubSchema()
+        sch.__vers_setvalues__(dict(required=1))
+
+        self.assertEqual(SubSchema.__dict__['__vers_setvalues__'],
+                         schema.Schema.__dict__['__vers_setvalues__'])
+        self.assertEqual(calls, [dict(__version__=4, required=1)])
+
+    def test_takevalues(self):
+        TestSchema, validator, getstate = self.make_schema()
+        sch = TestSchema()
+        state = dict(__version__=3, required=1, optional=2)
+
+        sch.__vers_takevalues__(state)
+
+        self.assertFalse(sch.__vers_values__ is state)
+        self.assertEqual(sch.__vers_values__,
+                         dict(required=1, optional='v(2)'))
+
+    def test_takevalues_errors(self):
+        TestSchema, validator, getstate = self.make_schema()
+        sch = TestSchema()
+
+        for state in (dict(required=1),
+                      dict(required=1, other=2),
+                      dict(required=1, optional=2, other=3)):
+            self.assertRaises(ValueError, sch.__vers_takevalues__, state)
+        self.assertEqual(sch.__vers_values__, None)
+
+    def test_takevalues_user_setstate(self):
+        TestSchema, validator, getstate = self.make_schema()
+        calls = []
+
+        class SubSchema(TestSchema):
+            def __setstate__(self, state):
+                calls.append(state)
+
+            @decorators.upgrader
+            def upgrader(cls, state):
+                pass
+
+        sch = SubSchema()
+        sch.__vers_takevalues__(dict(required=1))
+
+        self.assertEqual(SubSchema.__dict__['__vers_takevalues__'],
+                         schema.Schema.__dict__['__vers_takevalues__'])
+        self.assertEqual(calls, [dict(__version__=4, required=1)])
+
+    def test_setstate_validator_keyerror(self):
+        TestSchema, validator, getstate = self.make_schema()
+        validator.side_effect = KeyError('spam')
+        sch = TestSchema()
+
+        self.assertRaises(KeyError, sch.__setstate__,
+                          dict(__version__=3, required=1, optional=2))
+
+    def test_inherited(self):
+        TestSchema, validator, getstate = self.make_schema()
+
+        class SubSchema(TestSchema):
+            other = attribute.Attribute()
+
+            @decorators.upgrader
+            def upgrader(cls, state):
+                pass
+
+        result = SubSchema(dict(required=1, other=2))
+
+        self.assertEqual(result.__vers_values__,
+                         dict(required=1, optional='default', other=2))
+        for name in schema._GENERATORS:
+            self.assertTrue(SubSchema.__dict__[name].__vers_generated__)
+            self.assertNotEqual(SubSchema.__dict__[name],
+                                TestSchema.__dict__[name])
+
+    def test_disabled(self):
+        TestSchema, validator, getstate = self.make_schema()
+
+        class SubSchema(TestSchema):
+            __vers_specialize__ = False
+
+            @decorators.upgrader
+            def upgrader(cls, state):
+                pass
+
+        for name in schema._GENERATORS:
+            self.assertEqual(SubSchema.__dict__[name],
+                             schema.Schema.__dict__[name])
+
+    def test_user_defined(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+
+            def __getstate__(self):
+                return 'state'
+
+        class SubSchema(TestSchema):
+            __vers_specialize__ = True
+
+            @decorators.upgrader
+            def upgrader(cls, state):
+                pass
+
+        self.assertFalse('__getstate__' in SubSchema.__dict__)
+        self.assertTrue(SubSchema.__dict__['__init__'].__vers_generated__)
+
+    def test_fields(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            b = attribute.Attribute()
+            c = attribute.Attribute()
+            a = attribute.Attribute()
+
+        self.assertEqual(TestSchema.__vers_fields__, ('a', 'b', 'c'))
+
+    def test_untrusted(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            c = attribute.Attribute(getstate=str)
+            b = attribute.Attribute(validate=int)
+            a = attribute.Attribute(getstate=repr)
+
+        self.assertEqual(TestSchema.__vers_untrusted__, ('a', 'c'))
+
+
+class CompactTest(unittest.TestCase):
+    def make_schema(self):
+        validator = mock.Mock(side_effect=lambda x: 'v(%s)' % x)
+
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            __vers_compact__ = True
+            b = attribute.Attribute('default', validate=validator)
+            a = attribute.Attribute()
+
+        return TestSchema, validator
+
+    def test_methods(self):
+        TestSchema, validator = self.make_schema()
+
+        for name in schema._GENERATORS:
+            self.assertTrue(TestSchema.__dict__[name].__vers_generated__)
+        for name, func in schema._COMPACT.items():
+            self.assertEqual(TestSchema.__dict__[name], func)
+
+    def test_index(self):
+        TestSchema, validator = self.make_schema()
+
+        self.assertEqual(TestSchema.__vers_index__, dict(a=0, b=1))
+
+    def test_init(self):
+        TestSchema, validator = self.make_schema()
+
+        result = TestSchema(dict(a=1, b=2))
+
+        self.assertEqual(result.__vers_values__, [1, 'v(2)'])
+
+    def test_init_default(self):
+        TestSchema, validator = self.make_schema()
+
+        result = TestSchema(dict(a=1))
+
+        self.assertEqual(result.__vers_values__, [1, 'default'])
+
+    def test_getattr(self):
+        TestSchema, validator = self.make_schema()
+        sch = TestSchema(dict(a=1, b=2))
+
+        self.assertEqual(sch.a, 1)
+        self.assertEqual(sch.b, 'v(2)')
+        self.assertRaises(AttributeError, lambda: sch.c)
+
+    def test_getattr_uninit(self):
+        TestSchema, validator = self.make_schema()
+        sch = TestSchema()
+
+        self.assertRaises(RuntimeError, lambda: sch.a)
+
+    def test_setattr(self):
+        TestSchema, validator = self.make_schema()
+        notify = mock.Mock()
+        sch = TestSchema(dict(a=1, b=2))
+        sch.__vers_notify__ = notify
+
+        sch.b = 3
+        sch.c = 4
+
+        self.assertEqual(sch.__vers_values__, [1, 'v(3)'])
+        self.assertEqual(sch.c, 4)
+        notify.assert_called_once_with('b')
+
+    def test_setattr_uninit(self):
+        TestSchema, validator = self.make_schema()
+        sch = TestSchema()
+
+        def test_func():
+            sch.a = 1
+
+        self.assertRaises(RuntimeError, test_func)
+
+    def test_getstate(self):
+        TestSchema, validator = self.make_schema()
+        sch = TestSchema(dict(a=1, b=2))
+
+        self.assertEqual(sch.__getstate__(),
+                         dict(__version__=1, a=1, b='v(2)'))
+
+    def test_setstate(self):
+        TestSchema, validator = self.make_schema()
+        sch = TestSchema()
+
+        sch.__setstate__(dict(__version__=1, a=1, b=2))
+
+        self.assertEqual(sch.__vers_values__, [1, 'v(2)'])
+
+    def test_astuple(self):
+        TestSchema, validator = self.make_schema()
+        sch = TestSchema(dict(a=1, b=2))
+
+        self.assertEqual(sch.__vers_astuple__(), (1, 'v(2)'))
+
+    def test_fromtuple(self):
+        TestSchema, validator = self.make_schema()
+
+        sch = TestSchema.__vers_fromtuple__((1, 2))
+
+        self.assertEqual(sch.__vers_values__, [1, 2])
+        self.assertEqual(sch.b, 2)
+        self.assertFalse(validator.called)
+
+    def test_fromtrusted(self):
+        TestSchema, validator = self.make_schema()
+
+        sch = TestSchema.__vers_fromtrusted__(dict(a=1, b=2), ['b'])
+
+        self.assertEqual(sch.__vers_values__, [1, 'v(2)'])
+        validator.assert_called_once_with(2)
+
+    def test_takevalues(self):
+        TestSchema, validator = self.make_schema()
+        sch = TestSchema()
+
+        sch.__vers_takevalues__(dict(__version__=1, a=1, b=2))
+
+        self.assertEqual(sch.__vers_values__, [1, 'v(2)'])
+        self.assertTrue(TestSchema.__vers_takevalues__.__vers_generated__)
+
+    def test_eq(self):
+        TestSchema, validator = self.make_schema()
+
+        self.assertTrue(TestSchema(dict(a=1)) == TestSchema(dict(a=1)))
+        self.assertTrue(TestSchema(dict(a=1)) != TestSchema(dict(a=2)))
+
+    def test_not_compact(self):
+        TestSchema, validator = self.make_schema()
+
+        class SubSchema(TestSchema):
+            __vers_compact__ = False
+
+            @decorators.upgrader
+            def upgrader(cls, state):
+                pass
+
+        for name in schema._SPECIALIZED:
+            self.assertEqual(SubSchema.__dict__[name],
+                             schema.Schema.__dict__[name])
+        self.assertEqual(SubSchema(dict(a=1)).__vers_values__,
+                         dict(a=1, b='default'))
+
+    def test_user_init(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            __vers_compact__ = True
+            b = attribute.Attribute('default')
+            a = attribute.Attribute()
+
+            def __init__(self, values=None):
+                super(TestSchema, self).__init__(values)
+
+        result = TestSchema(dict(a=1))
+
+        self.assertEqual(result.__vers_values__, [1, 'default'])
+        self.assertEqual(result.a, 1)
+
+    def test_user_setstate(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            __vers_compact__ = True
+            b = attribute.Attribute(validate=int)
+            a = attribute.Attribute()
+
+            def __setstate__(self, state):
+                super(TestSchema, self).__setstate__(state)
+
+        result = TestSchema()
+        result.__setstate__(dict(__version__=1, a=1, b='2'))
+
+        self.assertEqual(result.__vers_values__, [1, 2])
+        self.assertEqual(result.a, 1)
+        self.assertEqual(result.b, 2)
+
+    def test_user_getstate(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            __vers_compact__ = True
+            b = attribute.Attribute(getstate=str)
+            a = attribute.Attribute()
+
+            def __getstate__(self):
+                return super(TestSchema, self).__getstate__()
+
+        result = TestSchema(dict(a=1, b=2))
+
+        self.assertEqual(result.__getstate__(),
+                         dict(__version__=1, a=1, b='2'))
+
+    def test_user_setattr(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            __vers_compact__ = True
+            b = attribute.Attribute(validate=int)
+            a = attribute.Attribute()
+
+            def __setattr__(self, name, value):
+                super(TestSchema, self).__setattr__(name, value)
+
+        result = TestSchema(dict(a=1, b=2))
+        result.b = '3'
+
+        self.assertEqual(result.__vers_values__, [1, 3])
+
+    def test_user_setstate_inherited(self):
+        TestSchema, validator = self.make_schema()
+
+        class SubSchema(TestSchema):
+            c = attribute.Attribute()
+
+            @decorators.upgrader
+            def upgrader(cls, state):
+                pass
+
+            def __setstate__(self, state):
+                super(SubSchema, self).__setstate__(state)
+
+        result = SubSchema()
+        result.__setstate__(dict(__version__=2, a=1, b=2, c=3))
+
+        self.assertEqual(result.__vers_values__, [1, 'v(2)', 3])
+        self.assertEqual(result.c, 3)
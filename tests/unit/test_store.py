@@ -0,0 +1,354 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import six
+
+from vobj import attribute
+from vobj import decorators
+from vobj import proxy
+from vobj import schema
+from vobj import store
+from vobj import vobject
+
+
+class OldEmployee(vobject.VObject):
+    __vers_name__ = 'Employee'
+
+    class Version1(schema.Schema):
+        __version__ = 1
+
+        name = attribute.Attribute()
+        salary = attribute.Attribute(0, validate=int)
+
+
+class Employee(vobject.VObject):
+    class Version1(schema.Schema):
+        __version__ = 1
+
+        name = attribute.Attribute()
+        salary = attribute.Attribute(0, validate=int)
+
+    class Version2(Version1):
+        __version__ = 2
+
+        name = None
+        first = attribute.Attribute()
+        last = attribute.Attribute()
+
+        @decorators.upgrader
+        def upgrade(cls, state):
+            state['first'], state['last'] = state.pop('name').split(' ')
+            return state
+
+        @decorators.downgrader(1)
+        def downgrade(cls, state):
+            state['name'] = '%s %s' % (state.pop('first'), state.pop('last'))
+            return state
+
+
+class Office(vobject.VObject):
+    class Version1(schema.Schema):
+        __version__ = 1
+
+        city = attribute.Attribute()
+
+
+def _employee(first, last, salary=0):
+    return Employee(first=six.u(first), last=six.u(last), salary=salary)
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, 'employees.vobjs')
+
+        self.alice = _employee('Alice', 'Smith', 10)
+        self.bob = _employee('Bob', 'Jones', 20)
+
+    def open(self, classes=(Employee, Office), **kwargs):
+        st = store.Store(self.path, classes, **kwargs)
+        self.addCleanup(st.close)
+        return st
+
+    def read(self, suffix=''):
+        with open(self.path + suffix, 'rb') as f:
+            return f.read()
+
+    def write(self, data, suffix=''):
+        with open(self.path + suffix, 'wb') as f:
+            f.write(data)
+
+    def test_create(self):
+        st = self.open()
+
+        self.assertEqual(len(st), 0)
+        self.assertEqual(st.keys(), [])
+        self.assertEqual(self.read(), store.MAGIC)
+        self.assertEqual(self.read(store.INDEX_SUFFIX), store.INDEX_MAGIC)
+
+    def test_put_get(self):
+        st = self.open()
+
+        st.put(six.u('alice'), self.alice)
+        st[six.u('bob')] = self.bob
+
+        self.assertEqual(len(st), 2)
+        self.assertEqual(sorted(st), ['alice', 'bob'])
+        self.assertTrue(six.u('alice') in st)
+        self.assertFalse(six.u('carol') in st)
+        self.assertEqual(st[six.u('alice')], self.alice)
+        self.assertEqual(st.get(six.u('bob')), self.bob)
+        self.assertEqual(st.get(six.u('carol')), None)
+        self.assertEqual(st.get(six.u('carol'), 'default'), 'default')
+        self.assertRaises(KeyError, lambda: st[six.u('carol')])
+
+    def test_layout(self):
+        st = self.open()
+
+        st.put(six.u('alice'), self.alice)
+        data = self.alice.to_bytes()
+        offset = len(store.MAGIC) + 8 + 5
+
+        self.assertEqual(self.read(), store.MAGIC +
+                         b'\x05\x00\x00\x00' +
+                         six.int2byte(len(data)) + b'\x00\x00\x00' +
+                         b'alice' + data)
+        self.assertEqual(self.read(store.INDEX_SUFFIX), store.INDEX_MAGIC +
+                         six.int2byte(offset) + b'\x00' * 7 +
+                         six.int2byte(len(data)) + b'\x00\x00\x00' +
+                         b'\x05\x00\x00\x00alice')
+
+    def test_replace(self):
+        st = self.open()
+        st.put(six.u('alice'), self.alice)
+        size = len(self.read())
+
+        st.put(six.u('alice'), self.bob)
+
+        self.assertEqual(len(st), 1)
+        self.assertEqual(st[six.u('alice')], self.bob)
+        self.assertTrue(len(self.read()) > size)
+
+    def test_delete(self):
+        st = self.open()
+        st.put_many([(six.u('alice'), self.alice), (six.u('bob'), self.bob)])
+
+        del st[six.u('alice')]
+
+        self.assertEqual(st.keys(), ['bob'])
+        self.assertRaises(KeyError, st.__delitem__, six.u('alice'))
+        st.close()
+        self.assertEqual(self.open().keys(), ['bob'])
+
+    def test_put_many(self):
+        st = self.open()
+
+        result = st.put_many({six.u('alice'): self.alice,
+                              six.u('bob'): self.bob})
+
+        self.assertEqual(result, 2)
+        self.assertEqual(st[six.u('alice')], self.alice)
+        self.assertEqual(st[six.u('bob')], self.bob)
+
+    def test_put_older_version(self):
+        st = self.open()
+
+        self.assertRaises(ValueError, st.put, six.u('alice'),
+                          self.alice.__version__[1])
+        self.assertEqual(len(st), 0)
+
+    def test_put_unknown_class(self):
+        st = self.open(classes=[Office])
+
+        self.assertRaises(ValueError, st.put, six.u('alice'), self.alice)
+
+    def test_reopen(self):
+        st = self.open()
+        st.put(six.u('alice'), self.alice)
+        st.put(six.u('office'), Office(city=six.u('Austin')))
+        st.close()
+
+        st = self.open()
+
+        self.assertEqual(sorted(st.keys()), ['alice', 'office'])
+        self.assertEqual(st[six.u('alice')], self.alice)
+        self.assertEqual(st[six.u('office')].city, six.u('Austin'))
+
+    def test_upgrade_on_read(self):
+        st = self.open(classes=[OldEmployee])
+        st.put(six.u('alice'), OldEmployee(name=six.u('Alice Smith'),
+                                           salary=10))
+        st.close()
+        data = self.read()
+
+        st = self.open()
+        result = st[six.u('alice')]
+
+        self.assertEqual(result, self.alice)
+        self.assertEqual(self.read(), data)
+
+    def test_view(self):
+        st = self.open()
+        st.put(six.u('alice'), self.alice)
+
+        result = st.view(six.u('alice'))
+
+        self.assertTrue(isinstance(result, proxy.BufferSchemaProxy))
+        self.assertEqual(result.first, six.u('Alice'))
+        self.assertEqual(result, self.alice)
+        self.assertRaises(KeyError, st.view, six.u('bob'))
+
+    def test_view_older_version(self):
+        st = self.open(classes=[OldEmployee])
+        st.put(six.u('alice'), OldEmployee(name=six.u('Alice Smith'),
+                                           salary=10))
+        st.close()
+
+        result = self.open().view(six.u('alice'))
+
+        self.assertTrue(isinstance(result, Employee))
+        self.assertEqual(result, self.alice)
+
+    def test_view_close(self):
+        st = self.open()
+        st.put(six.u('alice'), self.alice)
+        view = st.view(six.u('alice'))
+        view.first
+
+        st.close()
+
+    def test_remap(self):
+        st = self.open()
+        st.put(six.u('alice'), self.alice)
+        view = st.view(six.u('alice'))
+
+        st.put(six.u('bob'), self.bob)
+
+        self.assertEqual(st[six.u('bob')], self.bob)
+        self.assertEqual(view.first, six.u('Alice'))
+
+    def test_missing_class(self):
+        st = self.open()
+        st.put(six.u('office'), Office(city=six.u('Austin')))
+        st.close()
+
+        st = self.open(classes=[Employee])
+
+        self.assertRaises(ValueError, lambda: st[six.u('office')])
+
+    def test_not_a_store(self):
+        self.write(b'garbage')
+
+        self.assertRaises(ValueError, store.Store, self.path, [Employee])
+
+    def test_closed(self):
+        st = self.open()
+        st.put(six.u('alice'), self.alice)
+
+        with st:
+            pass
+        st.close()
+
+        self.assertRaises(ValueError, lambda: st[six.u('alice')])
+        self.assertRaises(ValueError, st.put, six.u('bob'), self.bob)
+
+    def test_rebuild_missing_index(self):
+        st = self.open()
+        st.put_many([(six.u('alice'), self.alice), (six.u('bob'), self.bob)])
+        del st[six.u('bob')]
+        st.close()
+        index = self.read(store.INDEX_SUFFIX)
+        os.remove(self.path + store.INDEX_SUFFIX)
+
+        st = self.open()
+
+        self.assertEqual(st.keys(), ['alice'])
+        self.assertEqual(st[six.u('alice')], self.alice)
+        self.assertEqual(self.read(store.INDEX_SUFFIX), index)
+
+    def test_rebuild_damaged_index(self):
+        st = self.open()
+        st.put(six.u('alice'), self.alice)
+        st.close()
+        index = self.read(store.INDEX_SUFFIX)
+        self.write(b'garbage', store.INDEX_SUFFIX)
+
+        st = self.open()
+
+        self.assertEqual(st[six.u('alice')], self.alice)
+        self.assertEqual(self.read(store.INDEX_SUFFIX), index)
+
+    def test_rebuild_index_tail(self):
+        st = self.open()
+        st.put_many([(six.u('alice'), self.alice), (six.u('bob'), self.bob)])
+        st.close()
+        index = self.read(store.INDEX_SUFFIX)
+        self.write(index[:-3], store.INDEX_SUFFIX)
+
+        st = self.open()
+
+        self.assertEqual(sorted(st.keys()), ['alice', 'bob'])
+        self.assertEqual(st[six.u('bob')], self.bob)
+        self.assertEqual(self.read(store.INDEX_SUFFIX), index)
+
+    def test_partial_record(self):
+        st = self.open()
+        st.put(six.u('alice'), self.alice)
+        st.close()
+        data = self.read()
+        index = self.read(store.INDEX_SUFFIX)
+        st = self.open()
+        st.put(six.u('bob'), self.bob)
+        st.close()
+        self.write(self.read()[:-3])
+        self.write(index, store.INDEX_SUFFIX)
+
+        st = self.open()
+
+        self.assertEqual(st.keys(), ['alice'])
+        self.assertEqual(self.read(), data)
+        st.put(six.u('bob'), self.bob)
+        self.assertEqual(st[six.u('bob')], self.bob)
+
+    def test_index_past_data(self):
+        st = self.open()
+        st.put(six.u('alice'), self.alice)
+        st.close()
+        data = self.read()
+        st = self.open()
+        st.put(six.u('bob'), self.bob)
+        st.close()
+        self.write(data)
+
+        st = self.open()
+
+        self.assertEqual(st.keys(), ['alice'])
+        self.assertEqual(st[six.u('alice')], self.alice)
+
+    def test_trusted(self):
+        data = self.alice.to_bytes()[:-2] + b's\x0210'
+        self.write(store.MAGIC + b'\x05\x00\x00\x00' +
+                   six.int2byte(len(data)) + b'\x00\x00\x00' +
+                   b'alice' + data)
+
+        self.assertEqual(self.open()[six.u('alice')].salary, 10)
+        self.assertEqual(self.open(trusted=True)[six.u('alice')].salary,
+                         six.u('10'))
@@ -0,0 +1,274 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from vobj import attribute
+from vobj import decorators
+from vobj import schema
+from vobj import stream
+from vobj import vobject
+
+
+class Employee(vobject.VObject):
+    class Version1(schema.Schema):
+        __version__ = 1
+
+        name = attribute.Attribute()
+
+    class Version2(Version1):
+        __version__ = 2
+
+        name = None
+        first = attribute.Attribute()
+        last = attribute.Attribute()
+
+        @decorators.upgrader
+        def upgrade(cls, state):
+            state['first'], state['last'] = state.pop('name').split(' ')
+            return state
+
+        @decorators.downgrader(1)
+        def downgrade(cls, state):
+            state['name'] = '%s %s' % (state.pop('first'), state.pop('last'))
+            return state
+
+
+RECORDS = [
+    {'__version__': 1, 'name': 'Alice Smith'},
+    {'__version__': 2, 'first': 'Bob', 'last': 'Jones'},
+    {'__version__': 1, 'name': 'Carol White'},
+]
+
+UPGRADED = [
+    {'__version__': 2, 'first': 'Alice', 'last': 'Smith'},
+    {'__version__': 2, 'first': 'Bob', 'last': 'Jones'},
+    {'__version__': 2, 'first': 'Carol', 'last': 'White'},
+]
+
+DOWNGRADED = [
+    {'__version__': 1, 'name': 'Alice Smith'},
+    {'__version__': 1, 'name': 'Bob Jones'},
+    {'__version__': 1, 'name': 'Carol White'},
+]
+
+
+class StreamTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, filename, records):
+        path = os.path.join(self.tmpdir, filename)
+        f = stream.open_stream(path, 'w')
+        try:
+            stream.write_records(f, records)
+        finally:
+            f.close()
+        return path
+
+    def read(self, path):
+        f = stream.open_stream(path)
+        try:
+            return list(stream.read_records(f))
+        finally:
+            f.close()
+
+
+class OpenStreamTest(StreamTestCase):
+    def test_plain(self):
+        path = self.write('records.json', RECORDS)
+
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(1), b'{')
+        self.assertEqual(self.read(path), RECORDS)
+
+    def test_gzip(self):
+        path = self.write('records.json.gz', RECORDS)
+
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(2), b'\x1f\x8b')
+        self.assertEqual(self.read(path), RECORDS)
+
+    @unittest.skipIf(stream.lzma is None, 'lzma is not available')
+    def test_xz(self):
+        path = self.write('records.json.xz', RECORDS)
+
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(6), b'\xfd7zXZ\x00')
+        self.assertEqual(self.read(path), RECORDS)
+
+    @mock.patch('sys.stdin', mock.Mock(spec=[], buffer='buffer'))
+    def test_stdin(self):
+        self.assertEqual(stream.open_stream('-'), 'buffer')
+
+    @mock.patch('sys.stdout', mock.Mock(spec=[], buffer='buffer'))
+    def test_stdout(self):
+        self.assertEqual(stream.open_stream('-', 'w'), 'buffer')
+
+
+class ReadRecordsTest(unittest.TestCase):
+    def test_read(self):
+        data = io.BytesIO(b'{"a": 1}\n\n{"b": "\\u00e9"}\n')
+
+        result = list(stream.read_records(data))
+
+        self.assertEqual(result, [{'a': 1}, {'b': u'\xe9'}])
+
+
+class WriteRecordsTest(unittest.TestCase):
+    def test_write(self):
+        data = io.BytesIO()
+
+        result = stream.write_records(data, [{'b': 2, 'a': 1}, {}])
+
+        self.assertEqual(result, 2)
+        self.assertEqual(data.getvalue(), b'{"a": 1, "b": 2}\n{}\n')
+
+
+class MigrateTest(unittest.TestCase):
+    def test_upgrade(self):
+        result = stream.migrate(Employee, iter(RECORDS), chunk_size=2)
+
+        self.assertEqual(list(result), UPGRADED)
+
+    def test_latest(self):
+        result = stream.migrate(Employee, iter(RECORDS), 2)
+
+        self.assertEqual(list(result), UPGRADED)
+
+    def test_downgrade(self):
+        result = stream.migrate(Employee, iter(RECORDS), 1)
+
+        self.assertEqual(list(result), DOWNGRADED)
+
+    def test_unavailable(self):
+        result = stream.migrate(Employee, iter(RECORDS), 3)
+
+        self.assertRaises(KeyError, list, result)
+
+    @mock.patch.object(Employee, 'iter_from_dicts', return_value=[])
+    def test_chunked(self, mock_iter_from_dicts):
+        result = list(stream.migrate(Employee, 'records', chunk_size=5))
+
+        self.assertEqual(result, [])
+        mock_iter_from_dicts.assert_called_once_with('records', chunk_size=5)
+
+
+class LoadClassTest(unittest.TestCase):
+    def test_load(self):
+        result = stream._load_class('tests.unit.test_stream:Employee')
+
+        self.assertTrue(result is Employee)
+
+    def test_load_nested(self):
+        result = stream._load_class(
+            'tests.unit.test_stream:Employee.Version1')
+
+        self.assertTrue(result is Employee.Version1)
+
+    def test_load_invalid(self):
+        self.assertRaises(ImportError, stream._load_class,
+                          'tests.unit.test_stream')
+
+    def test_load_missing(self):
+        self.assertRaises(ImportError, stream._load_class,
+                          'tests.unit.test_stream:Missing')
+
+
+class MainTest(StreamTestCase):
+    def test_upgrade(self):
+        inpath = self.write('in.json.gz', RECORDS)
+        outpath = os.path.join(self.tmpdir, 'out.json')
+
+        result = stream.main(['tests.unit.test_stream:Employee',
+                              '-i', inpath, '-o', outpath, '-c', '2'])
+
+        self.assertEqual(result, 0)
+        self.assertEqual(self.read(outpath), UPGRADED)
+
+    def test_downgrade(self):
+        inpath = self.write('in.json', RECORDS)
+        outpath = os.path.join(self.tmpdir, 'out.json.gz')
+
+        result = stream.main(['tests.unit.test_stream:Employee',
+                              '-i', inpath, '-o', outpath, '-t', '1'])
+
+        self.assertEqual(result, 0)
+        self.assertEqual(self.read(outpath), DOWNGRADED)
+
+    @mock.patch('sys.stderr', mock.Mock())
+    def test_bad_class(self):
+        self.assertRaises(SystemExit, stream.main,
+                          ['tests.unit.test_stream:Missing'])
+
+    @mock.patch('sys.stderr', mock.Mock())
+    def test_bad_version(self):
+        self.assertRaises(SystemExit, stream.main,
+                          ['tests.unit.test_stream:Employee', '-t', '3'])
+
+    @mock.patch('sys.stderr', mock.Mock())
+    def test_bad_chunk_size(self):
+        self.assertRaises(SystemExit, stream.main,
+                          ['tests.unit.test_stream:Employee', '-c', '0'])
+
+    @mock.patch('sys.stderr')
+    def test_bad_record(self, mock_stderr):
+        inpath = self.write('in.json', [{'name': 'Alice Smith'}])
+        outpath = os.path.join(self.tmpdir, 'out.json')
+
+        self.assertRaises(SystemExit, stream.main,
+                          ['tests.unit.test_stream:Employee',
+                           '-i', inpath, '-o', outpath])
+        mock_stderr.write.assert_called_once_with(
+            'python -m vobj.stream: error: schema version not available '
+            'in state\n')
+
+    @mock.patch('sys.stderr', mock.Mock())
+    def test_bad_input(self):
+        self.assertRaises(SystemExit, stream.main,
+                          ['tests.unit.test_stream:Employee',
+                           '-i', os.path.join(self.tmpdir, 'missing')])
+
+    @mock.patch('sys.stderr')
+    def test_upgrader_error(self, mock_stderr):
+        inpath = self.write('in.json', [{'__version__': 1}])
+        outpath = os.path.join(self.tmpdir, 'out.json')
+
+        self.assertRaises(SystemExit, stream.main,
+                          ['tests.unit.test_stream:Employee',
+                           '-i', inpath, '-o', outpath])
+        mock_stderr.write.assert_called_once_with(
+            "python -m vobj.stream: error: KeyError: 'name'\n")
+
+    @mock.patch('sys.stderr', mock.Mock())
+    def test_bad_output(self):
+        inpath = self.write('in.json', RECORDS)
+        instream = mock.Mock()
+
+        with mock.patch.object(stream, 'open_stream',
+                               side_effect=[instream, IOError('denied')]):
+            self.assertRaises(SystemExit, stream.main,
+                              ['tests.unit.test_stream:Employee',
+                               '-i', inpath, '-o', 'out.json'])
+        instream.close.assert_called_once_with()
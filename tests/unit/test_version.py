@@ -112,3 +112,27 @@ class SmartVersionTest(unittest.TestCase):
         result = sv.available()
 
         self.assertEqual(result, set([3, 4]))
+
+
+class VersionDescriptorTest(unittest.TestCase):
+    def test_init(self):
+        desc = version.VersionDescriptor('version')
+
+        self.assertEqual(desc.version, 'version')
+
+    def test_get_class(self):
+        sv = version.SmartVersion(5, 'schema')
+        desc = version.VersionDescriptor(sv)
+
+        self.assertTrue(desc.__get__(None, 'cls') is sv)
+
+    def test_get(self):
+        sv = version.SmartVersion(5, 'schema')
+        desc = version.VersionDescriptor(sv)
+
+        result = desc.__get__('master', 'cls')
+
+        self.assertTrue(isinstance(result, version.SmartVersion))
+        self.assertEqual(result, 5)
+        self.assertEqual(result._schema, 'schema')
+        self.assertEqual(result._master, 'master')
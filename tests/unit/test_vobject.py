@@ -13,17 +13,327 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+import gc
+import itertools
+import pickle
+import threading
+import time
 import unittest
+import weakref
 
 import mock
 
+from vobj import attribute
 from vobj import decorators
+from vobj import mapping
 from vobj import proxy
 from vobj import schema
 from vobj import version
 from vobj import vobject
 
 
+class InvalidatorTest(unittest.TestCase):
+    def test_call(self):
+        obj = mock.Mock(__vers_cache_invalidate__=mock.Mock())
+        invalidator = vobject.Invalidator(obj)
+
+        invalidator()
+
+        obj.__vers_cache_invalidate__.assert_called_once_with(None)
+
+    def test_call_name(self):
+        obj = mock.Mock(__vers_cache_invalidate__=mock.Mock())
+        invalidator = vobject.Invalidator(obj)
+
+        invalidator('attr')
+
+        obj.__vers_cache_invalidate__.assert_called_once_with('attr')
+
+    def test_call_dead(self):
+        obj = mock.Mock()
+        invalidator = vobject.Invalidator(obj)
+        del obj
+        gc.collect()
+
+        invalidator()
+
+
+def _plan_schemas(*upgraders):
+    schemas = [mock.Mock(__version__=1, __vers_upgraders__={})]
+    for idx, sources in enumerate(upgraders):
+        schemas.append(mock.Mock(
+            __version__=idx + 2,
+            __vers_upgraders__=dict(
+                (src, '%d->%d' % (src, idx + 2)) for src in sources),
+        ))
+    return schemas
+
+
+class CostsTest(unittest.TestCase):
+    def test_costs(self):
+        schemas = [
+            mock.Mock(__version__=1, __vers_upgraders__={}),
+            mock.Mock(__version__=2, __vers_upgraders__={
+                1: mock.Mock(__vers_cost__=5),
+            }),
+            mock.Mock(__version__=3, __vers_upgraders__={
+                1: mock.Mock(__vers_cost__=None),
+                2: mock.Mock(__vers_cost__=0),
+            }),
+        ]
+
+        result = vobject._costs(schemas)
+
+        self.assertEqual(result, {(1, 2): 5, (2, 3): 0})
+
+
+class RevalidateTest(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(vobject._revalidate([]), {})
+
+    def test_revalidate(self):
+        same = attribute.Attribute(validate=int)
+        schemas = [
+            mock.Mock(__version__=1, __vers_untrusted__=('old',),
+                      __vers_attrs__={
+                          'same': same,
+                          'changed': attribute.Attribute(),
+                          'plain': attribute.Attribute(),
+                          'old': attribute.Attribute(),
+                      }),
+            mock.Mock(__version__=2, __vers_untrusted__=('ser',),
+                      __vers_attrs__={
+                          'same': same,
+                          'changed': attribute.Attribute(validate=int),
+                          'plain': attribute.Attribute(),
+                          'added': attribute.Attribute(validate=int),
+                          'ser': attribute.Attribute(),
+                      }),
+        ]
+
+        result = vobject._revalidate(schemas)
+
+        self.assertEqual(result, {
+            1: frozenset(['changed', 'added', 'ser', 'old']),
+            2: frozenset(['ser']),
+        })
+
+
+class PlanGreedyTest(unittest.TestCase):
+    def test_greedy(self):
+        schemas = _plan_schemas([1], [2], [3, 1], [4, 2])
+
+        self.assertEqual(vobject._plan_greedy(schemas, 1),
+                         [(1, 2), (2, 5)])
+        self.assertEqual(vobject._plan_greedy(schemas, 2), [(2, 5)])
+        self.assertEqual(vobject._plan_greedy(schemas, 3),
+                         [(3, 4), (4, 5)])
+        self.assertEqual(vobject._plan_greedy(schemas, 5), [])
+
+    def test_missing(self):
+        schemas = _plan_schemas([1], [2], [1], [])
+
+        self.assertRaises(TypeError, vobject._plan_greedy, schemas, 1)
+
+
+class PlanGreedyAllTest(unittest.TestCase):
+    def test_greedy_all(self):
+        for upgraders in [
+            ([1], [2], [3, 1], [4, 2]),
+            ([1], [2], [3], [4]),
+            ([1], [2, 1], [3, 2, 1], [4, 3, 2, 1]),
+            ([1], [2], [3, 1], [4, 2], [5, 3, 1], [6, 2]),
+            (),
+        ]:
+            schemas = _plan_schemas(*upgraders)
+
+            result = vobject._plan_greedy_all(schemas)
+
+            self.assertEqual(result, dict(
+                (sch.__version__, vobject._plan_greedy(schemas,
+                                                       sch.__version__))
+                for sch in schemas))
+
+    def test_shared(self):
+        schemas = _plan_schemas([1], [2], [3, 1], [4, 2])
+
+        result = vobject._plan_greedy_all(schemas)
+
+        self.assertEqual(result[1], [(1, 2), (2, 5)])
+        self.assertTrue(result[1][1] is result[2][0])
+
+    def test_missing(self):
+        schemas = _plan_schemas([1], [2], [1], [])
+
+        self.assertRaises(TypeError, vobject._plan_greedy_all, schemas)
+
+
+class PlanCheapestTest(unittest.TestCase):
+    def test_unit_costs(self):
+        # Greedy would take 1->3->4->6
+        schemas = _plan_schemas([1], [2], [3], [1], [3, 5])
+
+        self.assertEqual(vobject._plan_cheapest(schemas, 1, {}),
+                         [(1, 5), (5, 6)])
+
+    def test_costs(self):
+        schemas = _plan_schemas([1], [2, 1], [3])
+
+        self.assertEqual(vobject._plan_cheapest(schemas, 1, {}),
+                         [(1, 3), (3, 4)])
+        self.assertEqual(
+            vobject._plan_cheapest(schemas, 1, {(1, 3): 2.5}),
+            [(1, 2), (2, 3), (3, 4)])
+        self.assertEqual(
+            vobject._plan_cheapest(schemas, 1, {(1, 3): 1.5}),
+            [(1, 3), (3, 4)])
+
+    def test_tie(self):
+        schemas = _plan_schemas([1], [2, 1], [3])
+
+        self.assertEqual(
+            vobject._plan_cheapest(schemas, 1, {(1, 3): 2}),
+            [(1, 3), (3, 4)])
+
+    def test_unknown_unused(self):
+        schemas = _plan_schemas([1], [2, 1], [3])
+
+        self.assertEqual(
+            vobject._plan_cheapest(schemas, 1,
+                                   {(1, 3): 50, (3, 4): 1}, None),
+            [(1, 3), (3, 4)])
+        self.assertEqual(
+            vobject._plan_cheapest(schemas, 1,
+                                   {(1, 2): 1, (2, 3): 1, (1, 3): 50,
+                                    (3, 4): 1}, None),
+            [(1, 2), (2, 3), (3, 4)])
+        self.assertRaises(TypeError, vobject._plan_cheapest, schemas, 1,
+                          {(1, 3): 50}, None)
+
+    def test_latest(self):
+        schemas = _plan_schemas([1])
+
+        self.assertEqual(vobject._plan_cheapest(schemas, 2, {}), [])
+
+    def test_missing(self):
+        schemas = _plan_schemas([1], [2], [1])
+
+        self.assertRaises(TypeError, vobject._plan_cheapest, schemas, 2, {})
+
+
+@mock.patch('timeit.default_timer', side_effect=[1.0, 3.0, 10.0, 11.0])
+class TimedTest(unittest.TestCase):
+    def test_plain(self, mock_timer):
+        upgrader = mock.Mock(return_value='new', __vers_batch__=False,
+                             __vers_columnar__=False)
+        timings = {}
+
+        timed = vobject._timed(upgrader, timings, (1, 2), threading.Lock())
+
+        self.assertFalse(timed.__vers_batch__)
+        self.assertFalse(timed.__vers_columnar__)
+        self.assertEqual(timed('state1'), 'new')
+        self.assertEqual(timed('state2'), 'new')
+        self.assertEqual(timings, {(1, 2): [3.0, 2]})
+        upgrader.assert_has_calls([mock.call('state1'), mock.call('state2')])
+
+    def test_batch(self, mock_timer):
+        upgrader = mock.Mock(return_value='new', __vers_batch__=True,
+                             __vers_columnar__=False)
+        timings = {(1, 2): [1.0, 1]}
+
+        timed = vobject._timed(upgrader, timings, (1, 2), threading.Lock())
+
+        self.assertTrue(timed.__vers_batch__)
+        self.assertEqual(timed(['s1', 's2']), 'new')
+        self.assertEqual(timings, {(1, 2): [3.0, 3]})
+
+    def test_columnar(self, mock_timer):
+        upgrader = mock.Mock(return_value='new', __vers_batch__=False,
+                             __vers_columnar__=True)
+        timings = {}
+
+        timed = vobject._timed(upgrader, timings, (1, 2), threading.Lock())
+
+        self.assertTrue(timed.__vers_columnar__)
+        self.assertEqual(timed({'a': [1, 2, 3]}), 'new')
+        self.assertEqual(timings, {(1, 2): [2.0, 3]})
+
+    def test_locked(self, mock_timer):
+        upgrader = mock.Mock(return_value='new', __vers_batch__=False,
+                             __vers_columnar__=False)
+        lock = mock.MagicMock()
+        timings = {}
+
+        def check_unlocked(state):
+            self.assertFalse(lock.__enter__.called)
+            return 'new'
+        upgrader.side_effect = check_unlocked
+
+        timed = vobject._timed(upgrader, timings, (1, 2), lock)
+
+        self.assertEqual(timed('state'), 'new')
+        lock.__enter__.assert_called_once_with()
+        lock.__exit__.assert_called_once_with(None, None, None)
+
+
+class FakeConverters(tuple):
+    def fuse(self):
+        return ('fused', self)
+
+
+class Pickled(vobject.VObject):
+    class Schema1(schema.Schema):
+        __version__ = 1
+        attr = attribute.Attribute(validate=int)
+        old = attribute.Attribute()
+
+    class Schema2(Schema1):
+        __version__ = 2
+        old = None
+        new = attribute.Attribute()
+
+        @decorators.upgrader
+        def upgrade(cls, state):
+            state['new'] = state.pop('old') * 2
+            return state
+
+
+def _upgraded_vobject(validator):
+    class TestVObject(vobject.VObject):
+        class Schema1(schema.Schema):
+            __version__ = 1
+            attr = attribute.Attribute(validate=validator)
+            old = attribute.Attribute(validate=validator)
+
+        class Schema2(Schema1):
+            __version__ = 2
+            old = None
+            new = attribute.Attribute(validate=validator)
+
+            @decorators.upgrader
+            def upgrade(cls, state):
+                state['new'] = state.pop('old') * 2
+                return state
+
+    return TestVObject
+
+
+def _setstate_vobject():
+    class TestVObject(vobject.VObject):
+        class Schema(schema.Schema):
+            __version__ = 1
+            a = attribute.Attribute()
+            b = attribute.Attribute()
+
+            def __setstate__(self, state):
+                state.setdefault('b', 0)
+                super(TestVObject.Schema, self).__setstate__(state)
+
+    return TestVObject
+
+
 class VObjectMetaTest(unittest.TestCase):
     def test_empty(self):
         namespace = {
@@ -86,7 +396,7 @@ class VObjectMetaTest(unittest.TestCase):
         self.assertRaises(TypeError, vobject.VObjectMeta, 'TestVObject',
                           (object,), namespace)
 
-    @mock.patch('vobj.converters.Converters', side_effect=lambda x, *y: (x, y))
+    @mock.patch('vobj.converters.Converters')
     def test_normal(self, mock_Converters):
         class TestSchema1(schema.Schema):
             __version__ = 1
@@ -110,13 +420,15 @@ class VObjectMetaTest(unittest.TestCase):
         self.assertEqual(result.__vers_schemas__, [TestSchema1, TestSchema2])
         self.assertEqual(result.__vers_downgraders__, {})
         self.assertEqual(result.__vers_upgraders__, {
-            2: (TestSchema2, ()),
+            2: mock_Converters.return_value.fuse.return_value,
         })
         self.assertTrue(isinstance(result.__version__, version.SmartVersion))
         self.assertEqual(result.__version__, 2)
         mock_Converters.assert_called_once_with(TestSchema2)
+        mock_Converters.return_value.fuse.assert_called_once_with()
 
-    @mock.patch('vobj.converters.Converters', side_effect=lambda x, *y: (x, y))
+    @mock.patch('vobj.converters.Converters',
+                side_effect=lambda x, *y: FakeConverters((x, y)))
     def test_downgraders(self, mock_Converters):
         class TestSchema1(schema.Schema):
             __version__ = 1
@@ -162,7 +474,7 @@ class VObjectMetaTest(unittest.TestCase):
             2: (TestSchema2, (TestSchema3.downgrader_2,)),
         })
         self.assertEqual(result.__vers_upgraders__, {
-            3: (TestSchema3, ()),
+            3: ('fused', (TestSchema3, ())),
         })
         self.assertTrue(isinstance(result.__version__, version.SmartVersion))
         self.assertEqual(result.__version__, 3)
@@ -172,6 +484,143 @@ class VObjectMetaTest(unittest.TestCase):
             mock.call(TestSchema3),
         ])
 
+    def test_descriptors(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            attr = attribute.Attribute()
+            overridden = attribute.Attribute()
+
+            @property
+            def prop(self):
+                pass
+
+            def meth(self):
+                pass
+
+        namespace = {
+            '__module__': 'test_vobject',
+            'Schema': TestSchema,
+            'overridden': 'class value',
+        }
+
+        result = vobject.VObjectMeta('TestVObject', (proxy.SchemaProxy,),
+                                     namespace)
+
+        self.assertTrue(isinstance(result.__dict__['attr'],
+                                   proxy.AttributeDescriptor))
+        self.assertTrue(isinstance(result.__dict__['prop'],
+                                   proxy.PropertyDescriptor))
+        self.assertTrue(isinstance(result.__dict__['meth'],
+                                   proxy.MemberDescriptor))
+        self.assertEqual(result.__dict__['overridden'], 'class value')
+        self.assertFalse('to_dict' in result.__dict__)
+        self.assertFalse('__getstate__' in result.__dict__)
+        self.assertEqual(result.__setattr__, object.__setattr__)
+
+    def test_descriptors_masked(self):
+        class TestSchema1(schema.Schema):
+            __version__ = 1
+            attr1 = attribute.Attribute()
+            attr2 = attribute.Attribute()
+
+        class TestSchema2(schema.Schema):
+            __version__ = 1
+            attr2 = attribute.Attribute()
+
+        class BaseVObject(vobject.VObject):
+            Schema = TestSchema1
+
+        class TestVObject(BaseVObject):
+            Schema = TestSchema2
+
+        self.assertTrue(isinstance(TestVObject.__dict__['attr1'],
+                                   proxy.MaskDescriptor))
+        self.assertTrue(isinstance(TestVObject.__dict__['attr2'],
+                                   proxy.AttributeDescriptor))
+        obj = TestVObject(attr2=2)
+        obj.attr1 = 1
+        self.assertEqual(obj.__dict__['attr1'], 1)
+        self.assertEqual(obj.attr1, 1)
+
+    def test_descriptors_setattr(self):
+        calls = []
+
+        class TestVObject(vobject.VObject):
+            class Schema(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+
+                def __setattr__(self, name, value):
+                    calls.append((name, value))
+                    super(TestVObject.Schema, self).__setattr__(name, value)
+
+        obj = TestVObject(attr=1)
+        obj.attr = 2
+
+        self.assertFalse(TestVObject.__dict__['attr'].direct)
+        self.assertEqual(calls, [('attr', 2)])
+        self.assertEqual(obj.attr, 2)
+
+    def test_descriptors_compact(self):
+        class TestVObject(vobject.VObject):
+            class Schema(schema.Schema):
+                __version__ = 1
+                __vers_compact__ = True
+                b = attribute.Attribute(validate=int)
+                a = attribute.Attribute()
+
+        self.assertEqual(TestVObject.__dict__['a'].key, 0)
+        self.assertEqual(TestVObject.__dict__['b'].key, 1)
+        obj = TestVObject(a='a', b='1')
+        obj.b = '2'
+        self.assertEqual(obj.a, 'a')
+        self.assertEqual(obj.b, 2)
+        self.assertEqual(obj.to_dict(), dict(__version__=1, a='a', b=2))
+
+    def test_setattr_overridden(self):
+        class TestSchema(schema.Schema):
+            __version__ = 1
+            attr = attribute.Attribute()
+
+        class BaseVObject(vobject.VObject):
+            def __setattr__(self, name, value):
+                pass
+
+        class TestVObject(BaseVObject):
+            Schema = TestSchema
+
+        self.assertFalse('__setattr__' in TestVObject.__dict__)
+
+    def test_descriptors_functional(self):
+        class TestVObject(vobject.VObject):
+            class Schema(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute(validate=int)
+
+                @property
+                def prop(self):
+                    return self.attr * 2
+
+                def meth(self):
+                    return self.attr + 1
+
+        obj = TestVObject(attr='5')
+
+        self.assertEqual(obj.attr, 5)
+        self.assertEqual(obj.prop, 10)
+        self.assertEqual(obj.meth(), 6)
+        obj.attr = '6'
+        self.assertEqual(obj.attr, 6)
+        self.assertEqual(obj.__vers_values__.__vers_values__, dict(attr=6))
+
+        def set_prop():
+            obj.prop = 5
+
+        self.assertRaises(AttributeError, set_prop)
+
+        obj.other = 'value'
+        self.assertEqual(obj.__dict__['other'], 'value')
+
 
 class VObjectTest(unittest.TestCase):
     @mock.patch('vobj.converters.Converters')
@@ -204,12 +653,13 @@ class VObjectTest(unittest.TestCase):
 
         result = TestVObject.__vers_upgrader_get__(2)
 
-        self.assertEqual(result, cvt)
+        self.assertEqual(result, cvt.fuse.return_value)
         mock_Converters.assert_called_once_with(
             TestVObject.__vers_schemas__[1])
         self.assertFalse(cvt.append.called)
+        cvt.fuse.assert_called_once_with()
         self.assertEqual(TestVObject.__vers_upgraders__, {
-            2: cvt,
+            2: cvt.fuse.return_value,
         })
 
     @mock.patch('vobj.converters.Converters')
@@ -240,7 +690,7 @@ class VObjectTest(unittest.TestCase):
 
         result = TestVObject.__vers_upgrader_get__(2)
 
-        self.assertEqual(result, cvt)
+        self.assertEqual(result, cvt.fuse.return_value)
         mock_Converters.assert_called_once_with(
             TestVObject.__vers_schemas__[4])
         cvt.append.assert_has_calls([
@@ -248,8 +698,9 @@ class VObjectTest(unittest.TestCase):
             mock.call('2->4'),
         ])
         self.assertEqual(cvt.append.call_count, 2)
+        cvt.fuse.assert_called_once_with()
         self.assertEqual(TestVObject.__vers_upgraders__, {
-            2: cvt,
+            2: cvt.fuse.return_value,
         })
 
     @mock.patch('vobj.converters.Converters')
@@ -284,6 +735,287 @@ class VObjectTest(unittest.TestCase):
         self.assertFalse(cvt.append.called)
         self.assertEqual(TestVObject.__vers_upgraders__, {})
 
+    @mock.patch('vobj.converters.Converters')
+    @mock.patch.object(vobject.VObject, '__vers_upgrader_step__',
+                       side_effect=lambda src, dst: '%d->%d' % (src, dst))
+    @mock.patch.object(vobject.VObject, '__vers_plan_all__', return_value={
+        1: [(1, 2), (2, 4)],
+        2: [(2, 4)],
+        3: [(3, 4)],
+        4: [],
+    })
+    def test_warm(self, mock_plan_all, mock_step, mock_Converters):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(__version__=1),
+            mock.Mock(__version__=2),
+            mock.Mock(__version__=3),
+            mock.Mock(__version__=4),
+        ]
+        latest = mock.Mock()
+        TestVObject.__vers_upgraders__ = {4: latest}
+
+        TestVObject.__vers_warm__()
+
+        self.assertEqual(mock_step.call_args_list, [
+            mock.call(3, 4), mock.call(2, 4), mock.call(1, 2),
+        ])
+        latest.chain.assert_has_calls([mock.call('3->4'),
+                                       mock.call('2->4')])
+        self.assertEqual(latest.chain.call_count, 2)
+        chain2 = latest.chain.return_value
+        chain2.chain.assert_called_once_with('1->2')
+        self.assertFalse(mock_Converters.called)
+        self.assertEqual(TestVObject.__vers_upgraders__, {
+            1: chain2.chain.return_value,
+            2: chain2,
+            3: chain2,
+            4: latest,
+        })
+
+    @mock.patch('vobj.converters.Converters')
+    @mock.patch.object(vobject.VObject, '__vers_upgrader_step__',
+                       side_effect=lambda src, dst: '%d->%d' % (src, dst))
+    @mock.patch.object(vobject.VObject, '__vers_plan_all__', return_value={
+        1: [(1, 2), (2, 4)],
+        2: [(2, 3), (3, 4)],
+        3: [(3, 4)],
+        4: [],
+    })
+    def test_warm_unshared(self, mock_plan_all, mock_step, mock_Converters):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(__version__=1),
+            mock.Mock(__version__=2),
+            mock.Mock(__version__=3),
+            mock.Mock(__version__=4),
+        ]
+        latest = mock.Mock()
+        built = mock.Mock()
+        TestVObject.__vers_upgraders__ = {3: built, 4: latest}
+        cvt = mock_Converters.return_value
+
+        TestVObject.__vers_warm__()
+
+        self.assertFalse(latest.chain.called)
+        built.chain.assert_called_once_with('2->3')
+        mock_Converters.assert_called_once_with(
+            TestVObject.__vers_schemas__[3])
+        self.assertEqual(cvt.append.call_args_list, [
+            mock.call('2->4'), mock.call('1->2'),
+        ])
+        self.assertEqual(TestVObject.__vers_upgraders__, {
+            1: cvt.fuse.return_value,
+            2: built.chain.return_value,
+            3: built,
+            4: latest,
+        })
+
+    def test_warm_abstract(self):
+        self.assertRaises(TypeError, vobject.VObject.__vers_warm__)
+
+    def test_eager(self):
+        class TestVObject(vobject.VObject):
+            __vers_eager__ = True
+
+            class Schema1(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+
+            class Schema2(Schema1):
+                __version__ = 2
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+            class Schema3(Schema2):
+                __version__ = 3
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+        self.assertEqual(sorted(TestVObject.__vers_upgraders__), [1, 2, 3])
+
+        class SubVObject(TestVObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+
+        self.assertEqual(sorted(SubVObject.__vers_upgraders__), [1])
+
+    def test_eager_same_chains(self):
+        def make_class(eager):
+            class TestVObject(vobject.VObject):
+                __vers_eager__ = eager
+
+                class Schema1(schema.Schema):
+                    __version__ = 1
+                    attr = attribute.Attribute()
+
+                class Schema2(Schema1):
+                    __version__ = 2
+
+                    upgrade = decorators.upgrader(mapping.Mapping([]))
+
+                class Schema3(Schema2):
+                    __version__ = 3
+
+                    @decorators.upgrader
+                    def upgrade(cls, state):
+                        state['attr'] += 1
+                        return state
+
+                class Schema4(Schema3):
+                    __version__ = 4
+
+                    upgrade = decorators.upgrader(
+                        mapping.compute('attr', lambda s: s['attr'] * 2))
+
+                    @decorators.upgrader(1)
+                    def skip(cls, state):
+                        state['attr'] = -state['attr']
+                        return state
+
+            return TestVObject
+
+        Eager = make_class(True)
+        Lazy = make_class(False)
+
+        for vers in range(1, 5):
+            eager = Eager.__vers_upgraders__[vers]
+            lazy = Lazy.__vers_upgrader_get__(vers)
+            self.assertEqual(len(eager), len(lazy))
+            self.assertEqual(eager(dict(__version__=vers, attr=3)).attr,
+                             lazy(dict(__version__=vers, attr=3)).attr)
+
+    def test_lazy_chains(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+
+            class Schema2(Schema1):
+                __version__ = 2
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+        self.assertEqual(sorted(TestVObject.__vers_upgraders__), [2])
+
+    @mock.patch.object(vobject, '_plan_cheapest', return_value='cheapest')
+    @mock.patch.object(vobject, '_plan_greedy', return_value='greedy')
+    def test_plan_greedy(self, mock_plan_greedy, mock_plan_cheapest):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = 'schemas'
+
+        self.assertEqual(TestVObject.__vers_plan__(2), 'greedy')
+        mock_plan_greedy.assert_called_once_with('schemas', 2)
+        self.assertFalse(mock_plan_cheapest.called)
+
+    @mock.patch.object(vobject, '_plan_cheapest', return_value='cheapest')
+    @mock.patch.object(vobject, '_plan_greedy', return_value='greedy')
+    def test_plan_replanned(self, mock_plan_greedy, mock_plan_cheapest):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = 'schemas'
+        TestVObject.__vers_costs__ = {(1, 2): 5}
+        TestVObject.__vers_plans__ = {2: 'replanned'}
+
+        self.assertEqual(TestVObject.__vers_plan__(2), 'replanned')
+        self.assertFalse(mock_plan_cheapest.called)
+        self.assertFalse(mock_plan_greedy.called)
+
+    @mock.patch.object(vobject, '_plan_cheapest', return_value='cheapest')
+    @mock.patch.object(vobject, '_plan_greedy', return_value='greedy')
+    def test_plan_cheapest(self, mock_plan_greedy, mock_plan_cheapest):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = 'schemas'
+        TestVObject.__vers_costs__ = {(1, 2): 5}
+
+        self.assertEqual(TestVObject.__vers_plan__(2), 'cheapest')
+        mock_plan_cheapest.assert_called_once_with('schemas', 2,
+                                                   {(1, 2): 5})
+        self.assertFalse(mock_plan_greedy.called)
+
+    @mock.patch.object(vobject, '_plan_greedy_all', return_value='plans')
+    @mock.patch.object(vobject.VObject, '__vers_plan__',
+                       side_effect=lambda vers: 'plan%d' % vers)
+    def test_plan_all(self, mock_plan, mock_plan_greedy_all):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(__version__=1),
+            mock.Mock(__version__=2),
+        ]
+
+        self.assertEqual(TestVObject.__vers_plan_all__(), 'plans')
+        mock_plan_greedy_all.assert_called_once_with(
+            TestVObject.__vers_schemas__)
+        self.assertFalse(mock_plan.called)
+
+    @mock.patch.object(vobject, '_plan_greedy_all', return_value='plans')
+    @mock.patch.object(vobject.VObject, '__vers_plan__',
+                       side_effect=lambda vers: 'plan%d' % vers)
+    def test_plan_all_costs(self, mock_plan, mock_plan_greedy_all):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(__version__=1),
+            mock.Mock(__version__=2),
+        ]
+        TestVObject.__vers_costs__ = {(1, 2): 5}
+
+        self.assertEqual(TestVObject.__vers_plan_all__(),
+                         {1: 'plan1', 2: 'plan2'})
+        self.assertFalse(mock_plan_greedy_all.called)
+
+    @mock.patch.object(vobject.VObject, '__vers_warm__')
+    def test_reset(self, mock_warm):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(__version__=1),
+            mock.Mock(__version__=2),
+        ]
+        upgraders = TestVObject.__vers_upgraders__
+        upgraders.update({1: 'up1', 2: 'up2'})
+
+        TestVObject.__vers_reset__()
+
+        self.assertEqual(TestVObject.__vers_upgraders__, {2: 'up2'})
+        self.assertEqual(upgraders, {1: 'up1', 2: 'up2'})
+        self.assertFalse(mock_warm.called)
+
+    @mock.patch.object(vobject.VObject, '__vers_warm__')
+    def test_reset_eager(self, mock_warm):
+        class TestVObject(vobject.VObject):
+            __vers_eager__ = True
+        TestVObject.__vers_schemas__ = [mock.Mock(__version__=1)]
+        TestVObject.__vers_upgraders__[1] = 'up1'
+
+        TestVObject.__vers_reset__()
+
+        self.assertEqual(TestVObject.__vers_upgraders__, {1: 'up1'})
+        mock_warm.assert_called_once_with()
+
+    @mock.patch('vobj.converters.Converters._compile')
+    def test_timed_chain(self, mock_compile):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = _plan_schemas([1], [2])
+        TestVObject.__vers_timings__ = {}
+
+        result = TestVObject.__vers_upgrader_get__(1)
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0].__name__, 'timed')
+        self.assertEqual(result[1].__name__, 'timed')
+
     def test_abstract_constructor(self):
         self.assertRaises(TypeError, vobject.VObject)
 
@@ -306,13 +1038,36 @@ class VObjectTest(unittest.TestCase):
         result = TestVObject(a=1, b=2, c=3)
 
         schema.assert_called_once_with({'a': 1, 'b': 2, 'c': 3})
-        self.assertEqual(values.__vers_notify__,
-                         result.__vers_cache_invalidate__)
         mock_set_values.assert_called_once_with(values)
-        mock_SmartVersion.assert_called_once_with(
-            2, schema, result)
-        mock_cache_invalidate.assert_called_once_with()
-        self.assertEqual(result.__vers_proxies__, {})
+        self.assertFalse(mock_SmartVersion.called)
+        self.assertFalse(mock_cache_invalidate.called)
+        self.assertEqual(result.__vers_cache__, None)
+        self.assertFalse('__version__' in result.__dict__)
+
+    def test_version_lazy(self):
+        class TestVObject(vobject.VObject):
+            class Schema(schema.Schema):
+                __version__ = 1
+
+        obj = TestVObject()
+
+        self.assertFalse('__version__' in obj.__dict__)
+        result = obj.__version__
+        self.assertTrue(isinstance(result, version.SmartVersion))
+        self.assertEqual(result, 1)
+        self.assertEqual(result._schema, TestVObject.Schema)
+        self.assertEqual(result._master, obj)
+        self.assertFalse('__version__' in obj.__dict__)
+        self.assertEqual(TestVObject.__version__._master, None)
+
+    def test_version_from_dict(self):
+        class TestVObject(vobject.VObject):
+            class Schema(schema.Schema):
+                __version__ = 1
+
+        obj = TestVObject.from_dict({'__version__': 1})
+
+        self.assertEqual(obj.__version__._master, obj)
 
     def test_setattr_delegated(self):
         class TestVObject(vobject.VObject):
@@ -346,50 +1101,47 @@ class VObjectTest(unittest.TestCase):
         self.assertEqual(sch.attr, 'schema')
         self.assertEqual(obj.__dict__['attr'], 'value')
 
-    @mock.patch.object(proxy, 'ReadOnlyLazySchemaProxy', return_value='proxy')
-    def test_accessor_cached(self, mock_ReadOnlyLazySchemaProxy):
+    @mock.patch.object(proxy, 'ReadOnlyLazySchemaProxy')
+    def test_accessor(self, mock_ReadOnlyLazySchemaProxy):
         class TestVObject(vobject.VObject):
             pass
         TestVObject.__vers_schemas__ = [
             mock.Mock(return_value=mock.Mock()),
         ]
         obj = TestVObject()
-        obj.__vers_proxies__[1] = 'cached'
+        prox = mock_ReadOnlyLazySchemaProxy.return_value
 
         with mock.patch.object(version, 'SmartVersion',
                                return_value='version') as mock_SmartVersion:
             result = obj.__vers_accessor__(1)
 
-        self.assertEqual(result, 'cached')
-        self.assertFalse(mock_SmartVersion.called)
-        self.assertFalse(mock_ReadOnlyLazySchemaProxy.called)
-        self.assertEqual(obj.__vers_proxies__, {
-            1: 'cached',
-        })
+        self.assertEqual(result, prox)
+        mock_SmartVersion.assert_called_once_with(
+            1, TestVObject.__vers_schemas__[0], obj)
+        mock_ReadOnlyLazySchemaProxy.assert_called_once_with('version')
+        self.assertFalse('__vers_proxies__' in obj.__dict__)
 
-    @mock.patch.object(proxy, 'ReadOnlyLazySchemaProxy', return_value='proxy')
-    def test_accessor_uncached(self, mock_ReadOnlyLazySchemaProxy):
+    @mock.patch.object(vobject.VObject, '__getstate__', return_value='state')
+    def test_cache_get_cached(self, mock_getstate):
         class TestVObject(vobject.VObject):
             pass
         TestVObject.__vers_schemas__ = [
             mock.Mock(return_value=mock.Mock()),
         ]
+        TestVObject.__vers_downgraders__[1] = mock.Mock(return_value='values')
         obj = TestVObject()
+        object.__setattr__(obj, '__vers_cache__', {1: 'cached'})
 
-        with mock.patch.object(version, 'SmartVersion',
-                               return_value='version') as mock_SmartVersion:
-            result = obj.__vers_accessor__(1)
+        result = obj.__vers_cache_get__(1)
 
-        self.assertEqual(result, 'proxy')
-        mock_SmartVersion.assert_called_once_with(
-            1, TestVObject.__vers_schemas__[0], obj)
-        mock_ReadOnlyLazySchemaProxy.assert_called_once_with('version')
-        self.assertEqual(obj.__vers_proxies__, {
-            1: 'proxy',
+        self.assertEqual(result, 'cached')
+        self.assertFalse(TestVObject.__vers_downgraders__[1].called)
+        self.assertEqual(obj.__vers_cache__, {
+            1: 'cached',
         })
 
     @mock.patch.object(vobject.VObject, '__getstate__', return_value='state')
-    def test_cache_get_cached(self, mock_getstate):
+    def test_cache_get_uncached(self, mock_getstate):
         class TestVObject(vobject.VObject):
             pass
         TestVObject.__vers_schemas__ = [
@@ -397,49 +1149,248 @@ class VObjectTest(unittest.TestCase):
         ]
         TestVObject.__vers_downgraders__[1] = mock.Mock(return_value='values')
         obj = TestVObject()
-        obj.__vers_cache__[1] = 'cached'
 
         result = obj.__vers_cache_get__(1)
 
-        self.assertEqual(result, 'cached')
-        self.assertFalse(TestVObject.__vers_downgraders__[1].called)
+        self.assertEqual(result, 'values')
+        TestVObject.__vers_downgraders__[1].assert_called_once_with('state')
         self.assertEqual(obj.__vers_cache__, {
-            1: 'cached',
+            1: 'values',
         })
 
-    @mock.patch.object(vobject.VObject, '__getstate__', return_value='state')
-    def test_cache_get_uncached(self, mock_getstate):
+    def test_cache_invalidate(self):
         class TestVObject(vobject.VObject):
             pass
         TestVObject.__vers_schemas__ = [
             mock.Mock(return_value=mock.Mock()),
         ]
-        TestVObject.__vers_downgraders__[1] = mock.Mock(return_value='values')
         obj = TestVObject()
+        object.__setattr__(obj, '__vers_cache__', {
+            1: 'one',
+            2: 'two',
+        })
 
-        result = obj.__vers_cache_get__(1)
+        obj.__vers_cache_invalidate__()
 
-        self.assertEqual(result, 'values')
-        TestVObject.__vers_downgraders__[1].assert_called_once_with('state')
-        self.assertEqual(obj.__vers_cache__, {
-            1: 'values',
+        self.assertEqual(obj.__vers_cache__, None)
+
+    def test_cache_invalidate_name(self):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(return_value=mock.Mock()),
+        ]
+        TestVObject.__vers_invalidates__ = {
+            'attr': frozenset([2, 3]),
+        }
+        obj = TestVObject()
+        object.__setattr__(obj, '__vers_cache__', {
+            1: 'one',
+            2: 'two',
         })
 
-    def test_cache_invalidate(self):
+        obj.__vers_cache_invalidate__('attr')
+
+        self.assertEqual(obj.__vers_cache__, {1: 'one'})
+
+    def test_cache_invalidate_copies(self):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(return_value=mock.Mock()),
+        ]
+        TestVObject.__vers_invalidates__ = {
+            'attr': frozenset([2, 3]),
+        }
+        obj = TestVObject()
+        cache = {1: 'one'}
+        object.__setattr__(obj, '__vers_cache__', cache)
+
+        obj.__vers_cache_invalidate__('attr')
+
+        self.assertEqual(obj.__vers_cache__, {1: 'one'})
+        self.assertFalse(obj.__vers_cache__ is cache)
+
+    def test_cache_publish(self):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(return_value=mock.Mock()),
+        ]
+        obj = TestVObject()
+        cache = {1: 'one'}
+        object.__setattr__(obj, '__vers_cache__', cache)
+
+        obj.__vers_cache_publish__(cache, {2: 'two'})
+
+        self.assertEqual(obj.__vers_cache__, {1: 'one', 2: 'two'})
+        self.assertEqual(cache, {1: 'one'})
+
+    def test_cache_publish_stale(self):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(return_value=mock.Mock()),
+        ]
+        obj = TestVObject()
+        object.__setattr__(obj, '__vers_cache__', {1: 'one'})
+
+        obj.__vers_cache_publish__({}, {2: 'two'})
+
+        self.assertEqual(obj.__vers_cache__, {1: 'one'})
+
+    def test_cache_invalidate_unknown_name(self):
         class TestVObject(vobject.VObject):
             pass
         TestVObject.__vers_schemas__ = [
             mock.Mock(return_value=mock.Mock()),
         ]
+        TestVObject.__vers_invalidates__ = {
+            'attr': frozenset([2, 3]),
+        }
         obj = TestVObject()
-        obj.__vers_cache__.update({
+        object.__setattr__(obj, '__vers_cache__', {
             1: 'one',
             2: 'two',
         })
 
+        obj.__vers_cache_invalidate__('other')
+
+        self.assertEqual(obj.__vers_cache__, None)
+
+    def test_cache_invalidate_empty(self):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(return_value=mock.Mock()),
+        ]
+        obj = TestVObject()
+
         obj.__vers_cache_invalidate__()
 
+        self.assertEqual(obj.__vers_cache__, None)
+        self.assertFalse('__vers_cache__' in obj.__dict__)
+
+    def test_cache_functional(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+
+            class Schema2(Schema1):
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+                @decorators.downgrader(1)
+                def downgrade(cls, state):
+                    return state
+
+        obj = TestVObject(attr=1)
+        obj.attr = 2
+
+        self.assertEqual(obj.__vers_values__.__vers_notify__, None)
+        self.assertEqual(obj.__vers_cache__, None)
+
+        self.assertEqual(obj.__version__[1].attr, 2)
+        self.assertTrue(isinstance(obj.__vers_values__.__vers_notify__,
+                                   vobject.Invalidator))
+        self.assertEqual(list(obj.__vers_cache__.keys()), [1])
+
+        obj.attr = 3
+
         self.assertEqual(obj.__vers_cache__, {})
+        self.assertEqual(obj.__version__[1].attr, 3)
+
+    def test_no_cycles(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+
+            class Schema2(Schema1):
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+                @decorators.downgrader(1)
+                def downgrade(cls, state):
+                    return state
+
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            obj = TestVObject(attr=1)
+            self.assertEqual(obj.__version__, 2)
+            self.assertEqual(obj.__version__[1].attr, 1)
+            prox = obj.__version__[1]
+            obj.attr = 2
+            self.assertEqual(prox.attr, 2)
+            ref = weakref.ref(obj)
+
+            # The proxy keeps the object alive...
+            del obj
+            self.assertFalse(ref() is None)
+
+            # ...but the object is reclaimed as soon as it's dropped
+            del prox
+            self.assertTrue(ref() is None)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def test_compact_user_methods(self):
+        class TestVObject(vobject.VObject):
+            class Schema(schema.Schema):
+                __version__ = 1
+                __vers_compact__ = True
+                attr = attribute.Attribute(validate=int)
+
+                def __getstate__(self):
+                    return super(TestVObject.Schema, self).__getstate__()
+
+                def __setstate__(self, state):
+                    super(TestVObject.Schema, self).__setstate__(state)
+
+        obj = TestVObject.from_dict({'__version__': 1, 'attr': '1'})
+
+        self.assertEqual(obj.attr, 1)
+        self.assertEqual(obj.to_dict(), {'__version__': 1, 'attr': 1})
+
+    def test_proxy_outlives_object(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                first = attribute.Attribute()
+                last = attribute.Attribute()
+
+            class Schema2(schema.Schema):
+                __version__ = 2
+                name = attribute.Attribute()
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return {'name': '%s %s' % (state['first'],
+                                               state['last'])}
+
+                @decorators.downgrader(1)
+                def downgrade(cls, state):
+                    first, last = state['name'].split(' ', 1)
+                    return {'first': first, 'last': last}
+
+        def legacy(state):
+            return TestVObject.from_dict(state).__version__[1]
+
+        prox = legacy({'__version__': 2, 'name': 'Kevin Mitchell'})
+        gc.collect()
+
+        self.assertEqual(prox.to_dict(), {
+            '__version__': 1,
+            'first': 'Kevin',
+            'last': 'Mitchell',
+        })
+        self.assertEqual(prox.__version__, 1)
+        self.assertEqual(prox.last, 'Mitchell')
 
     @mock.patch.object(vobject.VObject, '__vers_upgrader_get__')
     def test_setstate_abstract(self, mock_upgrader_get):
@@ -525,22 +1476,97 @@ class VObjectTest(unittest.TestCase):
             mock.Mock(__version__=1),
             mock.Mock(__version__=2),
         ]
+        TestVObject.__vers_trustable__ = True
         obj = TestVObject()
+        object.__setattr__(obj, '__vers_cache__', {1: 'cached'})
         upgraders = mock_upgrader_get.return_value
         values = upgraders.return_value
-
-        obj.__setstate__({
+        state = {
             '__version__': 2,
             'attr': 'value',
-        })
+        }
+
+        obj.__setstate__(state)
 
         mock_upgrader_get.assert_called_once_with(2)
-        upgraders.assert_called_once_with({
-            '__version__': 2,
-            'attr': 'value',
-        })
-        self.assertEqual(values.__vers_notify__, obj.__vers_cache_invalidate__)
+        upgraders.assert_called_once_with(state, False)
+        # The latest version isn't modified, so it isn't copied
+        self.assertTrue(upgraders.call_args[0][0] is state)
         self.assertEqual(obj.__vers_values__, values)
+        self.assertEqual(obj.__vers_cache__, None)
+
+    @mock.patch.object(vobject.VObject, '__vers_upgrader_get__')
+    def test_setstate_upgrade(self, mock_upgrader_get):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(__version__=1),
+            mock.Mock(__version__=2),
+        ]
+        obj = TestVObject()
+        upgraders = mock_upgrader_get.return_value
+        state = {
+            '__version__': 1,
+            'attr': 'value',
+        }
+
+        obj.__setstate__(state)
+
+        mock_upgrader_get.assert_called_once_with(1)
+        upgraders.assert_called_once_with(state, False)
+        self.assertFalse(upgraders.call_args[0][0] is state)
+        self.assertEqual(obj.__vers_values__, upgraders.return_value)
+
+    @mock.patch.object(vobject.VObject, '__vers_upgrader_get__')
+    def test_setstate_take(self, mock_upgrader_get):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = [
+            mock.Mock(__version__=1),
+            mock.Mock(__version__=2),
+        ]
+        obj = TestVObject()
+        upgraders = mock_upgrader_get.return_value
+        state = {
+            '__version__': 1,
+            'attr': 'value',
+        }
+
+        obj.__setstate__(state, take=True)
+
+        upgraders.assert_called_once_with(state, True)
+        self.assertTrue(upgraders.call_args[0][0] is state)
+        self.assertEqual(obj.__vers_values__, upgraders.return_value)
+
+    @mock.patch.object(vobject.VObject, '__vers_trust__',
+                       return_value=['values'])
+    @mock.patch.object(vobject.VObject, '__vers_upgrader_get__')
+    def test_setstate_trusted(self, mock_upgrader_get, mock_trust):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+        obj = vobject.EmptyClass()
+        obj.__class__ = TestVObject
+        state = {'__version__': 1}
+
+        with vobject.trusted():
+            with vobject.trusted():
+                obj.__setstate__(state)
+            obj.__setstate__(state)
+        obj.__setstate__(state, True)
+
+        self.assertEqual(mock_trust.call_args_list, [
+            mock.call(1, [state]),
+            mock.call(1, [state]),
+            mock.call(1, [state]),
+        ])
+        self.assertFalse(mock_upgrader_get.called)
+        self.assertEqual(obj.__vers_values__, 'values')
+
+        obj.__setstate__(state)
+
+        mock_upgrader_get.assert_called_once_with(1)
+        self.assertEqual(mock_trust.call_count, 3)
 
     @mock.patch.object(vobject.VObject, '__setstate__')
     def test_from_dict_abstract(self, mock_setstate):
@@ -557,3 +1583,1399 @@ class VObjectTest(unittest.TestCase):
 
         self.assertTrue(isinstance(result, TestVObject))
         mock_setstate.assert_called_once_with('values')
+
+    @mock.patch.object(vobject.VObject, '__setstate__')
+    def test_from_dict_trusted(self, mock_setstate):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = ['schema']
+
+        result = TestVObject.from_dict('values', trusted=True)
+
+        self.assertTrue(isinstance(result, TestVObject))
+        mock_setstate.assert_called_once_with('values', True, False)
+
+    @mock.patch.object(vobject.VObject, '__setstate__')
+    def test_from_dict_take(self, mock_setstate):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = ['schema']
+
+        result = TestVObject.from_dict('values', take=True)
+
+        self.assertTrue(isinstance(result, TestVObject))
+        mock_setstate.assert_called_once_with('values', False, True)
+
+    def test_from_dicts_abstract(self):
+        self.assertRaises(TypeError, vobject.VObject.from_dicts, [])
+
+    @mock.patch.object(vobject.VObject, '__vers_load__',
+                       side_effect=lambda states, trusted, take: [
+                           'obj%d' % state for state in states])
+    def test_iter_from_dicts(self, mock_load):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = ['schema']
+
+        result = TestVObject.iter_from_dicts(iter(range(5)), chunk_size=2)
+
+        self.assertFalse(mock_load.called)
+        self.assertEqual(list(result), ['obj%d' % i for i in range(5)])
+        mock_load.assert_has_calls([
+            mock.call([0, 1], False, False),
+            mock.call([2, 3], False, False),
+            mock.call([4], False, False),
+        ])
+        self.assertEqual(mock_load.call_count, 3)
+
+    @mock.patch.object(vobject.VObject, '__vers_load__',
+                       side_effect=lambda states, trusted, take: [
+                           'obj%d' % state for state in states])
+    def test_from_dicts(self, mock_load):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = ['schema']
+
+        result = TestVObject.from_dicts(iter(range(5)), trusted=True,
+                                        take=True)
+
+        self.assertEqual(result, ['obj%d' % i for i in range(5)])
+        mock_load.assert_called_once_with([0, 1, 2, 3, 4], True, True)
+
+    def test_from_dicts_functional(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+
+            class Schema2(Schema1):
+                __version__ = 2
+                new = attribute.Attribute()
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    state['new'] = state['attr'] * 2
+                    return state
+
+        states = [
+            {'__version__': 1, 'attr': 1},
+            {'__version__': 2, 'attr': 2, 'new': 5},
+            {'__version__': 1, 'attr': 3},
+        ]
+
+        with mock.patch.object(TestVObject, '__vers_upgrader_get__',
+                               wraps=TestVObject.__vers_upgrader_get__) \
+                as mock_upgrader_get:
+            result = TestVObject.from_dicts(states)
+
+        self.assertEqual(mock_upgrader_get.call_count, 2)
+        self.assertEqual([obj.to_dict() for obj in result], [
+            {'__version__': 2, 'attr': 1, 'new': 2},
+            {'__version__': 2, 'attr': 2, 'new': 5},
+            {'__version__': 2, 'attr': 3, 'new': 6},
+        ])
+        self.assertEqual(result, [TestVObject.from_dict(state)
+                                  for state in states])
+        self.assertEqual(states, [
+            {'__version__': 1, 'attr': 1},
+            {'__version__': 2, 'attr': 2, 'new': 5},
+            {'__version__': 1, 'attr': 3},
+        ])
+        for obj in result:
+            self.assertEqual(obj.__vers_cache__, None)
+
+    def test_reduce_ex(self):
+        obj = Pickled(attr=1, new=4)
+
+        result = obj.__reduce_ex__(2)
+
+        self.assertEqual(result, (vobject._restore, (Pickled, 2, (1, 4))))
+
+    def test_reduce_ex_own_getstate(self):
+        class TestVObject(vobject.VObject):
+            class Schema(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+                new = attribute.Attribute()
+
+            def __getstate__(self):
+                return super(TestVObject, self).__getstate__()
+
+        obj = TestVObject(attr=1, new=4)
+
+        result = obj.__reduce_ex__(2)
+
+        self.assertNotEqual(result[0], vobject._restore)
+        self.assertEqual(result[2], {'__version__': 1, 'attr': 1, 'new': 4})
+
+    def test_reduce_ex_own_schema_setstate(self):
+        TestVObject = _setstate_vobject()
+        obj = TestVObject.from_dict({'__version__': 1, 'a': 1})
+
+        result = obj.__reduce_ex__(2)
+
+        self.assertNotEqual(result[0], vobject._restore)
+
+    def test_pickle(self):
+        obj = Pickled(attr=1, new=4)
+
+        data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        result = pickle.loads(data)
+
+        self.assertEqual(result, obj)
+        self.assertFalse(b'attr' in data)
+        with mock.patch.object(Pickled, '__reduce_ex__',
+                               object.__reduce_ex__):
+            self.assertTrue(len(data) < len(pickle.dumps(
+                obj, pickle.HIGHEST_PROTOCOL)))
+
+    def test_unpickle_old_format(self):
+        obj = Pickled(attr=1, new=4)
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            with mock.patch.object(Pickled, '__reduce_ex__',
+                                   object.__reduce_ex__):
+                data = pickle.dumps(obj, protocol)
+
+            result = pickle.loads(data)
+
+            self.assertTrue(b'attr' in data)
+            self.assertEqual(result, obj)
+
+    def test_load_rows(self):
+        result = Pickled.__vers_load_rows__(2, [('1', 4), (2, 8)])
+
+        self.assertEqual([obj.to_dict() for obj in result],
+                         [{'__version__': 2, 'attr': 1, 'new': 4},
+                          {'__version__': 2, 'attr': 2, 'new': 8}])
+
+    def test_load_rows_trusted(self):
+        row = ('1', 4)
+
+        result = Pickled.__vers_load_rows__(2, [row], trusted=True)
+
+        self.assertEqual(result[0].attr, '1')
+        self.assertEqual(row, ('1', 4))
+
+    def test_load_rows_older(self):
+        with mock.patch.object(Pickled, '__vers_load__',
+                               return_value=['loaded']) as mock_load:
+            result = Pickled.__vers_load_rows__(1, [('1', 2)], True)
+
+        self.assertEqual(result, ['loaded'])
+        mock_load.assert_called_once_with(
+            [{'__version__': 1, 'attr': '1', 'old': 2}], True, take=True)
+
+    def test_load_rows_setstate(self):
+        TestVObject = _setstate_vobject()
+
+        result = TestVObject.__vers_load_rows__(1, [(1, 2)])
+
+        self.assertEqual(result[0].to_dict(),
+                         {'__version__': 1, 'a': 1, 'b': 2})
+
+    def test_restore_validated(self):
+        result = vobject._restore(Pickled, 2, ('1', 4))
+
+        self.assertEqual(result.to_dict(),
+                         {'__version__': 2, 'attr': 1, 'new': 4})
+
+    def test_restore_trusted(self):
+        with vobject.trusted():
+            result = vobject._restore(Pickled, 2, ('1', 4))
+
+        self.assertEqual(result.attr, '1')
+
+    def test_restore_older(self):
+        result = vobject._restore(Pickled, 1, ('1', 2))
+
+        self.assertEqual(result.to_dict(),
+                         {'__version__': 2, 'attr': 1, 'new': 4})
+
+    def test_restore_bad_version(self):
+        self.assertRaises(TypeError, vobject._restore, Pickled, 3, ())
+
+    def test_restore_bad_count(self):
+        self.assertRaises(ValueError, vobject._restore, Pickled, 2, (1,))
+
+    def test_threads_lazy_load(self):
+        TestVObject = _upgraded_vobject(int)
+        obj = TestVObject.from_dict(
+            {'__version__': 1, 'attr': '1', 'old': 2}, lazy=True)
+
+        results = self.run_threads(lambda: obj.__vers_values__)
+
+        self.assertEqual(len(set(id(values) for values in results)), 1)
+        self.assertTrue(obj.__vers_values__ is results[0])
+        self.assertEqual(obj.new, 4)
+
+    def test_from_dicts_badversion(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+
+        states = [
+            {'__version__': 1, 'attr': 1},
+            {'attr': 2},
+        ]
+
+        with mock.patch.object(TestVObject, '__vers_upgrader_get__') \
+                as mock_upgrader_get:
+            self.assertRaises(TypeError, TestVObject.from_dicts, states)
+
+        self.assertFalse(mock_upgrader_get.called)
+
+    def test_from_dicts_batch_upgrader(self):
+        calls = []
+
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+
+            class Schema2(Schema1):
+                __version__ = 2
+                new = attribute.Attribute()
+
+                @decorators.upgrader(batch=True)
+                def upgrade(cls, states):
+                    calls.append(len(states))
+                    for state in states:
+                        state['new'] = state['attr'] * 2
+                    return states
+
+        states = [{'__version__': 1, 'attr': i} for i in range(5)]
+
+        result = TestVObject.from_dicts(states)
+        single = TestVObject.from_dict(states[0])
+
+        self.assertEqual(calls, [5, 1])
+        self.assertEqual([obj.new for obj in result], [0, 2, 4, 6, 8])
+        self.assertEqual(single.new, 0)
+
+    @mock.patch.object(vobject.parallel, 'upgrade_all',
+                       return_value=iter(['obj1', 'obj2']))
+    def test_from_dicts_workers(self, mock_upgrade_all):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = ['schema']
+
+        result = TestVObject.from_dicts('states', workers=4, chunk_size=10)
+
+        self.assertEqual(result, ['obj1', 'obj2'])
+        mock_upgrade_all.assert_called_once_with(TestVObject, 'states', 4, 10,
+                                                 False)
+
+    @mock.patch.object(vobject.parallel, 'upgrade_all',
+                       return_value=iter(['obj1', 'obj2']))
+    def test_iter_from_dicts_workers(self, mock_upgrade_all):
+        class TestVObject(vobject.VObject):
+            pass
+        TestVObject.__vers_schemas__ = ['schema']
+
+        result = TestVObject.iter_from_dicts('states', chunk_size=None,
+                                             workers=4)
+
+        self.assertEqual(list(result), ['obj1', 'obj2'])
+        mock_upgrade_all.assert_called_once_with(TestVObject, 'states', 4,
+                                                 1000, False)
+
+    def test_cache_depends(self):
+        calls = []
+
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                name = attribute.Attribute()
+                salary = attribute.Attribute()
+
+            class Schema2(Schema1):
+                __version__ = 2
+                salary = None
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    del state['salary']
+                    return state
+
+            class Schema3(Schema2):
+                __version__ = 3
+                name = None
+                first = attribute.Attribute()
+                last = attribute.Attribute()
+                title = attribute.Attribute()
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    state['first'], state['last'] = state.pop('name').split()
+                    state['title'] = None
+                    return state
+
+                @decorators.downgrader(1, depends=('first', 'last'))
+                def downgrade1(cls, state):
+                    calls.append(1)
+                    return {
+                        'name': '%s %s' % (state['first'], state['last']),
+                        'salary': 0,
+                    }
+
+                @decorators.downgrader(2)
+                def downgrade2(cls, state):
+                    calls.append(2)
+                    return {
+                        'name': '%s %s' % (state['first'], state['last']),
+                    }
+
+        self.assertEqual(TestVObject.__vers_invalidates__, {
+            'first': frozenset([1, 2]),
+            'last': frozenset([1, 2]),
+            'title': frozenset([2]),
+        })
+
+        obj = TestVObject(first='Alice', last='Smith', title='CEO')
+        self.assertEqual(obj.__version__[1].name, 'Alice Smith')
+        self.assertEqual(obj.__version__[2].name, 'Alice Smith')
+        self.assertEqual(calls, [1, 2])
+
+        obj.title = 'CTO'
+        self.assertEqual(obj.__version__[1].name, 'Alice Smith')
+        self.assertEqual(obj.__version__[2].name, 'Alice Smith')
+        self.assertEqual(calls, [1, 2, 2])
+
+        obj.last = 'Jones'
+        self.assertEqual(obj.__version__[1].name, 'Alice Jones')
+        self.assertEqual(obj.__version__[2].name, 'Alice Jones')
+        self.assertEqual(calls, [1, 2, 2, 1, 2])
+
+    def test_invalidates_passthrough(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                name = attribute.Attribute()
+                salary = attribute.Attribute()
+
+            class Schema2(Schema1):
+                __version__ = 2
+                title = attribute.Attribute()
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    state['title'] = None
+                    return state
+
+                @decorators.downgrader(1, depends=())
+                def downgrade(cls, state):
+                    del state['title']
+                    return state
+
+        self.assertEqual(TestVObject.__vers_invalidates__, {
+            'name': frozenset([1]),
+            'salary': frozenset([1]),
+            'title': frozenset(),
+        })
+
+    def test_mappings(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                first = attribute.Attribute()
+                middle = attribute.Attribute()
+
+            class Schema2(Schema1):
+                __version__ = 2
+                first = None
+                middle = None
+                given = attribute.Attribute()
+
+                upgrade = decorators.upgrader(
+                    mapping.rename('first', 'given') + mapping.drop('middle'))
+
+            class Schema3(Schema2):
+                __version__ = 3
+                salary = attribute.Attribute()
+
+                upgrade = decorators.upgrader(mapping.add('salary', 0))
+
+            class Schema4(Schema3):
+                __version__ = 4
+                upper = attribute.Attribute()
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    state['upper'] = state['given'].upper()
+                    return state
+
+                downgrade = decorators.downgrader(2)(
+                    mapping.drop('salary') + mapping.drop('upper'))
+
+        self.assertTrue(isinstance(TestVObject.Schema2.__dict__['upgrade'],
+                                   mapping.Mapping))
+
+        obj = TestVObject.from_dict({
+            '__version__': 1,
+            'first': 'alice',
+            'middle': 'b',
+        })
+
+        self.assertEqual(obj.to_dict(), {
+            '__version__': 4,
+            'given': 'alice',
+            'salary': 0,
+            'upper': 'ALICE',
+        })
+        self.assertEqual(obj.__version__[2].to_dict(), {
+            '__version__': 2,
+            'given': 'alice',
+        })
+
+        # The two mappings have been fused
+        cvt = TestVObject.__vers_upgraders__[1]
+        self.assertEqual(len(cvt), 2)
+        self.assertEqual(cvt[1].steps, (
+            ('rename', 'first', 'given'),
+            ('drop', 'middle'),
+            ('add', 'salary', 0),
+        ))
+
+    def make_concurrent(self, produces=None):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+
+            class Schema2(Schema1):
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+                @decorators.downgrader(1, produces=produces)
+                def downgrade(cls, state):
+                    # Simulate a write from another thread, racing
+                    # with the downgrade
+                    if write:
+                        obj.attr = write.pop()
+                    return state
+
+        write = []
+        obj = TestVObject(attr=1)
+        return obj, write
+
+    def test_concurrent_write(self):
+        obj, write = self.make_concurrent()
+        write.append(2)
+
+        self.assertEqual(obj.__version__[1].attr, 1)
+        self.assertEqual(obj.__vers_cache__, {})
+        self.assertEqual(obj.__version__[1].attr, 2)
+        self.assertEqual(list(obj.__vers_cache__.keys()), [1])
+
+    def test_concurrent_write_lazy(self):
+        obj, write = self.make_concurrent(produces=('attr',))
+        write.append(2)
+
+        self.assertEqual(obj.__version__[1].attr, 1)
+        self.assertEqual(obj.__vers_cache__, {})
+        self.assertEqual(obj.__version__[1].attr, 2)
+        self.assertEqual(obj.__vers_cache__, {(1, 'attr'): 2})
+
+    def run_threads(self, func, count=8):
+        barrier = threading.Event()
+        results = []
+
+        def target():
+            barrier.wait()
+            results.append(func())
+
+        threads = [threading.Thread(target=target) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        barrier.set()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_threads_upgrader_built_once(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+
+            class Schema2(Schema1):
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+        plan = TestVObject.__vers_plan__
+        calls = []
+
+        def slow_plan(vers):
+            calls.append(vers)
+            time.sleep(0.01)
+            return plan(vers)
+
+        with mock.patch.object(TestVObject, '__vers_plan__',
+                               staticmethod(slow_plan)):
+            results = self.run_threads(
+                lambda: TestVObject.__vers_upgrader_get__(1))
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(len(set(id(cvt) for cvt in results)), 1)
+
+    def test_threads_share_downgrades(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+
+            class Schema2(Schema1):
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+                @decorators.downgrader(1)
+                def downgrade(cls, state):
+                    return state
+
+        obj = TestVObject()
+
+        results = self.run_threads(lambda: obj.__version__[1])
+
+        self.assertTrue(all(prox.__vers_master__ is obj for prox in results))
+        self.assertEqual(
+            len(set(id(prox.__vers_values__) for prox in results)), 1)
+
+    def test_threads_cache_lock_per_object(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute()
+
+            class Schema2(Schema1):
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+                @decorators.downgrader(1)
+                def downgrade(cls, state):
+                    return state
+
+        obj1 = TestVObject(attr=1)
+        obj2 = TestVObject(attr=2)
+        self.assertFalse('__vers_cache_lock__' in obj1.__dict__)
+
+        # The class lock is not needed for older versions
+        with TestVObject.__vers_lock__:
+            self.assertEqual(obj1.__version__[1].attr, 1)
+            obj1.attr = 3
+            self.assertEqual(obj1.__version__[1].attr, 3)
+            self.assertEqual(obj2.__version__[1].attr, 2)
+
+        self.assertFalse(obj1.__dict__['__vers_cache_lock__'] is
+                         obj2.__dict__['__vers_cache_lock__'])
+
+
+def _columns_vobject():
+    class TestVObject(vobject.VObject):
+        class Schema1(schema.Schema):
+            __version__ = 1
+            first = attribute.Attribute()
+
+        class Schema2(Schema1):
+            __version__ = 2
+            first = None
+            given = attribute.Attribute()
+
+            @decorators.upgrader(columnar=True)
+            def upgrade(cls, cols):
+                cols['given'] = cols.pop('first')
+                return cols
+
+        class Schema3(Schema2):
+            __version__ = 3
+            upper = attribute.Attribute()
+
+            @decorators.upgrader
+            def upgrade(cls, state):
+                state['upper'] = state['given'].upper()
+                return state
+
+            @decorators.downgrader(1, columnar=True)
+            def downgrade(cls, cols):
+                del cols['upper']
+                cols['first'] = cols.pop('given')
+                return cols
+
+    return TestVObject
+
+
+class ColumnsTest(unittest.TestCase):
+    def test_upgrade_columns_abstract(self):
+        self.assertRaises(TypeError, vobject.VObject.upgrade_columns,
+                          {}, 1)
+
+    def test_upgrade_columns(self):
+        TestVObject = _columns_vobject()
+        cols = {'first': ['a', 'b']}
+
+        result = TestVObject.upgrade_columns(cols, from_version=1)
+
+        self.assertEqual(result, {
+            'given': ['a', 'b'],
+            'upper': ['A', 'B'],
+        })
+        self.assertEqual(cols, {'first': ['a', 'b']})
+        self.assertEqual(
+            [TestVObject(**dict(zip(result, values))).to_dict()
+             for values in zip(*result.values())],
+            [TestVObject.from_dict({'__version__': 1, 'first': 'a'})
+             .to_dict(),
+             TestVObject.from_dict({'__version__': 1, 'first': 'b'})
+             .to_dict()],
+        )
+
+    def test_upgrade_columns_badversion(self):
+        TestVObject = _columns_vobject()
+
+        self.assertRaises(TypeError, TestVObject.upgrade_columns,
+                          {'first': ['a']}, 4)
+
+    def test_upgrade_columns_badkeys(self):
+        TestVObject = _columns_vobject()
+
+        self.assertRaises(ValueError, TestVObject.upgrade_columns,
+                          {'given': ['a']}, 1)
+
+    def test_downgrade_columns(self):
+        TestVObject = _columns_vobject()
+        cols = {'given': ['a', 'b'], 'upper': ['A', 'B']}
+
+        result = TestVObject.downgrade_columns(cols, to_version=1)
+
+        self.assertEqual(result, {'first': ['a', 'b']})
+        self.assertEqual(cols, {'given': ['a', 'b'], 'upper': ['A', 'B']})
+
+    def test_downgrade_columns_latest(self):
+        TestVObject = _columns_vobject()
+        cols = {'given': ['a', 'b'], 'upper': ['A', 'B']}
+
+        result = TestVObject.downgrade_columns(cols, to_version=3)
+
+        self.assertEqual(result, cols)
+        self.assertFalse(result is cols)
+
+    def test_downgrade_columns_unavailable(self):
+        TestVObject = _columns_vobject()
+
+        self.assertRaises(KeyError, TestVObject.downgrade_columns,
+                          {'given': ['a'], 'upper': ['A']}, 2)
+
+
+def _costs_vobject(cost=None):
+    class TestVObject(vobject.VObject):
+        class Schema1(schema.Schema):
+            __version__ = 1
+            path = attribute.Attribute()
+
+        class Schema2(Schema1):
+            __version__ = 2
+
+            @decorators.upgrader
+            def upgrade(cls, state):
+                state['path'] += '2'
+                return state
+
+        class Schema3(Schema2):
+            __version__ = 3
+
+            @decorators.upgrader
+            def upgrade(cls, state):
+                state['path'] += '3'
+                return state
+
+            @decorators.upgrader(1, cost=cost)
+            def jump(cls, state):
+                state['path'] += 'J'
+                return state
+
+    return TestVObject
+
+
+class UpgradeCostsTest(unittest.TestCase):
+    def test_costs(self):
+        TestVObject = _costs_vobject(10)
+
+        self.assertEqual(TestVObject.__vers_costs__, {(1, 3): 10})
+        self.assertEqual(TestVObject.explain_upgrade(1), ([1, 2, 3], 2))
+        self.assertEqual(TestVObject.explain_upgrade(3), ([3], 0))
+        self.assertRaises(TypeError, TestVObject.explain_upgrade, 4)
+
+        obj = TestVObject.from_dict({'__version__': 1, 'path': '1'})
+        self.assertEqual(obj.path, '123')
+
+        # Now measure the upgraders; each takes a "second"
+        with mock.patch('timeit.default_timer',
+                        side_effect=itertools.count()):
+            TestVObject.profile_upgrades()
+            obj = TestVObject.from_dict({'__version__': 1, 'path': '1'})
+            self.assertEqual(obj.path, '123')
+            self.assertEqual(TestVObject.__vers_timings__, {
+                (1, 2): [1.0, 1],
+                (2, 3): [1.0, 1],
+            })
+
+        result = TestVObject.replan_upgrades()
+
+        self.assertEqual(result, {
+            (1, 2): 1000000.0,
+            (2, 3): 1000000.0,
+            (1, 3): 10,
+        })
+        self.assertEqual(TestVObject.__vers_timings__, None)
+        self.assertEqual(TestVObject.explain_upgrade(1), ([1, 3], 10))
+
+        obj = TestVObject.from_dict({'__version__': 1, 'path': '1'})
+        self.assertEqual(obj.path, '1J')
+
+    def test_replan_keeps_unmeasured(self):
+        TestVObject = _costs_vobject()
+        self.assertEqual(TestVObject.explain_upgrade(1), ([1, 3], 1))
+
+        # Only the direct upgrader runs, and it is slow
+        with mock.patch('timeit.default_timer',
+                        side_effect=itertools.count()):
+            TestVObject.profile_upgrades()
+            TestVObject.from_dict({'__version__': 1, 'path': '1'})
+
+        result = TestVObject.replan_upgrades()
+
+        self.assertEqual(result, {(1, 3): 1000000.0})
+        self.assertEqual(TestVObject.explain_upgrade(1), ([1, 3], 1000000.0))
+        self.assertEqual(TestVObject.__vers_plans__,
+                         {1: [(1, 3)], 2: [(2, 3)]})
+        obj = TestVObject.from_dict({'__version__': 1, 'path': '1'})
+        self.assertEqual(obj.path, '1J')
+
+    def test_replan_known(self):
+        TestVObject = _costs_vobject()
+        TestVObject.__vers_costs__ = {(1, 2): 5, (2, 3): 5}
+        TestVObject.__vers_plans__ = {1: [(1, 3)]}
+        TestVObject.profile_upgrades()
+        TestVObject.__vers_timings__[(1, 3)] = [1.0, 1]
+
+        TestVObject.replan_upgrades()
+
+        self.assertEqual(TestVObject.explain_upgrade(1), ([1, 2, 3], 10))
+        obj = TestVObject.from_dict({'__version__': 1, 'path': '1'})
+        self.assertEqual(obj.path, '123')
+
+    def test_costs_abstract(self):
+        self.assertRaises(TypeError, vobject.VObject.explain_upgrade, 1)
+        self.assertRaises(TypeError, vobject.VObject.profile_upgrades)
+        self.assertRaises(TypeError, vobject.VObject.replan_upgrades)
+
+
+def _getstate_vobject():
+    def parse_date(value):
+        if isinstance(value, datetime.date):
+            return value
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+    class TestVObject(vobject.VObject):
+        class Schema1(schema.Schema):
+            __version__ = 1
+            d = attribute.Attribute(validate=parse_date,
+                                    getstate=lambda v: v.isoformat())
+            old = attribute.Attribute()
+
+        class Schema2(Schema1):
+            __version__ = 2
+            old = None
+            new = attribute.Attribute()
+
+            @decorators.upgrader
+            def upgrade(cls, state):
+                state['new'] = state.pop('old')
+                return state
+
+    return TestVObject
+
+
+class TrustedTest(unittest.TestCase):
+    def test_from_dict_trusted_latest(self):
+        validator = mock.Mock(side_effect=lambda x: x)
+        TestVObject = _upgraded_vobject(validator)
+        state = {'__version__': 2, 'attr': 1, 'new': 2}
+
+        result = TestVObject.from_dict(state, trusted=True)
+
+        self.assertEqual(result.to_dict(), state)
+        self.assertFalse(validator.called)
+
+    def test_from_dict_trusted_upgraded(self):
+        validator = mock.Mock(side_effect=lambda x: x)
+        TestVObject = _upgraded_vobject(validator)
+        state = {'__version__': 1, 'attr': 1, 'old': 2}
+
+        result = TestVObject.from_dict(state, trusted=True)
+
+        self.assertEqual(result.to_dict(),
+                         {'__version__': 2, 'attr': 1, 'new': 4})
+        self.assertEqual(state, {'__version__': 1, 'attr': 1, 'old': 2})
+        validator.assert_called_once_with(4)
+
+    def test_from_dict_trusted_badkeys(self):
+        TestVObject = _upgraded_vobject(int)
+
+        self.assertRaises(ValueError, TestVObject.from_dict,
+                          {'__version__': 2, 'attr': 1}, trusted=True)
+        self.assertRaises(ValueError, TestVObject.from_dict,
+                          {'__version__': 1, 'attr': 1, 'old': 2,
+                           'extra': 3}, trusted=True)
+        self.assertRaises(TypeError, TestVObject.from_dict,
+                          {'attr': 1, 'new': 2}, trusted=True)
+
+    def test_from_dict_trusted_setstate(self):
+        calls = []
+
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                attr = attribute.Attribute(validate=int)
+
+                def __setstate__(self, state):
+                    calls.append(state)
+                    super(TestVObject.Schema1, self).__setstate__(state)
+
+        result = TestVObject.from_dict({'__version__': 1, 'attr': '5'},
+                                       trusted=True)
+
+        self.assertEqual(result.attr, 5)
+        self.assertEqual(calls, [{'__version__': 1, 'attr': '5'}])
+
+    def test_from_dicts_trusted(self):
+        validator = mock.Mock(side_effect=lambda x: x)
+        TestVObject = _upgraded_vobject(validator)
+        states = [
+            {'__version__': 1, 'attr': 1, 'old': 2},
+            {'__version__': 2, 'attr': 2, 'new': 5},
+            {'__version__': 1, 'attr': 3, 'old': 4},
+        ]
+
+        result = TestVObject.from_dicts(states, trusted=True)
+
+        self.assertEqual([obj.to_dict() for obj in result], [
+            {'__version__': 2, 'attr': 1, 'new': 4},
+            {'__version__': 2, 'attr': 2, 'new': 5},
+            {'__version__': 2, 'attr': 3, 'new': 8},
+        ])
+        self.assertEqual(states[0], {'__version__': 1, 'attr': 1, 'old': 2})
+        self.assertEqual(validator.call_args_list,
+                         [mock.call(4), mock.call(8)])
+
+    def test_unpickle_trusted(self):
+        validator = mock.Mock(side_effect=lambda x: x)
+        TestVObject = _upgraded_vobject(validator)
+        obj = TestVObject.from_dict({'__version__': 1, 'attr': 1, 'old': 2})
+        validator.reset_mock()
+
+        with vobject.trusted():
+            result = TestVObject.__new__(TestVObject)
+            result.__setstate__(obj.__getstate__())
+
+        self.assertEqual(result, obj)
+        self.assertFalse(validator.called)
+
+    def test_from_dict_trusted_getstate(self):
+        TestVObject = _getstate_vobject()
+        obj = TestVObject(d=datetime.date(2014, 3, 1), new=1)
+
+        result = TestVObject.from_dict(obj.to_dict(), trusted=True)
+
+        self.assertEqual(result.d, datetime.date(2014, 3, 1))
+        self.assertEqual(result, obj)
+
+    def test_from_dict_trusted_getstate_upgraded(self):
+        TestVObject = _getstate_vobject()
+
+        result = TestVObject.from_dict(
+            {'__version__': 1, 'd': '2014-03-01', 'old': 1}, trusted=True)
+
+        self.assertEqual(result.d, datetime.date(2014, 3, 1))
+        self.assertEqual(result.new, 1)
+
+    def test_from_bytes_trusted_getstate(self):
+        TestVObject = _getstate_vobject()
+        obj = TestVObject(d=datetime.date(2014, 3, 1), new=1)
+        data = obj.to_bytes()
+
+        result = TestVObject.from_bytes(data, trusted=True)
+
+        self.assertEqual(result.d, datetime.date(2014, 3, 1))
+
+    def test_unpickle_trusted_getstate(self):
+        TestVObject = _getstate_vobject()
+        obj = TestVObject(d=datetime.date(2014, 3, 1), new=1)
+        row = (u'2014-03-01', 1)
+
+        with vobject.trusted():
+            result = vobject._restore(TestVObject, 2, row)
+
+        self.assertEqual(result.d, datetime.date(2014, 3, 1))
+        self.assertEqual(result, obj)
+        self.assertEqual(row, (u'2014-03-01', 1))
+
+    def test_from_dict_trusted_validator_changed(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                age = attribute.Attribute()
+
+            class Schema2(schema.Schema):
+                __version__ = 2
+                age = attribute.Attribute(validate=int)
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return state
+
+        state = {'__version__': 1, 'age': '5'}
+
+        result = TestVObject.from_dict(state, trusted=True)
+
+        self.assertEqual(result.age, 5)
+        self.assertEqual(TestVObject.from_dict(state).age, 5)
+
+
+class TakeTest(unittest.TestCase):
+    def test_from_dict_take_latest(self):
+        TestVObject = _upgraded_vobject(int)
+        state = {'__version__': 2, 'attr': '1', 'new': 2}
+
+        result = TestVObject.from_dict(state, take=True)
+
+        self.assertEqual(result.to_dict(),
+                         {'__version__': 2, 'attr': 1, 'new': 2})
+        self.assertTrue(result.__vers_values__.__vers_values__ is state)
+
+    def test_from_dict_take_upgraded(self):
+        TestVObject = _upgraded_vobject(int)
+        state = {'__version__': 1, 'attr': '1', 'old': 2}
+
+        result = TestVObject.from_dict(state, take=True)
+
+        self.assertEqual(result.to_dict(),
+                         {'__version__': 2, 'attr': 1, 'new': 4})
+        self.assertTrue(result.__vers_values__.__vers_values__ is state)
+
+    def test_from_dict_take_trusted(self):
+        validator = mock.Mock(side_effect=lambda x: x)
+        TestVObject = _upgraded_vobject(validator)
+        states = [{'__version__': 1, 'attr': 1, 'old': 2},
+                  {'__version__': 2, 'attr': 1, 'new': 4}]
+
+        result = [TestVObject.from_dict(state, trusted=True, take=True)
+                  for state in states]
+
+        for obj in result:
+            self.assertEqual(obj.to_dict(),
+                             {'__version__': 2, 'attr': 1, 'new': 4})
+        self.assertEqual(states, [{'__version__': 1, 'attr': 1, 'old': 2},
+                                  {'__version__': 2, 'attr': 1, 'new': 4}])
+        validator.assert_called_once_with(4)
+
+    def test_from_dicts_take(self):
+        TestVObject = _upgraded_vobject(int)
+        states = [
+            {'__version__': 1, 'attr': '1', 'old': 2},
+            {'__version__': 2, 'attr': '2', 'new': 5},
+        ]
+
+        result = TestVObject.from_dicts(states, take=True)
+
+        self.assertEqual([obj.to_dict() for obj in result], [
+            {'__version__': 2, 'attr': 1, 'new': 4},
+            {'__version__': 2, 'attr': 2, 'new': 5},
+        ])
+        for obj, state in zip(result, states):
+            self.assertTrue(obj.__vers_values__.__vers_values__ is state)
+
+    def test_from_dict_no_take(self):
+        TestVObject = _upgraded_vobject(int)
+        states = [{'__version__': 1, 'attr': '1', 'old': 2},
+                  {'__version__': 2, 'attr': '1', 'new': 4}]
+
+        for state in states:
+            result = TestVObject.from_dict(state)
+
+            self.assertEqual(result.to_dict(),
+                             {'__version__': 2, 'attr': 1, 'new': 4})
+        self.assertEqual(states, [{'__version__': 1, 'attr': '1', 'old': 2},
+                                  {'__version__': 2, 'attr': '1', 'new': 4}])
+
+    def test_from_dict_setstate_unmodified(self):
+        TestVObject = _setstate_vobject()
+        state = {'__version__': 1, 'a': 1}
+
+        result = TestVObject.from_dict(state)
+
+        self.assertEqual(result.b, 0)
+        self.assertEqual(state, {'__version__': 1, 'a': 1})
+
+    def test_from_dict_setstate_take(self):
+        TestVObject = _setstate_vobject()
+        state = {'__version__': 1, 'a': 1}
+
+        result = TestVObject.from_dict(state, take=True)
+
+        self.assertEqual(result.b, 0)
+        self.assertEqual(state, {'__version__': 1, 'a': 1, 'b': 0})
+
+    def test_from_dicts_setstate_unmodified(self):
+        TestVObject = _setstate_vobject()
+        state = {'__version__': 1, 'a': 1}
+
+        result = TestVObject.from_dicts([state])
+
+        self.assertEqual(result[0].b, 0)
+        self.assertEqual(state, {'__version__': 1, 'a': 1})
+
+    def test_from_dicts_setstate_trusted_unmodified(self):
+        TestVObject = _setstate_vobject()
+        state = {'__version__': 1, 'a': 1}
+
+        result = TestVObject.from_dicts([state], trusted=True)
+
+        self.assertEqual(result[0].b, 0)
+        self.assertEqual(state, {'__version__': 1, 'a': 1})
+
+
+class LazyLoadTest(unittest.TestCase):
+    def test_from_dict_lazy(self):
+        validator = mock.Mock(side_effect=lambda x: x)
+        TestVObject = _upgraded_vobject(validator)
+        state = {'__version__': 2, 'attr': 1, 'new': 2}
+
+        result = TestVObject.from_dict(state, lazy=True)
+
+        self.assertFalse(validator.called)
+        self.assertEqual(result.__vers_raw__, (2, state, False))
+        self.assertFalse(result.__vers_raw__[1] is state)
+        self.assertEqual(result.attr, 1)
+        self.assertEqual(validator.call_count, 2)
+        self.assertEqual(result.new, 2)
+        self.assertEqual(validator.call_count, 2)
+        self.assertFalse('__vers_raw__' in result.__dict__)
+        self.assertTrue('__vers_values__' in result.__dict__)
+
+    def test_from_dict_lazy_upgraded(self):
+        TestVObject = _upgraded_vobject(int)
+        state = {'__version__': 1, 'attr': '1', 'old': 2}
+
+        result = TestVObject.from_dict(state, lazy=True)
+
+        self.assertEqual(result.to_dict(),
+                         {'__version__': 2, 'attr': 1, 'new': 4})
+        self.assertEqual(state, {'__version__': 1, 'attr': '1', 'old': 2})
+
+    def test_from_dict_lazy_write(self):
+        TestVObject = _upgraded_vobject(int)
+
+        result = TestVObject.from_dict(
+            {'__version__': 2, 'attr': '1', 'new': 2}, lazy=True)
+        result.attr = '3'
+
+        self.assertEqual(result.to_dict(),
+                         {'__version__': 2, 'attr': 3, 'new': 2})
+
+    def test_from_dict_lazy_compare(self):
+        TestVObject = _upgraded_vobject(int)
+        state = {'__version__': 2, 'attr': '1', 'new': 2}
+
+        result = TestVObject.from_dict(state, lazy=True)
+
+        self.assertEqual(result, TestVObject.from_dict(state))
+        self.assertEqual(result.__getstate__(),
+                         {'__version__': 2, 'attr': 1, 'new': 2})
+
+    def test_from_dict_lazy_badversion(self):
+        TestVObject = _upgraded_vobject(int)
+
+        self.assertRaises(TypeError, TestVObject.from_dict,
+                          {'attr': 1, 'new': 2}, lazy=True)
+        self.assertRaises(TypeError, TestVObject.from_dict,
+                          {'__version__': 3, 'attr': 1}, lazy=True)
+
+    def test_from_dict_lazy_badkeys(self):
+        TestVObject = _upgraded_vobject(int)
+
+        result = TestVObject.from_dict({'__version__': 2, 'attr': 1},
+                                       lazy=True)
+
+        self.assertRaises(ValueError, getattr, result, 'attr')
+        self.assertRaises(ValueError, getattr, result, 'attr')
+
+    def test_from_dict_lazy_take(self):
+        TestVObject = _upgraded_vobject(int)
+        state = {'__version__': 2, 'attr': '1', 'new': 2}
+
+        result = TestVObject.from_dict(state, take=True, lazy=True)
+
+        self.assertTrue(result.__vers_raw__[1] is state)
+        self.assertEqual(result.attr, 1)
+
+    def test_from_dict_lazy_trusted(self):
+        validator = mock.Mock(side_effect=lambda x: x)
+        TestVObject = _upgraded_vobject(validator)
+
+        result = TestVObject.from_dict(
+            {'__version__': 1, 'attr': 1, 'old': 2}, trusted=True,
+            lazy=True)
+
+        self.assertFalse(validator.called)
+        self.assertEqual(result.to_dict(),
+                         {'__version__': 2, 'attr': 1, 'new': 4})
+        validator.assert_called_once_with(4)
+
+    def test_from_dict_lazy_proxy(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                name = attribute.Attribute()
+
+            class Schema2(Schema1):
+                __version__ = 2
+                name = None
+                first = attribute.Attribute()
+                last = attribute.Attribute()
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    state['first'], state['last'] = state.pop('name').split()
+                    return state
+
+                @decorators.downgrader(1)
+                def downgrade(cls, state):
+                    state['name'] = '%s %s' % (state.pop('first'),
+                                               state.pop('last'))
+                    return state
+
+        result = TestVObject.from_dict(
+            {'__version__': 1, 'name': 'Alice Smith'}, lazy=True)
+
+        self.assertEqual(result.__version__[1].name, 'Alice Smith')
+        self.assertEqual(result.first, 'Alice')
+
+    def test_from_dict_lazy_setstate_unmodified(self):
+        TestVObject = _setstate_vobject()
+        state = {'__version__': 1, 'a': 1}
+
+        result = TestVObject.from_dict(state, take=True, lazy=True)
+
+        self.assertEqual(result.b, 0)
+        self.assertEqual(state, {'__version__': 1, 'a': 1})
+
+    def test_from_dicts_lazy(self):
+        validator = mock.Mock(side_effect=lambda x: x)
+        TestVObject = _upgraded_vobject(validator)
+        states = [
+            {'__version__': 1, 'attr': 1, 'old': 2},
+            {'__version__': 2, 'attr': 2, 'new': 5},
+        ]
+
+        result = TestVObject.from_dicts(states, chunk_size=1, lazy=True)
+
+        self.assertFalse(validator.called)
+        self.assertEqual(result[1].new, 5)
+        self.assertEqual(validator.call_count, 2)
+        self.assertEqual([obj.to_dict() for obj in result], [
+            {'__version__': 2, 'attr': 1, 'new': 4},
+            {'__version__': 2, 'attr': 2, 'new': 5},
+        ])
+
+    def test_lazy_values_class(self):
+        self.assertTrue(isinstance(vobject.VObject.__vers_values__,
+                                   vobject.LazyValues))
+
+    def test_lazy_values_unset(self):
+        obj = object.__new__(vobject.VObject)
+
+        self.assertRaises(AttributeError, getattr, obj, '__vers_values__')
+
+
+def _lazy_vobject(calls):
+    class TestVObject(vobject.VObject):
+        class Schema1(schema.Schema):
+            __version__ = 1
+            name = attribute.Attribute()
+            salary = attribute.Attribute(validate=int)
+
+        class Schema2(Schema1):
+            __version__ = 2
+            name = None
+            first = attribute.Attribute()
+            last = attribute.Attribute()
+            salary = attribute.Attribute(getstate=str)
+            title = attribute.Attribute()
+
+            @decorators.upgrader
+            def upgrade(cls, state):
+                state['first'], state['last'] = state.pop('name').split()
+                state['title'] = None
+                return state
+
+            @decorators.downgrader(1, depends=('first', 'last'),
+                                   produces=('name',))
+            def downgrade(cls, state):
+                calls.append(dict(state))
+                state['name'] = '%s %s' % (state.pop('first'),
+                                           state.pop('last'))
+                del state['title']
+                return state
+
+    return TestVObject
+
+
+class LazyAttributeTest(unittest.TestCase):
+    def test_lazy_metadata(self):
+        TestVObject = _lazy_vobject([])
+
+        self.assertEqual(TestVObject.__vers_lazy__, {
+            1: {
+                'name': None,
+                'salary': (TestVObject.Schema2.__vers_attrs__['salary'],
+                           TestVObject.Schema1.__vers_attrs__['salary']),
+            },
+        })
+        self.assertEqual(TestVObject.__vers_invalidates__, {
+            'first': frozenset([1, (1, 'name')]),
+            'last': frozenset([1, (1, 'name')]),
+            'salary': frozenset([1, (1, 'name')]),
+            'title': frozenset(),
+        })
+
+    def test_lazy_passthrough(self):
+        calls = []
+        TestVObject = _lazy_vobject(calls)
+        obj = TestVObject(first='Alice', last='Smith', salary=10,
+                          title='CEO')
+
+        self.assertEqual(obj.__version__[1].salary, 10)
+        self.assertEqual(calls, [])
+        self.assertEqual(obj.__vers_cache__, None)
+
+        obj.salary = 20
+
+        self.assertEqual(obj.__version__[1].salary, 20)
+        self.assertEqual(calls, [])
+
+    def test_lazy_produced(self):
+        calls = []
+        TestVObject = _lazy_vobject(calls)
+        obj = TestVObject(first='Alice', last='Smith', salary=10,
+                          title='CEO')
+        v1 = obj.__version__[1]
+
+        self.assertEqual(v1.name, 'Alice Smith')
+        self.assertEqual(v1.name, 'Alice Smith')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(obj.__vers_cache__, {(1, 'name'): 'Alice Smith'})
+
+        obj.title = 'CTO'
+
+        self.assertEqual(v1.name, 'Alice Smith')
+        self.assertEqual(len(calls), 1)
+
+        obj.last = 'Jones'
+
+        self.assertEqual(v1.name, 'Alice Jones')
+        self.assertEqual(len(calls), 2)
+
+    def test_lazy_full(self):
+        calls = []
+        TestVObject = _lazy_vobject(calls)
+        obj = TestVObject(first='Alice', last='Smith', salary=10,
+                          title='CEO')
+        v1 = obj.__version__[1]
+
+        self.assertEqual(v1.to_dict(), {
+            '__version__': 1,
+            'name': 'Alice Smith',
+            'salary': 10,
+        })
+        self.assertEqual(len(calls), 1)
+
+        # Served from the full schema object now
+        self.assertEqual(v1.name, 'Alice Smith')
+        self.assertEqual(len(calls), 1)
+
+    def test_lazy_missing(self):
+        class TestVObject(vobject.VObject):
+            class Schema1(schema.Schema):
+                __version__ = 1
+                name = attribute.Attribute()
+
+            class Schema2(Schema1):
+                __version__ = 2
+                name = None
+                first = attribute.Attribute()
+
+                @decorators.upgrader
+                def upgrade(cls, state):
+                    return {'first': state['name']}
+
+                @decorators.downgrader(1, produces=('name',))
+                def downgrade(cls, state):
+                    return {}
+
+        obj = TestVObject(first='Alice')
+
+        self.assertRaises(ValueError, getattr, obj.__version__[1], 'name')
+
+    def test_lazy_undeclared(self):
+        class Schema1(schema.Schema):
+            __version__ = 1
+            name = attribute.Attribute()
+
+        class Schema2(Schema1):
+            __version__ = 2
+
+            @decorators.upgrader
+            def upgrade(cls, state):
+                return state
+
+            @decorators.downgrader(1, produces=('other',))
+            def downgrade(cls, state):
+                return state
+
+        def test_func():
+            class TestVObject(vobject.VObject):
+                S1 = Schema1
+                S2 = Schema2
+
+        self.assertRaises(TypeError, test_func)
+
+    def test_lazy_unproduced(self):
+        class Schema1(schema.Schema):
+            __version__ = 1
+            name = attribute.Attribute()
+            other = attribute.Attribute()
+
+        class Schema2(Schema1):
+            __version__ = 2
+            name = None
+            other = None
+            first = attribute.Attribute()
+
+            @decorators.upgrader
+            def upgrade(cls, state):
+                return state
+
+            @decorators.downgrader(1, produces=('name',))
+            def downgrade(cls, state):
+                return state
+
+        def test_func():
+            class TestVObject(vobject.VObject):
+                S1 = Schema1
+                S2 = Schema2
+
+        self.assertRaises(TypeError, test_func)
@@ -15,8 +15,10 @@
 
 from vobj.attribute import Attribute
 from vobj.decorators import upgrader, downgrader
+from vobj.mapping import rename, drop, add, compute
 from vobj.schema import Schema
-from vobj.vobject import VObject
+from vobj.vobject import VObject, trusted
 
 
-__all__ = ['Attribute', 'upgrader', 'downgrader', 'Schema', 'VObject']
+__all__ = ['Attribute', 'upgrader', 'downgrader', 'rename', 'drop', 'add',
+           'compute', 'Schema', 'VObject', 'trusted']
@@ -18,13 +18,27 @@
 unset = object()
 
 
+def identity(value):
+    """
+    The default validator and state serializer for attributes.
+    Returns its argument unchanged.  Schemas recognize this function
+    and omit the call entirely from specialized code.
+
+    :param value: The value to return.
+
+    :returns: The ``value`` argument.
+    """
+
+    return value
+
+
 class Attribute(object):
     """
     Describe an attribute.
     """
 
-    def __init__(self, default=unset, validate=lambda x: x,
-                 getstate=lambda x: x):
+    def __init__(self, default=unset, validate=identity,
+                 getstate=identity):
         """
         Initialize an ``Attribute`` object.
 
@@ -0,0 +1,346 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import struct
+
+import six
+
+
+# Identifies an encoded record, and the version of the format
+MAGIC = b'V\x01'
+
+# The tags identifying the type of each encoded value
+_NONE = ord('N')
+_TRUE = ord('T')
+_FALSE = ord('F')
+_INT = ord('i')
+_FLOAT = ord('f')
+_TEXT = ord('s')
+_BYTES = ord('b')
+_LIST = ord('l')
+_TUPLE = ord('t')
+_DICT = ord('d')
+
+_double = struct.Struct('<d')
+_byte = six.indexbytes
+
+
+def _tobytes(data):
+    """
+    Convert a slice of a buffer to a byte string.
+
+    :param data: A byte string, ``bytearray``, ``memoryview``, or
+                 slice of an ``mmap.mmap`` object.
+
+    :returns: A byte string.
+    """
+
+    if isinstance(data, memoryview):
+        return data.tobytes()
+
+    return bytes(data)
+
+
+def _write_varint(out, value):
+    """
+    Append an unsigned integer to a buffer, 7 bits per byte, least
+    significant group first.
+
+    :param out: The ``bytearray`` to append to.
+    :param value: The non-negative integer to append.
+    """
+
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buf, pos):
+    """
+    Read an unsigned integer written by ``_write_varint()``.
+
+    :param buf: The buffer to read from.
+    :param pos: The position of the integer in the buffer.
+
+    :returns: A tuple of the integer and the position following it.
+    """
+
+    # Most integers and lengths fit in a single byte
+    result = _byte(buf, pos)
+    pos += 1
+    if result < 0x80:
+        return result, pos
+
+    result &= 0x7f
+    shift = 7
+    while True:
+        byte = _byte(buf, pos)
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_bytes(out, data):
+    """
+    Append a length-prefixed byte string to a buffer.
+
+    :param out: The ``bytearray`` to append to.
+    :param data: The byte string.
+    """
+
+    _write_varint(out, len(data))
+    out += data
+
+
+def _read_bytes(buf, pos):
+    """
+    Read a byte string written by ``_write_bytes()``.
+
+    :param buf: The buffer to read from.
+    :param pos: The position of the byte string in the buffer.
+
+    :returns: A tuple of the byte string and the position following
+              it.
+    """
+
+    length, pos = _read_varint(buf, pos)
+    end = pos + length
+    if end > len(buf):
+        raise IndexError(end)
+
+    data = buf[pos:end]
+    if not isinstance(data, bytes):
+        data = _tobytes(data)
+
+    return data, end
+
+
+def encode_value(out, value):
+    """
+    Append an encoded value to a buffer.  ``None``, booleans,
+    integers, floats, text and byte strings, and lists, tuples, and
+    dictionaries of these may be encoded; anything else raises a
+    ``TypeError``.
+
+    :param out: The ``bytearray`` to append to.
+    :param value: The value to encode.
+    """
+
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, six.integer_types):
+        # Zigzag encoding keeps small negative numbers small
+        out.append(_INT)
+        _write_varint(out, value << 1 if value >= 0 else (~value << 1) | 1)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _double.pack(value)
+    elif isinstance(value, six.text_type):
+        out.append(_TEXT)
+        _write_bytes(out, value.encode('utf-8'))
+    elif isinstance(value, six.binary_type):
+        out.append(_BYTES)
+        _write_bytes(out, value)
+    elif isinstance(value, (list, tuple)):
+        out.append(_TUPLE if isinstance(value, tuple) else _LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            encode_value(out, item)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            encode_value(out, key)
+            encode_value(out, item)
+    else:
+        raise TypeError("cannot encode value of type '%s'" %
+                        type(value).__name__)
+
+
+def decode_value(buf, pos):
+    """
+    Decode a value written by ``encode_value()``.
+
+    :param buf: The buffer to read from.  This may be a byte string,
+                a ``bytearray``, or a ``memoryview``.
+    :param pos: The position of the value in the buffer.
+
+    :returns: A tuple of the value and the position following it.
+    """
+
+    tag = _byte(buf, pos)
+    pos += 1
+
+    if tag == _NONE:
+        return None, pos
+    elif tag == _TRUE:
+        return True, pos
+    elif tag == _FALSE:
+        return False, pos
+    elif tag == _INT:
+        value, pos = _read_varint(buf, pos)
+        return (~(value >> 1) if value & 1 else value >> 1), pos
+    elif tag == _FLOAT:
+        return _double.unpack_from(buf, pos)[0], pos + 8
+    elif tag == _TEXT:
+        value, pos = _read_bytes(buf, pos)
+        return value.decode('utf-8'), pos
+    elif tag == _BYTES:
+        return _read_bytes(buf, pos)
+    elif tag in (_LIST, _TUPLE):
+        count, pos = _read_varint(buf, pos)
+        items = []
+        for _i in range(count):
+            item, pos = decode_value(buf, pos)
+            items.append(item)
+        return (tuple(items) if tag == _TUPLE else items), pos
+    elif tag == _DICT:
+        count, pos = _read_varint(buf, pos)
+        items = {}
+        for _i in range(count):
+            key, pos = decode_value(buf, pos)
+            items[key], pos = decode_value(buf, pos)
+        return items, pos
+
+    raise ValueError("unknown value tag %d at offset %d" % (tag, pos - 1))
+
+
+def skip_value(buf, pos):
+    """
+    Skip over a value written by ``encode_value()``, without decoding
+    it.
+
+    :param buf: The buffer to read from.
+    :param pos: The position of the value in the buffer.
+
+    :returns: The position following the value.
+    """
+
+    tag = _byte(buf, pos)
+    pos += 1
+
+    if tag in (_NONE, _TRUE, _FALSE):
+        return pos
+    elif tag == _INT:
+        return _read_varint(buf, pos)[1]
+    elif tag == _FLOAT:
+        return pos + 8
+    elif tag in (_TEXT, _BYTES):
+        length, pos = _read_varint(buf, pos)
+        return pos + length
+    elif tag in (_LIST, _TUPLE):
+        count, pos = _read_varint(buf, pos)
+        for _i in range(count):
+            pos = skip_value(buf, pos)
+        return pos
+    elif tag == _DICT:
+        count, pos = _read_varint(buf, pos)
+        for _i in range(2 * count):
+            pos = skip_value(buf, pos)
+        return pos
+
+    raise ValueError("unknown value tag %d at offset %d" % (tag, pos - 1))
+
+
+def encode(name, sch_obj):
+    """
+    Encode a schema object as a record.  The record starts with a
+    header giving the name of the versioned object class, the version
+    of the schema, and the number of values, followed by the values
+    of the attributes, in the order of the schema's
+    "__vers_fields__".  The values are those the schema's
+    ``__getstate__()`` returns.
+
+    :param name: The name of the ``VObject`` subclass; see its
+                 "__vers_name__" attribute.
+    :param sch_obj: The schema object to encode.
+
+    :returns: The encoded record, as a byte string.
+    """
+
+    state = sch_obj.__getstate__()
+    fields = sch_obj.__vers_fields__
+
+    out = bytearray(MAGIC)
+    _write_bytes(out, name.encode('utf-8'))
+    _write_varint(out, state['__version__'])
+    _write_varint(out, len(fields))
+    for key in fields:
+        encode_value(out, state[key])
+
+    return bytes(out)
+
+
+def decode_header(buf):
+    """
+    Decode the header of a record written by ``encode()``.  Raises a
+    ``ValueError`` if the header is invalid.
+
+    :param buf: The buffer containing the record.  This may be a byte
+                string, a ``bytearray``, or a ``memoryview``.
+
+    :returns: A tuple of the name of the ``VObject`` subclass, the
+              version, the number of values, and the position of the
+              first value.
+    """
+
+    if _tobytes(buf[:len(MAGIC)]) != MAGIC:
+        raise ValueError("not an encoded versioned object")
+
+    try:
+        name, pos = _read_bytes(buf, len(MAGIC))
+        vers, pos = _read_varint(buf, pos)
+        count, pos = _read_varint(buf, pos)
+    except IndexError:
+        raise ValueError("truncated versioned object header")
+
+    return name.decode('utf-8'), vers, count, pos
+
+
+def decode(buf):
+    """
+    Decode a record written by ``encode()``.  Raises a ``ValueError``
+    if the record is invalid.
+
+    :param buf: The buffer containing the record.  This may be a byte
+                string, a ``bytearray``, or a ``memoryview``.
+
+    :returns: A tuple of the name of the ``VObject`` subclass, the
+              version, and a list of the values, in the order of the
+              "__vers_fields__" of the schema for that version.
+    """
+
+    name, vers, count, pos = decode_header(buf)
+
+    values = []
+    try:
+        for _i in range(count):
+            value, pos = decode_value(buf, pos)
+            values.append(value)
+    except (IndexError, struct.error):
+        raise ValueError("truncated versioned object")
+
+    if pos != len(buf):
+        raise ValueError("%d extra bytes after versioned object" %
+                         (len(buf) - pos))
+
+    return name, vers, values
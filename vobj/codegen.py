@@ -0,0 +1,86 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import six
+
+
+class Namer(object):
+    """
+    Helper for building up the global namespace of a generated
+    function.  Objects the generated code needs to refer to are
+    registered with ``bind()``, which returns a unique identifier
+    usable in the generated source.
+    """
+
+    def __init__(self, **env):
+        """
+        Initialize a ``Namer`` object.
+
+        :param env: Initial names to make available to the generated
+                    code.
+        """
+
+        self.env = env
+        self._count = 0
+
+    def bind(self, prefix, value):
+        """
+        Make a value available to the generated code.
+
+        :param prefix: A prefix for the generated identifier, to make
+                       the generated source easier to read.
+        :param value: The value to make available.
+
+        :returns: The identifier the generated code should use to
+                  refer to ``value``.
+        """
+
+        name = '_%s_%d' % (prefix, self._count)
+        self._count += 1
+        self.env[name] = value
+
+        return name
+
+
+def make_function(name, lines, env, filename=None):
+    """
+    Compile a function from generated source.
+
+    :param name: The name of the function being defined.  The source
+                 must contain a definition of a function with this
+                 name.
+    :param lines: A list of the lines of source code.
+    :param env: A dictionary to use as the global namespace of the
+                function.
+    :param filename: The file name to report in tracebacks.  Defaults
+                     to a name derived from ``name``.
+
+    :returns: The compiled function.  The function will have a
+              ``__vers_generated__`` attribute set to ``True`` and a
+              ``__vers_source__`` attribute containing the source
+              code.
+    """
+
+    source = '\n'.join(lines) + '\n'
+    code = compile(source, filename or '<vobj %s>' % name, 'exec')
+
+    namespace = {}
+    six.exec_(code, env, namespace)
+
+    func = namespace[name]
+    func.__vers_generated__ = True
+    func.__vers_source__ = source
+
+    return func
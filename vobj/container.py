@@ -0,0 +1,421 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import struct
+
+from vobj import binary
+
+
+# Identifies a container file, and the version of the format; it
+# appears at both ends of the file
+MAGIC = b'VOBJC\x01'
+
+# The offsets in the index are little-endian 64-bit integers
+_offset = struct.Struct('<Q')
+
+# The trailer holds the offsets of the footer and of the index
+_trailer = struct.Struct('<QQ')
+
+
+def _states(fields, vers, rows):
+    """
+    Turn rows of values into state dictionaries.
+
+    :param fields: The names of the fields of the rows.
+    :param vers: The version of the rows.
+    :param rows: A list of the lists of values of the rows.
+
+    :returns: A list of state dictionaries.
+    """
+
+    states = []
+    for values in rows:
+        state = dict(zip(fields, values))
+        state['__version__'] = vers
+        states.append(state)
+
+    return states
+
+
+class Writer(object):
+    """
+    Write versioned objects to a container file.  A container holds
+    any number of objects, of any number of ``VObject`` subclasses and
+    versions; the objects of each class and version form a group.
+    Each object is stored as a row: a JSON array of the number of its
+    group, followed by the values of its attributes, in the order of
+    the "__vers_fields__" of its schema.  The rows together form a
+    single JSON array, so they can all be decoded at once.  The
+    footer, written by ``close()``, describes each group once, naming
+    its class, version, and fields, and is followed by an index of
+    the offsets of the rows, allowing random access.  See ``Reader``.
+    """
+
+    def __init__(self, stream):
+        """
+        Initialize a ``Writer`` object.
+
+        :param stream: A binary file object, opened for writing.  The
+                       container is written starting at the current
+                       position.  The stream is not closed by the
+                       ``Writer``.
+        """
+
+        self._stream = stream
+        self._pos = len(MAGIC) + 1
+        self._groups = {}
+        self._table = []
+        self._offsets = []
+        self._closed = False
+
+        stream.write(MAGIC + b'[')
+
+    def __enter__(self):
+        """
+        Enter a context.  The ``Writer`` is closed when the context
+        is exited.
+
+        :returns: The ``Writer`` object.
+        """
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        """
+        Exit a context, closing the ``Writer``.
+        """
+
+        self.close()
+
+    def __len__(self):
+        """
+        Retrieve the number of objects written.
+
+        :returns: The number of objects written.
+        """
+
+        return len(self._offsets)
+
+    def write(self, obj):
+        """
+        Write a versioned object to the container.  The attribute
+        values must be representable in JSON; a ``TypeError`` is
+        raised otherwise.  As with ``to_dict()`` and ``json``, tuples
+        are read back as lists.
+
+        :param obj: The ``VObject`` instance to write, or a proxy for
+                    one of its older versions, such as
+                    ``obj.__version__[1]``.
+        """
+
+        if self._closed:
+            raise ValueError("write to closed container")
+
+        sch_obj = obj.__vers_values__
+        state = sch_obj.__getstate__()
+        key = (obj.__vers_name__, state['__version__'])
+
+        # Describe each new group in the footer
+        group = self._groups.get(key)
+        if group is None:
+            group = len(self._table)
+            self._groups[key] = group
+            self._table.append(key + (sch_obj.__vers_fields__,))
+
+        row = [group]
+        row.extend(state[field] for field in self._table[group][2])
+        data = json.dumps(row, separators=(',', ':')).encode('utf-8')
+
+        # Rows are separated by commas
+        if self._offsets:
+            self._stream.write(b',')
+            self._pos += 1
+        self._stream.write(data)
+        self._offsets.append(self._pos)
+        self._pos += len(data)
+
+    def write_many(self, objs):
+        """
+        Write versioned objects to the container.
+
+        :param objs: An iterable of ``VObject`` instances or proxies;
+                     see ``write()``.
+
+        :returns: The number of objects written.
+        """
+
+        count = 0
+        for obj in objs:
+            self.write(obj)
+            count += 1
+
+        return count
+
+    def close(self):
+        """
+        Write the footer, completing the container.  Further calls
+        have no effect.
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+
+        footer = self._pos + 1
+        table = json.dumps({
+            'groups': [[name, vers, list(fields)]
+                       for name, vers, fields in self._table],
+        }, separators=(',', ':')).encode('utf-8')
+
+        out = bytearray(b']')
+        out += table
+        for offset in self._offsets:
+            out += _offset.pack(offset)
+        out += _trailer.pack(footer, footer + len(table))
+        out += MAGIC
+
+        self._stream.write(bytes(out))
+        self._stream.flush()
+
+
+class Reader(object):
+    """
+    Read versioned objects from a container file written by
+    ``Writer``.  Objects may be loaded one at a time, by position, or
+    all at once with ``load()``, which upgrades all the objects of
+    each group together.
+    """
+
+    def __init__(self, data, classes, trusted=False):
+        """
+        Initialize a ``Reader`` object.  Raises a ``ValueError`` if
+        the data is not a complete container.
+
+        :param data: The contents of the container.  This may be a
+                     byte string, a ``bytearray``, a ``memoryview``, or
+                     an ``mmap.mmap`` object, which avoids reading the
+                     whole file for random access.
+        :param classes: An iterable of the ``VObject`` subclasses of
+                        the objects in the container.  The classes are
+                        matched to the groups by their "__vers_name__"
+                        attribute.
+        :param trusted: If ``True``, the container is trusted, for
+                        instance because it was written by the
+                        application itself; see
+                        ``VObject.from_dict()``.  Defaults to
+                        ``False``.
+        """
+
+        self._data = data
+        self._classes = dict((cls.__vers_name__, cls) for cls in classes)
+        self._trusted = trusted
+
+        end = len(data) - _trailer.size - len(MAGIC)
+        if (end < len(MAGIC) or
+                binary._tobytes(data[:len(MAGIC)]) != MAGIC or
+                binary._tobytes(data[-len(MAGIC):]) != MAGIC):
+            raise ValueError("not a complete versioned object container")
+
+        self._footer, self._index = _trailer.unpack_from(data, end)
+        if (not len(MAGIC) + 2 <= self._footer <= self._index <= end or
+                (end - self._index) % _offset.size):
+            raise ValueError("invalid versioned object container trailer")
+        self._count = (end - self._index) // _offset.size
+
+        try:
+            table = self._decode(self._footer, self._index)
+            self._groups = [(name, vers, tuple(fields))
+                            for name, vers, fields in table['groups']]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("invalid versioned object container footer")
+
+    def __len__(self):
+        """
+        Retrieve the number of objects in the container.
+
+        :returns: The number of objects.
+        """
+
+        return self._count
+
+    def __getitem__(self, idx):
+        """
+        Load the object at a given position in the container.  Only
+        that object's row is read.
+
+        :param idx: The position of the object.  Negative positions
+                    count from the end.
+
+        :returns: A new instance of the object's ``VObject`` subclass.
+        """
+
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError("container index out of range")
+
+        # Each row is followed by a comma, or by the closing bracket
+        start = self._offset(idx)
+        end = (self._offset(idx + 1) if idx + 1 < self._count
+               else self._footer) - 1
+
+        row = self._decode(start, end)
+        if not isinstance(row, list) or not row:
+            raise ValueError("invalid versioned object container row %d" %
+                             idx)
+
+        return self._load(row[0], [row[1:]])[0]
+
+    def __iter__(self):
+        """
+        Iterate over the objects in the container, loading each one
+        as it is reached.  See ``load()`` to load all the objects at
+        once.
+
+        :returns: An iterator over new ``VObject`` instances.
+        """
+
+        for idx in range(self._count):
+            yield self[idx]
+
+    def _offset(self, idx):
+        """
+        Look up the offset of a row in the index.
+
+        :param idx: The position of the object.
+
+        :returns: The offset of the row.
+        """
+
+        return _offset.unpack_from(self._data,
+                                   self._index + idx * _offset.size)[0]
+
+    def _decode(self, start, end):
+        """
+        Decode a portion of the container as JSON.  Raises a
+        ``ValueError`` if it is invalid.
+
+        :param start: The offset of the start of the portion.
+        :param end: The offset following the portion.
+
+        :returns: The decoded value.
+        """
+
+        data = binary._tobytes(self._data[start:end])
+        return json.loads(data.decode('utf-8'))
+
+    def _rows(self):
+        """
+        Decode all the rows at once.
+
+        :returns: A list of the rows, each a list of the number of its
+                  group followed by its values.
+        """
+
+        rows = self._decode(len(MAGIC), self._footer)
+        if (not isinstance(rows, list) or len(rows) != self._count or
+                not all(isinstance(row, list) and row for row in rows)):
+            raise ValueError("invalid versioned object container rows")
+
+        return rows
+
+    def _group(self, group):
+        """
+        Look up the description of a group.  Raises a ``ValueError``
+        if there is no such group.
+
+        :param group: The number of the group.
+
+        :returns: A tuple of the name of the group's class, its
+                  version, and a tuple of the names of its fields.
+        """
+
+        if (not isinstance(group, int) or isinstance(group, bool) or
+                not 0 <= group < len(self._groups)):
+            raise ValueError("invalid versioned object container group %r" %
+                             (group,))
+
+        return self._groups[group]
+
+    def _load(self, group, rows):
+        """
+        Load the objects of a group.
+
+        :param group: The number of the group.
+        :param rows: A list of the lists of values of the objects.
+
+        :returns: A list of new instances of the group's ``VObject``
+                  subclass.
+        """
+
+        name, vers, fields = self._group(group)
+        try:
+            cls = self._classes[name]
+        except KeyError:
+            raise ValueError("no class provided for objects of class '%s'" %
+                             name)
+
+        # Rows in the order of the schema need no state dictionaries;
+        # otherwise, the fields are matched by name
+        schemas = cls.__vers_schemas__
+        if (0 < vers <= len(schemas) and
+                fields == schemas[vers - 1].__vers_fields__):
+            return cls.__vers_load_rows__(vers, rows, self._trusted)
+
+        return cls.from_dicts(_states(fields, vers, rows),
+                              trusted=self._trusted, take=True)
+
+    def states(self):
+        """
+        Decode the state dictionaries of all the objects in the
+        container, without loading them.
+
+        :returns: A list of tuples of the name of each object's class
+                  and its state dictionary.
+        """
+
+        result = []
+        for row in self._rows():
+            name, vers, fields = self._group(row[0])
+            result.append((name, _states(fields, vers, [row[1:]])[0]))
+
+        return result
+
+    def load(self):
+        """
+        Load all the objects in the container.  All the rows are
+        decoded at once, then the objects of each group are loaded
+        together, so the upgraders for each class and version are
+        looked up once, and batch upgraders see the whole group.
+        Objects of the latest version are loaded without building
+        state dictionaries.
+
+        :returns: A list of new ``VObject`` instances, in the order
+                  they were written.
+        """
+
+        groups = {}
+        for idx, row in enumerate(self._rows()):
+            indexes, rows = groups.setdefault(row[0], ([], []))
+            indexes.append(idx)
+            rows.append(row[1:])
+
+        result = [None] * self._count
+        for group, (indexes, rows) in groups.items():
+            for idx, obj in zip(indexes, self._load(group, rows)):
+                result[idx] = obj
+
+        return result
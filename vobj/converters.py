@@ -13,6 +13,193 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from vobj import codegen
+from vobj import mapping
+from vobj import schema
+
+
+def _call_batch(converter, states):
+    """
+    Call a batch converter, verifying that it returned the expected
+    number of states.
+
+    :param converter: The batch converter.
+    :param states: A list of the states to convert.
+
+    :returns: A list of the converted states.
+    """
+
+    result = converter(states)
+    if len(result) != len(states):
+        raise ValueError("batch converter returned %d states, expecting %d" %
+                         (len(result), len(states)))
+
+    return result
+
+
+def _count_rows(cols):
+    """
+    Determine the number of rows in a dictionary of columns.  Raises a
+    ``ValueError`` if the columns are not all the same length.
+
+    :param cols: A dictionary mapping attribute names to sequences of
+                 values.
+
+    :returns: The number of rows.
+    """
+
+    lengths = set(len(col) for col in cols.values())
+    if len(lengths) > 1:
+        raise ValueError("columns have differing lengths")
+
+    return lengths.pop() if lengths else 0
+
+
+def _to_rows(cols, nrows):
+    """
+    Transpose a dictionary of columns into a list of states.
+
+    :param cols: A dictionary mapping attribute names to sequences of
+                 values.
+    :param nrows: The number of rows.
+
+    :returns: A list of state dictionaries.
+    """
+
+    if not cols:
+        return [{} for i in range(nrows)]
+
+    names = list(cols.keys())
+    return [dict(zip(names, values))
+            for values in zip(*[cols[name] for name in names])]
+
+
+def _to_columns(states):
+    """
+    Transpose a list of states into a dictionary of columns.  The
+    attribute names are taken from the first state.
+
+    :param states: A non-empty list of state dictionaries.
+
+    :returns: A dictionary mapping attribute names to lists of
+              values.
+    """
+
+    return dict((name, [state[name] for state in states])
+                for name in states[0])
+
+
+def _call_columnar(converter, states):
+    """
+    Call a columnar converter on a list of states.
+
+    :param converter: The columnar converter.
+    :param states: A non-empty list of the states to convert.
+
+    :returns: A list of the converted states.
+    """
+
+    cols = converter(_to_columns(states))
+    if _count_rows(cols) != len(states):
+        raise ValueError("columnar converter returned %d rows, "
+                         "expecting %d" % (_count_rows(cols), len(states)))
+
+    return _to_rows(cols, len(states))
+
+
+def _call_rows(converters, cols, nrows):
+    """
+    Call a sequence of row-wise converters on a dictionary of
+    columns.  The columns are transposed into states, the converters
+    are applied in order, and the results are transposed back.
+
+    :param converters: A list of the converters, in the order they
+                       are to be applied.
+    :param cols: A dictionary mapping attribute names to sequences of
+                 values.
+    :param nrows: The number of rows.
+
+    :returns: A dictionary mapping attribute names to lists of
+              values.
+    """
+
+    states = _to_rows(cols, nrows)
+    for converter in converters:
+        if getattr(converter, '__vers_batch__', False):
+            states = _call_batch(converter, states)
+        else:
+            states = [converter(state) for state in states]
+
+    return _to_columns(states)
+
+
+# The longest run of plain converters whose calls are inlined into a
+# compiled conversion; see Converters.fuse()
+_INLINE_MAX = 32
+
+
+def _gen_run(namer, run):
+    """
+    Generate the source code for calling a run of plain converters in
+    a compiled conversion.
+
+    :param namer: An instance of ``vobj.codegen.Namer``.
+    :param run: A list of the converters, in the order they are to be
+                applied.
+
+    :returns: A list of source code lines.
+    """
+
+    if len(run) > _INLINE_MAX:
+        return [
+            '    for cvt in %s:' % namer.bind('run', tuple(run)),
+            '        state = cvt(state)',
+        ]
+
+    return ['    state = %s(state)' % namer.bind('cvt', converter)
+            for converter in run]
+
+
+def _segments(converters):
+    """
+    Group converters into the segments of a compiled conversion: runs
+    of plain converters, whose calls are generated by ``_gen_run()``,
+    and single batch or columnar converters.  ``Mapping`` converters
+    are replaced by their functions, skipping ``Mapping.__call__()``.
+
+    :param converters: An iterable of the converters, in the order
+                       they are to be applied.
+
+    :returns: A list of segments, in the order they are to be
+              applied.  Each is a tuple of "run" and a tuple of the
+              functions in the run, or of "batch" or "columnar" and
+              the converter.
+    """
+
+    segments = []
+    run = []
+    for converter in converters:
+        if isinstance(converter, mapping.Mapping):
+            converter = converter.function
+
+        if getattr(converter, '__vers_batch__', False):
+            kind = 'batch'
+        elif getattr(converter, '__vers_columnar__', False):
+            kind = 'columnar'
+        else:
+            run.append(converter)
+            continue
+
+        if run:
+            segments.append(('run', tuple(run)))
+            run = []
+        segments.append((kind, converter))
+
+    if run:
+        segments.append(('run', tuple(run)))
+
+    return segments
+
 
 class Converters(list):
     """
@@ -35,31 +222,363 @@ class Converters(list):
         super(Converters, self).__init__(conversions)
 
         self._target_schema = target
+        self._loader = None
+        self._segments = None
+        self._direct = None
+
+    def fuse(self):
+        """
+        Combine adjacent ``vobj.mapping.Mapping`` conversions, so that
+        they are performed by a single function call, and compile the
+        complete conversion into a single function.  The compiled
+        function avoids removing and restoring the "__version__" of
+        the state around the conversions, and the target schema
+        object is constructed without rechecking the version.  Note
+        that the result must not be modified.
+
+        :returns: A new ``Converters`` object performing the same
+                  conversions.
+        """
+
+        result = self.__class__(self._target_schema)
+        result._direct = self._direct
+        for converter in self:
+            # The conversions are applied in reverse order, so the
+            # new converter is applied before the previous one
+            if (result and isinstance(converter, mapping.Mapping) and
+                    isinstance(result[-1], mapping.Mapping)):
+                result[-1] = converter + result[-1]
+            else:
+                result.append(converter)
+
+        result._segments = _segments(reversed(result))
+        result._loader = result._compile(result._segments)
+
+        return result
 
-    def __call__(self, state):
+    def chain(self, converter):
+        """
+        Extend a compiled conversion with a conversion to be applied
+        before the others.  This produces the same result as
+        appending the converter to the ``Converters`` object this one
+        was fused from and fusing it again, but only the first
+        segment of the compiled conversion is rebuilt, so a chain of
+        upgraders can be built one step at a time in time linear in
+        the number of steps.  This object must have been produced by
+        ``fuse()`` or ``chain()``.
+
+        :param converter: The conversion to apply first.
+
+        :returns: A new ``Converters`` object performing the
+                  conversions.
+        """
+
+        result = self.__class__(self._target_schema, *self)
+        result._direct = self._direct
+        segments = list(self._segments)
+
+        if (result and isinstance(converter, mapping.Mapping) and
+                isinstance(result[-1], mapping.Mapping)):
+            # The combined mapping replaces the first function of the
+            # first run
+            converter = converter + result[-1]
+            result[-1] = converter
+            segments[0] = ('run', (converter.function,) + segments[0][1][1:])
+        else:
+            result.append(converter)
+            first = _segments([converter])[0]
+            if first[0] == 'run' and segments and segments[0][0] == 'run':
+                first = ('run', first[1] + segments.pop(0)[1])
+            segments.insert(0, first)
+
+        result._segments = segments
+        result._loader = result._compile(segments)
+
+        return result
+
+    def _compile(self, segments=None):
+        """
+        Compile the conversions and the construction of the target
+        schema object into a single function.
+
+        :param segments: The segments of the conversion, as returned
+                         by ``_segments()``.  If ``None``, they are
+                         computed from the conversions.
+
+        :returns: A function taking a state and an optional flag
+                  indicating whether to take ownership of the state
+                  (see ``__call__()``), and returning an instance of
+                  the target schema.
+        """
+
+        target = self._target_schema
+        namer = codegen.Namer(_call_batch=_call_batch,
+                              _call_columnar=_call_columnar)
+
+        # Construct the schema object directly if we can, skipping
+        # the do-nothing __init__(); the answer is kept, since
+        # checking the schema's classes is slow for deep hierarchies
+        if self._direct is None:
+            self._direct = bool(schema._standard(target, '__new__') and
+                                schema._standard(target, '__init__'))
+        if self._direct:
+            new = '%s(%s)' % (namer.bind('new', object.__new__),
+                              namer.bind('target', target))
+        else:
+            new = '%s()' % namer.bind('target', target)
+
+        lines = ['def load(state, take=False):']
+
+        if not self:
+            # Nothing to convert, so the state is not modified unless
+            # we're taking it
+            lines += [
+                '    sch_obj = %s' % new,
+                '    if take:',
+                '        sch_obj.__vers_takevalues__(state)',
+                '    else:',
+                '        sch_obj.__setstate__(state)',
+                '    return sch_obj',
+            ]
+        else:
+            lines.append("    del state['__version__']")
+
+            if segments is None:
+                segments = _segments(reversed(self))
+
+            # Inline the calls to the converters, except in long runs
+            # of plain converters, which are called in a loop to keep
+            # the cost of compiling long chains down
+            for kind, value in segments:
+                if kind == 'run':
+                    lines += _gen_run(namer, value)
+                    continue
+                elif kind == 'batch':
+                    call = '_call_batch(%s, [state])[0]'
+                else:
+                    call = '_call_columnar(%s, [state])[0]'
+                lines.append('    state = %s' %
+                             (call % namer.bind('cvt', value)))
+
+            lines += [
+                '    sch_obj = %s' % new,
+                '    if take:',
+                '        sch_obj.__vers_takevalues__(state)',
+                '    else:',
+                '        sch_obj.__vers_setvalues__(state)',
+                '    return sch_obj',
+            ]
+
+        return codegen.make_function(
+            'load', lines, namer.env,
+            '<vobj %s loader>' % target.__name__)
+
+    def __call__(self, state, take=False):
         """
         Apply conversions to a given state.  The conversions are
         applied in reverse order.
 
         :param state: The state to apply the conversions to.  Note
                       that this state will be modified in place.
+        :param take: If ``True``, the target schema object takes
+                     ownership of the state, and may use it to store
+                     its attribute values; see
+                     ``Schema.__vers_takevalues__()``.  The version of
+                     the state must already have been checked.  The
+                     caller must not use the state afterwards.
 
         :returns: An instance of the target schema passed to the
                   constructor.
         """
 
+        # Use the compiled conversion, if we have one
+        if self._loader is not None:
+            return self._loader(state, take)
+
+        state = self.convert(state)
+
+        # Generate the schema object
+        sch_obj = self._target_schema()
+        if take:
+            sch_obj.__vers_takevalues__(state)
+        else:
+            # We now have an appropriate state; set the version...
+            state['__version__'] = self._target_schema.__version__
+            sch_obj.__setstate__(state)
+
+        return sch_obj
+
+    def convert(self, state):
+        """
+        Apply conversions to a given state, without constructing a
+        target schema object.  The conversions are applied in reverse
+        order.
+
+        :param state: The state to apply the conversions to.  Note
+                      that this state will be modified in place.
+
+        :returns: The converted state, which will not have a
+                  "__version__" key.  The values are not passed
+                  through the attribute validators.
+        """
+
         # Start by dropping the __version__
         del state['__version__']
 
         # Now, call each converter in turn
         for converter in reversed(self):
-            state = converter(state)
+            if getattr(converter, '__vers_batch__', False):
+                state = _call_batch(converter, [state])[0]
+            elif getattr(converter, '__vers_columnar__', False):
+                state = _call_columnar(converter, [state])[0]
+            else:
+                state = converter(state)
 
-        # We now have an appropriate state; set the version...
-        state['__version__'] = self._target_schema.__version__
+        return state
 
-        # Generate the schema object
-        sch_obj = self._target_schema()
-        sch_obj.__setstate__(state)
+    def convert_many(self, states, take=False):
+        """
+        Apply conversions to a sequence of states.  This produces the
+        same results as calling the ``Converters`` object on each
+        state in turn, but the per-state overhead is lower, making it
+        suitable for converting large numbers of states with the same
+        version.  Each conversion is applied to all the states before
+        the next conversion is applied; batch converters are called
+        once, with the list of all the states.
 
-        return sch_obj
+        :param states: An iterable of the states to apply the
+                       conversions to.  If there are any conversions
+                       to apply, the states will be modified in place;
+                       otherwise, they are left untouched.
+        :param take: If ``True``, the target schema objects take
+                     ownership of the states; see ``__call__()``.
+
+        :returns: A list of instances of the target schema passed to
+                  the constructor.
+        """
+
+        target = self._target_schema
+        states = list(states)
+
+        # If there are no batch or columnar converters, the compiled
+        # conversion does the job with the least overhead
+        if self._loader is not None and not any(
+                getattr(converter, '__vers_batch__', False) or
+                getattr(converter, '__vers_columnar__', False)
+                for converter in self):
+            loader = self._loader
+            return [loader(state, take) for state in states]
+
+        if take:
+            if self:
+                states = self.convert_all(states)
+
+            result = []
+            for state in states:
+                sch_obj = target()
+                sch_obj.__vers_takevalues__(state)
+                result.append(sch_obj)
+
+            return result
+        elif self:
+            states = self.convert_all(states)
+
+            # We now have appropriate states; set the version...
+            sch_vers = target.__version__
+            for state in states:
+                state['__version__'] = sch_vers
+
+        # Generate the schema objects
+        result = []
+        for state in states:
+            sch_obj = target()
+            sch_obj.__setstate__(state)
+            result.append(sch_obj)
+
+        return result
+
+    def convert_all(self, states):
+        """
+        Apply conversions to a sequence of states, without
+        constructing target schema objects.  Each conversion is
+        applied to all the states before the next conversion is
+        applied; batch converters are called once, with the list of
+        all the states.
+
+        :param states: An iterable of the states to apply the
+                       conversions to.  Note that the states will be
+                       modified in place.
+
+        :returns: A list of the converted states, which will not have
+                  a "__version__" key.  The values are not passed
+                  through the attribute validators.
+        """
+
+        states = list(states)
+
+        # Start by dropping the __version__
+        for state in states:
+            del state['__version__']
+
+        # Now, call each converter in turn
+        for converter in reversed(self):
+            if not states:
+                break
+            elif getattr(converter, '__vers_batch__', False):
+                states = _call_batch(converter, states)
+            elif getattr(converter, '__vers_columnar__', False):
+                states = _call_columnar(converter, states)
+            else:
+                states = [converter(state) for state in states]
+
+        return states
+
+    def convert_columns(self, cols):
+        """
+        Apply conversions to a dictionary of columns.  Columnar
+        converters are called with the whole dictionary; runs of
+        other converters are applied to the individual states, with
+        the columns transposed into states and back around each run.
+        Note that no target schema object is constructed, so the
+        values are not passed through the attribute validators.
+
+        :param cols: A dictionary mapping attribute names to
+                     sequences of values, one element per state.  It
+                     must not contain a "__version__" key.  The
+                     dictionary itself is not modified, but the
+                     sequences are passed to columnar converters
+                     unchanged.
+
+        :returns: A dictionary mapping attribute names to sequences
+                  of values for the target schema.
+        """
+
+        nrows = _count_rows(cols)
+
+        # Without any rows, the row-wise converters can't tell us
+        # what the columns are; nothing to convert, anyway
+        if not nrows:
+            return dict((key, []) for key in
+                        self._target_schema.__vers_attrs__)
+
+        cols = dict(cols)
+        pending = []
+        for converter in reversed(self):
+            if not getattr(converter, '__vers_columnar__', False):
+                pending.append(converter)
+                continue
+
+            # Apply any pending row-wise converters
+            if pending:
+                cols = _call_rows(pending, cols, nrows)
+                pending = []
+
+            cols = converter(cols)
+            if _count_rows(cols) != nrows:
+                raise ValueError("columnar converter returned %d rows, "
+                                 "expecting %d" % (_count_rows(cols), nrows))
+
+        if pending:
+            cols = _call_rows(pending, cols, nrows)
+
+        return cols
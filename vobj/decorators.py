@@ -16,7 +16,20 @@
 import six
 
 
-def upgrader(version=None):
+def _check_modes(batch, columnar):
+    """
+    Sanity-check the calling convention flags of a converter
+    decorator.  Raises a ``TypeError`` if both are set.
+
+    :param batch: The value of the ``batch`` flag.
+    :param columnar: The value of the ``columnar`` flag.
+    """
+
+    if batch and columnar:
+        raise TypeError("Converters cannot be both batch and columnar")
+
+
+def upgrader(version=None, batch=False, columnar=False, cost=None):
     """
     A decorator for marking a method as an upgrader from an older
     version of a given object.  Can be used in two different ways:
@@ -36,7 +49,34 @@ def upgrader(version=None):
     dictionary.  Upgraders may modify the argument in place, if
     desired.
 
+    If ``batch`` is ``True``, the upgrader instead takes a list of
+    dictionaries of attributes, and must return a list of the same
+    length containing the upgraded dictionaries, in the same order.
+    When objects are loaded one at a time, a batch upgrader is called
+    with a list containing a single dictionary.
+
+    If ``columnar`` is ``True``, the upgrader instead takes a
+    dictionary mapping attribute names to sequences of values (one
+    element per state), and must return a dictionary of the same
+    form.  Columnar upgraders are used by ``VObject.upgrade_columns()``
+    to convert whole columns at once; when states are converted as
+    dictionaries, they are transposed into columns for the upgrader.
+
+    If ``cost`` is given, it is the estimated time taken to upgrade a
+    single state, in microseconds, and the chain of upgraders used to
+    upgrade a state from an older version is chosen to minimize the
+    total cost; see ``VObject.explain_upgrade()``.  Upgraders not
+    declaring a cost are assumed to have a cost of 1.  If no upgrader
+    declares a cost, the chain is chosen by always taking the longest
+    available step.
+
     :param version: The version number the upgrader converts from.
+    :param batch: If ``True``, the upgrader converts a list of
+                  states at a time.  Defaults to ``False``.
+    :param columnar: If ``True``, the upgrader converts a dictionary
+                     of columns.  Defaults to ``False``.
+    :param cost: The estimated cost of the upgrader, a non-negative
+                 number.
 
     :returns: If called with no arguments or with an integer version,
               returns a decorator.  If called with a callable, returns
@@ -46,8 +86,16 @@ def upgrader(version=None):
     def decorator(func):
         # Save the version to update from
         func.__vers_upgrader__ = version
+        func.__vers_batch__ = batch
+        func.__vers_columnar__ = columnar
+        func.__vers_cost__ = cost
         return func
 
+    _check_modes(batch, columnar)
+    if cost is not None and (
+            not isinstance(cost, (float,) + six.integer_types) or cost < 0):
+        raise TypeError("Invalid upgrader cost %r" % (cost,))
+
     # What is version?  It can be None, an int, or a callable,
     # depending on how @upgrader() was called
     if version is None:
@@ -70,7 +118,28 @@ def upgrader(version=None):
         raise TypeError("Invalid upgrader version number %r" % version)
 
 
-def downgrader(version):
+def _check_names(kind, names):
+    """
+    Sanity-check a sequence of attribute names passed to a converter
+    decorator.  Raises a ``TypeError`` if a bare string is passed,
+    which is almost certainly a mistake.
+
+    :param kind: The kind of names, for the error message.
+    :param names: The sequence of names, or ``None``.
+
+    :returns: A ``frozenset`` of the names, or ``None``.
+    """
+
+    if names is None:
+        return None
+    elif isinstance(names, six.string_types):
+        raise TypeError("Downgrader %s must be a sequence of attribute "
+                        "names" % kind)
+
+    return frozenset(names)
+
+
+def downgrader(version, columnar=False, depends=None, produces=None):
     """
     A decorator for marking a method as a downgrader to an older
     version of a given object.  Note that downgrader methods are
@@ -79,8 +148,34 @@ def downgrader(version):
     dictionary.  Downgraders may modify the argument in place, if
     desired.
 
+    If ``columnar`` is ``True``, the downgrader instead takes and
+    returns a dictionary mapping attribute names to sequences of
+    values, as for columnar upgraders.
+
+    Downgraded versions of an object are cached until the object is
+    modified.  By default, any modification discards all the cached
+    versions; if ``depends`` is given, the cached version produced by
+    this downgrader is only discarded when one of the listed
+    attributes, or an attribute also present in the older schema, is
+    modified.
+
+    If ``produces`` is given, it lists the attributes of the older
+    schema which the downgrader computes; the remaining attributes
+    must be present in this schema, and must be passed through
+    unchanged by the downgrader.  Reads of those attributes through
+    the older version of an object are then served directly from the
+    object, and the downgrader is only run when one of the listed
+    attributes is read.
+
     :param version: The version number the downgrader returns the
                     attributes for.  Must be provided.
+    :param columnar: If ``True``, the downgrader converts a
+                     dictionary of columns.  Defaults to ``False``.
+    :param depends: An optional sequence of the names of the
+                    attributes the downgrader reads.
+    :param produces: An optional sequence of the names of the
+                     attributes of the older schema the downgrader
+                     computes.
 
     :returns: A decorator.
     """
@@ -88,10 +183,16 @@ def downgrader(version):
     def decorator(func):
         # Save the version to downgrade to
         func.__vers_downgrader__ = version
+        func.__vers_columnar__ = columnar
+        func.__vers_depends__ = depends
+        func.__vers_produces__ = produces
         return func
 
     # Sanity-check the version number
     if not isinstance(version, six.integer_types) or version < 1:
         raise TypeError("Invalid downgrader version number %r" % version)
 
+    depends = _check_names('dependencies', depends)
+    produces = _check_names('products', produces)
+
     return decorator
@@ -0,0 +1,174 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from vobj import codegen
+
+
+class Mapping(object):
+    """
+    A declarative state conversion, built from a sequence of simple
+    steps: renaming, dropping, adding, and computing attributes.  The
+    steps are compiled into a single function when the ``Mapping`` is
+    created.  A ``Mapping`` may be used as an upgrader or downgrader
+    by passing it to the ``@upgrader`` or ``@downgrader`` decorators,
+    and two ``Mapping`` objects may be combined with ``+``; adjacent
+    ``Mapping`` objects in a chain of upgraders are combined
+    automatically.  ``Mapping`` objects are normally constructed
+    using the ``rename()``, ``drop()``, ``add()``, and ``compute()``
+    functions.
+    """
+
+    # Mappings always convert one state at a time
+    __vers_batch__ = False
+    __vers_columnar__ = False
+
+    def __init__(self, steps):
+        """
+        Initialize a ``Mapping`` object.
+
+        :param steps: A sequence of steps.  Each step is a tuple; the
+                      first element is one of "rename", "drop",
+                      "add", or "compute", and the remaining elements
+                      are the arguments of the function of the same
+                      name.
+        """
+
+        self.steps = tuple(steps)
+        self.function = self._compile()
+
+    def __call__(self, state):
+        """
+        Apply the conversion to a state.
+
+        :param state: The state to convert.  It is modified in place.
+
+        :returns: The converted state.
+        """
+
+        return self.function(state)
+
+    def __add__(self, other):
+        """
+        Combine two ``Mapping`` objects.
+
+        :param other: The ``Mapping`` to apply after this one.
+
+        :returns: A new ``Mapping`` object performing the steps of
+                  this ``Mapping``, followed by those of ``other``.
+        """
+
+        if not isinstance(other, Mapping):
+            return NotImplemented
+
+        return self.__class__(self.steps + other.steps)
+
+    def __repr__(self):
+        """
+        Return a representation of the ``Mapping``.
+
+        :returns: A string listing the steps.
+        """
+
+        return '<%s %s>' % (self.__class__.__name__, ', '.join(
+            '%s%r' % (step[0], step[1:]) for step in self.steps))
+
+    def _compile(self):
+        """
+        Compile the steps into a function.
+
+        :returns: A function taking a state and returning the
+                  converted state.
+        """
+
+        namer = codegen.Namer()
+        lines = ['def mapping(state):']
+
+        for step in self.steps:
+            if step[0] == 'rename':
+                lines.append('    state[%r] = state.pop(%r)' %
+                             (step[2], step[1]))
+            elif step[0] == 'drop':
+                lines.append('    del state[%r]' % (step[1],))
+            elif step[0] == 'add':
+                lines += [
+                    '    if %r not in state:' % (step[1],),
+                    '        state[%r] = %s' %
+                    (step[1], namer.bind('default', step[2])),
+                ]
+            elif step[0] == 'compute':
+                lines.append('    state[%r] = %s(state)' %
+                             (step[1], namer.bind('compute', step[2])))
+            else:
+                raise TypeError("unknown mapping step %r" % (step[0],))
+
+        lines.append('    return state')
+
+        return codegen.make_function('mapping', lines, namer.env)
+
+
+def rename(old, new):
+    """
+    Construct a ``Mapping`` which renames an attribute.
+
+    :param old: The name of the attribute in the original state.
+    :param new: The name of the attribute in the converted state.
+
+    :returns: A ``Mapping`` object.
+    """
+
+    return Mapping([('rename', old, new)])
+
+
+def drop(name):
+    """
+    Construct a ``Mapping`` which drops an attribute.
+
+    :param name: The name of the attribute to drop.
+
+    :returns: A ``Mapping`` object.
+    """
+
+    return Mapping([('drop', name)])
+
+
+def add(name, default):
+    """
+    Construct a ``Mapping`` which adds an attribute with a default
+    value.  If the attribute is already present, it is left alone.
+    Note that the same default value is used for every state, so it
+    should not be mutable.
+
+    :param name: The name of the attribute to add.
+    :param default: The value of the attribute.
+
+    :returns: A ``Mapping`` object.
+    """
+
+    return Mapping([('add', name, default)])
+
+
+def compute(name, func):
+    """
+    Construct a ``Mapping`` which computes the value of an attribute.
+
+    :param name: The name of the attribute to set.
+    :param func: A function which will be passed the state, as
+                 converted by any preceding steps, and must return the
+                 value of the attribute.
+
+    :returns: A ``Mapping`` object.
+    """
+
+    return Mapping([('compute', name, func)])
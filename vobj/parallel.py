@@ -0,0 +1,189 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import itertools
+import multiprocessing
+
+try:
+    from concurrent import futures
+except ImportError:
+    futures = None
+
+
+def _upgrade_states(cls, states):
+    """
+    Upgrade a chunk of state dictionaries to the latest version of a
+    ``VObject`` subclass, without constructing schema objects.  The
+    values are not passed through the attribute validators.
+
+    :param cls: The ``VObject`` subclass.
+    :param states: A list of state dictionaries.  The dictionaries
+                   are modified in place.
+
+    :returns: A list of state dictionaries of the latest version, in
+              the same order as ``states``.
+    """
+
+    # Group the states by version, as VObject.__vers_convert__() does
+    groups = {}
+    for idx, state in enumerate(states):
+        vers = cls.__vers_state_version__(state)
+        groups.setdefault(vers, []).append(idx)
+
+    result = [None] * len(states)
+    latest = cls.__vers_schemas__[-1].__version__
+    for vers, indexes in groups.items():
+        upgraders = cls.__vers_upgrader_get__(vers)
+        converted = upgraders.convert_all(states[idx] for idx in indexes)
+        for idx, state in zip(indexes, converted):
+            state['__version__'] = latest
+            result[idx] = state
+
+    return result
+
+
+def _upgrade_chunk(cls, states, trusted=False):
+    """
+    Convert a chunk of state dictionaries to the latest version of a
+    ``VObject`` subclass.  This is run in the worker processes.
+
+    :param cls: The ``VObject`` subclass.
+    :param states: A list of state dictionaries.
+    :param trusted: If ``True``, the states are trusted; see
+                    ``VObject.from_dict()``.
+
+    :returns: A list of tuples of the attribute values of the
+              converted states, as returned by the
+              ``__vers_astuple__()`` method of the latest schema.  If
+              the latest schema defines its own ``__setstate__()``,
+              the objects must be loaded by calling it, so a list of
+              upgraded state dictionaries is returned instead; see
+              ``_upgrade_states()``.
+    """
+
+    # The states were unpickled in this process, so nobody else has
+    # them and there's no need to copy them
+    if not cls.__vers_standard_setstate__():
+        return _upgrade_states(cls, states)
+
+    return [sch_obj.__vers_astuple__()
+            for sch_obj in cls.__vers_convert__(states, trusted, True)]
+
+
+def _upgrade(cls, states, workers, chunk_size, trusted):
+    """
+    Generator for ``upgrade_all()``.  Starts a pool of worker
+    processes when first advanced, submits chunks of states to it,
+    keeping each worker busy with a chunk queued up behind it, and
+    yields the resulting objects in order.  The pool is shut down
+    when the generator finishes or is closed.
+
+    :param cls: The ``VObject`` subclass.
+    :param states: An iterable of state dictionaries.
+    :param workers: The number of worker processes.
+    :param chunk_size: The number of states in each chunk.
+    :param trusted: If ``True``, the states are trusted.
+
+    :returns: A generator yielding new instances of ``cls``.
+    """
+
+    restore = cls.__vers_schemas__[-1].__vers_fromtuple__
+    standard = cls.__vers_standard_setstate__()
+    window = 2 * workers
+    pending = collections.deque()
+
+    def collect():
+        values = pending.popleft().result()
+        if not standard:
+            # Upgraded states; load them through __setstate__()
+            return cls.__vers_load__(values, trusted, True)
+        return cls.__vers_wrap__(restore(vals) for vals in values)
+
+    executor = futures.ProcessPoolExecutor(workers)
+    try:
+        states = iter(states)
+        while True:
+            chunk = list(itertools.islice(states, chunk_size))
+            if not chunk:
+                break
+
+            pending.append(executor.submit(_upgrade_chunk, cls, chunk,
+                                           trusted))
+            if len(pending) >= window:
+                for obj in collect():
+                    yield obj
+
+        while pending:
+            for obj in collect():
+                yield obj
+    finally:
+        # Don't run work nobody wants, if we're stopped early
+        for fut in pending:
+            fut.cancel()
+        executor.shutdown()
+
+
+def upgrade_all(cls, states, workers=None, chunk_size=1000, trusted=False):
+    """
+    Construct ``VObject`` instances from an iterable of dictionaries,
+    using a pool of worker processes to perform the conversions.  The
+    dictionaries are sent to the workers in chunks, which are
+    converted as by ``VObject.from_dicts()``; the attribute values of
+    the results are sent back as tuples, and the objects are
+    constructed in the calling process without revalidating the
+    values.  If the latest schema defines its own ``__setstate__()``,
+    the workers only run the upgraders, and the upgraded dictionaries
+    are loaded in the calling process, so that ``__setstate__()`` is
+    called for each of them.  Only a bounded number of chunks are in
+    flight at any time.
+
+    Note that ``cls`` and the dictionaries must be picklable; in
+    particular, ``cls`` must be importable by name from the workers,
+    as must any classes or functions its upgraders refer to.
+
+    :param cls: The ``VObject`` subclass.
+    :param states: An iterable of state dictionaries.  All attribute
+                   values will be passed through the appropriate
+                   validators, unless ``trusted`` is ``True``.  Schema
+                   upgraders will be called to convert the
+                   dictionaries to the current version.
+    :param workers: The number of worker processes.  Defaults to the
+                    number of CPUs.
+    :param chunk_size: The number of dictionaries to send to a worker
+                       at a time.  Defaults to 1000.
+    :param trusted: If ``True``, the dictionaries are trusted; see
+                    ``VObject.from_dict()``.  Defaults to ``False``.
+
+    :returns: A generator yielding new instances of the ``VObject``
+              subclass, in the same order as ``states``.
+    """
+
+    if futures is None:
+        raise RuntimeError("parallel upgrades require concurrent.futures")
+
+    # Prohibit instantiating abstract versioned objects
+    if not getattr(cls, '__vers_schemas__', None):
+        raise TypeError("cannot instantiate abstract versioned object "
+                        "class '%s'" % cls.__name__)
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers < 1:
+        raise ValueError("number of workers must be positive")
+    elif chunk_size < 1:
+        raise ValueError("chunk size must be positive")
+
+    return _upgrade(cls, states, workers, chunk_size, trusted)
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from vobj import binary
+
 
 class SchemaProxy(object):
     """
@@ -30,6 +32,10 @@ class SchemaProxy(object):
         :returns: The value of the declared attribute.
         """
 
+        # If the schema object itself is missing, don't recurse
+        if name == '__vers_values__':
+            raise AttributeError(name)
+
         # Proxy to the Schema object stored in __vers_values__; this
         # covers not just the data attributes, but also any methods or
         # descriptors.
@@ -91,6 +97,19 @@ class SchemaProxy(object):
 
     to_dict = __getstate__
 
+    def to_bytes(self):
+        """
+        Encode the value of the ``SchemaProxy`` object in the compact
+        binary format of ``vobj.binary``.  The encoding names the
+        versioned object class and the version, followed by the
+        attribute values in a fixed order, without the attribute
+        names.  See ``VObject.from_bytes()``.
+
+        :returns: The encoded value, as a byte string.
+        """
+
+        return binary.encode(self.__vers_name__, self.__vers_values__)
+
     def __vers_set_values__(self, values):
         """
         Convenience method for setting the ``__vers_values__``
@@ -122,9 +141,34 @@ class ReadOnlyLazySchemaProxy(SchemaProxy):
         # Set up our special attributes
         super(ReadOnlyLazySchemaProxy, self).__setattr__(
             '__version__', version)
+        super(ReadOnlyLazySchemaProxy, self).__setattr__(
+            '__vers_version__', int(version))
         super(ReadOnlyLazySchemaProxy, self).__setattr__(
             '__vers_master__', version._master)
 
+    @property
+    def __vers_name__(self):
+        """
+        Retrieve the name of the master's versioned object class, as
+        used by ``to_bytes()``.
+        """
+
+        return self.__vers_master__.__vers_name__
+
+    def __getattr__(self, name):
+        """
+        Retrieve the value of a declared attribute.  The master
+        object resolves the attribute, which may avoid generating the
+        complete schema object for the version.
+
+        :param name: The name of the attribute.
+
+        :returns: The value of the declared attribute.
+        """
+
+        return self.__vers_master__.__vers_attr_get__(
+            self.__vers_version__, name)
+
     def __setattr__(self, name, value):
         """
         Sets the value of an attribute or property.  Values on the
@@ -149,4 +193,356 @@ class ReadOnlyLazySchemaProxy(SchemaProxy):
         Retrieve the schema object from the master.
         """
 
-        return self.__vers_master__.__vers_cache_get__(int(self.__version__))
+        return self.__vers_master__.__vers_cache_get__(
+            self.__vers_version__)
+
+
+class BufferSchemaProxy(SchemaProxy):
+    """
+    A read-only schema proxy over the binary encoding of an object of
+    the latest version of a ``VObject`` subclass, as produced by
+    ``to_bytes()``.  Each declared attribute is decoded from the
+    buffer when it is read, without building a state dictionary or
+    schema object; the positions of the values are found the first
+    time an attribute is read.  Anything else, such as properties,
+    methods, comparisons, ``to_dict()``, or the ``__version__``,
+    requires the complete object, which is loaded from the buffer
+    and kept.  See ``VObject.from_buffer()``.
+    """
+
+    def __init__(self, cls, buf, pos, trusted=False):
+        """
+        Initialize a ``BufferSchemaProxy`` object.
+
+        :param cls: The ``VObject`` subclass.
+        :param buf: The buffer containing the encoded object.  This
+                    may be a byte string, a ``bytearray``, a
+                    ``memoryview``, or an ``mmap.mmap`` object.  It
+                    must not be modified while the proxy is in use.
+        :param pos: The position of the first value in the buffer.
+        :param trusted: If ``True``, the values are not passed
+                        through the attribute validators, save for
+                        those of attributes with a ``getstate``
+                        function.  Defaults to ``False``.
+        """
+
+        # Set up our special attributes
+        setattr_ = super(BufferSchemaProxy, self).__setattr__
+        setattr_('__vers_class__', cls)
+        setattr_('__vers_buffer__', buf)
+        setattr_('__vers_start__', pos)
+        setattr_('__vers_trusted__', trusted)
+        setattr_('__vers_offsets__', None)
+        setattr_('__vers_object__', None)
+
+    @property
+    def __vers_name__(self):
+        """
+        Retrieve the name of the versioned object class, as used by
+        ``to_bytes()``.
+        """
+
+        return self.__vers_class__.__vers_name__
+
+    @property
+    def __version__(self):
+        """
+        Retrieve the ``SmartVersion`` of the complete object.
+        """
+
+        return self.__vers_materialize__().__version__
+
+    @property
+    def __vers_values__(self):
+        """
+        Retrieve the schema object of the complete object.
+        """
+
+        return self.__vers_materialize__().__vers_values__
+
+    def __vers_materialize__(self):
+        """
+        Load the complete object from the buffer, the first time it
+        is needed.
+
+        :returns: The ``VObject`` instance.
+        """
+
+        obj = self.__vers_object__
+        if obj is None:
+            obj = self.__vers_class__.from_bytes(self.__vers_buffer__,
+                                                 self.__vers_trusted__)
+            super(BufferSchemaProxy, self).__setattr__('__vers_object__',
+                                                       obj)
+
+        return obj
+
+    def __vers_offsets_get__(self):
+        """
+        Find the positions of the values in the buffer, the first
+        time they are needed.  Raises a ``ValueError`` if the buffer
+        is truncated or has extra bytes, as ``binary.decode()``
+        does.
+
+        :returns: A list of the positions of the values, in the order
+                  of "__vers_fields__".
+        """
+
+        offsets = self.__vers_offsets__
+        if offsets is None:
+            buf = self.__vers_buffer__
+            fields = self.__vers_class__.__vers_schemas__[-1].__vers_fields__
+
+            offsets = []
+            pos = self.__vers_start__
+            try:
+                for _field in fields:
+                    offsets.append(pos)
+                    pos = binary.skip_value(buf, pos)
+            except IndexError:
+                raise ValueError("truncated versioned object")
+            if pos > len(buf):
+                raise ValueError("truncated versioned object")
+            elif pos < len(buf):
+                raise ValueError("%d extra bytes after versioned object" %
+                                 (len(buf) - pos))
+
+            super(BufferSchemaProxy, self).__setattr__('__vers_offsets__',
+                                                       offsets)
+
+        return offsets
+
+    def __getattr__(self, name):
+        """
+        Retrieve the value of a declared attribute, decoding it from
+        the buffer.  Other names are looked up on the complete
+        object.
+
+        :param name: The name of the attribute.
+
+        :returns: The value of the declared attribute.
+        """
+
+        # If the special attributes are missing, don't recurse
+        if name.startswith('__vers_'):
+            raise AttributeError(name)
+
+        sch = self.__vers_class__.__vers_schemas__[-1]
+        idx = sch.__vers_index__.get(name)
+        if idx is None:
+            return getattr(self.__vers_materialize__(), name)
+
+        value = binary.decode_value(self.__vers_buffer__,
+                                    self.__vers_offsets_get__()[idx])[0]
+        if self.__vers_trusted__ and name not in sch.__vers_untrusted__:
+            return value
+
+        return sch.__vers_attrs__[name].validate(value)
+
+    def __setattr__(self, name, value):
+        """
+        Always raises an ``AttributeError``, as this is a read-only
+        proxy.
+
+        :param name: The name of the attribute.
+        :param value: The new value of the attribute.
+        """
+
+        raise AttributeError("type object '%s' attribute '%s' is read only" %
+                             (self.__class__.__name__, name))
+
+    def __delattr__(self, name):
+        """
+        Always raises an ``AttributeError``, as this is a read-only
+        proxy.
+
+        :param name: The name of the attribute.
+        """
+
+        raise AttributeError("type object '%s' attribute '%s' cannot be "
+                             "deleted" % (self.__class__.__name__, name))
+
+
+class AttributeDescriptor(object):
+    """
+    A data descriptor installed on ``VObject`` subclasses for each
+    declared attribute of the latest schema.  Reads are served
+    directly from the values of the schema object, avoiding the
+    ``__getattr__()`` calls of ``SchemaProxy``; writes are validated
+    and stored directly, unless the schema defines its own
+    ``__setattr__()``.
+    """
+
+    def __init__(self, name, key=None, direct=True):
+        """
+        Initialize an ``AttributeDescriptor`` object.
+
+        :param name: The name of the attribute.
+        :param key: The key of the attribute value in the
+                    "__vers_values__" of the schema object.  For
+                    schemas using compact storage, this is the index
+                    of the attribute in "__vers_fields__".  Defaults
+                    to ``name``.
+        :param direct: If ``False``, writes are delegated to the
+                       schema object's ``__setattr__()``.  Defaults
+                       to ``True``.
+        """
+
+        self.name = name
+        self.key = name if key is None else key
+        self.direct = direct
+
+    def __get__(self, obj, cls=None):
+        """
+        Retrieve the value of the attribute.
+
+        :param obj: The ``VObject`` instance, or ``None`` if the
+                    attribute was looked up on the class.
+        :param cls: The ``VObject`` subclass.
+
+        :returns: The value of the attribute.
+        """
+
+        if obj is None:
+            return self
+
+        sch = obj.__vers_values__
+        try:
+            return sch.__vers_values__[self.key]
+        except (KeyError, TypeError):
+            # Let the schema object raise the appropriate error
+            return getattr(sch, self.name)
+
+    def __set__(self, obj, value):
+        """
+        Set the value of the attribute.
+
+        :param obj: The ``VObject`` instance.
+        :param value: The new value of the attribute.
+        """
+
+        sch = obj.__vers_values__
+        attr = sch.__vers_attrs__.get(self.name)
+
+        # Let the schema object handle uninitialized values,
+        # undeclared attributes, and its own __setattr__()
+        if (not self.direct or attr is None or
+                sch.__vers_values__ is None):
+            setattr(sch, self.name, value)
+            return
+
+        sch.__vers_values__[self.key] = attr.validate(value)
+
+        # Send a notification on update
+        if sch.__vers_notify__:
+            sch.__vers_notify__(self.name)
+
+
+class PropertyDescriptor(object):
+    """
+    A data descriptor installed on ``VObject`` subclasses for each
+    property of the latest schema.  Reads and writes are delegated to
+    the schema object.
+    """
+
+    def __init__(self, name):
+        """
+        Initialize a ``PropertyDescriptor`` object.
+
+        :param name: The name of the property.
+        """
+
+        self.name = name
+
+    def __get__(self, obj, cls=None):
+        """
+        Retrieve the value of the property.
+
+        :param obj: The ``VObject`` instance, or ``None`` if the
+                    property was looked up on the class.
+        :param cls: The ``VObject`` subclass.
+
+        :returns: The value of the property.
+        """
+
+        if obj is None:
+            return self
+
+        return getattr(obj.__vers_values__, self.name)
+
+    def __set__(self, obj, value):
+        """
+        Set the value of the property.
+
+        :param obj: The ``VObject`` instance.
+        :param value: The new value of the property.
+        """
+
+        setattr(obj.__vers_values__, self.name, value)
+
+
+class MemberDescriptor(object):
+    """
+    A non-data descriptor installed on ``VObject`` subclasses for each
+    method or other class member of the latest schema.  Reads are
+    delegated to the schema object.
+    """
+
+    def __init__(self, name):
+        """
+        Initialize a ``MemberDescriptor`` object.
+
+        :param name: The name of the member.
+        """
+
+        self.name = name
+
+    def __get__(self, obj, cls=None):
+        """
+        Retrieve the member.
+
+        :param obj: The ``VObject`` instance, or ``None`` if the
+                    member was looked up on the class.
+        :param cls: The ``VObject`` subclass.
+
+        :returns: The member, as retrieved from the schema object.
+        """
+
+        if obj is None:
+            return self
+
+        return getattr(obj.__vers_values__, self.name)
+
+
+class MaskDescriptor(object):
+    """
+    A non-data descriptor used to hide a descriptor inherited from a
+    base ``VObject`` subclass, if the name is not present in the
+    latest schema.  Reads fall through to ``__getattr__()``.
+    """
+
+    def __init__(self, name):
+        """
+        Initialize a ``MaskDescriptor`` object.
+
+        :param name: The name of the hidden descriptor.
+        """
+
+        self.name = name
+
+    def __get__(self, obj, cls=None):
+        """
+        Always raises an ``AttributeError``, causing the lookup to
+        fall back to ``__getattr__()``.
+
+        :param obj: The ``VObject`` instance, or ``None`` if the name
+                    was looked up on the class.
+        :param cls: The ``VObject`` subclass.
+        """
+
+        raise AttributeError(self.name)
+
+
+# All the descriptor types installed by VObjectMeta
+DESCRIPTORS = (AttributeDescriptor, PropertyDescriptor, MemberDescriptor,
+               MaskDescriptor)
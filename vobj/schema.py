@@ -16,6 +16,423 @@
 import six
 
 from vobj import attribute
+from vobj import codegen
+from vobj import mapping
+
+
+# The methods that may be replaced by specialized versions; see
+# _specialize()
+_SPECIALIZED = ('__init__', '__getstate__', '__setstate__',
+                '__vers_setvalues__', '__vers_takevalues__', '__getattr__',
+                '__setattr__')
+
+# Specialized methods which bypass __setstate__(), and so can't be
+# used if that's user-defined
+_BYPASS = ('__vers_setvalues__', '__vers_takevalues__')
+
+
+def _resolve(cls, name):
+    """
+    Find the value of a class attribute inherited by a class.
+
+    :param cls: The class.
+    :param name: The name of the attribute.
+
+    :returns: The raw value of the attribute, as found in the
+              ``__dict__`` of the first base class in the method
+              resolution order defining it, or ``None``.
+    """
+
+    for klass in cls.__mro__[1:]:
+        if name in klass.__dict__:
+            return klass.__dict__[name]
+
+    return None
+
+
+def _standard(cls, name):
+    """
+    Determine whether a class uses the generic or a generated version
+    of a ``Schema`` method, rather than one defined by the user.
+
+    :param cls: The ``Schema`` subclass.
+    :param name: The name of the method.
+
+    :returns: A ``True`` value if the method is the generic or a
+              generated version, ``False`` otherwise.
+    """
+
+    value = cls.__dict__[name] if name in cls.__dict__ else _resolve(
+        cls, name)
+
+    return (value is Schema.__dict__[name] or
+            getattr(value, '__vers_generated__', False))
+
+
+def _check_keys(sch, state):
+    """
+    Raise the appropriate ``ValueError`` for a state dictionary with
+    missing or unexpected attributes.  Used by the specialized
+    ``__setstate__()`` methods.
+
+    :param sch: The schema object.
+    :param state: The ``state`` dictionary.
+    """
+
+    for key in sorted(set(state) | set(sch.__vers_attrs__)):
+        if key == '__version__':
+            continue
+        elif key not in state:
+            raise ValueError("missing attribute '%s'" % key)
+        elif key not in sch.__vers_attrs__:
+            raise ValueError("unexpected attribute '%s'" % key)
+
+
+def _call(namer, prefix, func, expr):
+    """
+    Generate the source code for calling an attribute function.
+
+    :param namer: An instance of ``vobj.codegen.Namer``.
+    :param prefix: A prefix for the name of the function.
+    :param func: The function to call.  If it is the identity
+                 function, no call is generated.
+    :param expr: The source code of the argument expression.
+
+    :returns: The source code of the call.
+    """
+
+    if func is attribute.identity:
+        return expr
+
+    return '%s(%s)' % (namer.bind(prefix, func), expr)
+
+
+def _store(cls, compact, exprs):
+    """
+    Generate the source code for storing the attribute values into
+    the "__vers_values__" attribute of a schema object.
+
+    :param cls: The ``Schema`` subclass.
+    :param compact: If ``True``, the values are stored in a list
+                    ordered by "__vers_fields__"; otherwise, they are
+                    stored in a dictionary.
+    :param exprs: A list of the source code of the value
+                  expressions, ordered by "__vers_fields__".
+
+    :returns: The source code line.
+    """
+
+    if compact:
+        container = '[%s]' % ', '.join(exprs)
+    else:
+        container = '{%s}' % ', '.join(
+            '%r: %s' % (key, expr)
+            for key, expr in zip(cls.__vers_fields__, exprs)
+        )
+
+    return "    _setattr(self, '__vers_values__', %s)" % container
+
+
+def _guard(*args):
+    """
+    Generate the source code which hands calls made on behalf of
+    another class over to the generic version of a method.  A
+    subclass defining its own version of a method may call the
+    specialized version of its base class through ``super()``, and
+    that code only knows the base class's attributes.
+
+    :param args: The names of the arguments of the method, following
+                 ``self``.
+
+    :returns: A list of source code lines.
+    """
+
+    return [
+        '    if self.__class__ is not _cls:',
+        '        return _generic(%s)' % ', '.join(('self',) + args),
+    ]
+
+
+def _gen_init(cls, namer, compact):
+    """
+    Generate the source code for a specialized ``__init__()``.
+
+    :param cls: The ``Schema`` subclass.
+    :param namer: An instance of ``vobj.codegen.Namer``.
+    :param compact: If ``True``, generate code for compact storage.
+
+    :returns: A list of source code lines.
+    """
+
+    lines = [
+        'def __init__(self, values=None):',
+    ] + _guard('values') + [
+        '    if values is None:',
+        '        return',
+    ]
+
+    for idx, key in enumerate(cls.__vers_fields__):
+        attr = cls.__vers_attrs__[key]
+        lines += [
+            '    if %r in values:' % key,
+            '        v%d = %s' % (idx, _call(namer, 'validate', attr.validate,
+                                             'values[%r]' % key)),
+            '    else:',
+        ]
+        if attr.default is attribute.unset:
+            lines.append('        raise TypeError(%r)' %
+                         ("missing required argument '%s'" % key))
+        else:
+            lines.append('        v%d = %s' %
+                         (idx, namer.bind('default', attr.default)))
+
+    lines.append(_store(cls, compact, [
+        'v%d' % idx for idx in range(len(cls.__vers_fields__))
+    ]))
+
+    return lines
+
+
+def _gen_getstate(cls, namer, compact):
+    """
+    Generate the source code for a specialized ``__getstate__()``.
+
+    :param cls: The ``Schema`` subclass.
+    :param namer: An instance of ``vobj.codegen.Namer``.
+    :param compact: If ``True``, generate code for compact storage.
+
+    :returns: A list of source code lines.
+    """
+
+    lines = [
+        'def __getstate__(self):',
+    ] + _guard() + [
+        '    values = self.__vers_values__',
+        '    if values is None:',
+        '        raise RuntimeError("\'%s\' is uninitialized" %',
+        '                           self.__class__.__name__)',
+        '    return {',
+        '        %r: %r,' % ('__version__', cls.__version__),
+    ]
+
+    for idx, key in enumerate(cls.__vers_fields__):
+        attr = cls.__vers_attrs__[key]
+        lines.append('        %r: %s,' % (key, _call(
+            namer, 'getstate', attr.getstate,
+            'values[%r]' % (idx if compact else key))))
+
+    lines.append('    }')
+
+    return lines
+
+
+def _gen_setstate(cls, namer, compact):
+    """
+    Generate the source code for a specialized ``__setstate__()``.
+
+    :param cls: The ``Schema`` subclass.
+    :param namer: An instance of ``vobj.codegen.Namer``.
+    :param compact: If ``True``, generate code for compact storage.
+
+    :returns: A list of source code lines.
+    """
+
+    return ['def __setstate__(self, state):'] + _guard('state') + [
+        "    if state.get('__version__') != %r:" % cls.__version__,
+        '        raise ValueError("version mismatch setting state; "',
+        '                         "version %%r, expecting %s" %%' %
+        cls.__version__,
+        "                         state.get('__version__'))",
+    ] + _gen_values(cls, namer, compact, len(cls.__vers_fields__) + 1)
+
+
+def _gen_setvalues(cls, namer, compact):
+    """
+    Generate the source code for a specialized
+    ``__vers_setvalues__()``.
+
+    :param cls: The ``Schema`` subclass.
+    :param namer: An instance of ``vobj.codegen.Namer``.
+    :param compact: If ``True``, generate code for compact storage.
+
+    :returns: A list of source code lines.
+    """
+
+    return (['def __vers_setvalues__(self, state):'] + _guard('state') +
+            _gen_values(cls, namer, compact, len(cls.__vers_fields__)))
+
+
+def _gen_takevalues(cls, namer, compact):
+    """
+    Generate the source code for a specialized
+    ``__vers_takevalues__()``.
+
+    :param cls: The ``Schema`` subclass.
+    :param namer: An instance of ``vobj.codegen.Namer``.
+    :param compact: If ``True``, generate code for compact storage.
+
+    :returns: A list of source code lines.
+    """
+
+    # The state isn't kept: its keys may be copies made by a parser,
+    # while the generated storage shares the attribute names
+    return ['def __vers_takevalues__(self, state):'] + _guard('state') + [
+        "    state.pop('__version__', None)",
+    ] + _gen_values(cls, namer, compact, len(cls.__vers_fields__))
+
+
+def _gen_values(cls, namer, compact, nkeys):
+    """
+    Generate the source code for the body of a specialized
+    ``__setstate__()``, ``__vers_setvalues__()``, or
+    ``__vers_takevalues__()``, which checks the keys of the state,
+    validates the values, and stores them.
+
+    :param cls: The ``Schema`` subclass.
+    :param namer: An instance of ``vobj.codegen.Namer``.
+    :param compact: If ``True``, generate code for compact storage.
+    :param nkeys: The number of keys the state is expected to have.
+
+    :returns: A list of source code lines.
+    """
+
+    lines = [
+        '    if len(state) != %d:' % nkeys,
+        '        _check_keys(self, state)',
+    ]
+
+    # Fetch all the values first, so that a KeyError raised by a
+    # validator isn't mistaken for a missing attribute
+    if cls.__vers_fields__:
+        lines.append('    try:')
+        for idx, key in enumerate(cls.__vers_fields__):
+            lines.append('        v%d = state[%r]' % (idx, key))
+        lines += [
+            '    except KeyError:',
+            '        _check_keys(self, state)',
+        ]
+
+    lines.append(_store(cls, compact, [
+        _call(namer, 'validate', cls.__vers_attrs__[key].validate,
+              'v%d' % idx)
+        for idx, key in enumerate(cls.__vers_fields__)
+    ]))
+
+    return lines
+
+
+def _compact_getattr(self, name):
+    """
+    Retrieve the value of a declared attribute from a schema object
+    using compact storage.
+
+    :param name: The name of the attribute.
+
+    :returns: The value of the declared attribute.
+    """
+
+    # Be careful about uninitialized schemas
+    if self.__vers_values__ is None:
+        raise RuntimeError("'%s' is uninitialized" %
+                           self.__class__.__name__)
+
+    # Delegate to the values
+    if name not in self.__vers_index__:
+        raise AttributeError("'%s' object has no attribute '%s'" %
+                             (self.__class__.__name__, name))
+
+    return self.__vers_values__[self.__vers_index__[name]]
+
+
+def _compact_setattr(self, name, value):
+    """
+    Sets the value of an attribute of a schema object using compact
+    storage.
+
+    :param name: The name of the attribute.
+    :param value: The new value of the attribute.
+    """
+
+    # Be careful about uninitialized schemas
+    if self.__vers_values__ is None:
+        raise RuntimeError("'%s' is uninitialized" %
+                           self.__class__.__name__)
+
+    # Try sets into the values list...
+    if name in self.__vers_index__:
+        value = self.__vers_attrs__[name].validate(value)
+        self.__vers_values__[self.__vers_index__[name]] = value
+
+        # Send a notification on update
+        if self.__vers_notify__:
+            self.__vers_notify__(name)
+    else:
+        object.__setattr__(self, name, value)
+
+
+_compact_getattr.__vers_generated__ = True
+_compact_setattr.__vers_generated__ = True
+
+
+# Code generators for specialized methods
+_GENERATORS = {
+    '__init__': _gen_init,
+    '__getstate__': _gen_getstate,
+    '__setstate__': _gen_setstate,
+    '__vers_setvalues__': _gen_setvalues,
+    '__vers_takevalues__': _gen_takevalues,
+}
+
+# Replacement methods for schemas using compact storage
+_COMPACT = {
+    '__getattr__': _compact_getattr,
+    '__setattr__': _compact_setattr,
+}
+
+
+def _specialize(cls):
+    """
+    Install specialized versions of the methods named by
+    ``_SPECIALIZED`` on a ``Schema`` subclass, if requested by the
+    "__vers_specialize__" or "__vers_compact__" attributes.  Any
+    specialized methods inherited from a base class which are not
+    appropriate for the class are replaced by the generic versions.
+    Methods defined by the user are always left alone.
+
+    :param cls: The newly constructed ``Schema`` subclass.
+    """
+
+    compact = (cls.__version__ is not None and
+               getattr(cls, '__vers_compact__', False))
+    specialize = compact or (cls.__version__ is not None and
+                             getattr(cls, '__vers_specialize__', False))
+
+    for name in _SPECIALIZED:
+        # Leave user-defined methods alone
+        if name in cls.__dict__:
+            continue
+        inherited = _resolve(cls, name)
+        generic = Schema.__dict__[name]
+        if (inherited is not generic and
+                not getattr(inherited, '__vers_generated__', False)):
+            continue
+
+        if (specialize and name in _GENERATORS and
+                (name not in _BYPASS or _standard(cls, '__setstate__'))):
+            namer = codegen.Namer(_setattr=object.__setattr__,
+                                  _check_keys=_check_keys,
+                                  _cls=cls, _generic=generic)
+            func = codegen.make_function(
+                name, _GENERATORS[name](cls, namer, compact), namer.env,
+                '<vobj %s.%s>' % (cls.__name__, name))
+        elif compact and name in _COMPACT:
+            func = _COMPACT[name]
+        elif inherited is generic:
+            continue
+        else:
+            func = generic
+
+        setattr(cls, name, func)
 
 
 class SchemaMeta(type):
@@ -43,6 +460,7 @@ class SchemaMeta(type):
         attrs = {}
         upgraders = {}
         downgraders = {}
+        dependencies = {}
         properties = set()
 
         # Sanity-check the __version__
@@ -115,8 +533,10 @@ class SchemaMeta(type):
                 # Associate upgrader with the appropriate old version
                 upgraders[upgrade_version] = key
 
-                # Turn the upgrade method into a class method
-                namespace[key] = classmethod(value)
+                # Turn the upgrade method into a class method;
+                # mappings don't need the class
+                if not isinstance(value, mapping.Mapping):
+                    namespace[key] = classmethod(value)
             elif hasattr(value, '__vers_downgrader__'):
                 # Downgraders aren't permitted on abstract Schemas or
                 # the version 1 schema
@@ -137,8 +557,15 @@ class SchemaMeta(type):
                 # Associate downgrader with the appropriate old version
                 downgraders[downgrade_version] = key
 
-                # Turn the downgrade method into a class method
-                namespace[key] = classmethod(value)
+                # Remember its dependencies, to check them later
+                depends = getattr(value, '__vers_depends__', None)
+                if depends is not None:
+                    dependencies[key] = depends
+
+                # Turn the downgrade method into a class method;
+                # mappings don't need the class
+                if not isinstance(value, mapping.Mapping):
+                    namespace[key] = classmethod(value)
 
         # Make sure we have enough upgraders
         if (version is not None and version > 1 and
@@ -146,9 +573,30 @@ class SchemaMeta(type):
             raise TypeError("Schema requires an upgrader from version %d" %
                             (version - 1))
 
+        # Make sure downgraders only depend on declared attributes
+        for key, depends in dependencies.items():
+            undeclared = set(depends) - set(attrs)
+            if undeclared:
+                raise TypeError("Downgrader %s depends on undeclared "
+                                "attributes: %s" %
+                                (key, ', '.join(sorted(undeclared))))
+
         # Add the extra data to the namespace
         namespace['__version__'] = version  # Have to shadow superclass value
         namespace['__vers_attrs__'] = attrs
+        namespace['__vers_fields__'] = tuple(sorted(attrs))
+        namespace['__vers_index__'] = dict(
+            (key, idx) for idx, key in enumerate(namespace['__vers_fields__'])
+        )
+
+        # States hold the values of attributes with a getstate
+        # function in serialized form, so they have to be validated
+        # even when the state is trusted; abstract schemas are never
+        # loaded
+        namespace['__vers_untrusted__'] = tuple(
+            key for key in namespace['__vers_fields__']
+            if attrs[key].getstate is not attribute.identity
+        ) if version is not None else ()
         namespace['__vers_properties__'] = properties
         namespace['__vers_upgraders__'] = {}
         namespace['__vers_downgraders__'] = {}
@@ -168,6 +616,9 @@ class SchemaMeta(type):
         for version, key in downgraders.items():
             cls.__vers_downgraders__[version] = getattr(cls, key)
 
+        # Install specialized methods, if requested
+        _specialize(cls)
+
         return cls
 
 
@@ -202,8 +653,29 @@ class Schema(object):
     member.  It is safe for the upgrader method to modify the
     dictionary in place, as long as it returns the modified
     dictionary.
+
+    If the "__vers_specialize__" attribute is set to ``True`` (it is
+    inherited by subclasses), then the ``__init__()``,
+    ``__getstate__()``, and ``__setstate__()`` methods are replaced
+    by straight-line code generated for the declared attributes when
+    the class is created.  Calls to the default (identity)
+    ``validate`` and ``getstate`` functions are omitted from the
+    generated code.  Note that the specialized code captures the
+    attributes' defaults and functions at class creation time.
+
+    If the "__vers_compact__" attribute is set to ``True`` (it is also
+    inherited), the attribute values of schema objects are stored in
+    a list, ordered by the "__vers_fields__" attribute, rather than in
+    a dictionary.  This reduces the memory consumed by each object.
+    Compact storage implies "__vers_specialize__".  Such schemas may
+    still define their own ``__init__()``, ``__getstate__()``, or
+    ``__setstate__()`` calling the inherited version, which stores
+    and reads the values in the same way.
     """
 
+    __vers_specialize__ = False
+    __vers_compact__ = False
+
     def __new__(cls, values=None):
         """
         Construct a new instance of the ``Schema`` subclass.  Verifies
@@ -239,18 +711,20 @@ class Schema(object):
             # Initialization will be handled by __setstate__()
             return
 
-        super(Schema, self).__setattr__('__vers_values__', {})
+        result = {}
 
         for key, attr in self.__vers_attrs__.items():
             # Set up default value for the attribute
             if key not in values:
                 if attr.default is attribute.unset:
                     raise TypeError("missing required argument '%s'" % key)
-                self.__vers_values__[key] = attr.default
+                result[key] = attr.default
 
             # Validate the value from values
             else:
-                self.__vers_values__[key] = attr.validate(values[key])
+                result[key] = attr.validate(values[key])
+
+        self.__vers_store__(result)
 
     def __contains__(self, key):
         """
@@ -279,6 +753,10 @@ class Schema(object):
             raise RuntimeError("'%s' is uninitialized" %
                                self.__class__.__name__)
 
+        # Values of compact schemas are stored by index
+        if self.__vers_compact__:
+            return _compact_getattr(self, name)
+
         # Delegate to the values
         if name not in self.__vers_attrs__:
             raise AttributeError("'%s' object has no attribute '%s'" %
@@ -299,6 +777,11 @@ class Schema(object):
             raise RuntimeError("'%s' is uninitialized" %
                                self.__class__.__name__)
 
+        # Values of compact schemas are stored by index
+        if self.__vers_compact__:
+            _compact_setattr(self, name, value)
+            return
+
         # Try sets into the values dictionary...
         if name in self.__vers_attrs__:
             value = self.__vers_attrs__[name].validate(value)
@@ -306,7 +789,7 @@ class Schema(object):
 
             # Send a notification on update
             if self.__vers_notify__:
-                self.__vers_notify__()
+                self.__vers_notify__(name)
         else:
             super(Schema, self).__setattr__(name, value)
 
@@ -388,9 +871,16 @@ class Schema(object):
             raise RuntimeError("'%s' is uninitialized" %
                                self.__class__.__name__)
 
+        # Values of compact schemas are ordered by __vers_fields__
+        values = self.__vers_values__
+        if self.__vers_compact__:
+            items = zip(self.__vers_fields__, values)
+        else:
+            items = values.items()
+
         # Copy __vers_values__ and add the __version__ to it
         state = dict(__version__=self.__version__)
-        for key, value in self.__vers_values__.items():
+        for key, value in items:
             attr = self.__vers_attrs__[key]
             state[key] = attr.getstate(value)
 
@@ -437,4 +927,162 @@ class Schema(object):
             values[key] = attr.validate(state[key])
 
         # Now we know everything's all set, so set up __vers_values__
+        self.__vers_store__(values)
+
+    def __vers_store__(self, values):
+        """
+        Set the "__vers_values__" attribute from a dictionary of
+        validated attribute values.  For schemas using compact
+        storage, the values are stored in a list ordered by
+        "__vers_fields__".
+
+        :param values: A dictionary of the attribute values.  All
+                       declared attributes must be present.
+        """
+
+        if self.__vers_compact__:
+            values = [values[key] for key in self.__vers_fields__]
+
         super(Schema, self).__setattr__('__vers_values__', values)
+
+    def __vers_setvalues__(self, state):
+        """
+        Reset the state of the object to reflect the values contained
+        in the passed in ``state`` dictionary, which is already known
+        to describe this version of the schema.  This is used by the
+        upgraders, and is equivalent to ``__setstate__()``, save that
+        the version of the dictionary is not checked.
+
+        :param state: The ``state`` dictionary.  If it contains a
+                      "__version__" key, it is ignored.  All attribute
+                      values will be passed through the appropriate
+                      validators.  Note that the dictionary may be
+                      modified.
+        """
+
+        state['__version__'] = self.__version__
+        self.__setstate__(state)
+
+    def __vers_takevalues__(self, state):
+        """
+        Reset the state of the object to reflect the values contained
+        in the passed in ``state`` dictionary, which is already known
+        to describe this version of the schema, taking ownership of
+        the dictionary.  This is equivalent to
+        ``__vers_setvalues__()``, save that the dictionary itself is
+        used to store the attribute values.  The specialized version
+        of this method stores the values as ``__vers_setvalues__()``
+        does, since the dictionaries it builds share their keys with
+        the schema, while those of a dictionary made by a parser are
+        often copies.  The dictionary is also not used if the schema
+        defines its own ``__setstate__()``.
+
+        :param state: The ``state`` dictionary.  If it contains a
+                      "__version__" key, it is removed.  All attribute
+                      values will be passed through the appropriate
+                      validators.  The caller must not use the
+                      dictionary afterwards.
+        """
+
+        if (self.__vers_compact__ or
+                not _standard(self.__class__, '__setstate__')):
+            self.__vers_setvalues__(state)
+            return
+
+        state.pop('__version__', None)
+
+        attrs = self.__vers_attrs__
+        if len(state) != len(attrs) or any(key not in state
+                                           for key in attrs):
+            _check_keys(self, state)
+
+        for key, attr in attrs.items():
+            state[key] = attr.validate(state[key])
+
+        super(Schema, self).__setattr__('__vers_values__', state)
+
+    def __vers_astuple__(self):
+        """
+        Retrieve the attribute values of the ``Schema`` object as a
+        tuple, ordered by "__vers_fields__".  The values are returned
+        as stored, without applying the attributes' ``getstate``
+        functions.  This is a compact representation for passing
+        schema objects between processes; see ``__vers_fromtuple__()``.
+
+        :returns: A tuple of attribute values.
+        """
+
+        # Be careful about uninitialized schemas
+        if self.__vers_values__ is None:
+            raise RuntimeError("'%s' is uninitialized" %
+                               self.__class__.__name__)
+
+        if self.__vers_compact__:
+            return tuple(self.__vers_values__)
+
+        values = self.__vers_values__
+        return tuple(values[key] for key in self.__vers_fields__)
+
+    @classmethod
+    def __vers_fromtuple__(cls, values):
+        """
+        Construct a ``Schema`` object from a tuple of attribute values,
+        as returned by ``__vers_astuple__()``.  The values are stored
+        as is; they are not passed through the attribute validators.
+
+        :param values: A sequence of attribute values, ordered by
+                       "__vers_fields__".
+
+        :returns: A new instance of the ``Schema`` subclass.
+        """
+
+        if len(values) != len(cls.__vers_fields__):
+            raise ValueError("expected %d attribute values, got %d" %
+                             (len(cls.__vers_fields__), len(values)))
+
+        sch_obj = cls()
+        if cls.__vers_compact__:
+            values = list(values)
+        else:
+            values = dict(zip(cls.__vers_fields__, values))
+        super(Schema, sch_obj).__setattr__('__vers_values__', values)
+
+        return sch_obj
+
+    @classmethod
+    def __vers_fromtrusted__(cls, state, validate=()):
+        """
+        Construct a ``Schema`` object from a trusted state dictionary.
+        The keys of the dictionary are checked, but the values are
+        stored as is, without being passed through the attribute
+        validators, except for the attributes named by ``validate``.
+        Callers should include the attributes named by
+        "__vers_untrusted__", whose values are stored in states in the
+        form returned by their ``getstate`` functions.
+
+        :param state: The ``state`` dictionary.  If it contains a
+                      "__version__" key, it is ignored.
+        :param validate: A sequence of the names of the attributes
+                         whose values must be validated.
+
+        :returns: A new instance of the ``Schema`` subclass.
+        """
+
+        fields = cls.__vers_fields__
+        try:
+            values = [state[key] for key in fields]
+        except KeyError:
+            _check_keys(cls, state)
+        if len(state) != len(fields) + ('__version__' in state):
+            _check_keys(cls, state)
+
+        for key in validate:
+            idx = cls.__vers_index__[key]
+            values[idx] = cls.__vers_attrs__[key].validate(values[idx])
+
+        sch_obj = cls()
+        if not cls.__vers_compact__:
+            values = dict(zip(fields, values))
+        super(Schema, sch_obj).__setattr__('__vers_values__', values)
+
+        return sch_obj
@@ -0,0 +1,482 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mmap
+import os
+import struct
+
+from vobj import binary
+
+
+# Identifies a store's data file, and the version of the format
+MAGIC = b'VOBJS\x01'
+
+# Identifies a store's index file, and the version of the format
+INDEX_MAGIC = b'VOBJX\x01'
+
+# The suffix added to the name of the data file to name the index
+INDEX_SUFFIX = '.idx'
+
+# Each record in the data file starts with the lengths of its key and
+# of its encoded object
+_record = struct.Struct('<II')
+
+# Each entry in the index holds the offset and the length of the
+# encoded object in the data file, and the length of the key, which
+# follows the entry
+_entry = struct.Struct('<QII')
+
+
+def _pack_entry(key, offset, length):
+    """
+    Build an index entry.
+
+    :param key: The key, a text string.
+    :param offset: The offset of the encoded object in the data file.
+    :param length: The length of the encoded object.
+
+    :returns: The index entry, as a byte string.
+    """
+
+    key = key.encode('utf-8')
+
+    return _entry.pack(offset, length, len(key)) + key
+
+
+class Store(object):
+    """
+    A local, append-only store of versioned objects, each identified
+    by a text key.  The objects are kept in a data file, as records of
+    their key and their ``to_bytes()`` encoding, and are read through
+    an ``mmap.mmap`` of the file.  Storing an object under an existing
+    key appends a new record, which replaces the old one; deleting a
+    key appends a record with no encoded object.  An index file,
+    named by adding ``INDEX_SUFFIX`` to the name of the data file,
+    holds the key and offset of each record, so opening a store does
+    not read the data file.  Objects are always stored in their latest
+    version, and objects stored in an older version are upgraded when
+    they are read.
+
+    A store must only be written by one ``Store`` object at a time;
+    there is no locking.  If a write is interrupted, the partial
+    record is discarded the next time the store is opened, and a
+    missing or damaged index is rebuilt from the data file.
+    """
+
+    def __init__(self, path, classes, trusted=False):
+        """
+        Initialize a ``Store`` object, opening the store, and creating
+        it if it does not exist.  Raises a ``ValueError`` if the data
+        file is not a store.
+
+        :param path: The name of the data file.
+        :param classes: An iterable of the ``VObject`` subclasses of
+                        the objects in the store.  The classes are
+                        matched to the records by their
+                        "__vers_name__" attribute.
+        :param trusted: If ``True``, the store is trusted, for
+                        instance because it was written by the
+                        application itself; see
+                        ``VObject.from_dict()``.  Defaults to ``False``.
+        """
+
+        self._classes = dict((cls.__vers_name__, cls) for cls in classes)
+        self._trusted = trusted
+        self._keys = {}
+        self._map = None
+
+        # Append mode puts every write at the end of the file
+        self._data = open(path, 'a+b')
+        try:
+            self._index = open(path + INDEX_SUFFIX, 'a+b')
+            try:
+                self._open()
+            except Exception:
+                self._index.close()
+                raise
+        except Exception:
+            self._data.close()
+            raise
+
+    def __enter__(self):
+        """
+        Enter a context.  The store is closed when the context is
+        exited.
+
+        :returns: The ``Store`` object.
+        """
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        """
+        Exit a context, closing the store.
+        """
+
+        self.close()
+
+    def __len__(self):
+        """
+        Retrieve the number of keys in the store.
+
+        :returns: The number of keys.
+        """
+
+        return len(self._keys)
+
+    def __contains__(self, key):
+        """
+        Determine whether a key is in the store.
+
+        :param key: The key.
+
+        :returns: A ``True`` value if the key is in the store,
+                  ``False`` otherwise.
+        """
+
+        return key in self._keys
+
+    def __iter__(self):
+        """
+        Iterate over the keys in the store, in no particular order.
+
+        :returns: An iterator over the keys.
+        """
+
+        return iter(list(self._keys))
+
+    def __getitem__(self, key):
+        """
+        Load the object stored under a key.  Raises a ``KeyError`` if
+        the key is not in the store.
+
+        :param key: The key.
+
+        :returns: A new instance of the object's ``VObject`` subclass,
+                  upgraded to its latest version if necessary.
+        """
+
+        offset, length = self._locate(key)
+        data = self._map[offset:offset + length]
+
+        return self._class(data).from_bytes(data, self._trusted)
+
+    def __setitem__(self, key, obj):
+        """
+        Store an object under a key.  See ``put()``.
+
+        :param key: The key.
+        :param obj: The ``VObject`` instance to store.
+        """
+
+        self.put(key, obj)
+
+    def __delitem__(self, key):
+        """
+        Delete a key from the store.  Raises a ``KeyError`` if the key
+        is not in the store.
+
+        :param key: The key.
+        """
+
+        if key not in self._keys:
+            raise KeyError(key)
+
+        self._append([(key, b'')])
+
+    def _open(self):
+        """
+        Read the index, check it against the data file, and map the
+        data file.
+        """
+
+        self._data.seek(0, os.SEEK_END)
+        size = self._data.tell()
+        if not size:
+            self._data.write(MAGIC)
+            self._data.flush()
+            size = len(MAGIC)
+        else:
+            self._data.seek(0)
+            if self._data.read(len(MAGIC)) != MAGIC:
+                raise ValueError("not a versioned object store")
+
+        self._index.seek(0)
+        index = self._index.read()
+        if index[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            index = INDEX_MAGIC
+            self._index.truncate(0)
+            self._index.write(index)
+
+        # Load the index, up to the first entry that is incomplete or
+        # refers past the end of the data file.  This runs once per
+        # entry when a store is opened, so the lookups are hoisted and
+        # _set() is inlined
+        keys = self._keys
+        unpack = _entry.unpack_from
+        limit = len(index)
+        pos = len(INDEX_MAGIC)
+        end = len(MAGIC)
+        while pos + _entry.size <= limit:
+            offset, length, key_len = unpack(index, pos)
+            start = pos + _entry.size
+            key_end = start + key_len
+            if key_end > limit or offset < end or offset + length > size:
+                break
+
+            key = index[start:key_end].decode('utf-8')
+            if length:
+                keys[key] = (offset, length)
+            else:
+                keys.pop(key, None)
+            pos = key_end
+            end = offset + length
+        if pos < len(index):
+            self._index.truncate(pos)
+
+        # Index the records written since the last complete entry, and
+        # discard any partial record
+        self._data.seek(end)
+        tail = self._data.read()
+        entries = []
+        pos = 0
+        while pos + _record.size <= len(tail):
+            key_len, length = _record.unpack_from(tail, pos)
+            offset = pos + _record.size + key_len
+            if offset + length > len(tail):
+                break
+
+            key = tail[pos + _record.size:offset].decode('utf-8')
+            entries.append(_pack_entry(key, end + offset, length))
+            self._set(key, end + offset, length)
+            pos = offset + length
+        if pos < len(tail):
+            self._data.truncate(end + pos)
+        self._size = end + pos
+
+        self._index.write(b''.join(entries))
+        self._index.flush()
+
+        self._map = mmap.mmap(self._data.fileno(), 0,
+                              access=mmap.ACCESS_READ)
+
+    def _set(self, key, offset, length):
+        """
+        Record the location of the encoded object stored under a key.
+
+        :param key: The key.
+        :param offset: The offset of the encoded object in the data
+                       file.
+        :param length: The length of the encoded object.  If 0, the
+                       key has been deleted.
+        """
+
+        if length:
+            self._keys[key] = (offset, length)
+        else:
+            self._keys.pop(key, None)
+
+    def _append(self, items):
+        """
+        Append records to the data file, then their entries to the
+        index.
+
+        :param items: A list of tuples of a key and an encoded object.
+        """
+
+        if self._map is None:
+            raise ValueError("I/O operation on closed store")
+
+        records = bytearray()
+        entries = []
+        locations = []
+        for key, data in items:
+            key_bytes = key.encode('utf-8')
+            records += _record.pack(len(key_bytes), len(data))
+            records += key_bytes
+            offset = self._size + len(records)
+            records += data
+            entries.append(_pack_entry(key, offset, len(data)))
+            locations.append((key, offset, len(data)))
+
+        # The data is written first, so an interrupted write leaves
+        # records the index can be rebuilt from
+        self._data.write(bytes(records))
+        self._data.flush()
+        self._size += len(records)
+        self._index.write(b''.join(entries))
+        self._index.flush()
+
+        for key, offset, length in locations:
+            self._set(key, offset, length)
+
+    def _locate(self, key):
+        """
+        Look up the encoded object stored under a key, mapping the
+        data file again if it has grown.  Raises a ``KeyError`` if
+        the key is not in the store.
+
+        :param key: The key.
+
+        :returns: A tuple of the offset and the length of the encoded
+                  object.
+        """
+
+        if self._map is None:
+            raise ValueError("I/O operation on closed store")
+
+        offset, length = self._keys[key]
+
+        # Views from view() may still refer to the old mapping, so it
+        # is left for the garbage collector to close
+        if offset + length > len(self._map):
+            self._map = mmap.mmap(self._data.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+
+        return offset, length
+
+    def _class(self, data):
+        """
+        Look up the class of an encoded object.  Raises a
+        ``ValueError`` if the class was not provided.
+
+        :param data: The encoded object.
+
+        :returns: The ``VObject`` subclass.
+        """
+
+        name = binary.decode_header(data)[0]
+        try:
+            return self._classes[name]
+        except KeyError:
+            raise ValueError("no class provided for objects of class '%s'" %
+                             name)
+
+    def _encode(self, obj):
+        """
+        Encode an object to be stored.  Raises a ``ValueError`` if its
+        class was not provided, or if it is not of its latest version.
+
+        :param obj: The ``VObject`` instance.
+
+        :returns: The encoded object.
+        """
+
+        data = obj.to_bytes()
+        cls = self._class(data)
+        vers = binary.decode_header(data)[1]
+        if vers != cls.__vers_schemas__[-1].__version__:
+            raise ValueError("only the latest version of '%s' objects may "
+                             "be stored" % cls.__vers_name__)
+
+        return data
+
+    def close(self):
+        """
+        Close the store.  Further calls have no effect.
+        """
+
+        if self._map is None:
+            return
+
+        # The mapping can't be closed while views refer to it; it is
+        # then left for the garbage collector to close
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        self._map = None
+
+        self._index.close()
+        self._data.close()
+
+    def keys(self):
+        """
+        Retrieve the keys in the store.
+
+        :returns: A list of the keys, in no particular order.
+        """
+
+        return list(self._keys)
+
+    def get(self, key, default=None):
+        """
+        Load the object stored under a key, if there is one.
+
+        :param key: The key.
+        :param default: The value to return if the key is not in the
+                        store.  Defaults to ``None``.
+
+        :returns: A new ``VObject`` instance, upgraded to its latest
+                  version if necessary, or ``default``.
+        """
+
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def view(self, key):
+        """
+        Retrieve a read-only view of the object stored under a key,
+        which decodes its attributes only as they are read; see
+        ``VObject.from_buffer()``.  Objects that need an upgrade are
+        loaded immediately.  Raises a ``KeyError`` if the key is not
+        in the store.  A view must not be used after the store is
+        closed.
+
+        :param key: The key.
+
+        :returns: A ``vobj.proxy.BufferSchemaProxy``, or a new
+                  ``VObject`` instance.
+        """
+
+        offset, length = self._locate(key)
+        data = memoryview(self._map)[offset:offset + length]
+
+        return self._class(data).from_buffer(data, self._trusted)
+
+    def put(self, key, obj):
+        """
+        Store an object under a key, replacing any object already
+        stored under it.  The object is always stored in its latest
+        version; a ``ValueError`` is raised for proxies of older
+        versions, such as ``obj.__version__[1]``, and for objects of
+        classes that were not provided.
+
+        :param key: The key, a text string.
+        :param obj: The ``VObject`` instance to store.
+        """
+
+        self._append([(key, self._encode(obj))])
+
+    def put_many(self, items):
+        """
+        Store several objects, writing them to the files at once.
+        See ``put()``.
+
+        :param items: An iterable of tuples of a key and a
+                      ``VObject`` instance, or a dictionary mapping
+                      keys to ``VObject`` instances.
+
+        :returns: The number of objects stored.
+        """
+
+        if isinstance(items, dict):
+            items = items.items()
+        items = [(key, self._encode(obj)) for key, obj in items]
+        self._append(items)
+
+        return len(items)
@@ -0,0 +1,239 @@
+# Copyright 2014 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import argparse
+import gzip
+import json
+import sys
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+
+# Map file name extensions to the functions for opening compressed
+# files
+_COMPRESSORS = {
+    '.gz': gzip.open,
+}
+if lzma is not None:
+    _COMPRESSORS['.xz'] = lzma.open
+    _COMPRESSORS['.lzma'] = lzma.open
+
+
+def open_stream(filename, mode='r'):
+    """
+    Open a file of records.  Files with a name ending in ".gz" are
+    compressed with gzip; files with a name ending in ".xz" or
+    ".lzma" are compressed with lzma, if the ``lzma`` module is
+    available.  Files are always opened in binary mode.
+
+    :param filename: The name of the file.  The name "-" refers to
+                     the standard input or output, depending on
+                     ``mode``.
+    :param mode: The mode, either "r" or "w".  Defaults to "r".
+
+    :returns: A binary file object.
+    """
+
+    if filename == '-':
+        std = sys.stdin if mode == 'r' else sys.stdout
+        return getattr(std, 'buffer', std)
+
+    for ext, opener in _COMPRESSORS.items():
+        if filename.endswith(ext):
+            return opener(filename, mode + 'b')
+
+    return open(filename, mode + 'b')
+
+
+def read_records(stream):
+    """
+    Read records from a stream of JSON lines.  Blank lines are
+    ignored.
+
+    :param stream: An iterable of lines encoded in UTF-8, such as a
+                   binary file object.
+
+    :returns: A generator yielding state dictionaries.
+    """
+
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line.decode('utf-8'))
+
+
+def write_records(stream, records):
+    """
+    Write records to a stream as JSON lines.
+
+    :param stream: A binary file object.
+    :param records: An iterable of state dictionaries.
+
+    :returns: The number of records written.
+    """
+
+    count = 0
+    for record in records:
+        stream.write((json.dumps(record, sort_keys=True) + '\n')
+                     .encode('utf-8'))
+        count += 1
+
+    return count
+
+
+def migrate(cls, records, version=None, chunk_size=1000):
+    """
+    Convert records to the designated version.  The records are
+    upgraded to the latest version of ``cls`` in chunks, using
+    ``VObject.iter_from_dicts()``, then downgraded to the designated
+    version, if necessary.  Only one chunk of records is held in
+    memory at a time.
+
+    :param cls: The ``VObject`` subclass describing the records.
+    :param records: An iterable of state dictionaries.
+    :param version: The version to convert the records to.  Defaults
+                    to the latest version of ``cls``.  Raises a
+                    ``KeyError`` if the version is not available.
+    :param chunk_size: The number of records to convert at a time.
+                       Defaults to 1000.
+
+    :returns: A generator yielding state dictionaries.
+    """
+
+    # Select the downgraders to use, if any
+    downgraders = None
+    if version is not None and version != cls.__version__:
+        if version not in cls.__vers_downgraders__:
+            raise KeyError(version)
+        downgraders = cls.__vers_downgraders__[version]
+
+    for obj in cls.iter_from_dicts(records, chunk_size=chunk_size):
+        if downgraders is None:
+            yield obj.to_dict()
+        else:
+            yield downgraders(obj.to_dict()).__getstate__()
+
+
+def _load_class(spec):
+    """
+    Import a ``VObject`` subclass.
+
+    :param spec: The class specification, in the form
+                 "module:ClassName".  The class name may be a dotted
+                 path to a nested class.
+
+    :returns: The ``VObject`` subclass.
+    """
+
+    module, _sep, name = spec.partition(':')
+    if not module or not name:
+        raise ImportError("invalid class specification %r" % spec)
+
+    __import__(module)
+    obj = sys.modules[module]
+    for attr in name.split('.'):
+        try:
+            obj = getattr(obj, attr)
+        except AttributeError:
+            raise ImportError("no class %r in module %r" % (name, module))
+
+    return obj
+
+
+def main(argv=None):
+    """
+    Migrate a file of records from the command line.
+
+    :param argv: The command line arguments.  Defaults to
+                 ``sys.argv[1:]``.
+
+    :returns: The exit status.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='python -m vobj.stream',
+        description='Convert a file of versioned records, stored as '
+        'JSON lines, to a given version.  Files with names ending in '
+        '".gz", ".xz", or ".lzma" are compressed.',
+    )
+    parser.add_argument('cls', metavar='MODULE:CLASS',
+                        help='The VObject subclass describing the '
+                        'records.')
+    parser.add_argument('-i', '--input', default='-',
+                        help='The file to read records from.  Defaults to '
+                        'the standard input.')
+    parser.add_argument('-o', '--output', default='-',
+                        help='The file to write records to.  Defaults to '
+                        'the standard output.')
+    parser.add_argument('-t', '--to-version', type=int, default=None,
+                        help='The version to convert the records to.  '
+                        'Defaults to the latest version.')
+    parser.add_argument('-c', '--chunk-size', type=int, default=1000,
+                        help='The number of records to convert at a '
+                        'time.  Defaults to %(default)s.')
+    args = parser.parse_args(argv)
+
+    try:
+        cls = _load_class(args.cls)
+    except ImportError as exc:
+        parser.error(str(exc))
+
+    if args.chunk_size < 1:
+        parser.error("chunk size must be positive")
+    elif (args.to_version is not None and
+            args.to_version not in cls.__version__.available()):
+        parser.error("version %d of %s is not available" %
+                     (args.to_version, args.cls))
+
+    try:
+        instream = open_stream(args.input, 'r')
+    except EnvironmentError as exc:
+        parser.error(str(exc))
+
+    try:
+        try:
+            outstream = open_stream(args.output, 'w')
+        except EnvironmentError as exc:
+            parser.error(str(exc))
+
+        try:
+            write_records(outstream, migrate(
+                cls, read_records(instream), args.to_version,
+                args.chunk_size))
+        except Exception as exc:
+            # A malformed record may make an upgrader fail in any
+            # way; report it without a traceback, naming the
+            # exception unless it's one of the errors raised by the
+            # validators or by vobj itself
+            if not isinstance(exc, (TypeError, ValueError)):
+                exc = '%s: %s' % (exc.__class__.__name__, exc)
+            parser.exit(1, '%s: error: %s\n' % (parser.prog, exc))
+        finally:
+            if args.output != '-':
+                outstream.close()
+            else:
+                outstream.flush()
+    finally:
+        if args.input != '-':
+            instream.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
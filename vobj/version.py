@@ -114,3 +114,40 @@ class SmartVersion(int):
         avail.add(self._schema.__version__)
 
         return avail
+
+
+class VersionDescriptor(object):
+    """
+    Used as the value of the ``__version__`` attribute of ``VObject``
+    subclasses.  When accessed on the class, returns the class's
+    ``SmartVersion``.  When accessed on an instance, returns a
+    ``SmartVersion`` bound to the instance.  The instance's
+    ``SmartVersion`` is created when accessed, rather than being
+    stored on the instance, since storing it would create a reference
+    cycle.
+    """
+
+    def __init__(self, version):
+        """
+        Initialize a ``VersionDescriptor`` object.
+
+        :param version: The ``SmartVersion`` of the class.
+        """
+
+        self.version = version
+
+    def __get__(self, obj, cls=None):
+        """
+        Retrieve the version.
+
+        :param obj: The ``VObject`` instance, or ``None`` if the
+                    version was looked up on the class.
+        :param cls: The ``VObject`` subclass.
+
+        :returns: A ``SmartVersion`` object.
+        """
+
+        if obj is None:
+            return self.version
+
+        return SmartVersion(int(self.version), self.version._schema, obj)
@@ -13,16 +13,498 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
+import contextlib
 import inspect
+import itertools
+import threading
+import timeit
+import weakref
 
 import six
 
+from vobj import attribute
+from vobj import binary
 from vobj import converters
+from vobj import parallel
 from vobj import proxy
 from vobj import schema
 from vobj import version
 
 
+# Used to distinguish a missing class attribute from any other value
+_missing = object()
+
+
+class _Local(threading.local):
+    """
+    Per-thread flags.  The "trusted" flag indicates whether unpickled
+    states are trusted; see ``trusted()``.
+    """
+
+    trusted = False
+
+
+_local = _Local()
+
+
+def _lookup(bases, name):
+    """
+    Look up the raw value of a class attribute inherited from a tuple
+    of base classes.
+
+    :param bases: A tuple of the base classes.
+    :param name: The name of the attribute.
+
+    :returns: The raw value of the attribute, as found in the
+              ``__dict__`` of the class defining it, or ``_missing``.
+    """
+
+    for base in bases:
+        for klass in base.__mro__:
+            if name in klass.__dict__:
+                return klass.__dict__[name]
+
+    return _missing
+
+
+def _descriptors(sch, bases, namespace):
+    """
+    Compute the descriptors to install on a ``VObject`` subclass for
+    the attributes, properties, and other members of its latest
+    schema.  Names defined by the ``VObject`` subclass or its bases
+    take precedence, and descriptors inherited from a base class for
+    names not present in the schema are masked.  If the schema
+    defines its own ``__setattr__()``, writes to attributes are
+    passed to it.
+
+    :param sch: The latest ``Schema`` subclass, or ``None``.
+    :param bases: A tuple of the base classes.
+    :param namespace: A dictionary containing the namespace of the
+                      class.
+
+    :returns: A dictionary mapping names to descriptors.
+    """
+
+    # Select the type of descriptor for each name
+    types = {}
+    if sch is not None:
+        for name in dir(sch):
+            # Skip special names
+            if name.startswith('__') and name.endswith('__'):
+                continue
+            types[name] = proxy.MemberDescriptor
+        for name in sch.__vers_properties__:
+            types[name] = proxy.PropertyDescriptor
+        for name in sch.__vers_attrs__:
+            types[name] = proxy.AttributeDescriptor
+
+    direct = sch is None or schema._standard(sch, '__setattr__')
+
+    result = {}
+    for name, desc_type in types.items():
+        # Don't override anything declared on the class
+        inherited = _lookup(bases, name)
+        if name in namespace or not (inherited is _missing or
+                                     isinstance(inherited, proxy.DESCRIPTORS)):
+            continue
+
+        # Attributes of compact schemas are stored by index
+        if desc_type is proxy.AttributeDescriptor:
+            key = (sch.__vers_index__[name]
+                   if getattr(sch, '__vers_compact__', False) else None)
+            result[name] = desc_type(name, key, direct)
+        else:
+            result[name] = desc_type(name)
+
+    # Mask inherited descriptors
+    for base in bases:
+        for klass in base.__mro__:
+            for name, value in klass.__dict__.items():
+                if (isinstance(value, proxy.DESCRIPTORS) and
+                        name not in namespace and name not in types):
+                    result[name] = proxy.MaskDescriptor(name)
+
+    return result
+
+
+def _invalidates(schemas, downgraders):
+    """
+    Determine which cached downgraded versions must be discarded
+    when each attribute of the latest schema is modified.  A
+    downgrader declaring its dependencies only needs to be rerun if
+    one of those attributes is modified, or if an attribute that is
+    also present in the older schema (and is thus likely to be
+    passed through unchanged) is modified; any other downgrader must
+    be rerun if any attribute is modified.
+
+    :param schemas: A list of the schemas.
+    :param downgraders: A dictionary mapping versions to the
+                        ``vobj.converters.Converters`` objects that
+                        produce them.
+
+    :returns: A dictionary mapping the name of each attribute of the
+              latest schema to a ``frozenset`` of the affected
+              downgrade cache keys.  These are the affected versions,
+              along with a "(version, name)" key for each attribute
+              produced by a downgrader declaring the attributes it
+              produces.
+    """
+
+    attrs = set(schemas[-1].__vers_attrs__) if schemas else set()
+    result = dict((key, set()) for key in attrs)
+
+    for vers, cvt in downgraders.items():
+        # Each downgrade is performed by a single downgrader
+        depends = getattr(cvt[0], '__vers_depends__', None)
+
+        if depends is None:
+            affected = attrs
+        else:
+            affected = set(depends)
+            affected |= attrs & set(schemas[vers - 1].__vers_attrs__)
+
+        # Include the per-attribute cache keys
+        keys = set([vers])
+        produces = getattr(cvt[0], '__vers_produces__', None)
+        if produces is not None:
+            keys |= set((vers, name) for name in produces)
+
+        for key in affected:
+            result[key] |= keys
+
+    return dict((key, frozenset(versions))
+                for key, versions in result.items())
+
+
+def _lazy(schemas, downgraders):
+    """
+    Determine how each attribute of the older versions is resolved
+    when read through a ``ReadOnlyLazySchemaProxy``, for those
+    downgraders declaring the attributes they produce.  Raises a
+    ``TypeError`` if the declaration is inconsistent with the
+    schemas.
+
+    :param schemas: A list of the schemas.
+    :param downgraders: A dictionary mapping versions to the
+                        ``vobj.converters.Converters`` objects that
+                        produce them.
+
+    :returns: A dictionary mapping versions to dictionaries.  These
+              map the names of the attributes of the version to
+              ``None``, for attributes produced by the downgrader, or
+              to a tuple of the ``Attribute`` objects of the latest
+              and older schemas, for attributes passed through from
+              the latest schema.
+    """
+
+    result = {}
+    for vers, cvt in downgraders.items():
+        produces = getattr(cvt[0], '__vers_produces__', None)
+        if produces is None:
+            continue
+
+        latest = schemas[-1].__vers_attrs__
+        older = schemas[vers - 1].__vers_attrs__
+
+        lazy = {}
+        for key, attr in older.items():
+            if key in produces:
+                lazy[key] = None
+            elif key in latest:
+                lazy[key] = (latest[key], attr)
+            else:
+                raise TypeError("Attribute '%s' of version %d is neither "
+                                "produced by its downgrader nor present "
+                                "in version %d" %
+                                (key, vers, len(schemas)))
+
+        undeclared = set(produces) - set(older)
+        if undeclared:
+            raise TypeError("Downgrader to version %d produces undeclared "
+                            "attributes: %s" %
+                            (vers, ', '.join(sorted(undeclared))))
+
+        result[vers] = lazy
+
+    return result
+
+
+def _revalidate(schemas):
+    """
+    Determine which attributes must be validated when a trusted state
+    of each version is loaded.  A trusted state is only known to be
+    valid for the version it claims, so besides the attributes named
+    by the "__vers_untrusted__" of the latest schema, the attributes
+    of the latest schema whose validators differ from those of the
+    older schema, or which the older schema lacks, are validated
+    (unless their validators are the identity function), as
+    are the attributes named by the "__vers_untrusted__" of the older
+    schema, whose values are passed through in serialized form.
+
+    :param schemas: A list of the schemas.
+
+    :returns: A dictionary mapping versions to ``frozenset`` objects
+              of the names of the attributes to validate.
+    """
+
+    if not schemas:
+        return {}
+
+    latest = schemas[-1]
+    untrusted = frozenset(latest.__vers_untrusted__)
+
+    result = {}
+    for sch in schemas:
+        older = sch.__vers_attrs__
+        changed = set(
+            key for key, attr in latest.__vers_attrs__.items()
+            if attr.validate is not attribute.identity and
+            (key not in older or older[key].validate is not attr.validate)
+        )
+        result[sch.__version__] = (untrusted | changed |
+                                   frozenset(sch.__vers_untrusted__))
+
+    return result
+
+
+def _costs(schemas):
+    """
+    Collect the costs declared by the upgraders.
+
+    :param schemas: A list of the schemas.
+
+    :returns: A dictionary mapping "(from, to)" version pairs to the
+              declared costs of the corresponding upgraders.
+              Upgraders not declaring a cost are omitted.
+    """
+
+    return dict(
+        ((src, sch.__version__), up.__vers_cost__)
+        for sch in schemas
+        for src, up in sch.__vers_upgraders__.items()
+        if getattr(up, '__vers_cost__', None) is not None
+    )
+
+
+def _plan_greedy(schemas, vers):
+    """
+    Compute the chain of upgraders from a given version to the latest
+    version, by starting at the latest schema and always taking the
+    longest available step back toward the given version.
+
+    :param schemas: A list of the schemas.
+    :param vers: The version to upgrade from.
+
+    :returns: A list of "(from, to)" version pairs, in the order the
+              upgraders are to be applied.
+    """
+
+    sch = schemas[-1]
+    sch_vers = sch.__version__
+    steps = []
+
+    while vers != sch_vers:
+        # Find the upgrader that most closely matches the target
+        # version: the one from the oldest version no older than the
+        # target
+        sources = sorted(sch.__vers_upgraders__)
+        idx = bisect.bisect_left(sources, vers)
+        if idx >= len(sources) or sources[idx] >= sch_vers:
+            # Shouldn't happen
+            raise TypeError("missing upgrader for schema version %s" %
+                            sch.__version__)
+        trial_vers = sources[idx]
+
+        # Add the step and select the appropriate ancestor schema
+        steps.append((trial_vers, sch_vers))
+        sch = schemas[trial_vers - 1]
+        sch_vers = trial_vers
+
+    steps.reverse()
+
+    return steps
+
+
+def _plan_greedy_all(schemas):
+    """
+    Compute the chains of upgraders selected by ``_plan_greedy()`` for
+    all versions at once.  The chain from a version follows the chain
+    from the next version back from the latest version, until it
+    reaches the first schema with an upgrader from the version, so
+    each chain is the first step followed by the chain from the
+    version that step reaches.  The chains are thus built from the
+    newest version to the oldest, each from one already built.
+
+    :param schemas: A list of the schemas.
+
+    :returns: A dictionary mapping versions to lists of "(from, to)"
+              version pairs, in the order the upgraders are to be
+              applied.
+    """
+
+    latest = schemas[-1].__version__
+
+    # Find the schemas with an upgrader from each version, newest
+    # first
+    targets = {}
+    for sch in schemas:
+        for src in sch.__vers_upgraders__:
+            targets.setdefault(src, []).append(sch.__version__)
+
+    plans = {latest: []}
+    for vers in range(latest - 1, 0, -1):
+        # Versions in the following chain are in increasing order
+        following = plans[vers + 1]
+        for dst in sorted(targets.get(vers, []), reverse=True):
+            idx = bisect.bisect_left(following, (dst,))
+            if dst == latest or (idx < len(following) and
+                                 following[idx][0] == dst):
+                break
+        else:
+            raise TypeError("missing upgrader for schema version %s" %
+                            (vers + 1))
+
+        plans[vers] = [(vers, dst)] + plans[dst]
+
+    return plans
+
+
+def _plan_cheapest(schemas, vers, costs, default=1):
+    """
+    Compute the cheapest chain of upgraders from a given version to
+    the latest version.  Ties are broken in favor of fewer steps.
+
+    :param schemas: A list of the schemas.
+    :param vers: The version to upgrade from.
+    :param costs: A dictionary mapping "(from, to)" version pairs to
+                  the costs of the corresponding upgraders.
+    :param default: The cost assumed for upgraders with no known
+                    cost.  If ``None``, such upgraders are not used.
+                    Defaults to 1.
+
+    :returns: A list of "(from, to)" version pairs, in the order the
+              upgraders are to be applied.
+    """
+
+    # The upgraders only go forward, so the versions are already in
+    # topological order; best maps each reachable version to the
+    # cost and length of the best path to it and the previous version
+    # on that path
+    best = {vers: (0, 0, None)}
+    latest = schemas[-1].__version__
+    for dst in range(vers + 1, latest + 1):
+        for src in sorted(schemas[dst - 1].__vers_upgraders__):
+            if src not in best:
+                continue
+
+            step = costs.get((src, dst), default)
+            if step is None:
+                continue
+
+            cost, length, _prev = best[src]
+            trial = (cost + step, length + 1, src)
+            if dst not in best or trial[:2] < best[dst][:2]:
+                best[dst] = trial
+
+    if latest not in best:
+        raise TypeError("missing upgrader for schema version %s" % latest)
+
+    # Walk back along the best path
+    steps = []
+    dst = latest
+    while dst != vers:
+        src = best[dst][2]
+        steps.append((src, dst))
+        dst = src
+    steps.reverse()
+
+    return steps
+
+
+def _timed(upgrader, timings, key, lock):
+    """
+    Wrap an upgrader so that the time it takes is recorded.
+
+    :param upgrader: The upgrader.
+    :param timings: A dictionary mapping "(from, to)" version pairs
+                    to lists of the total time spent in the upgrader,
+                    in seconds, and the number of states upgraded.
+    :param key: The "(from, to)" version pair of the upgrader.
+    :param lock: The lock to hold while updating ``timings``, since
+                 the upgrader may run in several threads at once.
+
+    :returns: A function which calls the upgrader and records the
+              time it takes.  The function has the same calling
+              convention as the upgrader.
+    """
+
+    batch = getattr(upgrader, '__vers_batch__', False)
+    columnar = getattr(upgrader, '__vers_columnar__', False)
+    timer = timeit.default_timer
+
+    def timed(state):
+        start = timer()
+        result = upgrader(state)
+        elapsed = timer() - start
+
+        if batch:
+            count = len(state)
+        elif columnar:
+            count = converters._count_rows(state)
+        else:
+            count = 1
+
+        with lock:
+            totals = timings.setdefault(key, [0.0, 0])
+            totals[0] += elapsed
+            totals[1] += count
+
+        return result
+
+    timed.__vers_batch__ = batch
+    timed.__vers_columnar__ = columnar
+
+    return timed
+
+
+@contextlib.contextmanager
+def trusted():
+    """
+    A context manager under which versioned objects unpickled by the
+    current thread are loaded from trusted states, as if by
+    ``VObject.from_dict()`` with ``trusted=True``.  Only use this
+    when loading pickles written by the application itself.
+    """
+
+    saved = _local.trusted
+    _local.trusted = True
+    try:
+        yield
+    finally:
+        _local.trusted = saved
+
+
+def _restore(cls, vers, values):
+    """
+    Reconstruct a versioned object from the compact pickle produced by
+    ``VObject.__reduce_ex__()``.  Values of the latest version are
+    validated in place and stored without building a state
+    dictionary; under the ``trusted()`` context manager, they are
+    stored without being validated.  Values of older versions are
+    turned back into a state dictionary and upgraded as usual.
+
+    :param cls: The ``VObject`` subclass.
+    :param vers: The version of the values.
+    :param values: A tuple of attribute values, ordered by the
+                   "__vers_fields__" of the schema for that version.
+
+    :returns: A new instance of the ``VObject`` subclass.
+    """
+
+    return cls.__vers_load_rows__(vers, [values], _local.trusted)[0]
+
+
 class EmptyClass(object):
     """
     An empty class.  This is used by ``VObject.from_dict()`` when
@@ -32,6 +514,85 @@ class EmptyClass(object):
     pass
 
 
+class Invalidator(object):
+    """
+    Used as the "__vers_notify__" hook of the schema object of a
+    ``VObject`` instance.  Invalidates the downgrade cache of the
+    instance when called.  Only a weak reference to the instance is
+    kept, so that the instance and its schema object do not form a
+    reference cycle.
+    """
+
+    def __init__(self, obj):
+        """
+        Initialize an ``Invalidator`` object.
+
+        :param obj: The ``VObject`` instance.
+        """
+
+        self.ref = weakref.ref(obj)
+
+    def __call__(self, name=None):
+        """
+        Invalidate the downgrade cache of the instance, if it still
+        exists.
+
+        :param name: The name of the attribute that was modified.  If
+                     ``None``, the entire cache is invalidated.
+        """
+
+        obj = self.ref()
+        if obj is not None:
+            obj.__vers_cache_invalidate__(name)
+
+
+class LazyValues(object):
+    """
+    A non-data descriptor providing the schema object of a lazily
+    loaded ``VObject`` instance.  Loaded instances keep their schema
+    object in their instance dictionary, which takes precedence over
+    the descriptor, so it is only consulted until a lazily loaded
+    instance is first used.  It then loads the state saved in the
+    "__vers_raw__" attribute and stores the resulting schema object
+    in the instance dictionary.
+    """
+
+    def __get__(self, obj, cls=None):
+        """
+        Load the state of a lazily loaded ``VObject`` instance.
+
+        :param obj: The ``VObject`` instance, or ``None`` if the
+                    attribute was looked up on the class.
+        :param cls: The ``VObject`` subclass.
+
+        :returns: The schema object of the instance.
+        """
+
+        if obj is None:
+            return self
+
+        raw = obj.__dict__.get('__vers_raw__')
+        if raw is None:
+            raise AttributeError('__vers_values__')
+
+        # The saved state is only read, never modified, so threads
+        # racing to load the same instance don't interfere with each
+        # other; the first to finish wins
+        vers, state, trusted = raw
+        if trusted:
+            values = obj.__vers_trust__(vers, [state])[0]
+        else:
+            if (vers != obj.__vers_schemas__[-1].__version__ or
+                    not obj.__vers_standard_setstate__()):
+                state = state.copy()
+            values = obj.__vers_upgrader_get__(vers)(state)
+
+        values = obj.__dict__.setdefault('__vers_values__', values)
+        obj.__dict__.pop('__vers_raw__', None)
+
+        return values
+
+
 class VObjectMeta(type):
     """
     A metaclass for versioned objects.  A ``VObject`` subclass
@@ -40,6 +601,10 @@ class VObjectMeta(type):
     ``Schema`` subclass additionally expresses how to convert a
     dictionary describing an older version of the data object into
     that schema.
+
+    The attributes, properties, and methods of the latest schema are
+    made available through descriptors installed on the ``VObject``
+    subclass, avoiding the overhead of ``__getattr__()``.
     """
 
     def __new__(mcs, name, bases, namespace):
@@ -90,7 +655,7 @@ class VObjectMeta(type):
                 for vers, down in last_schema.__vers_downgraders__.items()
             )
             upgraders = {
-                len(schemas): converters.Converters(schemas[-1]),
+                len(schemas): converters.Converters(schemas[-1]).fuse(),
             }
         else:
             downgraders = {}
@@ -99,11 +664,35 @@ class VObjectMeta(type):
         # Now make our additions to the namespace
         namespace['__vers_schemas__'] = schemas
         namespace['__vers_downgraders__'] = downgraders
+        namespace['__vers_invalidates__'] = _invalidates(schemas,
+                                                         downgraders)
+        namespace['__vers_lazy__'] = _lazy(schemas, downgraders)
+        namespace['__vers_revalidate__'] = _revalidate(schemas)
         namespace['__vers_upgraders__'] = upgraders
-        namespace['__version__'] = version.SmartVersion(len(schemas),
-                                                        last_schema)
+        namespace['__vers_costs__'] = _costs(schemas)
+        namespace['__vers_plans__'] = {}
+        namespace['__vers_timings__'] = None
+        namespace['__vers_trustable__'] = None
+        namespace['__vers_lock__'] = threading.Lock()
+        namespace.setdefault('__vers_name__', name)
+        namespace['__version__'] = version.VersionDescriptor(
+            version.SmartVersion(len(schemas), last_schema))
+        namespace.update(_descriptors(last_schema, bases, namespace))
+
+        cls = super(VObjectMeta, mcs).__new__(mcs, name, bases, namespace)
+
+        # All writes to schema attributes and properties are handled
+        # by the descriptors, so unless a subclass overrides it, the
+        # generic __setattr__() is unnecessary
+        if last_schema and _lookup((cls,), '__setattr__') is _lookup(
+                (VObject,), '__setattr__'):
+            cls.__setattr__ = object.__setattr__
 
-        return super(VObjectMeta, mcs).__new__(mcs, name, bases, namespace)
+        # Build all the upgrader chains now, if requested
+        if last_schema and getattr(cls, '__vers_eager__', False):
+            cls.__vers_warm__()
+
+        return cls
 
 
 @six.add_metaclass(VObjectMeta)
@@ -115,9 +704,51 @@ class VObject(proxy.SchemaProxy):
     can be safely pickled and unpickled; the ``Schema`` update methods
     make it possible to unpickle an older version of the object
     safely.  Versioned objects can also be converted to and from raw
-    dictionaries using the ``to_dict()`` and ``from_dict()`` methods.
+    dictionaries using the ``to_dict()`` and ``from_dict()`` methods,
+    and to and from a compact binary encoding using the ``to_bytes()``
+    and ``from_bytes()`` methods.  The encoding names the class by
+    its "__vers_name__" attribute, which defaults to the class name.
+
+    Versioned objects do not participate in reference cycles of their
+    own making, so they are reclaimed as soon as the last reference to
+    them is dropped, without waiting for the cyclic garbage
+    collector.  The proxies for older versions keep the object alive,
+    but the object does not keep its proxies; a new proxy is returned
+    each time an older version is requested.
+
+    The chain of upgraders for each older version is normally computed
+    and compiled the first time a state of that version is loaded.  If
+    the "__vers_eager__" attribute is set to ``True`` (it is inherited
+    by subclasses), all the chains are built when the class is
+    created instead; see ``__vers_warm__()``.
+
+    The caches maintained by versioned objects and their classes are
+    safe to use from multiple threads.  Cached values are read
+    without locking.  Each ``VObject`` subclass has a lock
+    ("__vers_lock__") which is held while upgrader chains are built,
+    so each is built only once.  Older version proxies are not
+    cached; the downgraded versions they read are.  Each object has
+    its own lock ("__vers_cache_lock__"), created on first use, which
+    is held while its downgrade cache is updated, so threads working
+    on different objects never contend.  The downgrade cache is never
+    modified in place; it is replaced by an updated copy.
+    A downgraded version computed while the object is being modified
+    is returned to the caller, but not cached, so later reads never
+    see a version computed from values that have since been
+    replaced.  Modifying the same object from several threads at
+    once still requires the caller to provide its own locking.
     """
 
+    # Build the upgrader chains lazily by default
+    __vers_eager__ = False
+
+    # Only consulted by lazily loaded instances that haven't been
+    # used yet
+    __vers_values__ = LazyValues()
+
+    # The downgrade cache is created on first use
+    __vers_cache__ = None
+
     @classmethod
     def __vers_upgrader_get__(cls, vers):
         """
@@ -131,42 +762,447 @@ class VObject(proxy.SchemaProxy):
         :returns: An instance of ``vobj.converters.Converters``.
         """
 
-        # Do we need to generate the converter?
-        if vers not in cls.__vers_upgraders__:
-            # Initialize loop variables
-            sch = cls.__vers_schemas__[-1]
-            sch_vers = sch.__version__
+        # Most of the time, the converter has already been built
+        cvt = cls.__vers_upgraders__.get(vers)
+        if cvt is not None:
+            return cvt
+
+        # Build it while holding the lock, so it's only built once
+        with cls.__vers_lock__:
+            upgraders = cls.__vers_upgraders__
+            if vers in upgraders:
+                return upgraders[vers]
 
             # Initialize a landing pad
-            cvt = converters.Converters(sch)
-
-            # Use a greedy algorithm to compute the chain of schema
-            # upgraders
-            while vers != sch_vers:
-                # Find the upgrader that most closely matches the
-                # target version
-                for trial_vers in range(vers, sch_vers):
-                    if trial_vers in sch.__vers_upgraders__:
-                        # Add the upgrader to the converter
-                        cvt.append(sch.__vers_upgraders__[trial_vers])
-
-                        # Select the appropriate ancestor schema and
-                        # update sch_vers
-                        sch = cls.__vers_schemas__[trial_vers - 1]
-                        sch_vers = trial_vers
-
-                        # We're done with the for loop, but not the
-                        # while
-                        break
+            cvt = converters.Converters(cls.__vers_schemas__[-1])
+
+            # Select the upgraders; note that the conversions are
+            # applied in reverse order
+            for src, dst in reversed(cls.__vers_plan__(vers)):
+                cvt.append(cls.__vers_upgrader_step__(src, dst))
+
+            # OK, save the converter set into the cache, combining
+            # any adjacent mappings; storing a single key is atomic,
+            # so readers never see a partially built converter
+            cvt = cvt.fuse()
+            upgraders[vers] = cvt
+
+        return cvt
+
+    @classmethod
+    def __vers_upgrader_step__(cls, src, dst):
+        """
+        Look up the upgrader for one step of a chain of upgraders.  If
+        the upgraders are being profiled (see ``profile_upgrades()``),
+        it is wrapped to record the time it takes.
+
+        :param src: The version the upgrader converts from.
+        :param dst: The version the upgrader converts to.
+
+        :returns: The upgrader.
+        """
+
+        upgrader = cls.__vers_schemas__[dst - 1].__vers_upgraders__[src]
+        timings = cls.__vers_timings__
+        if timings is not None:
+            upgrader = _timed(upgrader, timings, (src, dst),
+                              cls.__vers_lock__)
+
+        return upgrader
+
+    @classmethod
+    def __vers_plan__(cls, vers):
+        """
+        Compute the chain of upgraders needed to convert states from
+        the given version to the latest version for this
+        ``VObject``.  If the costs of any of the upgraders are known,
+        either because they were declared or because they were
+        measured (see ``profile_upgrades()``), the cheapest chain is
+        selected; otherwise, the longest available step is always
+        taken.  Chains selected by ``replan_upgrades()`` are kept in
+        "__vers_plans__" and take precedence.
+
+        :param vers: The version of the state.
+
+        :returns: A list of "(from, to)" version pairs, in the order
+                  the upgraders are to be applied.
+        """
+
+        plan = cls.__vers_plans__.get(vers)
+        if plan is not None:
+            return plan
+
+        if cls.__vers_costs__:
+            return _plan_cheapest(cls.__vers_schemas__, vers,
+                                  cls.__vers_costs__)
+
+        return _plan_greedy(cls.__vers_schemas__, vers)
+
+    @classmethod
+    def __vers_plan_all__(cls):
+        """
+        Compute the chains of upgraders selected by
+        ``__vers_plan__()`` for all versions of this ``VObject``.
+        Unless upgrader costs are known, the chains are computed all
+        at once, in time linear in the number of versions.
+
+        :returns: A dictionary mapping versions to lists of "(from,
+                  to)" version pairs, in the order the upgraders are
+                  to be applied.
+        """
+
+        schemas = cls.__vers_schemas__
+        if cls.__vers_plans__ or cls.__vers_costs__:
+            return dict((sch.__version__, cls.__vers_plan__(sch.__version__))
+                        for sch in schemas)
+
+        return _plan_greedy_all(schemas)
+
+    @classmethod
+    def __vers_reset__(cls):
+        """
+        Discard the upgrader chains built so far, so that they will
+        be rebuilt.  If "__vers_eager__" is set, they are rebuilt
+        immediately.
+        """
+
+        latest = cls.__vers_schemas__[-1].__version__
+        with cls.__vers_lock__:
+            cls.__vers_upgraders__ = {
+                latest: cls.__vers_upgraders__[latest],
+            }
+
+        if cls.__vers_eager__:
+            cls.__vers_warm__()
+
+    @classmethod
+    def __vers_warm__(cls):
+        """
+        Compute and compile the chains of upgraders for all versions
+        of this ``VObject``, so that the first load of a state of an
+        older version does not pay that cost.  Chains which have
+        already been built are left alone.  The chains are built from
+        the newest version to the oldest; a chain whose steps after
+        the first are those of a chain already built is built by
+        extending that chain with its first step (see
+        ``Converters.chain()``), so that building all the chains
+        takes time linear in the number of versions, rather than
+        quadratic.
+        """
+
+        # Prohibit warming abstract versioned objects
+        if not getattr(cls, '__vers_schemas__', None):
+            raise TypeError("cannot warm abstract versioned object "
+                            "class '%s'" % cls.__name__)
+
+        plans = cls.__vers_plan_all__()
+
+        with cls.__vers_lock__:
+            upgraders = cls.__vers_upgraders__
+            for vers in sorted(plans, reverse=True):
+                if vers in upgraders:
+                    continue
+
+                plan = plans[vers]
+                src, dst = plan[0]
+                base = upgraders.get(dst)
+                if base is not None and plans[dst] == plan[1:]:
+                    cvt = base.chain(cls.__vers_upgrader_step__(src, dst))
                 else:
-                    # Shouldn't happen
-                    raise TypeError("missing upgrader for schema version %s" %
-                                    sch.__version__)
+                    cvt = converters.Converters(cls.__vers_schemas__[-1])
+                    for src, dst in reversed(plan):
+                        cvt.append(cls.__vers_upgrader_step__(src, dst))
+                    cvt = cvt.fuse()
 
-            # OK, save the converter set into the cache
-            cls.__vers_upgraders__[vers] = cvt
+                # Storing a single key is atomic, so readers never see
+                # a partially built converter
+                upgraders[vers] = cvt
 
-        return cls.__vers_upgraders__[vers]
+    @classmethod
+    def __vers_state_version__(cls, state):
+        """
+        Retrieve the version of a state dictionary.  Raises a
+        ``TypeError`` if the state has no version, or if the version
+        is not one of the versions of this ``VObject``.
+
+        :param state: The state dictionary.
+
+        :returns: The version of the state.
+        """
+
+        if '__version__' not in state:
+            raise TypeError("schema version not available in state")
+
+        return cls.__vers_check_version__(state['__version__'])
+
+    @classmethod
+    def __vers_check_version__(cls, vers):
+        """
+        Sanity-check a version.  Raises a ``TypeError`` if the version
+        is not one of the versions of this ``VObject``.
+
+        :param vers: The version to check.
+
+        :returns: The version.
+        """
+
+        max_vers = cls.__vers_schemas__[-1].__version__
+        if (not isinstance(vers, six.integer_types) or
+                vers < 1 or vers > max_vers):
+            raise TypeError("invalid schema version %r in state" % vers)
+
+        return vers
+
+    @classmethod
+    def __vers_standard_setstate__(cls):
+        """
+        Determine whether the latest schema uses the generic or a
+        generated ``__setstate__()``.  These never modify the state
+        dictionary, while one defined by the user may.  The answer is
+        cached in "__vers_trustable__".
+
+        :returns: A ``True`` value if the latest schema's
+                  ``__setstate__()`` is the generic or a generated
+                  version, ``False`` otherwise.
+        """
+
+        standard = cls.__vers_trustable__
+        if standard is None:
+            standard = schema._standard(cls.__vers_schemas__[-1],
+                                        '__setstate__')
+            cls.__vers_trustable__ = standard
+
+        return standard
+
+    @classmethod
+    def __vers_trust__(cls, vers, states):
+        """
+        Convert a list of trusted state dictionaries, all of the same
+        version, to schema objects of the latest schema.  A trusted
+        state is only known to be valid for its own version, so the
+        values are not passed through the attribute validators,
+        except for the values of attributes added or changed by the
+        upgraders, and of the attributes named for the version in
+        "__vers_revalidate__"; see ``_revalidate()``.  If the latest
+        schema defines its own ``__setstate__()``, the states are
+        converted normally.
+
+        :param vers: The version of the states.
+        :param states: A list of state dictionaries.  The
+                       dictionaries are not modified.
+
+        :returns: A list of schema objects, in the same order as
+                  ``states``.
+        """
+
+        latest = cls.__vers_schemas__[-1]
+        upgraders = cls.__vers_upgrader_get__(vers)
+
+        # A user-defined __setstate__() has to see every state, and
+        # may modify it
+        if not cls.__vers_standard_setstate__():
+            return upgraders.convert_many([state.copy() for state in states])
+
+        untrusted = cls.__vers_revalidate__[vers]
+        if vers == latest.__version__:
+            return [latest.__vers_fromtrusted__(state, untrusted)
+                    for state in states]
+
+        result = []
+        converted = upgraders.convert_all(state.copy() for state in states)
+        for orig, state in zip(states, converted):
+            # Anything the upgraders touched must be validated
+            produced = [key for key, value in state.items()
+                        if key in untrusted or
+                        orig.get(key, _missing) is not value]
+            result.append(latest.__vers_fromtrusted__(state, produced))
+
+        return result
+
+    @classmethod
+    def __vers_convert__(cls, states, trusted=False, take=False):
+        """
+        Convert a list of state dictionaries to schema objects of the
+        latest schema.  The states are grouped by version, so that
+        the upgraders for each version are looked up only once.
+
+        :param states: A list of state dictionaries.  The
+                       dictionaries are not modified, unless ``take``
+                       is ``True``.
+        :param trusted: If ``True``, the states are trusted; see
+                        ``__vers_trust__()``.
+        :param take: If ``True``, the schema objects take ownership of
+                     the dictionaries; see
+                     ``Schema.__vers_takevalues__()``.  Trusted states
+                     are never modified.
+
+        :returns: A list of schema objects, in the same order as
+                  ``states``.
+        """
+
+        # Group the states by version; this also validates all the
+        # versions before any conversions are performed
+        groups = {}
+        for idx, state in enumerate(states):
+            vers = cls.__vers_state_version__(state)
+            groups.setdefault(vers, []).append(idx)
+
+        result = [None] * len(states)
+        latest = cls.__vers_schemas__[-1].__version__
+        for vers, indexes in groups.items():
+            # States at the latest version aren't modified by the
+            # conversion, unless the latest schema has its own
+            # __setstate__(), so they don't need to be copied
+            if trusted or take or (vers == latest and
+                                   cls.__vers_standard_setstate__()):
+                group = [states[idx] for idx in indexes]
+            else:
+                group = [states[idx].copy() for idx in indexes]
+
+            if trusted:
+                converted = cls.__vers_trust__(vers, group)
+            else:
+                upgraders = cls.__vers_upgrader_get__(vers)
+                converted = upgraders.convert_many(group, take)
+
+            for idx, values in zip(indexes, converted):
+                result[idx] = values
+
+        return result
+
+    @classmethod
+    def __vers_wrap__(cls, values):
+        """
+        Construct ``VObject`` instances from schema objects of the
+        latest schema, without calling ``__init__()``.
+
+        :param values: An iterable of schema objects.
+
+        :returns: A list of new instances of the ``VObject`` subclass,
+                  in the same order as ``values``.
+        """
+
+        new = super(VObject, cls).__new__
+        set_values = object.__setattr__
+
+        result = []
+        for sch_obj in values:
+            obj = new(cls)
+            set_values(obj, '__vers_values__', sch_obj)
+            result.append(obj)
+
+        return result
+
+    @classmethod
+    def __vers_defer__(cls, states, trusted=False, take=False):
+        """
+        Construct lazily loaded ``VObject`` instances from a list of
+        state dictionaries.  Only the versions of the states are
+        checked; the states are saved, and each is loaded when its
+        instance is first used.  See ``LazyValues``.
+
+        :param states: A list of state dictionaries.  The
+                       dictionaries are not modified; unless ``take``
+                       is ``True``, they are copied.
+        :param trusted: If ``True``, the states are trusted; see
+                        ``__vers_trust__()``.
+        :param take: If ``True``, the dictionaries are saved without
+                     being copied.
+
+        :returns: A list of new instances of the ``VObject`` subclass,
+                  in the same order as ``states``.
+        """
+
+        new = super(VObject, cls).__new__
+        set_raw = object.__setattr__
+
+        result = []
+        for state in states:
+            vers = cls.__vers_state_version__(state)
+            obj = new(cls)
+            set_raw(obj, '__vers_raw__',
+                    (vers, state if take else state.copy(), trusted))
+            result.append(obj)
+
+        return result
+
+    @classmethod
+    def __vers_load__(cls, states, trusted=False, take=False):
+        """
+        Construct ``VObject`` instances from a list of state
+        dictionaries.
+
+        :param states: A list of state dictionaries.  The
+                       dictionaries are not modified, unless ``take``
+                       is ``True``.
+        :param trusted: If ``True``, the states are trusted; see
+                        ``__vers_trust__()``.
+        :param take: If ``True``, the objects take ownership of the
+                     dictionaries; see ``Schema.__vers_takevalues__()``.
+
+        :returns: A list of new instances of the ``VObject`` subclass,
+                  in the same order as ``states``.
+        """
+
+        return cls.__vers_wrap__(cls.__vers_convert__(states, trusted,
+                                                      take))
+
+    @classmethod
+    def __vers_load_rows__(cls, vers, rows, trusted=False):
+        """
+        Construct ``VObject`` instances from rows of attribute values,
+        all of the same version.  Rows of the latest version are
+        validated in place and stored without building state
+        dictionaries, unless the latest schema defines its own
+        ``__setstate__()``; other rows are turned into state
+        dictionaries and loaded as by ``__vers_load__()``.
+
+        :param vers: The version of the rows.
+        :param rows: A list of sequences of attribute values, ordered
+                     by the "__vers_fields__" of the schema for that
+                     version.  The sequences are not modified.
+        :param trusted: If ``True``, the values are trusted; see
+                        ``__vers_trust__()``.
+
+        :returns: A list of new instances of the ``VObject`` subclass,
+                  in the same order as ``rows``.
+        """
+
+        vers = cls.__vers_check_version__(vers)
+        sch = cls.__vers_schemas__[vers - 1]
+        fields = sch.__vers_fields__
+        for row in rows:
+            if len(row) != len(fields):
+                raise ValueError("expected %d attribute values, got %d" %
+                                 (len(fields), len(row)))
+
+        if (sch is cls.__vers_schemas__[-1] and
+                cls.__vers_standard_setstate__()):
+            if not trusted:
+                validators = [sch.__vers_attrs__[key].validate
+                              for key in fields]
+                rows = [[validate(value)
+                         for validate, value in zip(validators, row)]
+                        for row in rows]
+            elif sch.__vers_untrusted__:
+                # Serialized values must be validated even so
+                validators = [(sch.__vers_index__[key],
+                               sch.__vers_attrs__[key].validate)
+                              for key in sch.__vers_untrusted__]
+                rows = [list(row) for row in rows]
+                for row in rows:
+                    for idx, validate in validators:
+                        row[idx] = validate(row[idx])
+            return cls.__vers_wrap__(sch.__vers_fromtuple__(row)
+                                     for row in rows)
+
+        states = []
+        for row in rows:
+            state = dict(zip(fields, row))
+            state['__version__'] = vers
+            states.append(state)
+
+        return cls.__vers_load__(states, trusted, take=True)
 
     def __new__(cls, **kwargs):
         """
@@ -194,19 +1230,10 @@ class VObject(proxy.SchemaProxy):
         default was declared, a ``TypeError`` will be raised.
         """
 
-        # Construct the Schema instance and set up __vers_values__
-        values = self.__vers_schemas__[-1](kwargs)
-        values.__vers_notify__ = self.__vers_cache_invalidate__
-        self.__vers_set_values__(values)
-
-        # Set up the smart version field
-        vers = version.SmartVersion(
-            int(self.__version__), self.__vers_schemas__[-1], self)
-        super(VObject, self).__setattr__('__version__', vers)
-
-        # Also need to set up the downgrade cache
-        self.__vers_cache_invalidate__()
-        super(VObject, self).__setattr__('__vers_proxies__', {})
+        # Construct the Schema instance and set up __vers_values__;
+        # the smart version field and the downgrade cache will be set
+        # up on first use
+        self.__vers_set_values__(self.__vers_schemas__[-1](kwargs))
 
     def __setattr__(self, name, value):
         """
@@ -232,14 +1259,27 @@ class VObject(proxy.SchemaProxy):
                   version.
         """
 
-        # Do we need to generate it?
-        if vers not in self.__vers_proxies__:
-            smart_version = version.SmartVersion(
-                vers, self.__vers_schemas__[vers - 1], self)
-            self.__vers_proxies__[vers] = proxy.ReadOnlyLazySchemaProxy(
-                smart_version)
+        # The proxy isn't kept, since it would form a reference cycle
+        # with us; it's cheap to build, and the downgraded values it
+        # reads are cached by us
+        smart_version = version.SmartVersion(
+            vers, self.__vers_schemas__[vers - 1], self)
+        return proxy.ReadOnlyLazySchemaProxy(smart_version)
+
+    def __vers_cache_lock_get__(self):
+        """
+        Retrieve the lock protecting the downgrade cache of this
+        object, creating it if needed.
+
+        :returns: The lock.
+        """
+
+        lock = self.__dict__.get('__vers_cache_lock__')
+        if lock is None:
+            lock = self.__dict__.setdefault('__vers_cache_lock__',
+                                            threading.Lock())
 
-        return self.__vers_proxies__[vers]
+        return lock
 
     def __vers_cache_get__(self, vers):
         """
@@ -251,69 +1291,266 @@ class VObject(proxy.SchemaProxy):
         :returns: A schema object for the given version.
         """
 
-        # Do we need to generate it?
-        if vers not in self.__vers_cache__:
-            sch_obj = self.__vers_downgraders__[vers](self.__getstate__())
-            self.__vers_cache__[vers] = sch_obj
+        # The cache is never modified in place, so it can be read
+        # without holding the lock
+        cache = self.__vers_cache__
+        if cache is None:
+            cache = self.__vers_cache_setup__()
+        elif vers in cache:
+            return cache[vers]
 
-        return self.__vers_cache__[vers]
+        # Generate it and add it to the cache
+        sch_obj = self.__vers_downgraders__[vers](self.__getstate__())
+        self.__vers_cache_publish__(cache, {vers: sch_obj})
 
-    def __vers_cache_invalidate__(self):
+        return sch_obj
+
+    def __vers_cache_setup__(self):
         """
-        Invalidate the version cache.
+        Create the downgrade cache, if it does not already exist.
+
+        :returns: The cache dictionary.
         """
 
-        # Just clear the cache; the proxy will invoke a regeneration
-        # if need be
-        super(VObject, self).__setattr__('__vers_cache__', {})
+        # Retrieve the values before taking the lock; loading a
+        # lazily loaded object may run upgraders, which shouldn't be
+        # run while holding it
+        values = self.__vers_values__
+
+        with self.__vers_cache_lock_get__():
+            cache = self.__vers_cache__
+            if cache is None:
+                cache = {}
+                super(VObject, self).__setattr__('__vers_cache__', cache)
 
-    def __setstate__(self, state):
+                # Arrange to be notified of changes to the values;
+                # until now, there was nothing to invalidate
+                values.__vers_notify__ = Invalidator(self)
+
+        return cache
+
+    def __vers_cache_publish__(self, cache, entries):
+        """
+        Add entries to the downgrade cache.  The cache is replaced
+        with an updated copy, rather than being modified in place.
+        Every invalidation replaces the cache, so if the cache is no
+        longer the one the entries were computed against, they may
+        have been computed from stale values; in that case, they are
+        discarded.
+
+        :param cache: The cache dictionary in effect when the entries
+                      were computed.
+        :param entries: A dictionary of the entries to add.
+        """
+
+        with self.__vers_cache_lock_get__():
+            if self.__vers_cache__ is cache:
+                cache = dict(cache)
+                cache.update(entries)
+                super(VObject, self).__setattr__('__vers_cache__', cache)
+
+    def __vers_attr_get__(self, vers, name):
+        """
+        Retrieve the value of an attribute, property, or method of the
+        given version.  If the downgrader for the version declares
+        the attributes it produces, attributes passed through from
+        the latest version are read directly from the values, and
+        the downgrader is only run to compute the produced
+        attributes, which are cached individually.  Otherwise, the
+        complete schema object for the version is generated.
+
+        :param vers: The integer version.
+        :param name: The name of the attribute.
+
+        :returns: The value of the attribute.
+        """
+
+        cache = self.__vers_cache__
+        lazy = self.__vers_lazy__.get(vers)
+
+        # Use the full schema object if we have one or must build one
+        if (lazy is None or name not in lazy or
+                (cache is not None and vers in cache)):
+            return getattr(self.__vers_cache_get__(vers), name)
+
+        # Passed through attributes come straight from the values
+        spec = lazy[name]
+        if spec is not None:
+            latest, older = spec
+            return older.validate(latest.getstate(
+                getattr(self.__vers_values__, name)))
+
+        # Produced attributes are cached individually
+        if cache is None:
+            cache = self.__vers_cache_setup__()
+        elif (vers, name) in cache:
+            return cache[(vers, name)]
+
+        # Run the downgrader and cache all the produced attributes
+        state = self.__vers_downgraders__[vers].convert(self.__getstate__())
+        attrs = self.__vers_schemas__[vers - 1].__vers_attrs__
+        entries = {}
+        for key in lazy:
+            if lazy[key] is not None:
+                continue
+            elif key not in state:
+                raise ValueError("missing attribute '%s'" % key)
+            entries[(vers, key)] = attrs[key].validate(state[key])
+        self.__vers_cache_publish__(cache, entries)
+
+        return entries[(vers, name)]
+
+    def __vers_cache_invalidate__(self, name=None):
+        """
+        Invalidate the version cache.  This is a no-op if nothing has
+        been cached.
+
+        :param name: The name of the attribute that was modified.
+                     Only the cached versions affected by the
+                     attribute are invalidated.  If ``None``, the
+                     entire cache is invalidated.
+        """
+
+        if self.__vers_cache__ is None:
+            return
+
+        # Just drop the affected entries; the proxy will invoke a
+        # regeneration if need be.  The cache is always replaced, so
+        # that entries being computed concurrently from the old values
+        # won't be added to it
+        affected = self.__vers_invalidates__.get(name)
+        with self.__vers_cache_lock_get__():
+            cache = self.__vers_cache__
+            if cache is None or affected is None:
+                cache = None
+            else:
+                cache = dict(cache)
+                for key in affected:
+                    cache.pop(key, None)
+            super(VObject, self).__setattr__('__vers_cache__', cache)
+
+    def __setstate__(self, state, trusted=None, take=False):
         """
         Reset the state of the object to reflect the values contained
         in the passed in ``state`` dictionary.
 
         :param state: The state dictionary.  All attribute values will
-                      be passed through the appropriate validators.
-                      Schema upgraders will be called to convert the
-                      dictionary to the current version.
+                      be passed through the appropriate validators,
+                      unless the state is trusted.  Schema upgraders
+                      will be called to convert the dictionary to the
+                      current version.
+        :param trusted: If ``True``, the attribute values are not
+                        passed through the validators, except for
+                        those added or changed by the upgraders; see
+                        ``__vers_trust__()``.  Defaults to ``True``
+                        when unpickling under the ``trusted()``
+                        context manager, ``False`` otherwise.
+        :param take: If ``True``, the object takes ownership of the
+                     state dictionary, and may modify it or use it to
+                     store the attribute values; see
+                     ``Schema.__vers_takevalues__()``.  Otherwise, or
+                     if the state is trusted, the dictionary is not
+                     modified.
         """
 
+        if trusted is None:
+            trusted = _local.trusted
+
         # Prohibit instantiating abstract versioned objects
         if not getattr(self, '__vers_schemas__', None):
             raise TypeError("cannot instantiate abstract versioned object "
                             "class '%s'" % self.__class__.__name__)
 
-        # First step, get the state version
-        if '__version__' not in state:
-            raise TypeError("schema version not available in state")
-        vers = state['__version__']
+        # First step, get and sanity-check the state version
+        vers = self.__vers_state_version__(state)
 
-        # Next, sanity-check the version
-        max_vers = self.__vers_schemas__[-1].__version__
-        if (not isinstance(vers, six.integer_types) or
-                vers < 1 or vers > max_vers):
-            raise TypeError("invalid schema version %r in state" % vers)
+        if trusted:
+            values = self.__vers_trust__(vers, [state])[0]
+        else:
+            # Now, get the upgraders
+            upgraders = self.__vers_upgrader_get__(vers)
+
+            # States at the latest version aren't modified by the
+            # conversion, unless the latest schema has its own
+            # __setstate__(), so they only need to be copied if they
+            # have to be upgraded
+            latest = self.__vers_schemas__[-1].__version__
+            if not take and (vers != latest or
+                             not self.__vers_standard_setstate__()):
+                state = state.copy()
+
+            # OK, we now have a pipeline of upgraders; call them in
+            # the proper order and get our schema object
+            values = upgraders(state, take)
+
+        # Set the values; anything cached is now stale
+        self.__vers_set_values__(values)
+        self.__vers_cache_invalidate__()
 
-        # Now, get the upgraders
-        upgraders = self.__vers_upgrader_get__(vers)
+    def __reduce_ex__(self, protocol):
+        """
+        Describe how to pickle the object.  Rather than a state
+        dictionary, the pickle contains the version and a tuple of the
+        attribute values, ordered by the schema's "__vers_fields__",
+        which ``_restore()`` loads without building a dictionary.  If
+        the class or its latest schema defines its own
+        ``__getstate__()`` or ``__setstate__()``, the object is pickled
+        with its state dictionary instead.
 
-        # OK, we now have a pipeline of upgraders; call them in the
-        # proper order and get our schema object
-        values = upgraders(state.copy())
-        values.__vers_notify__ = self.__vers_cache_invalidate__
+        :param protocol: The pickle protocol version.
 
-        # Set the values
-        self.__vers_set_values__(values)
+        :returns: A tuple describing the object to ``pickle``.
+        """
+
+        cls = self.__class__
+        latest = cls.__vers_schemas__[-1]
+        if (_lookup((cls,), '__getstate__') is not
+                proxy.SchemaProxy.__dict__['__getstate__'] or
+                _lookup((cls,), '__setstate__') is not
+                VObject.__dict__['__setstate__'] or
+                not schema._standard(latest, '__getstate__') or
+                not cls.__vers_standard_setstate__()):
+            return super(VObject, self).__reduce_ex__(protocol)
+
+        state = self.__vers_values__.__getstate__()
+        fields = latest.__vers_fields__
+        return (_restore, (cls, state['__version__'],
+                           tuple(state[key] for key in fields)))
 
     @classmethod
-    def from_dict(cls, values):
+    def from_dict(cls, values, trusted=False, take=False, lazy=False):
         """
         Construct a ``VObject`` instance from a dictionary.
 
         :param values: The state dictionary.  All attribute values
                        will be passed through the appropriate
-                       validators.  Schema upgraders will be called to
-                       convert the dictionary to the current version.
+                       validators, unless ``trusted`` is ``True``.
+                       Schema upgraders will be called to convert the
+                       dictionary to the current version.
+        :param trusted: If ``True``, the dictionary is trusted, for
+                        instance because it was produced by
+                        ``to_dict()`` in the same application.  Only
+                        the keys of the dictionary are checked; the
+                        values are stored without being validated,
+                        except for values added or changed by the
+                        upgraders, and values of attributes with a
+                        ``getstate`` function, which must be
+                        converted back.  Defaults to ``False``.
+        :param take: If ``True``, the caller hands ownership of the
+                     dictionary to the new object, which may modify it
+                     instead of a copy, and may keep it to store the
+                     attribute values.  The caller must not use the
+                     dictionary afterwards.  Ignored if ``trusted`` is
+                     ``True``, save that a lazily loaded object does
+                     not copy the dictionary.  Defaults to ``False``.
+        :param lazy: If ``True``, only the version of the dictionary
+                     is checked, and the dictionary is saved.  The
+                     upgraders and validators are run when any
+                     attribute of the object is first read or written,
+                     or when the object is serialized or compared, so
+                     any errors in the dictionary are reported then.
+                     This saves time when most objects loaded are
+                     never used.  Defaults to ``False``.
 
         :returns: A new instance of the ``VObject`` subclass.
         """
@@ -323,6 +1560,9 @@ class VObject(proxy.SchemaProxy):
             raise TypeError("cannot instantiate abstract versioned object "
                             "class '%s'" % cls.__name__)
 
+        if lazy:
+            return cls.__vers_defer__([values], trusted, take)[0]
+
         # We have to construct a new instance of the class while
         # avoiding calling __init__(); this trick is borrowed from the
         # pure-Python pickle code
@@ -330,6 +1570,359 @@ class VObject(proxy.SchemaProxy):
         obj.__class__ = cls
 
         # Now we can just __setstate__()
-        obj.__setstate__(values)
+        if trusted or take:
+            obj.__setstate__(values, trusted, take)
+        else:
+            obj.__setstate__(values)
 
         return obj
+
+    @classmethod
+    def from_bytes(cls, data, trusted=False):
+        """
+        Construct a ``VObject`` instance from its binary encoding, as
+        produced by ``to_bytes()`` on an instance or on a proxy for
+        one of its older versions.  The encoded values are loaded as
+        by ``from_dict()``, without building a state dictionary if
+        they are of the latest version.  Raises a ``ValueError`` if
+        the data is invalid or encodes an object of another class.
+
+        :param data: The encoded object.  This may be a byte string,
+                     a ``bytearray``, or a ``memoryview``.
+        :param trusted: If ``True``, the data is trusted; see
+                        ``from_dict()``.  Defaults to ``False``.
+
+        :returns: A new instance of the ``VObject`` subclass.
+        """
+
+        # Prohibit instantiating abstract versioned objects
+        if not getattr(cls, '__vers_schemas__', None):
+            raise TypeError("cannot instantiate abstract versioned object "
+                            "class '%s'" % cls.__name__)
+
+        name, vers, values = binary.decode(data)
+        if name != cls.__vers_name__:
+            raise ValueError("encoded object is a '%s', not a '%s'" %
+                             (name, cls.__vers_name__))
+
+        return cls.__vers_load_rows__(vers, [values], trusted)[0]
+
+    @classmethod
+    def from_buffer(cls, data, trusted=False):
+        """
+        Construct a read-only view of the binary encoding of an
+        object, as produced by ``to_bytes()``.  If the object is of
+        the latest version, the view is a
+        ``vobj.proxy.BufferSchemaProxy``, which decodes each attribute
+        from ``data`` only when it is read.  Otherwise, or if the
+        latest schema defines its own ``__setstate__()``, the object
+        is upgraded and loaded immediately, as by ``from_bytes()``.
+        Raises a ``ValueError`` if the header of the data is invalid
+        or names another class; other errors in the data are raised
+        when the values are decoded.
+
+        :param data: The encoded object.  This may be a byte string,
+                     a ``bytearray``, a ``memoryview``, or an
+                     ``mmap.mmap`` object; a ``memoryview`` of part of
+                     a larger buffer avoids copying the record.  It
+                     must not be modified while the view is in use.
+        :param trusted: If ``True``, the data is trusted; see
+                        ``from_dict()``.  Defaults to ``False``.
+
+        :returns: A ``vobj.proxy.BufferSchemaProxy`` or a new instance
+                  of the ``VObject`` subclass.
+        """
+
+        # Prohibit instantiating abstract versioned objects
+        if not getattr(cls, '__vers_schemas__', None):
+            raise TypeError("cannot instantiate abstract versioned object "
+                            "class '%s'" % cls.__name__)
+
+        name, vers, count, pos = binary.decode_header(data)
+        if name != cls.__vers_name__:
+            raise ValueError("encoded object is a '%s', not a '%s'" %
+                             (name, cls.__vers_name__))
+
+        # Anything needing an upgrade is loaded now
+        vers = cls.__vers_check_version__(vers)
+        latest = cls.__vers_schemas__[-1]
+        if vers != latest.__version__ or not cls.__vers_standard_setstate__():
+            return cls.from_bytes(data, trusted)
+
+        if count != len(latest.__vers_fields__):
+            raise ValueError("expected %d attribute values, got %d" %
+                             (len(latest.__vers_fields__), count))
+
+        return proxy.BufferSchemaProxy(cls, data, pos, trusted)
+
+    @classmethod
+    def iter_from_dicts(cls, states, chunk_size=1000, workers=None,
+                        trusted=False, take=False, lazy=False):
+        """
+        Construct ``VObject`` instances from an iterable of
+        dictionaries.  This is a generator; the dictionaries are
+        consumed in chunks, and within each chunk, the dictionaries
+        are grouped by version so that the upgraders for each version
+        are looked up only once.  This is considerably faster than
+        calling ``from_dict()`` for each dictionary.
+
+        :param states: An iterable of state dictionaries.  All
+                       attribute values will be passed through the
+                       appropriate validators.  Schema upgraders will
+                       be called to convert the dictionaries to the
+                       current version.  The dictionaries are not
+                       modified, unless ``take`` is ``True``.
+        :param chunk_size: The number of dictionaries to consume from
+                           ``states`` at a time.  If ``None``, all the
+                           dictionaries are consumed at once.
+        :param workers: If provided, the number of worker processes
+                        to convert the dictionaries in; see
+                        ``vobj.parallel.upgrade_all()``.  Each chunk
+                        is converted in a worker process.
+        :param trusted: If ``True``, the dictionaries are trusted; see
+                        ``from_dict()``.  Defaults to ``False``.
+        :param take: If ``True``, the caller hands ownership of the
+                     dictionaries to the new objects; see
+                     ``from_dict()``.  Ignored if ``workers`` is
+                     provided.  Defaults to ``False``.
+        :param lazy: If ``True``, the objects are loaded lazily; see
+                     ``from_dict()``.  Ignored if ``workers`` is
+                     provided.  Defaults to ``False``.
+
+        :returns: A generator yielding new instances of the
+                  ``VObject`` subclass, in the same order as
+                  ``states``.
+        """
+
+        # Prohibit instantiating abstract versioned objects
+        if not getattr(cls, '__vers_schemas__', None):
+            raise TypeError("cannot instantiate abstract versioned object "
+                            "class '%s'" % cls.__name__)
+
+        if workers is not None:
+            for obj in parallel.upgrade_all(cls, states, workers,
+                                            chunk_size or 1000, trusted):
+                yield obj
+            return
+
+        load = cls.__vers_defer__ if lazy else cls.__vers_load__
+        if chunk_size is None:
+            for obj in load(list(states), trusted, take):
+                yield obj
+            return
+
+        states = iter(states)
+        while True:
+            chunk = list(itertools.islice(states, chunk_size))
+            if not chunk:
+                break
+
+            for obj in load(chunk, trusted, take):
+                yield obj
+
+    @classmethod
+    def from_dicts(cls, states, workers=None, chunk_size=1000,
+                   trusted=False, take=False, lazy=False):
+        """
+        Construct a list of ``VObject`` instances from an iterable of
+        dictionaries.  The dictionaries are grouped by version so that
+        the upgraders for each version are looked up only once.  This
+        is considerably faster than calling ``from_dict()`` for each
+        dictionary.
+
+        :param states: An iterable of state dictionaries.  All
+                       attribute values will be passed through the
+                       appropriate validators.  Schema upgraders will
+                       be called to convert the dictionaries to the
+                       current version.  The dictionaries are not
+                       modified, unless ``take`` is ``True``.
+        :param workers: If provided, the number of worker processes
+                        to convert the dictionaries in; see
+                        ``vobj.parallel.upgrade_all()``.
+        :param chunk_size: The number of dictionaries to send to a
+                           worker process at a time.  Only used if
+                           ``workers`` is provided.  Defaults to 1000.
+        :param trusted: If ``True``, the dictionaries are trusted; see
+                        ``from_dict()``.  Defaults to ``False``.
+        :param take: If ``True``, the caller hands ownership of the
+                     dictionaries to the new objects; see
+                     ``from_dict()``.  Ignored if ``workers`` is
+                     provided.  Defaults to ``False``.
+        :param lazy: If ``True``, the objects are loaded lazily; see
+                     ``from_dict()``.  Ignored if ``workers`` is
+                     provided.  Defaults to ``False``.
+
+        :returns: A list of new instances of the ``VObject``
+                  subclass, in the same order as ``states``.
+        """
+
+        if workers is None:
+            chunk_size = None
+
+        return list(cls.iter_from_dicts(states, chunk_size=chunk_size,
+                                        workers=workers, trusted=trusted,
+                                        take=take, lazy=lazy))
+
+    @classmethod
+    def upgrade_columns(cls, cols, from_version):
+        """
+        Upgrade a dictionary of columns to the latest version.  The
+        columns are passed through the chain of upgraders; columnar
+        upgraders (declared with ``@upgrader(columnar=True)``) are
+        called with the whole dictionary, while other upgraders are
+        applied to the individual states.  No ``VObject`` instances
+        are constructed, and the values are not passed through the
+        attribute validators.
+
+        :param cols: A dictionary mapping attribute names to
+                     sequences of values, one element per state.  The
+                     dictionary is not modified.
+        :param from_version: The version of the columns.
+
+        :returns: A dictionary mapping attribute names to sequences
+                  of values for the latest version.
+        """
+
+        # Prohibit converting abstract versioned objects
+        if not getattr(cls, '__vers_schemas__', None):
+            raise TypeError("cannot convert abstract versioned object "
+                            "class '%s'" % cls.__name__)
+
+        vers = cls.__vers_check_version__(from_version)
+        schema._check_keys(cls.__vers_schemas__[vers - 1], cols)
+
+        result = cls.__vers_upgrader_get__(vers).convert_columns(cols)
+        schema._check_keys(cls.__vers_schemas__[-1], result)
+
+        return result
+
+    @classmethod
+    def downgrade_columns(cls, cols, to_version):
+        """
+        Downgrade a dictionary of columns from the latest version.
+        Columnar downgraders (declared with
+        ``@downgrader(version, columnar=True)``) are called with the
+        whole dictionary; other downgraders are applied to the
+        individual states.  No ``VObject`` instances are constructed,
+        and the values are not passed through the attribute
+        validators.  Raises a ``KeyError`` if the version is not
+        available.
+
+        :param cols: A dictionary mapping attribute names to
+                     sequences of values for the latest version, one
+                     element per state.  The dictionary is not
+                     modified.
+        :param to_version: The desired version.
+
+        :returns: A dictionary mapping attribute names to sequences
+                  of values for the desired version.
+        """
+
+        # Prohibit converting abstract versioned objects
+        if not getattr(cls, '__vers_schemas__', None):
+            raise TypeError("cannot convert abstract versioned object "
+                            "class '%s'" % cls.__name__)
+
+        schema._check_keys(cls.__vers_schemas__[-1], cols)
+
+        if to_version == cls.__vers_schemas__[-1].__version__:
+            return dict(cols)
+        elif to_version not in cls.__vers_downgraders__:
+            raise KeyError(to_version)
+
+        result = cls.__vers_downgraders__[to_version].convert_columns(cols)
+        schema._check_keys(cls.__vers_schemas__[to_version - 1], result)
+
+        return result
+
+    @classmethod
+    def explain_upgrade(cls, from_version):
+        """
+        Describe the chain of upgraders used to upgrade states from
+        the given version to the latest version.
+
+        :param from_version: The version to upgrade from.
+
+        :returns: A tuple of a list of the versions the states pass
+                  through, starting with ``from_version`` and ending
+                  with the latest version, and the estimated cost of
+                  the upgrade.  Upgraders with no known cost are
+                  counted as having a cost of 1.
+        """
+
+        # Prohibit explaining abstract versioned objects
+        if not getattr(cls, '__vers_schemas__', None):
+            raise TypeError("cannot upgrade abstract versioned object "
+                            "class '%s'" % cls.__name__)
+
+        vers = cls.__vers_check_version__(from_version)
+        steps = cls.__vers_plan__(vers)
+
+        return ([vers] + [dst for src, dst in steps],
+                sum(cls.__vers_costs__.get(step, 1) for step in steps))
+
+    @classmethod
+    def profile_upgrades(cls):
+        """
+        Begin measuring the time taken by each upgrader.  The upgrader
+        chains are rebuilt to record the time spent in each upgrader
+        until ``replan_upgrades()`` is called.  Note that this makes
+        upgrades slower while it is in effect.
+        """
+
+        # Prohibit profiling abstract versioned objects
+        if not getattr(cls, '__vers_schemas__', None):
+            raise TypeError("cannot profile abstract versioned object "
+                            "class '%s'" % cls.__name__)
+
+        cls.__vers_timings__ = {}
+        cls.__vers_reset__()
+
+    @classmethod
+    def replan_upgrades(cls):
+        """
+        Stop measuring the time taken by each upgrader, and select
+        the upgrader chains using the measurements.  The cost of each
+        upgrader which has been measured is set to the average time
+        it took per state, in microseconds, replacing any declared
+        cost; the costs of the other upgraders are unchanged.  Each
+        version's chain is replaced by the cheapest chain made up
+        entirely of upgraders with known costs; if there is none, the
+        current chain is kept, since the cost of an unmeasured
+        upgrader cannot be compared with a measured one.
+
+        :returns: A dictionary mapping "(from, to)" version pairs to
+                  the costs of the corresponding upgraders, for those
+                  upgraders with known costs.
+        """
+
+        # Prohibit replanning abstract versioned objects
+        if not getattr(cls, '__vers_schemas__', None):
+            raise TypeError("cannot profile abstract versioned object "
+                            "class '%s'" % cls.__name__)
+
+        # The timings are updated under the lock by the upgraders
+        with cls.__vers_lock__:
+            timings = [(key, tuple(totals)) for key, totals in
+                       (cls.__vers_timings__ or {}).items()]
+
+        costs = dict(cls.__vers_costs__)
+        for key, (total, count) in timings:
+            if count:
+                costs[key] = total * 1000000.0 / count
+
+        schemas = cls.__vers_schemas__
+        plans = {}
+        for sch in schemas[:-1]:
+            vers = sch.__version__
+            try:
+                plans[vers] = _plan_cheapest(schemas, vers, costs, None)
+            except TypeError:
+                plans[vers] = cls.__vers_plan__(vers)
+
+        cls.__vers_costs__ = costs
+        cls.__vers_plans__ = plans
+        cls.__vers_timings__ = None
+        cls.__vers_reset__()
+
+        return dict(costs)